@@ -0,0 +1,204 @@
+"""
+Исполнитель обновлений перед Dispatcher: порядок внутри чата, параллельность между чатами.
+
+Обновления раскладываются по полосам (lanes) по chat id (без чата — по user id). В полосе
+одновременно обрабатывается не больше одного обновления, поэтому шаги FSM одного
+пользователя не гонятся друг с другом; разные полосы обрабатывают max_in_flight воркеров,
+беря готовые полосы по кругу (одно обновление за ход — флуд одного чата не задерживает
+остальных). Память ограничена: всего в очереди не больше max_queued обновлений
+(submit → False / put ждёт), в одной полосе — не больше max_per_chat (лишнее отбрасывается).
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Deque, Dict, Hashable, Iterable, List, Optional, Sequence
+
+from aiogram import Bot, Dispatcher
+from aiogram.methods import GetUpdates, TelegramMethod
+from aiogram.types import Update
+from aiogram.utils.backoff import Backoff, BackoffConfig
+
+from backend.app.config import settings
+from backend.app.utils.metrics import Family, gauge, registry
+
+logger = logging.getLogger(__name__)
+
+QUEUE_WAIT = registry.histogram("update_queue_wait_seconds", "Ожидание обновления в полосе до начала обработки")
+UPDATE_RESULTS = registry.counter("updates", "Обновления, прошедшие через исполнитель", ["result"])
+POLLING_BACKOFF = BackoffConfig(min_delay=1.0, max_delay=30.0, factor=1.5, jitter=0.1)
+
+
+def lane_key(update: Update) -> Hashable:
+    """Ключ полосы: чат события, иначе пользователь, иначе само обновление (без порядка)"""
+    event = update.event
+    chat = getattr(event, "chat", None)
+    if chat is None:
+        message = getattr(event, "message", None)  # callback_query
+        chat = getattr(message, "chat", None)
+    if chat is not None:
+        return chat.id
+    user = getattr(event, "from_user", None) or getattr(event, "user", None)
+    if user is not None:
+        return ("user", user.id)
+    return ("update", update.update_id)
+
+
+class UpdateExecutor:
+    def __init__(self, dp: Dispatcher, bot: Bot, max_in_flight: int = 32, max_queued: int = 1000,
+                 max_per_chat: int = 50):
+        self.dp = dp
+        self.bot = bot
+        self.max_in_flight = max_in_flight
+        self.max_queued = max_queued
+        self.max_per_chat = max_per_chat
+        self.lanes: Dict[Hashable, Deque[tuple]] = {}  # Ключ → (update, время постановки)
+        self.queued = 0
+        self.in_flight = 0
+        self._ready: asyncio.Queue = asyncio.Queue()  # Полосы, готовые к обработке (не в работе, не пустые)
+        self._space = asyncio.Condition()
+        self._workers: List[asyncio.Task] = []
+
+    def start(self) -> None:
+        """Запустить воркеры"""
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"update-worker-{i}")
+            for i in range(self.max_in_flight)
+        ]
+        logger.info(f"✅ Исполнитель обновлений: {self.max_in_flight} воркеров, очередь до {self.max_queued}")
+
+    def submit(self, update: Update) -> bool:
+        """Поставить обновление без ожидания; False — очередь заполнена (отказ, webhook отвечает 429)"""
+        if self.queued >= self.max_queued:
+            UPDATE_RESULTS.labels("rejected").inc()
+            return False
+        self._enqueue(update)
+        return True
+
+    async def put(self, update: Update) -> None:
+        """Поставить обновление, дождавшись места в очереди (обратное давление для polling)"""
+        if self.queued >= self.max_queued:
+            async with self._space:
+                await self._space.wait_for(lambda: self.queued < self.max_queued)
+        self._enqueue(update)
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Дождаться обработки очереди и остановить воркеры"""
+        try:
+            await asyncio.wait_for(self._drained(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"⚠️ Не обработано обновлений при остановке: {self.queued}")
+
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def _enqueue(self, update: Update) -> None:
+        key = lane_key(update)
+        lane = self.lanes.get(key)
+        if lane is None:
+            lane = self.lanes[key] = deque()
+            self._ready.put_nowait(key)
+        elif len(lane) >= self.max_per_chat:
+            # Флуд одного чата не должен вытеснять остальных: лишнее отбрасываем
+            UPDATE_RESULTS.labels("dropped").inc()
+            logger.warning(f"⚠️ Полоса {key} переполнена, update {update.update_id} отброшен")
+            return
+        lane.append((update, time.perf_counter()))
+        self.queued += 1
+
+    async def _drained(self) -> None:
+        while self.queued or self.in_flight:
+            await asyncio.sleep(0.05)
+
+    async def _worker(self) -> None:
+        while True:
+            key = await self._ready.get()
+            lane = self.lanes[key]
+            update, queued_at = lane.popleft()
+            self.queued -= 1
+            self.in_flight += 1
+            QUEUE_WAIT.observe(time.perf_counter() - queued_at)
+            try:
+                await self._process(update)
+            finally:
+                self.in_flight -= 1
+                if lane:
+                    self._ready.put_nowait(key)  # В конец: остальные полосы не ждут этот чат
+                else:
+                    del self.lanes[key]
+                async with self._space:
+                    self._space.notify()
+
+    async def _process(self, update: Update) -> None:
+        try:
+            response = await self.dp.feed_update(self.bot, update)
+            if isinstance(response, TelegramMethod):
+                await self.dp.silent_call_request(self.bot, response)
+            UPDATE_RESULTS.labels("processed").inc()
+        except Exception as e:
+            UPDATE_RESULTS.labels("failed").inc()
+            logger.error(f"❌ Ошибка обработки update {update.update_id}: {e}", exc_info=True)
+
+
+async def poll_updates(executor: UpdateExecutor, allowed_updates: Optional[Sequence[str]] = None,
+                       polling_timeout: int = 30) -> None:
+    """
+    Long polling в исполнитель: следующий getUpdates уходит, только когда для пачки нашлось
+    место в очереди, так что при перегрузке обновления ждут на стороне Telegram.
+    """
+    bot = executor.bot
+    backoff = Backoff(config=POLLING_BACKOFF)
+    get_updates = GetUpdates(timeout=polling_timeout, allowed_updates=list(allowed_updates or []) or None)
+    request_timeout = int(bot.session.timeout + polling_timeout) if bot.session.timeout else None
+    while True:
+        try:
+            updates = await bot(get_updates, request_timeout=request_timeout)
+        except Exception as e:
+            logger.warning(f"⚠️ getUpdates не удался ({type(e).__name__}: {e}), повтор через {backoff.next_delay:.1f} с")
+            await backoff.asleep()
+            continue
+        backoff.reset()
+        for update in updates:
+            await executor.put(update)
+            get_updates.offset = update.update_id + 1
+
+
+# Устанавливается в lifespan (и для polling, и для webhook)
+update_executor: Optional[UpdateExecutor] = None
+
+
+def setup_executor(dp: Dispatcher, bot: Bot) -> UpdateExecutor:
+    """Создать и запустить исполнитель обновлений"""
+    global update_executor
+    update_executor = UpdateExecutor(
+        dp,
+        bot,
+        max_in_flight=settings.UPDATES_MAX_IN_FLIGHT,
+        max_queued=settings.UPDATES_MAX_QUEUED,
+        max_per_chat=settings.UPDATES_MAX_PER_CHAT
+    )
+    update_executor.start()
+    return update_executor
+
+
+async def shutdown_executor() -> None:
+    """Доработать очередь и остановить исполнитель обновлений"""
+    global update_executor
+    if update_executor:
+        await update_executor.stop()
+        update_executor = None
+
+
+@registry.collector
+def _executor_metrics() -> Iterable[Family]:
+    executor = update_executor
+    if executor is None:
+        return
+    yield gauge("update_queue_depth", "Обновлений ждут в полосах", executor.queued)
+    yield gauge("update_in_flight", "Обновлений в обработке", executor.in_flight)
+    yield gauge("update_lanes", "Полос (чатов) с обновлениями в очереди или в работе", len(executor.lanes))
+    yield gauge(
+        "update_lane_max_depth", "Самая длинная полоса", max((len(lane) for lane in executor.lanes.values()), default=0)
+    )
@@ -5,23 +5,48 @@ from aiogram import Router, F
 from aiogram.types import Message
 from aiogram.fsm.context import FSMContext
 from aiogram.filters import Command
-from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Awaitable
 import logging
+import re
 
-from backend.app.bot.states import UserRegistration
-from backend.app.bot.keyboards import get_main_menu, get_gender_keyboard, get_activity_keyboard, get_goal_keyboard
-from backend.app.repositories.users_repo import UsersRepository
-from backend.app.db.models import User, UserGoal
-from backend.app.db.session import async_session_maker
+from backend.app.bot.states import UserRegistration, MealLogging
+from backend.app.bot.keyboards import (
+    get_main_menu, get_confirm_keyboard, get_gender_keyboard, get_activity_keyboard, get_goal_keyboard
+)
+from backend.app.bot.middlewares import MetricsMiddleware, UnitOfWorkMiddleware
+from backend.app.bot.streaming import stream_to_message
+from backend.app.clients.nlp_client import build_advice_request, get_nlp_client
+from backend.app.config import settings
+from backend.app.db.models import UserGoal
+from backend.app.db.uow import UnitOfWork
+from backend.app.repositories.meals_repo import NUTRIENTS
+from backend.app.repositories.users_repo import cached_user_id
+from backend.app.services.ai_profile import get_profile_service
+from backend.app.services.food_db import get_food_store
+from backend.app.services.nutrition_targets import FORMULA_VERSION, compute_targets
+from backend.app.services.photos import PhotoTooLarge, get_photo_pipeline
+from backend.app.services.recsys import get_dish_catalog
+from backend.app.services.reminders import schedule_default_reminders
+from backend.app.services.session_analysis import request_session_analysis
+from backend.app.utils.localtime import local_date
 
 logger = logging.getLogger(__name__)
 
+# "гречка 200", "овсянка 150 г", "суп 250,5гр"
+PORTION_RE = re.compile(r"^(.*?)(?:\s+(\d+(?:[.,]\d+)?)\s*(?:г|гр|g)?\.?)?$", re.IGNORECASE)
+FOOD_MIN_SCORE = 0.2  # Минимальное триграммное сходство для автоматического выбора
+RECOMMENDED_DISHES = 5
+MEALS_PER_DAY = 3  # Цель на приём = остаток дня / оставшиеся приёмы
+
 # Создаём router для хэндлеров
 router = Router()
+router.message.middleware(MetricsMiddleware())  # Первым: замер включает commit
+# Ленивая сессия БД на обновление: хэндлеры без обращения к БД соединение не берут
+router.message.middleware(UnitOfWorkMiddleware())
 
 
 @router.message(Command("start"))
-async def cmd_start(message: Message, state: FSMContext):
+async def cmd_start(message: Message, state: FSMContext, uow: UnitOfWork):
     """Команда /start: начало регистрации"""
     telegram_id = str(message.from_user.id)
     first_name = message.from_user.first_name
@@ -29,15 +54,13 @@ async def cmd_start(message: Message, state: FSMContext):
     
     logger.info(f"👤 /start от пользователя: {telegram_id} ({first_name})")
     
-    # Подключаемся к БД и регистрируем пользователя
-    async with async_session_maker() as session:
-        users_repo = UsersRepository(session)
-        user = await users_repo.get_or_create(
-            telegram_user_id=telegram_id,
-            username=username,
-            first_name=first_name
-        )
-        logger.info(f"✅ Пользователь зарегистрирован/найден: {user.id}")
+    # Регистрируем пользователя (commit — в UnitOfWorkMiddleware)
+    user_id = await uow.users.get_or_create_id(
+        telegram_user_id=telegram_id,
+        username=username,
+        first_name=first_name
+    )
+    logger.info(f"✅ Пользователь зарегистрирован/найден: {user_id}")
     
     # Приветствие
     await message.answer(
@@ -189,7 +212,7 @@ async def process_target_weight(message: Message, state: FSMContext):
 
 
 @router.message(UserRegistration.waiting_for_calories)
-async def process_calories(message: Message, state: FSMContext):
+async def process_calories(message: Message, state: FSMContext, uow: UnitOfWork):
     """Обработка калорий и завершение регистрации"""
     try:
         calories = int(message.text)
@@ -203,52 +226,56 @@ async def process_calories(message: Message, state: FSMContext):
     # Получаем все данные профиля
     data = await state.get_data()
     
-    # Сохраняем профиль в БД
+    # Целевые КБЖУ по профилю (Mifflin–St Jeor) при заданной пользователем калорийности
+    goal_type = data.get("goal_type", "maintain")
+    targets = compute_targets(
+        age=data.get("age"),
+        gender=data.get("gender"),
+        height_cm=data.get("height_cm"),
+        weight_kg=data.get("weight_kg"),
+        activity_level=data.get("activity_level"),
+        goal_type=goal_type,
+        calories=calories
+    )
+    
+    # Сохраняем профиль в БД (один commit в конце обновления — UnitOfWorkMiddleware)
     telegram_id = str(message.from_user.id)
-    async with async_session_maker() as session:
-        users_repo = UsersRepository(session)
-        user = await users_repo.get_by_telegram_id(telegram_id)
+    user_id = await uow.users.get_id_by_telegram_id(telegram_id)
+    
+    if user_id:
+        # Обновляем профиль пользователя
+        await uow.users.patch(user_id, {
+            "age": data.get("age"),
+            "gender": data.get("gender"),
+            "height_cm": data.get("height_cm"),
+            "weight_kg": data.get("weight_kg"),
+            "activity_level": data.get("activity_level")
+        })
+        
+        # Сохраняем цели
+        goal = UserGoal(
+            user_id=user_id,
+            goal_type=goal_type,
+            target_weight_kg=data.get("target_weight_kg", 0),
+            target_calories=targets.calories,
+            target_protein_g=targets.protein_g,
+            target_fat_g=targets.fat_g,
+            target_carbs_g=targets.carbs_g,
+            calories_manual=True,
+            formula_version=FORMULA_VERSION
+        )
+        uow.session.add(goal)
+        logger.info(f"✅ Цели сохранены для пользователя {user_id}")
         
-        if user:
-            # Обновляем профиль пользователя
-            await users_repo.update(user.id, {
-                "age": data.get("age"),
-                "gender": data.get("gender"),
-                "height_cm": data.get("height_cm"),
-                "weight_kg": data.get("weight_kg"),
-                "activity_level": data.get("activity_level")
-            })
-            
-            # Сохраняем цели
-            target_weight = data.get("target_weight_kg", 0)
-            current_weight = data.get("weight_kg", 0)
-            goal_type = data.get("goal_type", "maintain")
-            
-            # Простой расчёт КБЖУ (для MVP)
-            calories_target = calories
-            protein = int(calories_target * 0.3 / 4)  # 30% от калорий / 4 ккал на грамм
-            fat = int(calories_target * 0.25 / 9)      # 25% от калорий / 9 ккал на грамм
-            carbs = int(calories_target * 0.45 / 4)    # 45% от калорий / 4 ккал на грамм
-            
-            goal = UserGoal(
-                user_id=user.id,
-                goal_type=goal_type,
-                target_weight_kg=target_weight,
-                target_calories=calories_target,
-                target_protein_g=protein,
-                target_fat_g=fat,
-                target_carbs_g=carbs
-            )
-            session.add(goal)
-            await session.commit()
-            logger.info(f"✅ Цели сохранены для пользователя {user.id}")
+        # Напоминания о завтраке и взвешивании (в той же транзакции)
+        await schedule_default_reminders(uow.reminders, user_id, message.chat.id)
     
     # Завершение регистрации
     await message.answer(
         f"✅ Спасибо! Профиль готов! 🎉\n\n"
         f"📊 Твои целевые показатели:\n"
-        f"• Калории: {calories} ккал\n"
-        f"• Белки: {protein}г | Жиры: {fat}г | Углеводы: {carbs}г\n\n"
+        f"• Калории: {targets.calories} ккал\n"
+        f"• Белки: {targets.protein_g:.0f}г | Жиры: {targets.fat_g:.0f}г | Углеводы: {targets.carbs_g:.0f}г\n\n"
         f"Теперь ты готов начать отслеживать питание!",
         reply_markup=get_main_menu()
     )
@@ -257,21 +284,92 @@ async def process_calories(message: Message, state: FSMContext):
 
 
 @router.message(F.text == "📷 Добавить приём пищи")
-async def add_meal(message: Message):
-    """Заглушка: добавление приёма пищи"""
-    await message.answer("📷 Пока эта функция в разработке. Приходи позже!")
+async def add_meal(message: Message, state: FSMContext):
+    """Добавление приёма пищи: фото или текст"""
+    await message.answer("🍽️ Пришли фото блюда или напиши его и вес порции в граммах, например: «гречка 200»")
+    await state.set_state(MealLogging.waiting_for_food)
 
 
 @router.message(F.text == "📊 История питания")
-async def meal_history(message: Message):
-    """Заглушка: история питания"""
-    await message.answer("📊 Пока эта функция в разработке. Приходи позже!")
+async def meal_history(message: Message, uow: UnitOfWork):
+    """История питания за неделю (из дневных сводок)"""
+    user_id = await uow.users.get_id_by_telegram_id(str(message.from_user.id))
+    if not user_id:
+        await message.answer("❌ Сначала зарегистрируйся: /start")
+        return
+    
+    totals = await uow.meals.get_daily_totals(user_id, days=7)
+    if not totals:
+        await message.answer("📊 За последнюю неделю приёмов пищи нет")
+        return
+    
+    lines = [
+        f"• {day.day:%d.%m}: {day.calories:.0f} ккал | "
+        f"Б {day.protein_g:.0f} / Ж {day.fat_g:.0f} / У {day.carbs_g:.0f} ({day.meals_count} приём.)"
+        for day in totals
+    ]
+    
+    remaining = await uow.meals.get_remaining_today(user_id)
+    if remaining:
+        lines.append(f"\n🎯 Осталось на сегодня: {max(remaining['calories'], 0):.0f} ккал")
+    
+    await message.answer("📊 История питания за неделю:\n\n" + "\n".join(lines))
 
 
 @router.message(F.text == "💡 Рекомендации")
-async def recommendations(message: Message):
-    """Заглушка: рекомендации"""
-    await message.answer("💡 Пока эта функция в разработке. Приходи позже!")
+async def recommendations(message: Message, uow: UnitOfWork):
+    """Персональные советы от NLP Module: текст появляется по мере генерации"""
+    user_id = await uow.users.get_id_by_telegram_id(str(message.from_user.id))
+    goal = await uow.goals.get_latest_for_user(user_id) if user_id else None
+    if not goal:
+        await message.answer("❌ Сначала заполни профиль: /start")
+        return
+    
+    remaining = await uow.meals.get_remaining_today(user_id)
+    history = await uow.meals.get_daily_totals(user_id, days=7)
+    exclude_mask = await uow.preferences.get_exclude_mask(user_id)
+    request = build_advice_request(user_id, goal, remaining=remaining, history=history)
+    # Соединение с БД возвращаем в пул до начала долгого ожидания ответа
+    await uow.release()
+    
+    catalog = get_dish_catalog()
+    if catalog is not None and remaining:
+        today = history[0] if history and history[0].day == local_date() else None
+        dishes = catalog.rank(
+            [remaining[name] for name in NUTRIENTS],
+            [goal.target_calories, goal.target_protein_g, goal.target_fat_g, goal.target_carbs_g],
+            exclude_mask=exclude_mask,
+            k=RECOMMENDED_DISHES,
+            meals_left=MEALS_PER_DAY - (today.meals_count if today else 0)
+        )
+        if dishes:
+            lines = [
+                f"• {dish.name} — {dish.kcal:.0f} ккал | Б {dish.protein_g:.0f} / Ж {dish.fat_g:.0f} / У {dish.carbs_g:.0f}"
+                for dish in dishes
+            ]
+            await message.answer("🍽 Что подойдёт сейчас:\n\n" + "\n".join(lines))
+    
+    await stream_to_message(
+        message,
+        "💭 Анализирую твоё питание...",
+        get_nlp_client().stream_advice(request),
+        min_interval=settings.NLP_EDIT_INTERVAL_S,
+        error_text="⚠️ Сервис рекомендаций сейчас недоступен. Попробуй позже!"
+    )
+
+
+@router.message(F.text == "🏁 Итоги дня")
+async def session_summary(message: Message, uow: UnitOfWork):
+    """Завершение сессии: AI-разбор готовится в фоне и приходит отдельным сообщением"""
+    user_id = await uow.users.get_id_by_telegram_id(str(message.from_user.id))
+    if not user_id:
+        await message.answer("❌ Сначала зарегистрируйся: /start")
+        return
+    
+    if await request_session_analysis(user_id, message.chat.id):
+        await message.answer("⏳ Готовлю разбор дня — пришлю, как только будет готов")
+    else:
+        await message.answer("⏳ Разбор уже готовится, подожди немного")
 
 
 @router.message(F.text == "⚙️ Мой профиль")
@@ -280,7 +378,131 @@ async def my_profile(message: Message):
     await message.answer("⚙️ Пока эта функция в разработке. Приходи позже!")
 
 
+@router.message(MealLogging.waiting_for_food, F.text)
+async def process_food_text(message: Message, state: FSMContext, uow: UnitOfWork):
+    """Поиск блюда в локальной базе продуктов и запись приёма пищи"""
+    food_store = get_food_store()
+    if food_store is None:
+        await message.answer("⚠️ База продуктов сейчас недоступна. Попробуй позже!")
+        await state.clear()
+        return
+    
+    # Вес порции — число в конце сообщения (по умолчанию 100 г)
+    match = PORTION_RE.match(message.text.strip())
+    query = match.group(1)
+    grams = float(match.group(2).replace(",", ".")) if match.group(2) else 100.0
+    
+    found = food_store.search(query, k=3, min_score=FOOD_MIN_SCORE)
+    if not found:
+        await message.answer("🤔 Не нашёл такое блюдо. Попробуй написать иначе")
+        return
+    
+    user_id = await uow.users.get_id_by_telegram_id(str(message.from_user.id))
+    if not user_id:
+        await message.answer("❌ Сначала зарегистрируйся: /start")
+        await state.clear()
+        return
+    
+    food = found[0]
+    portion = food.for_portion(grams)
+    await uow.meals.add_meal(user_id, food.name, portion_g=grams, source="text", **portion)
+    remaining = await uow.meals.get_remaining_today(user_id)
+    
+    text = (
+        f"✅ Записал: {food.name}, {grams:.0f} г\n"
+        f"• {portion['calories']:.0f} ккал | Б {portion['protein_g']:.0f} / "
+        f"Ж {portion['fat_g']:.0f} / У {portion['carbs_g']:.0f}"
+    )
+    if remaining:
+        text += f"\n\n🎯 Осталось на сегодня: {max(remaining['calories'], 0):.0f} ккал"
+    await message.answer(text, reply_markup=get_main_menu())
+    await state.clear()
+    uow.after_commit(lambda: update_profile(get_profile_service().record_meal(user_id, food.name, portion)))
+
+
+@router.message(MealLogging.waiting_for_food, F.photo)
+async def process_food_photo(message: Message, state: FSMContext, uow: UnitOfWork):
+    """Распознавание блюда по фото: черновик на подтверждение"""
+    user_id = await uow.users.get_id_by_telegram_id(str(message.from_user.id))
+    if not user_id:
+        await message.answer("❌ Сначала зарегистрируйся: /start")
+        await state.clear()
+        return
+    # Скачивание и CV — долгие: соединение с БД возвращаем в пул
+    await uow.release()
+    
+    try:
+        draft = await get_photo_pipeline().recognize(message.bot, message.photo)
+    except PhotoTooLarge:
+        await message.answer("⚠️ Фото слишком большое. Пришли его сжатым (не файлом)")
+        return
+    except Exception as e:
+        logger.warning(f"⚠️ Фото не распознано: {e}")
+        await message.answer("⚠️ Распознавание фото сейчас недоступно. Напиши блюдо текстом, например: «гречка 200»")
+        return
+    if draft is None:
+        await message.answer("🤔 Не узнал блюдо на фото. Напиши его текстом, например: «гречка 200»")
+        return
+    
+    portion = f", ~{draft.portion_g:.0f} г" if draft.portion_g else ""
+    text = (
+        f"📷 Похоже на: {draft.name}{portion} ({draft.confidence:.0%})\n"
+        f"• {draft.calories:.0f} ккал | Б {draft.protein_g:.0f} / Ж {draft.fat_g:.0f} / У {draft.carbs_g:.0f}"
+    )
+    if draft.alternatives:
+        text += f"\nДругие варианты: {', '.join(draft.alternatives)}"
+    await message.answer(text + "\n\nЗаписать?", reply_markup=get_confirm_keyboard())
+    await state.update_data(photo_draft={"user_id": user_id, "name": draft.name, "portion_g": draft.portion_g, **draft.nutrients()})
+    await state.set_state(MealLogging.confirming_photo)
+
+
+@router.message(MealLogging.confirming_photo, F.text == "✅ Да")
+async def confirm_food_photo(message: Message, state: FSMContext, uow: UnitOfWork):
+    """Запись приёма пищи из черновика по фото"""
+    draft = (await state.get_data()).get("photo_draft")
+    if not draft:
+        await message.answer("⚠️ Черновик не найден, пришли фото ещё раз", reply_markup=get_main_menu())
+        await state.clear()
+        return
+    
+    user_id, name, portion_g = draft.pop("user_id"), draft.pop("name"), draft.pop("portion_g")
+    await uow.meals.add_meal(user_id, name, portion_g=portion_g, source="photo", **draft)
+    remaining = await uow.meals.get_remaining_today(user_id)
+    
+    text = f"✅ Записал: {name}"
+    if remaining:
+        text += f"\n\n🎯 Осталось на сегодня: {max(remaining['calories'], 0):.0f} ккал"
+    await message.answer(text, reply_markup=get_main_menu())
+    await state.clear()
+    uow.after_commit(lambda: update_profile(get_profile_service().record_meal(user_id, name, draft)))
+
+
+@router.message(MealLogging.confirming_photo)
+async def reject_food_photo(message: Message, state: FSMContext, uow: UnitOfWork):
+    """Черновик не подошёл: новое фото или блюдо текстом"""
+    await state.update_data(photo_draft=None)
+    await state.set_state(MealLogging.waiting_for_food)
+    if message.photo:
+        await process_food_photo(message, state, uow)
+    elif message.text and message.text != "❌ Нет":
+        await process_food_text(message, state, uow)
+    else:
+        await message.answer("✍️ Тогда напиши блюдо и вес порции, например: «гречка 200»", reply_markup=get_main_menu())
+
+
 @router.message()
-async def echo(message: Message):
+async def echo(message: Message, uow: UnitOfWork):
     """Эхо-обработчик для прочих сообщений"""
     await message.answer(f"Я получил: {message.text}\n\nПожалуйста, используй кнопки меню или команды.")
+    # Только id из кэша: эхо не берёт соединение из пула (промах — пропускаем оценку тона)
+    user_id = cached_user_id(str(message.from_user.id)) if message.text else None
+    if user_id:
+        uow.after_commit(lambda: update_profile(get_profile_service().record_message(user_id, message.text)))
+
+
+async def update_profile(update: Awaitable[None]) -> None:
+    """Обновление AI-профиля после commit и ответа пользователю; сбой хранилища не ломает обработку"""
+    try:
+        await update
+    except Exception as e:
+        logger.warning(f"⚠️ AI-профиль не обновлён: {e}")
@@ -11,6 +11,7 @@ def get_main_menu() -> ReplyKeyboardMarkup:
             [KeyboardButton(text="📷 Добавить приём пищи")],
             [KeyboardButton(text="📊 История питания")],
             [KeyboardButton(text="💡 Рекомендации")],
+            [KeyboardButton(text="🏁 Итоги дня")],
             [KeyboardButton(text="⚙️ Мой профиль")],
         ],
         resize_keyboard=True,
@@ -19,6 +20,18 @@ def get_main_menu() -> ReplyKeyboardMarkup:
     return keyboard
 
 
+def get_confirm_keyboard() -> ReplyKeyboardMarkup:
+    """Подтверждение распознанного блюда"""
+    keyboard = ReplyKeyboardMarkup(
+        keyboard=[
+            [KeyboardButton(text="✅ Да"), KeyboardButton(text="❌ Нет")],
+        ],
+        resize_keyboard=True,
+        one_time_keyboard=True
+    )
+    return keyboard
+
+
 def get_gender_keyboard() -> ReplyKeyboardMarkup:
     """Выбор пола"""
     keyboard = ReplyKeyboardMarkup(
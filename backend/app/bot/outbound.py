@@ -0,0 +1,199 @@
+"""
+Исходящие сообщения: глобальный и per-chat rate limit, приоритетные полосы, retry_after.
+
+Подключается как request middleware сессии Bot, поэтому message.answer, edit_text и
+любые bot.send_* из хэндлеров, рассылок и напоминаний проходят через один планировщик.
+"""
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import Dict, Iterable, Optional
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+
+from backend.app.config import settings
+from backend.app.utils.cache import LRUCache
+from backend.app.utils.metrics import Family, counter, counters, gauges, registry
+from backend.app.utils.online import RingBuffer
+from backend.app.utils.ratelimit import PriorityTokenBucket
+
+logger = logging.getLogger(__name__)
+
+OUTBOUND_LATENCY = registry.histogram(
+    "outbound_latency_seconds", "Задержка отправки от вызова до ответа Telegram, включая ожидание лимитов", ["lane"]
+)
+
+
+class Lane(IntEnum):
+    """Приоритет исходящего сообщения: меньше — раньше"""
+    INTERACTIVE = 0  # Ответы на действия пользователя
+    NOTIFICATION = 1  # Напоминания
+    BULK = 2  # Рассылки
+
+
+_lane: ContextVar[Lane] = ContextVar("outbound_lane", default=Lane.INTERACTIVE)
+
+
+@contextmanager
+def outbound_lane(lane: Lane):
+    """Все отправки внутри блока (в этой задаче) идут по полосе lane"""
+    token = _lane.set(lane)
+    try:
+        yield
+    finally:
+        _lane.reset(token)
+
+
+class OutboundStats:
+    """Счётчики и задержки отправки (от вызова до ответа Telegram, включая ожидание лимитов)"""
+
+    def __init__(self, window: int = 2048):
+        self.sent = 0
+        self.failed = 0
+        self.retry_after_events = 0
+        self.latencies = RingBuffer(window)
+        self.waiting: Dict[Lane, int] = {lane: 0 for lane in Lane}
+
+    def latency_ms(self, q: float) -> float:
+        values = sorted(self.latencies.items)
+        if not values:
+            return 0.0
+        return values[min(len(values) - 1, int(q * len(values)))] * 1000
+
+    def as_dict(self) -> dict:
+        return {
+            "sent": self.sent,
+            "failed": self.failed,
+            "retry_after_events": self.retry_after_events,
+            "queue_depth": {lane.name.lower(): count for lane, count in self.waiting.items()},
+            "latency_p50_ms": round(self.latency_ms(0.5), 2),
+            "latency_p95_ms": round(self.latency_ms(0.95), 2),
+            "latency_p99_ms": round(self.latency_ms(0.99), 2),
+        }
+
+
+class OutboundScheduler(BaseRequestMiddleware):
+    """
+    Ограничивает методы с chat_id: сначала per-chat bucket (1 сообщение/с в личке,
+    20/мин в группе), затем общий приоритетный bucket (~30/с на бота).
+    На 429 ждёт retry_after и повторяет; рассылки при этом ставятся на паузу целиком.
+    Остальные методы (getUpdates, setWebhook, ...) проходят без ограничений.
+    """
+
+    def __init__(
+        self,
+        global_rate: float = 30.0,
+        chat_rate: float = 1.0,
+        chat_burst: float = 3.0,
+        group_rate: float = 20 / 60,
+        max_retries: int = 3,
+        max_chats: int = 100_000
+    ):
+        self.global_bucket = PriorityTokenBucket(global_rate, capacity=global_rate)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.group_rate = group_rate
+        self.max_retries = max_retries
+        # Bucket на чат; давно не писавшие чаты вытесняются (их bucket и так полон)
+        self._chat_buckets = LRUCache(maxsize=max_chats)
+        self.stats = OutboundStats()
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        chat_id = getattr(method, "chat_id", None)
+        if chat_id is None:
+            return await make_request(bot, method)
+
+        lane = _lane.get()
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            await self._acquire(chat_id, lane)
+            try:
+                response = await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                attempt += 1
+                self.stats.retry_after_events += 1
+                logger.warning(f"⚠️ Telegram 429 (chat {chat_id}, {lane.name}): ждём {e.retry_after} с")
+                if attempt > self.max_retries:
+                    self.stats.failed += 1
+                    raise
+                # Чат ждёт целиком; фоновые полосы тоже притормаживают, интерактив — нет
+                self._chat_bucket(chat_id).pause(e.retry_after)
+                self.global_bucket.pause(e.retry_after, from_priority=Lane.NOTIFICATION)
+                continue
+            except Exception:
+                self.stats.failed += 1
+                raise
+            elapsed = time.monotonic() - started
+            self.stats.sent += 1
+            self.stats.latencies.append(elapsed)
+            OUTBOUND_LATENCY.labels(lane.name.lower()).observe(elapsed)
+            return response
+
+    async def _acquire(self, chat_id, lane: Lane) -> None:
+        self.stats.waiting[lane] += 1
+        try:
+            await self._chat_bucket(chat_id).acquire(priority=lane)
+            await self.global_bucket.acquire(priority=lane)
+        finally:
+            self.stats.waiting[lane] -= 1
+
+    def _chat_bucket(self, chat_id) -> PriorityTokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            # Отрицательный chat_id (или @username канала) — группа/канал
+            is_group = isinstance(chat_id, str) or chat_id < 0
+            if is_group:
+                bucket = PriorityTokenBucket(self.group_rate, capacity=1.0)
+            else:
+                bucket = PriorityTokenBucket(self.chat_rate, capacity=self.chat_burst)
+            self._chat_buckets.set(chat_id, bucket)
+        return bucket
+
+
+scheduler: Optional[OutboundScheduler] = None
+
+
+def setup_outbound(bot: Bot) -> OutboundScheduler:
+    """Подключить планировщик исходящих к сессии бота (настройки OUTBOUND_*)"""
+    global scheduler
+    scheduler = OutboundScheduler(
+        global_rate=settings.OUTBOUND_GLOBAL_RATE,
+        chat_rate=settings.OUTBOUND_CHAT_RATE,
+        chat_burst=settings.OUTBOUND_CHAT_BURST,
+        group_rate=settings.OUTBOUND_GROUP_RATE_PER_MIN / 60,
+        max_retries=settings.OUTBOUND_MAX_RETRIES
+    )
+    bot.session.middleware(scheduler)
+    logger.info(f"✅ Планировщик исходящих: {settings.OUTBOUND_GLOBAL_RATE:g} сообщений/с")
+    return scheduler
+
+
+def get_outbound_stats() -> dict:
+    """Метрики планировщика исходящих (пусто, если не подключён)"""
+    return scheduler.stats.as_dict() if scheduler is not None else {}
+
+
+@registry.collector
+def _outbound_metrics() -> Iterable[Family]:
+    if scheduler is None:
+        return
+    stats = scheduler.stats
+    yield counters(
+        "outbound_messages", "Исходящие сообщения с начала работы", {"sent": stats.sent, "failed": stats.failed}, "result"
+    )
+    yield counter("outbound_retry_after_events", "Ответов 429 от Telegram", stats.retry_after_events)
+    yield gauges(
+        "outbound_queue_depth", "Ожидают rate limit", {lane.name.lower(): count for lane, count in stats.waiting.items()}, "lane"
+    )
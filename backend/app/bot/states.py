@@ -14,3 +14,9 @@ class UserRegistration(StatesGroup):
     waiting_for_goal = State()
     waiting_for_target_weight = State()
     waiting_for_calories = State()
+
+
+class MealLogging(StatesGroup):
+    """Состояния добавления приёма пищи"""
+    waiting_for_food = State()
+    confirming_photo = State()
@@ -0,0 +1,230 @@
+"""
+FSM хранилища: Redis (pipelining + TTL) и SQLite (локальная замена)
+"""
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+import logging
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, KeyBuilder, StateType, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from backend.app.config import settings
+
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+
+logger = logging.getLogger(__name__)
+
+# Короткие псевдонимы для полей анкеты регистрации (state.update_data)
+FIELD_ALIASES = {
+    "age": "a",
+    "gender": "g",
+    "height_cm": "h",
+    "weight_kg": "w",
+    "activity_level": "l",
+    "goal_type": "t",
+    "target_weight_kg": "tw",
+}
+_ALIAS_TO_FIELD = {alias: field for field, alias in FIELD_ALIASES.items()}
+
+
+def encode_field(name: str) -> str:
+    """Имя поля → короткий псевдоним"""
+    return FIELD_ALIASES.get(name, name)
+
+
+def decode_field(name: str) -> str:
+    """Короткий псевдоним → имя поля"""
+    return _ALIAS_TO_FIELD.get(name, name)
+
+
+def encode_value(value: Any) -> str:
+    """Компактный JSON без пробелов"""
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+
+
+def encode_data(data: Dict[str, Any]) -> str:
+    """Сериализовать данные FSM целиком"""
+    return encode_value({encode_field(k): v for k, v in data.items()})
+
+
+def decode_data(raw: Optional[str]) -> Dict[str, Any]:
+    """Десериализовать данные FSM целиком"""
+    if not raw:
+        return {}
+    return {decode_field(k): v for k, v in json.loads(raw).items()}
+
+
+def _state_name(state: StateType) -> Optional[str]:
+    return state.state if isinstance(state, State) else state
+
+
+def _sqlite_upsert(column: str, other: str) -> str:
+    """Запись одной колонки: другая колонка истёкшей строки сбрасывается, а не оживает с новым TTL"""
+    return (
+        f"INSERT INTO fsm (key, {column}, expires_at) VALUES (?, ?, ?) "
+        f"ON CONFLICT(key) DO UPDATE SET {column} = excluded.{column}, "
+        f"{other} = CASE WHEN fsm.expires_at < ? THEN NULL ELSE fsm.{other} END, "
+        "expires_at = excluded.expires_at"
+    )
+
+
+_UPSERT_STATE = _sqlite_upsert("state", "data")
+_UPSERT_DATA = _sqlite_upsert("data", "state")
+
+
+class PipelinedRedisStorage(BaseStorage):
+    """
+    FSM в Redis: состояние — строка, данные — hash (поле на ключ update_data).
+    Каждая операция — один round trip (pipeline), ключи истекают через state_ttl
+    после последней записи, так что брошенные регистрации не копятся.
+    """
+
+    def __init__(self, redis: "Redis", state_ttl: int, key_builder: Optional[KeyBuilder] = None):
+        self.redis = redis
+        self.state_ttl = state_ttl
+        self.key_builder = key_builder or DefaultKeyBuilder()
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs: Any) -> "PipelinedRedisStorage":
+        from redis.asyncio import Redis  # Только при Redis-режиме: не тянем клиент на старте
+        return cls(Redis.from_url(url, decode_responses=True), **kwargs)
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        state_key = self.key_builder.build(key, "state")
+        data_key = self.key_builder.build(key, "data")
+        state = _state_name(state)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            if state is None:
+                pipe.delete(state_key)
+            else:
+                pipe.set(state_key, state, ex=self.state_ttl)
+            pipe.expire(data_key, self.state_ttl)
+            await pipe.execute()
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return await self.redis.get(self.key_builder.build(key, "state"))
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        data_key = self.key_builder.build(key, "data")
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.delete(data_key)
+            if data:
+                pipe.hset(data_key, mapping=self._encode_mapping(data))
+                pipe.expire(data_key, self.state_ttl)
+            await pipe.execute()
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        raw = await self.redis.hgetall(self.key_builder.build(key, "data"))
+        return self._decode_mapping(raw)
+
+    async def update_data(self, key: StorageKey, data: Dict[str, Any]) -> Dict[str, Any]:
+        """HSET только изменённых полей + HGETALL в одном round trip"""
+        if not data:
+            return await self.get_data(key)
+        data_key = self.key_builder.build(key, "data")
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(data_key, mapping=self._encode_mapping(data))
+            pipe.expire(data_key, self.state_ttl)
+            pipe.hgetall(data_key)
+            *_, raw = await pipe.execute()
+        return self._decode_mapping(raw)
+
+    async def close(self) -> None:
+        await self.redis.aclose()
+
+    @staticmethod
+    def _encode_mapping(data: Dict[str, Any]) -> Dict[str, str]:
+        return {encode_field(k): encode_value(v) for k, v in data.items()}
+
+    @staticmethod
+    def _decode_mapping(raw: Dict[str, str]) -> Dict[str, Any]:
+        return {decode_field(k): json.loads(v) for k, v in raw.items()}
+
+
+class SQLiteStorage(BaseStorage):
+    """FSM в SQLite-файле: переживает рестарт, локальная замена Redis для разработки и тестов"""
+
+    def __init__(self, path: str, state_ttl: int, key_builder: Optional[KeyBuilder] = None):
+        self.state_ttl = state_ttl
+        self.key_builder = key_builder or DefaultKeyBuilder()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS fsm ("
+            "key TEXT PRIMARY KEY, state TEXT, data TEXT, expires_at REAL NOT NULL)"
+        )
+        self._conn.execute("DELETE FROM fsm WHERE expires_at < ?", (time.time(),))
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        now = time.time()
+        await self._run(
+            _UPSERT_STATE, (self.key_builder.build(key), _state_name(state), now + self.state_ttl, now)
+        )
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        row = await self._fetch(key)
+        return row[0] if row else None
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        now = time.time()
+        await self._run(
+            _UPSERT_DATA, (self.key_builder.build(key), encode_data(data), now + self.state_ttl, now)
+        )
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        row = await self._fetch(key)
+        return decode_data(row[1]) if row else {}
+
+    async def update_data(self, key: StorageKey, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Чтение и запись под одной блокировкой, без лишнего перехода в поток"""
+        db_key = self.key_builder.build(key)
+
+        def merge() -> Dict[str, Any]:
+            now = time.time()
+            row = self._conn.execute(
+                "SELECT data FROM fsm WHERE key = ? AND expires_at >= ?", (db_key, now)
+            ).fetchone()
+            current = decode_data(row[0]) if row else {}
+            current.update(data)
+            self._conn.execute(_UPSERT_DATA, (db_key, encode_data(current), now + self.state_ttl, now))
+            return current
+
+        return await asyncio.to_thread(self._locked, merge)
+
+    async def close(self) -> None:
+        self._conn.close()
+
+    async def _fetch(self, key: StorageKey) -> Optional[tuple]:
+        db_key = self.key_builder.build(key)
+        return await asyncio.to_thread(
+            self._locked,
+            lambda: self._conn.execute(
+                "SELECT state, data FROM fsm WHERE key = ? AND expires_at >= ?", (db_key, time.time())
+            ).fetchone()
+        )
+
+    async def _run(self, sql: str, params: tuple) -> None:
+        await asyncio.to_thread(self._locked, lambda: self._conn.execute(sql, params))
+
+    def _locked(self, fn):
+        with self._lock:
+            return fn()
+
+
+def create_fsm_storage() -> BaseStorage:
+    """Создать FSM хранилище согласно settings.FSM_STORAGE"""
+    if settings.FSM_STORAGE == "redis":
+        logger.info("✅ FSM хранилище: Redis")
+        return PipelinedRedisStorage.from_url(settings.REDIS_URL, state_ttl=settings.FSM_STATE_TTL)
+    if settings.FSM_STORAGE == "sqlite":
+        logger.info(f"✅ FSM хранилище: SQLite ({settings.FSM_SQLITE_PATH})")
+        return SQLiteStorage(settings.FSM_SQLITE_PATH, state_ttl=settings.FSM_STATE_TTL)
+    logger.info("✅ FSM хранилище: Memory")
+    return MemoryStorage()
@@ -0,0 +1,69 @@
+"""
+Постепенный вывод длинного ответа: сообщение-заглушка редактируется по мере прихода текста
+"""
+import logging
+import time
+from typing import AsyncIterator
+
+from aiogram.exceptions import TelegramBadRequest, TelegramRetryAfter
+from aiogram.types import Message
+
+logger = logging.getLogger(__name__)
+
+TELEGRAM_TEXT_LIMIT = 4096
+
+
+class ProgressiveMessage:
+    """
+    Редактирует отправленное сообщение не чаще раза в min_interval секунд
+    (лимиты Telegram на edit), последняя версия текста отправляется всегда.
+    """
+
+    def __init__(self, message: Message, min_interval: float = 1.0):
+        self.message = message
+        self.min_interval = min_interval
+        self._text = ""
+        self._shown = message.text or ""
+        self._last_edit = 0.0
+
+    @property
+    def text(self) -> str:
+        return self._text
+
+    async def append(self, chunk: str) -> None:
+        self._text += chunk
+        if time.monotonic() - self._last_edit >= self.min_interval:
+            await self._edit(self._text + " ▌")
+
+    async def finish(self, text: str = None) -> None:
+        await self._edit(text if text is not None else self._text)
+
+    async def _edit(self, text: str) -> None:
+        text = text[:TELEGRAM_TEXT_LIMIT]
+        if not text.strip() or text == self._shown:
+            return
+        self._last_edit = time.monotonic()
+        try:
+            await self.message.edit_text(text)
+            self._shown = text
+        except TelegramRetryAfter as e:
+            # Следующая попытка — не раньше, чем разрешил Telegram
+            self._last_edit += e.retry_after
+        except TelegramBadRequest as e:
+            logger.warning(f"⚠️ Не удалось обновить сообщение: {e}")
+
+
+async def stream_to_message(message: Message, placeholder: str, chunks: AsyncIterator[str],
+                            min_interval: float = 1.0, error_text: str = "⚠️ Ответ прерван") -> str:
+    """Отправить заглушку и постепенно заменить её текстом из chunks; вернуть итоговый текст"""
+    sent = await message.answer(placeholder)
+    progressive = ProgressiveMessage(sent, min_interval=min_interval)
+    try:
+        async for chunk in chunks:
+            await progressive.append(chunk)
+    except Exception as e:
+        logger.error(f"❌ Ошибка потока ответа: {e}", exc_info=True)
+        await progressive.finish(f"{progressive.text}\n\n{error_text}".strip())
+        return progressive.text
+    await progressive.finish()
+    return progressive.text
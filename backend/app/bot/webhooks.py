@@ -1,33 +1,46 @@
 """
-Telegram bot polling и обработка обновлений
+Приём обновлений Telegram через webhook
 """
+import hmac
+import json
 import logging
-from aiogram import Bot, Dispatcher, types
+
 from aiogram.types import Update
+from fastapi import Request
+from pydantic import ValidationError
+from fastapi.responses import JSONResponse
+
+from backend.app.bot import executor
 from backend.app.config import settings
 
 logger = logging.getLogger(__name__)
 
-# Инициализация бота
-bot = Bot(token=settings.TELEGRAM_BOT_TOKEN)
-dp = Dispatcher()
-
-
-async def handle_telegram_update(request):
-    """Обработка обновлений от Telegram"""
-    data = await request.json()
-    update = Update(**data)
-    
-    logger.info(f"📨 Update получен: {update}")
-    
-    # [TODO] Добавить обработчики для /start, /help, meal logging
-    
-    return {"ok": True}
-
-
-async def start_polling():
-    """Запуск polling (получение обновлений от Telegram)"""
-    logger.info("🤖 Telegram polling запущен")
-    
-    # [TODO] Реализовать polling с aiogram
-    # await dp.start_polling(bot)
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+async def handle_telegram_update(request: Request) -> JSONResponse:
+    """Обработка обновлений от Telegram: ставим в полосу чата и сразу отвечаем 200"""
+    update_executor = executor.update_executor
+    if update_executor is None or settings.BOT_MODE != "webhook":
+        return JSONResponse({"ok": False, "error": "webhook mode disabled"}, status_code=503)
+
+    if settings.WEBHOOK_SECRET:
+        token = request.headers.get(SECRET_HEADER, "")
+        if not hmac.compare_digest(token, settings.WEBHOOK_SECRET):
+            logger.warning("⚠️ Webhook с неверным secret token")
+            return JSONResponse({"ok": False}, status_code=403)
+
+    try:
+        data = await request.json()
+        update = Update.model_validate(data, context={"bot": update_executor.bot})
+    except (json.JSONDecodeError, UnicodeDecodeError, ValidationError) as e:
+        # 5xx Telegram повторял бы бесконечно; битое тело повтором не исправить
+        logger.warning(f"⚠️ Webhook с некорректным телом: {type(e).__name__}")
+        return JSONResponse({"ok": False, "error": "malformed update"}, status_code=400)
+
+    if not update_executor.submit(update):
+        # Backpressure: Telegram повторит доставку позже
+        logger.warning(f"⚠️ Очередь обновлений переполнена, update {update.update_id} отклонён")
+        return JSONResponse({"ok": False}, status_code=429, headers={"Retry-After": "1"})
+
+    return JSONResponse({"ok": True})
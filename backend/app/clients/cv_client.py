@@ -0,0 +1,152 @@
+"""
+gRPC клиент CV Module (распознавание блюда по фото) с micro-batching
+"""
+import asyncio
+import logging
+import uuid
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from backend.app.clients.grpc_base import ChannelPool, CircuitBreaker, hedged
+from backend.app.clients.protos import cv_pb2
+from backend.app.config import settings
+
+logger = logging.getLogger(__name__)
+
+RECOGNIZE_METHOD = "/nutrition.cv.CVService/Recognize"
+RECOGNIZE_BATCH_METHOD = "/nutrition.cv.CVService/RecognizeBatch"
+
+
+@dataclass(frozen=True)
+class DishHypothesis:
+    """Гипотеза CV-модели"""
+    label: str
+    confidence: float
+
+
+def _to_hypotheses(response: cv_pb2.RecognizeResponse) -> List[DishHypothesis]:
+    return [DishHypothesis(h.label, h.confidence) for h in response.hypotheses]
+
+
+class CVClient:
+    """
+    Клиент CV-сервиса.
+    batch_window > 0 включает micro-batching: фото, пришедшие в пределах окна
+    (или до max_batch_size штук), уходят одним RecognizeBatch — модель считает их вместе.
+    Каждый вызов идёт с дедлайном, через circuit breaker и hedged-повтор.
+    """
+
+    def __init__(
+        self,
+        pool: ChannelPool,
+        deadline: float = 2.0,
+        batch_window: float = 0.0,
+        max_batch_size: int = 16,
+        hedge_delay: Optional[float] = None,
+        breaker: Optional[CircuitBreaker] = None
+    ):
+        self.pool = pool
+        self.deadline = deadline
+        self.batch_window = batch_window
+        self.max_batch_size = max_batch_size
+        self.hedge_delay = hedge_delay
+        self.breaker = breaker or CircuitBreaker()
+        self._pending: List[Tuple[cv_pb2.RecognizeRequest, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._inflight: set = set()
+
+    async def recognize(self, image: bytes) -> List[DishHypothesis]:
+        """Top-гипотезы для одного фото"""
+        request = cv_pb2.RecognizeRequest(request_id=uuid.uuid4().hex, image=image)
+        if self.batch_window <= 0:
+            response = await self.breaker.call(lambda: hedged(
+                lambda: self._unary(request), self.hedge_delay
+            ))
+            return _to_hypotheses(response)
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((request, future))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.batch_window, self._flush)
+        return await future
+
+    async def close(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush()
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+        await self.pool.close()
+
+    async def _unary(self, request: cv_pb2.RecognizeRequest) -> cv_pb2.RecognizeResponse:
+        call = self.pool.get().unary_unary(
+            RECOGNIZE_METHOD,
+            request_serializer=cv_pb2.RecognizeRequest.SerializeToString,
+            response_deserializer=cv_pb2.RecognizeResponse.FromString
+        )
+        return await call(request, timeout=self.deadline)
+
+    async def _batch(self, batch: cv_pb2.RecognizeBatchRequest) -> cv_pb2.RecognizeBatchResponse:
+        call = self.pool.get().unary_unary(
+            RECOGNIZE_BATCH_METHOD,
+            request_serializer=cv_pb2.RecognizeBatchRequest.SerializeToString,
+            response_deserializer=cv_pb2.RecognizeBatchResponse.FromString
+        )
+        return await call(batch, timeout=self.deadline)
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        pending, self._pending = self._pending, []
+        if pending:
+            task = asyncio.ensure_future(self._send_batch(pending))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _send_batch(self, pending: List[Tuple[cv_pb2.RecognizeRequest, asyncio.Future]]) -> None:
+        batch = cv_pb2.RecognizeBatchRequest(items=[request for request, _ in pending])
+        try:
+            response = await self.breaker.call(lambda: hedged(lambda: self._batch(batch), self.hedge_delay))
+        except Exception as e:
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        by_id = {item.request_id: item for item in response.items}
+        for request, future in pending:
+            if future.done():
+                continue
+            item = by_id.get(request.request_id)
+            if item is None:
+                future.set_exception(RuntimeError(f"CV не вернул ответ для {request.request_id}"))
+            else:
+                future.set_result(_to_hypotheses(item))
+
+
+_client: Optional[CVClient] = None
+
+
+def get_cv_client() -> CVClient:
+    """Клиент CV-сервиса из настроек CV_* (один на процесс)"""
+    global _client
+    if _client is None:
+        _client = CVClient(
+            ChannelPool(settings.CV_SERVICE_ADDR, size=settings.CV_CHANNELS),
+            deadline=settings.CV_DEADLINE_S,
+            batch_window=settings.CV_BATCH_WINDOW_MS / 1000,
+            max_batch_size=settings.CV_MAX_BATCH_SIZE,
+            hedge_delay=settings.CV_HEDGE_DELAY_MS / 1000 if settings.CV_HEDGE_DELAY_MS else None,
+            breaker=CircuitBreaker(settings.CV_BREAKER_FAILURES, settings.CV_BREAKER_RESET_S)
+        )
+    return _client
+
+
+async def close_cv_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
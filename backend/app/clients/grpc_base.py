@@ -0,0 +1,136 @@
+"""
+Общая инфраструктура gRPC-клиентов: пул каналов, circuit breaker, hedged-вызовы
+"""
+import asyncio
+import itertools
+import logging
+import time
+from typing import Awaitable, Callable, Optional, TypeVar
+
+import grpc
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Keepalive, чтобы балансировщики не рвали простаивающие HTTP/2 соединения
+DEFAULT_CHANNEL_OPTIONS = (
+    ("grpc.keepalive_time_ms", 30_000),
+    ("grpc.keepalive_timeout_ms", 10_000),
+    ("grpc.keepalive_permit_without_calls", 1),
+    ("grpc.max_receive_message_length", 16 * 1024 * 1024),
+    ("grpc.max_send_message_length", 16 * 1024 * 1024),
+)
+
+# Коды, после которых сервис считается нездоровым (а не ошибка конкретного запроса)
+FAILURE_CODES = frozenset({
+    grpc.StatusCode.UNAVAILABLE,
+    grpc.StatusCode.DEADLINE_EXCEEDED,
+    grpc.StatusCode.RESOURCE_EXHAUSTED,
+    grpc.StatusCode.INTERNAL,
+})
+
+
+class CircuitOpenError(Exception):
+    """Сервис помечен недоступным, вызов отклонён без обращения к сети"""
+
+
+class ChannelPool:
+    """
+    Несколько grpc.aio каналов к одному адресу с выдачей по кругу.
+    Один HTTP/2 канал ограничен числом одновременных стримов — пул распределяет нагрузку.
+    """
+
+    def __init__(self, target: str, size: int = 4, options=DEFAULT_CHANNEL_OPTIONS):
+        self.target = target
+        self._channels = [grpc.aio.insecure_channel(target, options=options) for _ in range(size)]
+        self._next = itertools.cycle(self._channels)
+
+    def get(self) -> grpc.aio.Channel:
+        return next(self._next)
+
+    async def close(self) -> None:
+        await asyncio.gather(*(channel.close() for channel in self._channels))
+
+
+class CircuitBreaker:
+    """
+    closed → (failure_threshold ошибок подряд) → open → (reset_timeout) → half-open:
+    пропускается один пробный вызов; успех закрывает цепь, ошибка снова открывает.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 10.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    async def call(self, fn: Callable[[], Awaitable[T]]) -> T:
+        state = self.state
+        if state == "open" or (state == "half-open" and self._probe_in_flight):
+            raise CircuitOpenError("circuit open")
+
+        probe = state == "half-open"
+        if probe:
+            self._probe_in_flight = True
+        try:
+            result = await fn()
+        except grpc.aio.AioRpcError as e:
+            if e.code() in FAILURE_CODES:
+                self._record_failure()
+            raise
+        finally:
+            if probe:
+                self._probe_in_flight = False
+
+        self._failures = 0
+        self._opened_at = None
+        return result
+
+    def _record_failure(self) -> None:
+        self._failures += 1
+        if self._failures >= self.failure_threshold or self._opened_at is not None:
+            if self._opened_at is None:
+                logger.warning(f"⚠️ Circuit breaker открыт после {self._failures} ошибок")
+            self._opened_at = time.monotonic()
+
+
+async def hedged(fn: Callable[[], Awaitable[T]], hedge_delay: Optional[float], max_attempts: int = 2) -> T:
+    """
+    Hedged request: если ответа нет за hedge_delay (или попытка упала с сетевой ошибкой),
+    отправляется ещё одна копия, максимум max_attempts; берётся первый успешный ответ,
+    остальные отменяются. Срезает хвост латентности. Вызов должен быть идемпотентным.
+    """
+    if not hedge_delay or max_attempts <= 1:
+        return await fn()
+
+    attempts = 1
+    tasks = {asyncio.ensure_future(fn())}
+    last_error: Optional[BaseException] = None
+    try:
+        while tasks:
+            timeout = hedge_delay if attempts < max_attempts else None
+            done, tasks = await asyncio.wait(tasks, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                error = task.exception()
+                if error is None:
+                    return task.result()
+                if not (isinstance(error, grpc.aio.AioRpcError) and error.code() in FAILURE_CODES):
+                    raise error
+                last_error = error
+            if attempts < max_attempts and (not done or not tasks):
+                tasks.add(asyncio.ensure_future(fn()))
+                attempts += 1
+        raise last_error
+    finally:
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,87 @@
+"""
+gRPC клиент NLP Module: потоковая генерация советов
+"""
+import logging
+from typing import AsyncIterator, Optional, Sequence
+
+from backend.app.clients.grpc_base import ChannelPool
+from backend.app.clients.protos import nlp_pb2
+from backend.app.config import settings
+from backend.app.db.models import DailyNutritionTotal, UserGoal
+
+logger = logging.getLogger(__name__)
+
+STREAM_ADVICE_METHOD = "/nutrition.nlp.NLPService/StreamAdvice"
+
+
+def build_advice_request(user_id: int, goal: UserGoal, remaining: Optional[dict],
+                         history: Sequence[DailyNutritionTotal]) -> nlp_pb2.AdviceRequest:
+    """Собрать запрос к NLP из цели, остатка на сегодня и дневных сводок"""
+    remaining = remaining or {}
+    return nlp_pb2.AdviceRequest(
+        user_id=user_id,
+        goal_type=goal.goal_type,
+        targets=nlp_pb2.DayTotals(
+            calories=goal.target_calories,
+            protein_g=goal.target_protein_g,
+            fat_g=goal.target_fat_g,
+            carbs_g=goal.target_carbs_g
+        ),
+        remaining_today=nlp_pb2.DayTotals(**remaining),
+        history=[
+            nlp_pb2.DayTotals(
+                day=day.day.isoformat(),
+                calories=day.calories,
+                protein_g=day.protein_g,
+                fat_g=day.fat_g,
+                carbs_g=day.carbs_g
+            )
+            for day in history
+        ]
+    )
+
+
+class NLPClient:
+    """Клиент NLP-сервиса; дедлайн ограничивает весь поток целиком"""
+
+    def __init__(self, pool: ChannelPool, deadline: float = 60.0):
+        self.pool = pool
+        self.deadline = deadline
+
+    async def stream_advice(self, request: nlp_pb2.AdviceRequest) -> AsyncIterator[str]:
+        """Фрагменты текста совета по мере генерации"""
+        call = self.pool.get().unary_stream(
+            STREAM_ADVICE_METHOD,
+            request_serializer=nlp_pb2.AdviceRequest.SerializeToString,
+            response_deserializer=nlp_pb2.AdviceChunk.FromString
+        )(request, timeout=self.deadline)
+        try:
+            async for chunk in call:
+                yield chunk.text
+        finally:
+            # Потребитель прервал чтение — отменяем RPC, чтобы сервер не генерировал впустую
+            call.cancel()
+
+    async def close(self) -> None:
+        await self.pool.close()
+
+
+_client: Optional[NLPClient] = None
+
+
+def get_nlp_client() -> NLPClient:
+    """Клиент NLP-сервиса из настроек NLP_* (один на процесс)"""
+    global _client
+    if _client is None:
+        _client = NLPClient(
+            ChannelPool(settings.NLP_SERVICE_ADDR, size=settings.NLP_CHANNELS),
+            deadline=settings.NLP_DEADLINE_S
+        )
+    return _client
+
+
+async def close_nlp_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
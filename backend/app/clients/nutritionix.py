@@ -0,0 +1,159 @@
+"""
+Клиент Nutritionix API (natural language → КБЖУ) с двухуровневым кэшем
+"""
+import logging
+import re
+from dataclasses import asdict, dataclass
+from typing import TYPE_CHECKING, List, Optional
+
+from backend.app.config import settings
+from backend.app.utils.cache import DiskCache, LRUCache, SingleFlight
+from backend.app.utils.ratelimit import TokenBucket
+
+if TYPE_CHECKING:
+    import httpx
+
+logger = logging.getLogger(__name__)
+
+NATURAL_NUTRIENTS_PATH = "/v2/natural/nutrients"
+
+
+class NutritionixError(Exception):
+    """Ошибка обращения к Nutritionix"""
+
+
+@dataclass(frozen=True)
+class FoodNutrients:
+    """КБЖУ распознанного продукта на указанную порцию"""
+    name: str
+    serving_weight_g: Optional[float]
+    calories: float
+    protein_g: float
+    fat_g: float
+    carbs_g: float
+
+
+def normalize_query(query: str) -> str:
+    """Ключ кэша: нижний регистр, схлопнутые пробелы"""
+    return re.sub(r"\s+", " ", query.strip().lower())
+
+
+class NutritionixClient:
+    """
+    Запрос идёт по цепочке: LRU в памяти → кэш на диске (переживает рестарт) → API.
+    Одинаковые одновременные запросы схлопываются в один вызов API,
+    вызовы API ограничены token bucket'ом.
+    """
+
+    def __init__(
+        self,
+        app_id: str,
+        app_key: str,
+        base_url: str = "https://trackapi.nutritionix.com",
+        memory_cache_size: int = 1024,
+        disk_cache: Optional[DiskCache] = None,
+        rate_limit: float = 5.0,
+        timeout: float = 10.0,
+        http_client: Optional["httpx.AsyncClient"] = None
+    ):
+        import httpx  # Лениво: клиент нужен только при заданных ключах, импорт httpx заметен на старте
+        self._http = http_client or httpx.AsyncClient(
+            base_url=base_url,
+            timeout=timeout,
+            headers={"x-app-id": app_id, "x-app-key": app_key}
+        )
+        self._memory = LRUCache(maxsize=memory_cache_size, ttl=disk_cache.ttl if disk_cache else None)
+        self._disk = disk_cache
+        self._flights = SingleFlight()
+        self._limiter = TokenBucket(rate=rate_limit, capacity=max(rate_limit, 1.0))
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "api_calls": 0}
+
+    async def natural_nutrients(self, query: str) -> List[FoodNutrients]:
+        """Разобрать запрос вида «200 г гречки и котлета» в список продуктов с КБЖУ"""
+        key = normalize_query(query)
+        if not key:
+            return []
+
+        cached = self._memory.get(key)
+        if cached is not None:
+            self.stats["memory_hits"] += 1
+        else:
+            cached = await self._flights.do(key, lambda: self._load(key))
+        return [FoodNutrients(**item) for item in cached]
+
+    async def close(self) -> None:
+        await self._http.aclose()
+        if self._disk:
+            self._disk.close()
+
+    async def _load(self, key: str) -> list:
+        if self._disk:
+            cached = await self._disk.get(key)
+            if cached is not None:
+                self.stats["disk_hits"] += 1
+                self._memory.set(key, cached)
+                return cached
+
+        items = [asdict(food) for food in await self._fetch(key)]
+        self._memory.set(key, items)
+        if self._disk:
+            await self._disk.set(key, items)
+        return items
+
+    async def _fetch(self, query: str) -> List[FoodNutrients]:
+        import httpx
+        await self._limiter.acquire()
+        self.stats["api_calls"] += 1
+        try:
+            response = await self._http.post(NATURAL_NUTRIENTS_PATH, json={"query": query})
+        except httpx.HTTPError as e:
+            raise NutritionixError(f"Nutritionix недоступен: {e}") from e
+
+        if response.status_code == 404:
+            # «We couldn't match any of your foods» — кэшируем пустой результат
+            return []
+        if response.status_code != 200:
+            raise NutritionixError(f"Nutritionix ответил {response.status_code}: {response.text[:200]}")
+
+        return [
+            FoodNutrients(
+                name=food.get("food_name", ""),
+                serving_weight_g=food.get("serving_weight_grams"),
+                calories=food.get("nf_calories") or 0.0,
+                protein_g=food.get("nf_protein") or 0.0,
+                fat_g=food.get("nf_total_fat") or 0.0,
+                carbs_g=food.get("nf_total_carbohydrate") or 0.0
+            )
+            for food in response.json().get("foods", [])
+        ]
+
+
+_client: Optional[NutritionixClient] = None
+
+
+def get_nutritionix_client() -> Optional[NutritionixClient]:
+    """Клиент из настроек NUTRITIONIX_* (None, если ключи не заданы)"""
+    global _client
+    if _client is None and settings.NUTRITIONIX_APP_ID and settings.NUTRITIONIX_APP_KEY:
+        disk_cache = None
+        if settings.NUTRITIONIX_CACHE_PATH:
+            disk_cache = DiskCache(
+                settings.NUTRITIONIX_CACHE_PATH,
+                ttl=settings.NUTRITIONIX_CACHE_TTL,
+                max_entries=settings.NUTRITIONIX_CACHE_MAX_ENTRIES
+            )
+        _client = NutritionixClient(
+            settings.NUTRITIONIX_APP_ID,
+            settings.NUTRITIONIX_APP_KEY,
+            base_url=settings.NUTRITIONIX_BASE_URL,
+            disk_cache=disk_cache,
+            rate_limit=settings.NUTRITIONIX_RATE_LIMIT
+        )
+    return _client
+
+
+async def close_nutritionix_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
@@ -0,0 +1,6 @@
+"""
+Protobuf-контракты CV/NLP модулей.
+
+Перегенерация *_pb2.py (из каталога protos):
+    python -m grpc_tools.protoc -I. --python_out=. cv.proto nlp.proto
+"""
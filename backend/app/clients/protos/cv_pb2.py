@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+# Generated by the protocol buffer compiler.  DO NOT EDIT!
+# source: cv.proto
+# Protobuf Python Version: 5.26.1
+"""Generated protocol buffer code."""
+from google.protobuf import descriptor as _descriptor
+from google.protobuf import descriptor_pool as _descriptor_pool
+from google.protobuf import symbol_database as _symbol_database
+from google.protobuf.internal import builder as _builder
+# @@protoc_insertion_point(imports)
+
+_sym_db = _symbol_database.Default()
+
+
+
+
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x08\x63v.proto\x12\x0cnutrition.cv\"5\n\x10RecognizeRequest\x12\x12\n\nrequest_id\x18\x01 \x01(\t\x12\r\n\x05image\x18\x02 \x01(\x0c\"/\n\nHypothesis\x12\r\n\x05label\x18\x01 \x01(\t\x12\x12\n\nconfidence\x18\x02 \x01(\x02\"U\n\x11RecognizeResponse\x12\x12\n\nrequest_id\x18\x01 \x01(\t\x12,\n\nhypotheses\x18\x02 \x03(\x0b\x32\x18.nutrition.cv.Hypothesis\"F\n\x15RecognizeBatchRequest\x12-\n\x05items\x18\x01 \x03(\x0b\x32\x1e.nutrition.cv.RecognizeRequest\"H\n\x16RecognizeBatchResponse\x12.\n\x05items\x18\x01 \x03(\x0b\x32\x1f.nutrition.cv.RecognizeResponse2\xb6\x01\n\tCVService\x12L\n\tRecognize\x12\x1e.nutrition.cv.RecognizeRequest\x1a\x1f.nutrition.cv.RecognizeResponse\x12[\n\x0eRecognizeBatch\x12#.nutrition.cv.RecognizeBatchRequest\x1a$.nutrition.cv.RecognizeBatchResponseb\x06proto3')
+
+_globals = globals()
+_builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
+_builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'cv_pb2', _globals)
+if not _descriptor._USE_C_DESCRIPTORS:
+  DESCRIPTOR._loaded_options = None
+  _globals['_RECOGNIZEREQUEST']._serialized_start=26
+  _globals['_RECOGNIZEREQUEST']._serialized_end=79
+  _globals['_HYPOTHESIS']._serialized_start=81
+  _globals['_HYPOTHESIS']._serialized_end=128
+  _globals['_RECOGNIZERESPONSE']._serialized_start=130
+  _globals['_RECOGNIZERESPONSE']._serialized_end=215
+  _globals['_RECOGNIZEBATCHREQUEST']._serialized_start=217
+  _globals['_RECOGNIZEBATCHREQUEST']._serialized_end=287
+  _globals['_RECOGNIZEBATCHRESPONSE']._serialized_start=289
+  _globals['_RECOGNIZEBATCHRESPONSE']._serialized_end=361
+  _globals['_CVSERVICE']._serialized_start=364
+  _globals['_CVSERVICE']._serialized_end=546
+# @@protoc_insertion_point(module_scope)
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+# Generated by the protocol buffer compiler.  DO NOT EDIT!
+# source: nlp.proto
+# Protobuf Python Version: 5.26.1
+"""Generated protocol buffer code."""
+from google.protobuf import descriptor as _descriptor
+from google.protobuf import descriptor_pool as _descriptor_pool
+from google.protobuf import symbol_database as _symbol_database
+from google.protobuf.internal import builder as _builder
+# @@protoc_insertion_point(imports)
+
+_sym_db = _symbol_database.Default()
+
+
+
+
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\tnlp.proto\x12\rnutrition.nlp\"]\n\tDayTotals\x12\x0b\n\x03\x64\x61y\x18\x01 \x01(\t\x12\x10\n\x08\x63\x61lories\x18\x02 \x01(\x02\x12\x11\n\tprotein_g\x18\x03 \x01(\x02\x12\r\n\x05\x66\x61t_g\x18\x04 \x01(\x02\x12\x0f\n\x07\x63\x61rbs_g\x18\x05 \x01(\x02\"\xbc\x01\n\rAdviceRequest\x12\x0f\n\x07user_id\x18\x01 \x01(\x03\x12\x11\n\tgoal_type\x18\x02 \x01(\t\x12)\n\x07targets\x18\x03 \x01(\x0b\x32\x18.nutrition.nlp.DayTotals\x12\x31\n\x0fremaining_today\x18\x04 \x01(\x0b\x32\x18.nutrition.nlp.DayTotals\x12)\n\x07history\x18\x05 \x03(\x0b\x32\x18.nutrition.nlp.DayTotals\"\x1b\n\x0b\x41\x64viceChunk\x12\x0c\n\x04text\x18\x01 \x01(\t2X\n\nNLPService\x12J\n\x0cStreamAdvice\x12\x1c.nutrition.nlp.AdviceRequest\x1a\x1a.nutrition.nlp.AdviceChunk0\x01\x62\x06proto3')
+
+_globals = globals()
+_builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
+_builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'nlp_pb2', _globals)
+if not _descriptor._USE_C_DESCRIPTORS:
+  DESCRIPTOR._loaded_options = None
+  _globals['_DAYTOTALS']._serialized_start=28
+  _globals['_DAYTOTALS']._serialized_end=121
+  _globals['_ADVICEREQUEST']._serialized_start=124
+  _globals['_ADVICEREQUEST']._serialized_end=312
+  _globals['_ADVICECHUNK']._serialized_start=314
+  _globals['_ADVICECHUNK']._serialized_end=341
+  _globals['_NLPSERVICE']._serialized_start=343
+  _globals['_NLPSERVICE']._serialized_end=431
+# @@protoc_insertion_point(module_scope)
@@ -0,0 +1,3 @@
+"""
+Локальные заглушки gRPC-сервисов для разработки и бенчмарков
+"""
@@ -0,0 +1,87 @@
+"""
+Заглушка CV Module: имитирует модель с фиксированной стоимостью прохода и ценой за фото
+
+Запуск (из корня репозитория):
+    python -m backend.app.clients.stubs.cv_server --port 8001
+"""
+import argparse
+import asyncio
+import hashlib
+import logging
+
+import grpc
+
+from backend.app.clients.protos import cv_pb2
+
+logger = logging.getLogger(__name__)
+
+LABELS = ("борщ", "гречка с курицей", "салат цезарь", "овсянка", "паста карбонара", "плов")
+
+
+def fake_hypotheses(image: bytes) -> list:
+    """Детерминированные top-3 гипотезы по содержимому фото"""
+    digest = hashlib.blake2b(image, digest_size=4).digest()
+    return [
+        cv_pb2.Hypothesis(label=LABELS[(digest[i] + i) % len(LABELS)], confidence=round(0.9 - 0.3 * i, 2))
+        for i in range(3)
+    ]
+
+
+class StubCVService:
+    """Одна «GPU»: проходы модели выполняются строго по одному"""
+
+    def __init__(self, pass_latency: float = 0.005, per_image_latency: float = 0.0005):
+        self.pass_latency = pass_latency
+        self.per_image_latency = per_image_latency
+        self._gpu = asyncio.Lock()
+
+    async def _run_model(self, images: int) -> None:
+        async with self._gpu:
+            await asyncio.sleep(self.pass_latency + self.per_image_latency * images)
+
+    async def recognize(self, request: cv_pb2.RecognizeRequest, context) -> cv_pb2.RecognizeResponse:
+        await self._run_model(1)
+        return cv_pb2.RecognizeResponse(request_id=request.request_id, hypotheses=fake_hypotheses(request.image))
+
+    async def recognize_batch(self, request: cv_pb2.RecognizeBatchRequest, context) -> cv_pb2.RecognizeBatchResponse:
+        await self._run_model(len(request.items))
+        return cv_pb2.RecognizeBatchResponse(items=[
+            cv_pb2.RecognizeResponse(request_id=item.request_id, hypotheses=fake_hypotheses(item.image))
+            for item in request.items
+        ])
+
+
+async def start_server(port: int, service: StubCVService = None) -> grpc.aio.Server:
+    """Запустить заглушку; port=0 — любой свободный (см. server.bound_port)"""
+    service = service or StubCVService()
+    handler = grpc.method_handlers_generic_handler("nutrition.cv.CVService", {
+        "Recognize": grpc.unary_unary_rpc_method_handler(
+            service.recognize,
+            request_deserializer=cv_pb2.RecognizeRequest.FromString,
+            response_serializer=cv_pb2.RecognizeResponse.SerializeToString
+        ),
+        "RecognizeBatch": grpc.unary_unary_rpc_method_handler(
+            service.recognize_batch,
+            request_deserializer=cv_pb2.RecognizeBatchRequest.FromString,
+            response_serializer=cv_pb2.RecognizeBatchResponse.SerializeToString
+        ),
+    })
+    server = grpc.aio.server()
+    server.add_generic_rpc_handlers((handler,))
+    server.bound_port = server.add_insecure_port(f"127.0.0.1:{port}")
+    await server.start()
+    logger.info(f"🧪 CV stub слушает порт {server.bound_port}")
+    return server
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Заглушка CV Module")
+    parser.add_argument("--port", type=int, default=8001)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    server = await start_server(args.port)
+    await server.wait_for_termination()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,70 @@
+"""
+Заглушка NLP Module: отдаёт совет по словам с задержкой, как LLM
+
+Запуск (из корня репозитория):
+    python -m backend.app.clients.stubs.nlp_server --port 8002
+"""
+import argparse
+import asyncio
+import logging
+
+import grpc
+
+from backend.app.clients.protos import nlp_pb2
+
+logger = logging.getLogger(__name__)
+
+
+def compose_advice(request: nlp_pb2.AdviceRequest) -> str:
+    """Простой совет по остатку КБЖУ на сегодня"""
+    remaining = request.remaining_today
+    parts = [f"Сегодня осталось около {remaining.calories:.0f} ккал."]
+    if remaining.protein_g > 20:
+        parts.append(f"Добери белок: ещё {remaining.protein_g:.0f} г — подойдут творог, курица или рыба.")
+    if remaining.calories < 0:
+        parts.append("Норма уже превышена, на ужин лучше выбрать овощи и нежирный белок.")
+    if len(request.history) >= 3:
+        average = sum(day.calories for day in request.history) / len(request.history)
+        parts.append(f"В среднем за последние дни ты съедаешь {average:.0f} ккал в день.")
+    return " ".join(parts)
+
+
+class StubNLPService:
+    def __init__(self, token_delay: float = 0.05):
+        self.token_delay = token_delay
+
+    async def stream_advice(self, request: nlp_pb2.AdviceRequest, context):
+        for word in compose_advice(request).split(" "):
+            await asyncio.sleep(self.token_delay)
+            yield nlp_pb2.AdviceChunk(text=word + " ")
+
+
+async def start_server(port: int, service: StubNLPService = None) -> grpc.aio.Server:
+    """Запустить заглушку; port=0 — любой свободный (см. server.bound_port)"""
+    service = service or StubNLPService()
+    handler = grpc.method_handlers_generic_handler("nutrition.nlp.NLPService", {
+        "StreamAdvice": grpc.unary_stream_rpc_method_handler(
+            service.stream_advice,
+            request_deserializer=nlp_pb2.AdviceRequest.FromString,
+            response_serializer=nlp_pb2.AdviceChunk.SerializeToString
+        ),
+    })
+    server = grpc.aio.server()
+    server.add_generic_rpc_handlers((handler,))
+    server.bound_port = server.add_insecure_port(f"127.0.0.1:{port}")
+    await server.start()
+    logger.info(f"🧪 NLP stub слушает порт {server.bound_port}")
+    return server
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Заглушка NLP Module")
+    parser.add_argument("--port", type=int, default=8002)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    server = await start_server(args.port)
+    await server.wait_for_termination()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
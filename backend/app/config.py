@@ -3,6 +3,7 @@
 """
 from pydantic_settings import BaseSettings
 from pathlib import Path
+from typing import Literal, Optional
 
 # Путь к корню проекта
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
@@ -12,9 +13,111 @@ class Settings(BaseSettings):
     
     # Database
     DATABASE_URL: str
+    DB_POOL_MODE: Literal["queue", "null"] = "queue"  # "null" — новое соединение на каждую сессию
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 30.0  # Сколько ждать свободное соединение, сек
+    DB_POOL_RECYCLE: int = 1800  # Пересоздавать соединения старше N сек
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_CACHE_SIZE: int = 100  # Prepared statements на соединение (asyncpg)
+    DB_SQLITE_BUSY_TIMEOUT_MS: int = 5000  # SQLite: сколько ждать блокировку записи вместо "database is locked"
+    # "migrate" — догнать схему при старте; "check" — только проверить версию (DDL делает отдельный шаг деплоя)
+    DB_SCHEMA_MODE: Literal["migrate", "check"] = "migrate"
+    USER_CACHE_SIZE: int = 100_000  # Кэш telegram_user_id → users.id на процесс
+    USER_CACHE_TTL: float = 3600.0
     
     # Telegram
     TELEGRAM_BOT_TOKEN: str
+    BOT_MODE: Literal["polling", "webhook"] = "polling"
+    
+    # Webhook (используется при BOT_MODE=webhook)
+    WEBHOOK_URL: Optional[str] = None  # Публичный URL, например https://bot.example.com/telegram/webhook
+    WEBHOOK_SECRET: Optional[str] = None  # Сверяется с заголовком X-Telegram-Bot-Api-Secret-Token
+    
+    # Обработка обновлений (polling и webhook): порядок внутри чата, параллельность между чатами
+    UPDATES_MAX_IN_FLIGHT: int = 32  # Одновременно обрабатываемых обновлений (разных чатов) на воркер
+    UPDATES_MAX_QUEUED: int = 1000  # Webhook при переполнении отвечает 429, polling ждёт места
+    UPDATES_MAX_PER_CHAT: int = 50  # Больше в одном чате — отбрасываем (флуд)
+    POLLING_TIMEOUT: int = 30  # Long polling getUpdates, секунды
+    
+    # Исходящие сообщения (лимиты Telegram: ~30/с на бота, ~1/с в чат, 20/мин в группу)
+    OUTBOUND_GLOBAL_RATE: float = 30.0
+    OUTBOUND_CHAT_RATE: float = 1.0
+    OUTBOUND_CHAT_BURST: float = 3.0  # Короткая пачка ответов в личку без ожидания
+    OUTBOUND_GROUP_RATE_PER_MIN: float = 20.0
+    OUTBOUND_MAX_RETRIES: int = 3  # Повторов после 429 (retry_after)
+    
+    # Напоминания (завтрак, взвешивание)
+    REMINDERS_ENABLED: bool = True
+    REMINDER_PARTITIONS: int = 64  # Секций user_id % N; не менять на живой БД без пересчёта partition
+    REMINDER_LEASE_TTL_S: int = 30
+    REMINDER_HORIZON_S: int = 300  # На сколько вперёд расписания держатся в памяти
+    REMINDER_RESYNC_S: int = 600  # Полная перечитка своих секций (правки с других воркеров)
+    REMINDER_MAX_QUEUED: int = 100_000  # Предел кучи в памяти
+    REMINDER_BATCH_SIZE: int = 200
+    REMINDER_BREAKFAST_SKIP: float = 0.8  # Не напоминать о завтраке, если завтракает в 80%+ дней
+    
+    # Фоновые задачи (AI-разбор в конце сессии): "memory" (один процесс), "redis" (прод), "sqlite" (локально)
+    JOBS_BROKER: Literal["memory", "redis", "sqlite"] = "memory"
+    JOBS_SQLITE_PATH: str = "jobs.sqlite3"
+    JOBS_IN_PROCESS: bool = True  # Исполнять задачи в процессе бота (False — только python -m backend.app.jobs.worker)
+    JOBS_WORKERS: int = 2  # Процессов для вычислений
+    JOBS_CONCURRENCY: int = 4  # Задач одновременно (загрузка данных и отправка — в event loop)
+    JOBS_LEASE_S: int = 300  # Через сколько задача упавшего воркера вернётся в очередь
+    JOBS_POLL_INTERVAL_S: float = 1.0
+    
+    # FSM хранилище: "memory" (один процесс), "redis" (прод, несколько воркеров), "sqlite" (локально)
+    FSM_STORAGE: Literal["memory", "redis", "sqlite"] = "memory"
+    FSM_STATE_TTL: int = 86400  # Брошенная регистрация истекает через сутки
+    FSM_SQLITE_PATH: str = "fsm.sqlite3"
+    
+    # Redis
+    REDIS_URL: str = "redis://localhost:6379/0"
+    
+    # AI-профиль: "mongo" (прод) или "sqlite" (локальная замена)
+    PROFILE_STORE: Literal["mongo", "sqlite"] = "sqlite"
+    MONGO_URL: str = "mongodb://localhost:27017"
+    MONGO_DB: str = "nutrition_bot"
+    PROFILE_SQLITE_PATH: str = "profiles.sqlite3"
+    PROFILE_TZ_OFFSET_H: int = 3  # Часовой пояс пользователей по умолчанию (МСК) для завтраков/перекусов
+    
+    # Локальная база продуктов (каталог, собранный services.food_db)
+    FOOD_DB_PATH: Optional[str] = None
+    DISH_CATALOG_PATH: Optional[str] = None  # Каталог блюд RecSys (python -m backend.app.services.recsys build)
+    
+    # Nutritionix API
+    NUTRITIONIX_APP_ID: Optional[str] = None
+    NUTRITIONIX_APP_KEY: Optional[str] = None
+    NUTRITIONIX_BASE_URL: str = "https://trackapi.nutritionix.com"
+    NUTRITIONIX_RATE_LIMIT: float = 5.0  # Запросов в секунду к API
+    NUTRITIONIX_CACHE_PATH: Optional[str] = "nutritionix_cache.sqlite3"  # None — только кэш в памяти
+    NUTRITIONIX_CACHE_TTL: int = 7 * 86400
+    NUTRITIONIX_CACHE_MAX_ENTRIES: int = 50_000
+    
+    # CV Module (gRPC)
+    CV_SERVICE_ADDR: str = "localhost:8001"
+    CV_CHANNELS: int = 4  # Каналов в пуле
+    CV_DEADLINE_S: float = 2.0  # Дедлайн одного вызова
+    CV_BATCH_WINDOW_MS: float = 5.0  # Окно micro-batching (0 — без батчей)
+    CV_MAX_BATCH_SIZE: int = 16
+    CV_HEDGE_DELAY_MS: Optional[float] = 300.0  # Через сколько отправлять дублирующий запрос (None — выкл.)
+    CV_BREAKER_FAILURES: int = 5  # Ошибок подряд до размыкания
+    CV_BREAKER_RESET_S: float = 10.0  # Через сколько пробовать снова
+    
+    # Фото блюд (скачивание, предобработка, дедупликация)
+    PHOTO_WORKERS: int = 2  # Процессов для декодирования и уменьшения
+    PHOTO_MAX_BYTES: int = 10 * 1024 * 1024  # Больше — не скачиваем
+    PHOTO_TARGET_SIZE: int = 512  # Сторона входа CV-модели, px
+    PHOTO_DEDUP_DISTANCE: int = 4  # Макс. расстояние Хэмминга между dHash «того же» фото
+    PHOTO_CACHE_SIZE: int = 50_000  # Распознаваний в памяти
+    PHOTO_CACHE_PATH: Optional[str] = "photo_cache.sqlite3"  # None — только кэш в памяти
+    PHOTO_CACHE_TTL: int = 30 * 86400
+    
+    # NLP Module (gRPC, потоковые ответы)
+    NLP_SERVICE_ADDR: str = "localhost:8002"
+    NLP_CHANNELS: int = 2
+    NLP_DEADLINE_S: float = 60.0  # Дедлайн на весь поток ответа
+    NLP_EDIT_INTERVAL_S: float = 1.0  # Не чаще одного edit сообщения в N секунд
     
     # Server
     DEBUG: bool = False
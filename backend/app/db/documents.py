@@ -0,0 +1,154 @@
+"""
+Документное хранилище (AI-профили): MongoDB в продакшене, SQLite-файл как локальная замена
+"""
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+from typing import Any, Dict, Optional
+
+from backend.app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Поле ревизии документа для put_if_unchanged (документы до его появления — ревизия 0)
+REVISION = "_rev"
+
+
+class DocumentStore:
+    """Минимальный интерфейс: документ по ключу в коллекции"""
+
+    async def get(self, collection: str, key: Any) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    async def put(self, collection: str, key: Any, document: Dict[str, Any]) -> None:
+        """Записать документ целиком (upsert)"""
+        raise NotImplementedError
+
+    async def put_if_unchanged(self, collection: str, key: Any, document: Dict[str, Any],
+                               revision: Optional[int]) -> bool:
+        """
+        Compare-and-swap: записать документ с ревизией revision + 1, только если в хранилище
+        всё ещё ревизия revision (None — документа не было). False — его успели изменить.
+        """
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+
+class MongoDocumentStore(DocumentStore):
+    """MongoDB через motor; ключ документа — _id"""
+
+    def __init__(self, url: str, database: str):
+        # motor нужен только при PROFILE_STORE=mongo — не тянем его в остальные процессы
+        from motor.motor_asyncio import AsyncIOMotorClient
+
+        self.client = AsyncIOMotorClient(url)
+        self.db = self.client[database]
+
+    async def get(self, collection: str, key: Any) -> Optional[Dict[str, Any]]:
+        document = await self.db[collection].find_one({"_id": key})
+        if document is not None:
+            document.pop("_id", None)
+        return document
+
+    async def put(self, collection: str, key: Any, document: Dict[str, Any]) -> None:
+        await self.db[collection].replace_one({"_id": key}, document, upsert=True)
+
+    async def put_if_unchanged(self, collection: str, key: Any, document: Dict[str, Any],
+                               revision: Optional[int]) -> bool:
+        from pymongo.errors import DuplicateKeyError
+
+        document = {**document, REVISION: (revision or 0) + 1}
+        if revision is None:
+            try:
+                await self.db[collection].insert_one({"_id": key, **document})
+            except DuplicateKeyError:
+                return False
+            return True
+        # Ревизия 0 — документ без поля ревизии ({"_rev": None} совпадает и с отсутствующим полем)
+        result = await self.db[collection].replace_one({"_id": key, REVISION: revision or None}, document)
+        return result.matched_count == 1
+
+    async def close(self) -> None:
+        self.client.close()
+
+
+class SQLiteDocumentStore(DocumentStore):
+    """Документы как JSON в SQLite-файле: локальная разработка и тесты без MongoDB"""
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            "collection TEXT NOT NULL, key TEXT NOT NULL, body TEXT NOT NULL, PRIMARY KEY (collection, key))"
+        )
+
+    async def get(self, collection: str, key: Any) -> Optional[Dict[str, Any]]:
+        row = await asyncio.to_thread(
+            self._locked,
+            lambda: self._conn.execute(
+                "SELECT body FROM documents WHERE collection = ? AND key = ?", (collection, str(key))
+            ).fetchone()
+        )
+        return json.loads(row[0]) if row else None
+
+    async def put(self, collection: str, key: Any, document: Dict[str, Any]) -> None:
+        body = json.dumps(document, separators=(",", ":"), ensure_ascii=False)
+        await asyncio.to_thread(
+            self._locked,
+            lambda: self._conn.execute(
+                "INSERT OR REPLACE INTO documents (collection, key, body) VALUES (?, ?, ?)",
+                (collection, str(key), body)
+            )
+        )
+
+    async def put_if_unchanged(self, collection: str, key: Any, document: Dict[str, Any],
+                               revision: Optional[int]) -> bool:
+        body = json.dumps({**document, REVISION: (revision or 0) + 1}, separators=(",", ":"), ensure_ascii=False)
+        if revision is None:
+            sql = "INSERT OR IGNORE INTO documents (collection, key, body) VALUES (?, ?, ?)"
+            params = (collection, str(key), body)
+        else:
+            # Условный UPDATE атомарен и между процессами, открывшими один файл
+            sql = (
+                "UPDATE documents SET body = ? WHERE collection = ? AND key = ? "
+                "AND coalesce(json_extract(body, '$.{0}'), 0) = ?".format(REVISION)
+            )
+            params = (body, collection, str(key), revision)
+        cursor = await asyncio.to_thread(self._locked, lambda: self._conn.execute(sql, params))
+        return cursor.rowcount == 1
+
+    async def close(self) -> None:
+        self._conn.close()
+
+    def _locked(self, fn):
+        with self._lock:
+            return fn()
+
+
+_store: Optional[DocumentStore] = None
+
+
+def get_document_store() -> DocumentStore:
+    """Хранилище согласно settings.PROFILE_STORE (одно на процесс)"""
+    global _store
+    if _store is None:
+        if settings.PROFILE_STORE == "mongo":
+            _store = MongoDocumentStore(settings.MONGO_URL, settings.MONGO_DB)
+            logger.info("✅ Хранилище AI-профилей: MongoDB")
+        else:
+            _store = SQLiteDocumentStore(settings.PROFILE_SQLITE_PATH)
+            logger.info(f"✅ Хранилище AI-профилей: SQLite ({settings.PROFILE_SQLITE_PATH})")
+    return _store
+
+
+async def close_document_store() -> None:
+    global _store
+    if _store is not None:
+        await _store.close()
+        _store = None
@@ -0,0 +1,89 @@
+"""
+Лёгкие миграции схемы: пронумерованные шаги + таблица schema_version.
+
+Каждый шаг — модуль с VERSION, DESCRIPTION и upgrade(conn) (синхронный, внутри транзакции).
+Шаги применяются по порядку, каждый в своей транзакции вместе с записью в schema_version.
+
+Запуск (из корня репозитория):
+    python -m backend.app.db.migrations
+"""
+import logging
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, func, inspect, select, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from backend.app.db.migrations import (
+    m0001_initial, m0002_preference_masks, m0003_broadcast_runs, m0004_reminders, m0005_goal_formula,
+    m0006_meals
+)
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS = (
+    m0001_initial, m0002_preference_masks, m0003_broadcast_runs, m0004_reminders, m0005_goal_formula,
+    m0006_meals
+)
+LATEST_VERSION = MIGRATIONS[-1].VERSION
+
+# Произвольный ключ advisory lock: несколько воркеров не мигрируют одновременно (PostgreSQL)
+ADVISORY_LOCK_KEY = 4_815_162_342
+
+schema_version = Table(
+    "schema_version",
+    MetaData(),
+    Column("version", Integer, primary_key=True),
+    Column("description", String(255), nullable=False),
+    Column("applied_at", DateTime, default=datetime.utcnow, nullable=False),
+)
+
+
+def _current_version(conn: Connection) -> int:
+    if not inspect(conn).has_table(schema_version.name):
+        return 0
+    return conn.execute(select(func.max(schema_version.c.version))).scalar() or 0
+
+
+async def get_schema_version(db_engine: AsyncEngine) -> int:
+    """Версия схемы в БД (0 — миграции ещё не применялись)"""
+    async with db_engine.connect() as conn:
+        return await conn.run_sync(_current_version)
+
+
+async def check_schema_version(db_engine: AsyncEngine) -> int:
+    """
+    Версия схемы одним запросом, без обращения к каталогу: быстрый путь старта.
+    Нет таблицы schema_version — 0 (ошибка запроса откатывается вместе с соединением).
+    """
+    async with db_engine.connect() as conn:
+        try:
+            return (await conn.execute(select(func.max(schema_version.c.version)))).scalar() or 0
+        except DBAPIError:
+            return 0
+
+
+async def run_migrations(db_engine: Optional[AsyncEngine] = None) -> int:
+    """Применить недостающие миграции; возвращает итоговую версию схемы"""
+    if db_engine is None:
+        from backend.app.db.session import engine as db_engine
+
+    for migration in MIGRATIONS:
+        async with db_engine.begin() as conn:
+            if conn.dialect.name == "postgresql":
+                await conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": ADVISORY_LOCK_KEY})
+            # Перечитываем версию под блокировкой: шаг мог применить соседний воркер
+            current = await conn.run_sync(_current_version)
+            if migration.VERSION <= current:
+                continue
+            await conn.run_sync(schema_version.create, checkfirst=True)
+            logger.info(f"🔄 Миграция {migration.VERSION:04d}: {migration.DESCRIPTION}")
+            await conn.run_sync(migration.upgrade)
+            await conn.execute(
+                schema_version.insert().values(version=migration.VERSION, description=migration.DESCRIPTION)
+            )
+
+    logger.info(f"✅ Схема БД актуальна (версия {LATEST_VERSION})")
+    return LATEST_VERSION
@@ -0,0 +1,20 @@
+"""
+Применить миграции схемы БД: python -m backend.app.db.migrations
+"""
+import asyncio
+import logging
+
+from backend.app.db.migrations import run_migrations
+from backend.app.db.session import dispose_db
+
+
+async def main() -> None:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+    try:
+        await run_migrations()
+    finally:
+        await dispose_db()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
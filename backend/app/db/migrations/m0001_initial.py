@@ -0,0 +1,70 @@
+"""
+0001: исходная схема — таблицы в том виде, в каком их создавал create_all до миграций.
+Определения заморожены здесь, а не берутся из db.models: иначе смысл шага менялся бы
+вместе с моделями, и новые колонки доходили бы только до пустых баз. Всё, что появилось
+в моделях позже, добавляется своими пронумерованными шагами.
+"""
+from datetime import datetime
+
+from sqlalchemy import Boolean, Column, DateTime, Float, Integer, MetaData, String, Table, Text
+from sqlalchemy.engine import Connection
+
+VERSION = 1
+DESCRIPTION = "initial schema"
+
+metadata = MetaData()
+
+Table(
+    "users",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("telegram_user_id", String(255), unique=True, nullable=False, index=True),
+    Column("username", String(255), nullable=True),
+    Column("first_name", String(255), nullable=True),
+    Column("last_name", String(255), nullable=True),
+    Column("phone", String(20), nullable=True),
+    Column("age", Integer, nullable=True),
+    Column("gender", String(10), nullable=True),
+    Column("height_cm", Float, nullable=True),
+    Column("weight_kg", Float, nullable=True),
+    Column("activity_level", String(50), nullable=True),
+    Column("is_active", Boolean, default=True),
+    Column("is_premium", Boolean, default=False),
+    Column("created_at", DateTime, default=datetime.utcnow, nullable=False),
+    Column("updated_at", DateTime, default=datetime.utcnow, nullable=False),
+)
+
+Table(
+    "user_goals",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, nullable=False, index=True),
+    Column("goal_type", String(50), nullable=False),
+    Column("target_weight_kg", Float, nullable=False),
+    Column("weekly_goal_kg", Float, nullable=True),
+    Column("target_calories", Integer, nullable=False),
+    Column("target_protein_g", Float, nullable=False),
+    Column("target_fat_g", Float, nullable=False),
+    Column("target_carbs_g", Float, nullable=False),
+    Column("created_at", DateTime, default=datetime.utcnow, nullable=False),
+    Column("updated_at", DateTime, default=datetime.utcnow, nullable=False),
+)
+
+Table(
+    "user_preferences",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, nullable=False, index=True),
+    Column("dietary_restrictions", Text, nullable=True),
+    Column("allergies", Text, nullable=True),
+    Column("disliked_ingredients", Text, nullable=True),
+    Column("preferred_cuisines", Text, nullable=True),
+    Column("cooking_methods_allowed", Text, nullable=True),
+    Column("created_at", DateTime, default=datetime.utcnow, nullable=False),
+    Column("updated_at", DateTime, default=datetime.utcnow, nullable=False),
+)
+
+
+def upgrade(conn: Connection) -> None:
+    # checkfirst: на базах, созданных до появления миграций, таблицы уже есть
+    metadata.create_all(conn, checkfirst=True)
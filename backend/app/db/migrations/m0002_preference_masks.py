@@ -0,0 +1,109 @@
+"""
+0002: предпочтения пользователя из JSON-в-Text в битовые маски + частичные индексы по аллергенам.
+Старые Text-колонки не удаляются (данные с неизвестными кодами остаются там для ручного разбора).
+"""
+import logging
+
+from sqlalchemy import BigInteger, Column, Index, Integer, MetaData, Table, bindparam, inspect, select, text, update
+from sqlalchemy.engine import Connection
+
+from backend.app.db import vocabulary
+
+logger = logging.getLogger(__name__)
+
+VERSION = 2
+DESCRIPTION = "user_preferences bitmask columns"
+
+BATCH_SIZE = 5000
+
+# Старая Text-колонка → (новая колонка-маска, словарь)
+LEGACY_COLUMNS = {
+    "dietary_restrictions": ("dietary_restrictions_mask", vocabulary.diets),
+    "allergies": ("allergies_mask", vocabulary.allergens),
+    "disliked_ingredients": ("disliked_ingredients_mask", vocabulary.ingredients),
+    "preferred_cuisines": ("preferred_cuisines_mask", vocabulary.cuisines),
+    "cooking_methods_allowed": ("cooking_methods_mask", vocabulary.cooking_methods),
+}
+MASK_COLUMNS = [mask for mask, _ in LEGACY_COLUMNS.values()] + ["exclude_mask"]
+
+# Аллергены с частичными индексами на момент шага (биты — как в vocabulary, только дописываются)
+ALLERGENS = (
+    "nuts", "peanuts", "dairy", "gluten", "eggs", "fish", "shellfish", "soy",
+    "sesame", "mustard", "celery", "sulphites",
+)
+
+table = Table(
+    "user_preferences",
+    MetaData(),
+    Column("id", Integer, primary_key=True),
+    Column("user_id", Integer, nullable=False),
+    *(Column(column, BigInteger, nullable=False) for column in MASK_COLUMNS),
+)
+AVOIDS_INDEXES = [
+    Index(
+        f"ix_user_preferences_avoids_{code}",
+        table.c.user_id,
+        postgresql_where=text(f"(exclude_mask & {1 << bit}) <> 0"),
+        sqlite_where=text(f"(exclude_mask & {1 << bit}) <> 0")
+    )
+    for bit, code in enumerate(ALLERGENS)
+]
+
+
+def upgrade(conn: Connection) -> None:
+    existing = {column["name"] for column in inspect(conn).get_columns(table.name)}
+
+    for column in MASK_COLUMNS:
+        if column not in existing:
+            conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column} BIGINT NOT NULL DEFAULT 0"))
+
+    legacy = [name for name in LEGACY_COLUMNS if name in existing]
+    if legacy:
+        _backfill(conn, legacy)
+
+    for index in AVOIDS_INDEXES:
+        index.create(conn, checkfirst=True)
+
+
+def _backfill(conn: Connection, legacy: list) -> None:
+    """Пачками: keyset по id → маски в Python → один executemany UPDATE на пачку"""
+    # Имена параметров с "_": SQLAlchemy не даёт bindparam совпадать с именем колонки в SET
+    targets = [LEGACY_COLUMNS[name][0] for name in legacy] + ["exclude_mask"]
+    stmt = (
+        update(table)
+        .where(table.c.id == bindparam("_id"))
+        .values({column: bindparam(f"_{column}") for column in targets})
+    )
+
+    last_id, migrated, unknown = 0, 0, 0
+    while True:
+        rows = conn.execute(
+            select(table.c.id, *(text(name) for name in legacy))
+            .select_from(table)
+            .where(table.c.id > last_id)
+            .order_by(table.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+
+        params = []
+        for row_id, *raw_values in rows:
+            masks = {}
+            for name, raw in zip(legacy, raw_values):
+                mask_column, vocab = LEGACY_COLUMNS[name]
+                masks[mask_column], skipped = vocab.split_known(vocabulary.parse_json_list(raw))
+                unknown += len(skipped)
+            masks["exclude_mask"] = vocabulary.exclude_mask(
+                masks.get("dietary_restrictions_mask", 0),
+                masks.get("allergies_mask", 0),
+                masks.get("disliked_ingredients_mask", 0)
+            )
+            params.append({"_id": row_id, **{f"_{column}": value for column, value in masks.items()}})
+        conn.execute(stmt, params)
+        migrated += len(rows)
+
+    logger.info(f"✅ Предпочтения переведены на маски: {migrated} строк")
+    if unknown:
+        logger.warning(f"⚠️ Значений вне словаря: {unknown} (остались в старых Text-колонках)")
@@ -0,0 +1,29 @@
+"""
+0003: таблица рассылок с контрольными точками
+"""
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, Text
+from sqlalchemy.engine import Connection
+
+VERSION = 3
+DESCRIPTION = "broadcast_runs"
+
+broadcast_runs = Table(
+    "broadcast_runs",
+    MetaData(),
+    Column("id", Integer, primary_key=True, index=True),
+    Column("name", String(100), unique=True, nullable=False),
+    Column("text", Text, nullable=False),
+    Column("status", String(20), default="running", nullable=False),
+    Column("last_user_id", Integer, default=0, nullable=False),
+    Column("sent", Integer, default=0, nullable=False),
+    Column("failed", Integer, default=0, nullable=False),
+    Column("blocked", Integer, default=0, nullable=False),
+    Column("created_at", DateTime, default=datetime.utcnow, nullable=False),
+    Column("updated_at", DateTime, default=datetime.utcnow, nullable=False),
+)
+
+
+def upgrade(conn: Connection) -> None:
+    broadcast_runs.create(conn, checkfirst=True)
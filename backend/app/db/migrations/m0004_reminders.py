@@ -0,0 +1,50 @@
+"""
+0004: расписания напоминаний, аренды секций и heartbeat воркеров планировщика
+"""
+from datetime import datetime
+
+from sqlalchemy import (
+    BigInteger, Boolean, Column, DateTime, Index, Integer, MetaData, String, Table, UniqueConstraint
+)
+from sqlalchemy.engine import Connection
+
+VERSION = 4
+DESCRIPTION = "reminder_schedules, scheduler_leases, scheduler_workers"
+
+metadata = MetaData()
+
+Table(
+    "reminder_schedules",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, nullable=False),
+    Column("chat_id", BigInteger, nullable=False),
+    Column("kind", String(20), nullable=False),
+    Column("partition", Integer, nullable=False),
+    Column("next_run_ts", BigInteger, nullable=False),
+    Column("interval_s", Integer, default=0, nullable=False),
+    Column("enabled", Boolean, default=True, nullable=False),
+    Column("created_at", DateTime, default=datetime.utcnow, nullable=False),
+    Column("updated_at", DateTime, default=datetime.utcnow, nullable=False),
+    UniqueConstraint("user_id", "kind", name="uq_reminder_schedules_user_kind"),
+    Index("ix_reminder_schedules_due", "partition", "next_run_ts"),
+)
+
+Table(
+    "scheduler_leases",
+    metadata,
+    Column("partition", Integer, primary_key=True),
+    Column("owner", String(100), nullable=True),
+    Column("expires_ts", BigInteger, default=0, nullable=False),
+)
+
+Table(
+    "scheduler_workers",
+    metadata,
+    Column("owner", String(100), primary_key=True),
+    Column("expires_ts", BigInteger, nullable=False),
+)
+
+
+def upgrade(conn: Connection) -> None:
+    metadata.create_all(conn, checkfirst=True)
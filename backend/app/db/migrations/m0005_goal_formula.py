@@ -0,0 +1,24 @@
+"""
+0005: user_goals.calories_manual и formula_version (движок целей Mifflin–St Jeor).
+До движка калорийность всегда вводил пользователь, поэтому существующие цели помечаются
+calories_manual = true: пересчёт (jobs.retarget) обновит им только БЖУ. formula_version
+остаётся NULL — такие цели пересчёт считает устаревшими.
+"""
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+
+VERSION = 5
+DESCRIPTION = "user_goals.calories_manual, user_goals.formula_version"
+
+TABLE = "user_goals"
+
+
+def upgrade(conn: Connection) -> None:
+    existing = {column["name"] for column in inspect(conn).get_columns(TABLE)}
+
+    if "calories_manual" not in existing:
+        conn.execute(text(f"ALTER TABLE {TABLE} ADD COLUMN calories_manual BOOLEAN NOT NULL DEFAULT false"))
+        conn.execute(text(f"UPDATE {TABLE} SET calories_manual = true"))
+
+    if "formula_version" not in existing:
+        conn.execute(text(f"ALTER TABLE {TABLE} ADD COLUMN formula_version INTEGER"))
@@ -0,0 +1,75 @@
+"""
+0006: приёмы пищи, история правок и дневные сводки КБЖУ.
+Раньше эти таблицы создавал create_all в шаге 0001; на базах, где он уже отработал,
+шаг ничего не меняет (checkfirst).
+"""
+from datetime import datetime
+
+from sqlalchemy import Column, Date, DateTime, Float, Integer, MetaData, String, Table, UniqueConstraint
+from sqlalchemy.engine import Connection
+
+VERSION = 6
+DESCRIPTION = "meal_sessions, meals, meal_edits, daily_nutrition_totals"
+
+metadata = MetaData()
+
+Table(
+    "meal_sessions",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, nullable=False, index=True),
+    Column("status", String(20), default="open", nullable=False),
+    Column("started_at", DateTime, default=datetime.utcnow, nullable=False),
+    Column("ended_at", DateTime, nullable=True),
+)
+
+Table(
+    "meals",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, nullable=False, index=True),
+    Column("session_id", Integer, nullable=True, index=True),
+    Column("name", String(255), nullable=False),
+    Column("source", String(20), default="text", nullable=False),
+    Column("meal_date", Date, nullable=False, index=True),
+    Column("portion_g", Float, nullable=True),
+    Column("percent_eaten", Float, default=100.0, nullable=False),
+    Column("calories", Float, nullable=False),
+    Column("protein_g", Float, nullable=False),
+    Column("fat_g", Float, nullable=False),
+    Column("carbs_g", Float, nullable=False),
+    Column("eaten_at", DateTime, default=datetime.utcnow, nullable=False),
+    Column("created_at", DateTime, default=datetime.utcnow, nullable=False),
+    Column("updated_at", DateTime, default=datetime.utcnow, nullable=False),
+)
+
+Table(
+    "meal_edits",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("meal_id", Integer, nullable=False, index=True),
+    Column("user_id", Integer, nullable=False),
+    Column("field", String(50), nullable=False),
+    Column("old_value", Float, nullable=True),
+    Column("new_value", Float, nullable=True),
+    Column("created_at", DateTime, default=datetime.utcnow, nullable=False),
+)
+
+Table(
+    "daily_nutrition_totals",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, nullable=False),
+    Column("day", Date, nullable=False),
+    Column("calories", Float, default=0.0, nullable=False),
+    Column("protein_g", Float, default=0.0, nullable=False),
+    Column("fat_g", Float, default=0.0, nullable=False),
+    Column("carbs_g", Float, default=0.0, nullable=False),
+    Column("meals_count", Integer, default=0, nullable=False),
+    Column("updated_at", DateTime, default=datetime.utcnow, nullable=False),
+    UniqueConstraint("user_id", "day", name="uq_daily_totals_user_day"),
+)
+
+
+def upgrade(conn: Connection) -> None:
+    metadata.create_all(conn, checkfirst=True)
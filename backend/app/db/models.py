@@ -1,9 +1,11 @@
 """
 ORM модели SQLAlchemy
 """
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, Float
+from sqlalchemy import Column, Integer, BigInteger, String, Date, DateTime, Boolean, Text, Float, Index, UniqueConstraint, text
 from sqlalchemy.sql import func
 from datetime import datetime
+from typing import List, Optional
+from backend.app.db import vocabulary
 from backend.app.db.session import Base
 
 
@@ -54,6 +56,8 @@ class UserGoal(Base):
     target_protein_g = Column(Float, nullable=False)
     target_fat_g = Column(Float, nullable=False)
     target_carbs_g = Column(Float, nullable=False)
+    calories_manual = Column(Boolean, default=False, nullable=False)  # калории заданы пользователем
+    formula_version = Column(Integer, nullable=True)  # версия services.nutrition_targets
     
     # Временные метки
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -63,6 +67,18 @@ class UserGoal(Base):
         return f"<UserGoal(id={self.id}, user_id={self.user_id}, goal_type={self.goal_type})>"
 
 
+def _mask_list(column: str, vocab: vocabulary.Vocabulary) -> property:
+    """Свойство-список кодов, читающее и пишущее маску column"""
+    def getter(self) -> List[str]:
+        return vocab.decode(getattr(self, column))
+    
+    def setter(self, codes: Optional[List[str]]) -> None:
+        setattr(self, column, vocab.encode(codes))
+        self.refresh_exclude_mask()
+    
+    return property(getter, setter)
+
+
 class UserPreference(Base):
     """Модель предпочтений пользователя"""
     __tablename__ = "user_preferences"
@@ -70,18 +86,201 @@ class UserPreference(Base):
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, nullable=False, index=True)  # FK к users.id
     
-    # Ограничения и аллергены (JSON-подобные строки, для MVP)
-    dietary_restrictions = Column(Text, nullable=True)  # JSON: ["vegan", "gluten-free"]
-    allergies = Column(Text, nullable=True)  # JSON: ["nuts", "dairy"]
-    disliked_ingredients = Column(Text, nullable=True)  # JSON: ["mushrooms"]
+    # Ограничения и предпочтения — битовые маски по словарю db.vocabulary
+    dietary_restrictions_mask = Column(BigInteger, default=0, nullable=False)  # vocabulary.diets
+    allergies_mask = Column(BigInteger, default=0, nullable=False)  # vocabulary.allergens
+    disliked_ingredients_mask = Column(BigInteger, default=0, nullable=False)  # vocabulary.ingredients
+    preferred_cuisines_mask = Column(BigInteger, default=0, nullable=False)  # vocabulary.cuisines
+    cooking_methods_mask = Column(BigInteger, default=0, nullable=False)  # vocabulary.cooking_methods
     
-    # Предпочтения по кухне
-    preferred_cuisines = Column(Text, nullable=True)  # JSON: ["Italian", "Asian"]
-    cooking_methods_allowed = Column(Text, nullable=True)  # JSON: ["boiling", "baking"]
+    # Производная: ингредиенты, которых не должно быть в блюде (аллергии ∪ нелюбимое ∪ диеты).
+    # Пересчитывается при записи любой из масок выше; на неё смотрят частичные индексы
+    exclude_mask = Column(BigInteger, default=0, nullable=False)
     
     # Временные метки
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     
+    # Списки кодов поверх масок (для Pydantic схем и кода, которому удобнее списки)
+    dietary_restrictions = _mask_list("dietary_restrictions_mask", vocabulary.diets)
+    allergies = _mask_list("allergies_mask", vocabulary.allergens)
+    disliked_ingredients = _mask_list("disliked_ingredients_mask", vocabulary.ingredients)
+    preferred_cuisines = _mask_list("preferred_cuisines_mask", vocabulary.cuisines)
+    cooking_methods_allowed = _mask_list("cooking_methods_mask", vocabulary.cooking_methods)
+    
+    # Частичный индекс на каждый аллерген: "кто избегает орехов" читает только таких пользователей
+    __table_args__ = tuple(
+        Index(
+            f"ix_user_preferences_avoids_{code}",
+            "user_id",
+            postgresql_where=text(f"(exclude_mask & {bit}) <> 0"),
+            sqlite_where=text(f"(exclude_mask & {bit}) <> 0")
+        )
+        for code, bit in vocabulary.allergens.bits.items()
+    )
+    
+    def refresh_exclude_mask(self) -> None:
+        self.exclude_mask = vocabulary.exclude_mask(
+            self.dietary_restrictions_mask, self.allergies_mask, self.disliked_ingredients_mask
+        )
+    
+    def __repr__(self):
+        return f"<UserPreference(id={self.id}, user_id={self.user_id})>"
+
+
+class MealSession(Base):
+    """Сессия приёмов пищи (завершение сессии запускает AI-анализ)"""
+    __tablename__ = "meal_sessions"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, nullable=False, index=True)  # FK к users.id
+    status = Column(String(20), default="open", nullable=False)  # 'open', 'closed'
+    
+    started_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    ended_at = Column(DateTime, nullable=True)
+    
+    def __repr__(self):
+        return f"<MealSession(id={self.id}, user_id={self.user_id}, status={self.status})>"
+
+
+class Meal(Base):
+    """Модель приёма пищи"""
+    __tablename__ = "meals"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, nullable=False, index=True)  # FK к users.id
+    session_id = Column(Integer, nullable=True, index=True)  # FK к meal_sessions.id
+    
+    name = Column(String(255), nullable=False)
+    source = Column(String(20), default="text", nullable=False)  # 'photo', 'text', 'manual'
+    meal_date = Column(Date, nullable=False, index=True)  # день для daily_nutrition_totals
+    
+    # Порция и доля съеденного (Сценарий 3: редактирование)
+    portion_g = Column(Float, nullable=True)
+    percent_eaten = Column(Float, default=100.0, nullable=False)
+    
+    # КБЖУ всей порции; съедено = значение * percent_eaten / 100
+    calories = Column(Float, nullable=False)
+    protein_g = Column(Float, nullable=False)
+    fat_g = Column(Float, nullable=False)
+    carbs_g = Column(Float, nullable=False)
+    
+    # Временные метки
+    eaten_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    
+    def __repr__(self):
+        return f"<Meal(id={self.id}, user_id={self.user_id}, name={self.name})>"
+
+
+class MealEdit(Base):
+    """История правок приёма пищи"""
+    __tablename__ = "meal_edits"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    meal_id = Column(Integer, nullable=False, index=True)  # FK к meals.id
+    user_id = Column(Integer, nullable=False)  # FK к users.id
+    
+    field = Column(String(50), nullable=False)  # 'portion_g', 'percent_eaten'
+    old_value = Column(Float, nullable=True)
+    new_value = Column(Float, nullable=True)
+    
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    def __repr__(self):
+        return f"<MealEdit(id={self.id}, meal_id={self.meal_id}, field={self.field})>"
+
+
+class DailyNutritionTotal(Base):
+    """Суммарное съеденное КБЖУ за день (обновляется в той же транзакции, что и meals)"""
+    __tablename__ = "daily_nutrition_totals"
+    __table_args__ = (UniqueConstraint("user_id", "day", name="uq_daily_totals_user_day"),)
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, nullable=False)  # FK к users.id
+    day = Column(Date, nullable=False)
+    
+    calories = Column(Float, default=0.0, nullable=False)
+    protein_g = Column(Float, default=0.0, nullable=False)
+    fat_g = Column(Float, default=0.0, nullable=False)
+    carbs_g = Column(Float, default=0.0, nullable=False)
+    meals_count = Column(Integer, default=0, nullable=False)
+    
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    
+    def __repr__(self):
+        return f"<DailyNutritionTotal(user_id={self.user_id}, day={self.day}, calories={self.calories})>"
+
+
+class BroadcastRun(Base):
+    """Рассылка и её контрольная точка: упавший запуск продолжается с last_user_id"""
+    __tablename__ = "broadcast_runs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(100), unique=True, nullable=False)
+    text = Column(Text, nullable=False)  # Шаблон сообщения (str.format по полям пользователя)
+    status = Column(String(20), default="running", nullable=False)  # 'running', 'done'
+    
+    # Все пользователи с id <= last_user_id уже обработаны
+    last_user_id = Column(Integer, default=0, nullable=False)
+    sent = Column(Integer, default=0, nullable=False)
+    failed = Column(Integer, default=0, nullable=False)
+    blocked = Column(Integer, default=0, nullable=False)
+    
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    
+    def __repr__(self):
+        return f"<BroadcastRun(id={self.id}, name={self.name}, status={self.status})>"
+
+
+class ReminderSchedule(Base):
+    """Расписание напоминания пользователя (завтрак, взвешивание); время — UNIX-секунды UTC"""
+    __tablename__ = "reminder_schedules"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, nullable=False)
+    chat_id = Column(BigInteger, nullable=False)
+    kind = Column(String(20), nullable=False)  # 'breakfast', 'weigh_in'
+    
+    # Секция (user_id % REMINDER_PARTITIONS): её аренда определяет воркер, который шлёт напоминание
+    partition = Column(Integer, nullable=False)
+    next_run_ts = Column(BigInteger, nullable=False)
+    interval_s = Column(Integer, default=0, nullable=False)  # 0 — разовое
+    enabled = Column(Boolean, default=True, nullable=False)
+    
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    
+    __table_args__ = (
+        UniqueConstraint("user_id", "kind", name="uq_reminder_schedules_user_kind"),
+        # Выборка ближайших напоминаний своих секций
+        Index("ix_reminder_schedules_due", "partition", "next_run_ts"),
+    )
+    
+    def __repr__(self):
+        return f"<ReminderSchedule(id={self.id}, user_id={self.user_id}, kind={self.kind}, next_run_ts={self.next_run_ts})>"
+
+
+class SchedulerWorker(Base):
+    """Живой воркер планировщика (heartbeat): по их числу секции делятся поровну"""
+    __tablename__ = "scheduler_workers"
+    
+    owner = Column(String(100), primary_key=True)
+    expires_ts = Column(BigInteger, nullable=False)
+    
+    def __repr__(self):
+        return f"<SchedulerWorker(owner={self.owner}, expires_ts={self.expires_ts})>"
+
+
+class SchedulerLease(Base):
+    """Аренда секции напоминаний воркером: истёкшую аренду забирает любой другой воркер"""
+    __tablename__ = "scheduler_leases"
+    
+    partition = Column(Integer, primary_key=True)
+    owner = Column(String(100), nullable=True)
+    expires_ts = Column(BigInteger, default=0, nullable=False)
+    
     def __repr__(self):
-        return f"<UserPreference(id={self.id}, user_id={self.user_id})>"
\ No newline at end of file
+        return f"<SchedulerLease(partition={self.partition}, owner={self.owner}, expires_ts={self.expires_ts})>"
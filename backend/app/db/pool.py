@@ -0,0 +1,78 @@
+"""
+Пул соединений с телеметрией: ожидание checkout, занятые соединения, overflow
+"""
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from backend.app.utils.metrics import registry
+
+CHECKOUT_WAIT = registry.histogram("db_pool_checkout_wait_seconds", "Ожидание соединения из пула БД")
+
+
+class PoolStats:
+    """Накопительные счётчики пула"""
+
+    __slots__ = ("checkouts", "wait_total_s", "wait_max_s", "overflow_events", "timeouts")
+
+    def __init__(self):
+        self.checkouts = 0
+        self.wait_total_s = 0.0
+        self.wait_max_s = 0.0
+        self.overflow_events = 0
+        self.timeouts = 0
+
+    def as_dict(self) -> dict:
+        avg = self.wait_total_s / self.checkouts if self.checkouts else 0.0
+        return {
+            "checkouts": self.checkouts,
+            "wait_avg_ms": round(avg * 1000, 3),
+            "wait_max_ms": round(self.wait_max_s * 1000, 3),
+            "overflow_events": self.overflow_events,
+            "timeouts": self.timeouts,
+        }
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool, который замеряет время получения соединения"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def _do_get(self):
+        overflow_before = self._overflow
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            self.stats.timeouts += 1
+            raise
+        wait = time.perf_counter() - start
+        CHECKOUT_WAIT.observe(wait)
+
+        stats = self.stats
+        stats.checkouts += 1
+        stats.wait_total_s += wait
+        if wait > stats.wait_max_s:
+            stats.wait_max_s = wait
+        if self._overflow > 0 and self._overflow > overflow_before:
+            stats.overflow_events += 1
+        return conn
+
+    def recreate(self):
+        # engine.dispose() пересоздаёт пул — сохраняем накопленную статистику
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+    def snapshot(self) -> dict:
+        """Текущее состояние пула + накопленные счётчики"""
+        return {
+            "size": self.size(),
+            "checked_out": self.checkedout(),
+            "checked_in": self.checkedin(),
+            "overflow": self.overflow(),
+            **self.stats.as_dict(),
+        }
@@ -1,9 +1,18 @@
 """
 Pydantic схемы для валидации данных (DTO)
 """
-from pydantic import BaseModel, Field
-from typing import Optional
+from pydantic import BaseModel, Field, ValidationInfo, field_validator
+from typing import List, Optional
 from datetime import datetime
+from backend.app.db import vocabulary
+
+_PREFERENCE_VOCABULARIES = {
+    "dietary_restrictions": vocabulary.diets,
+    "allergies": vocabulary.allergens,
+    "disliked_ingredients": vocabulary.ingredients,
+    "preferred_cuisines": vocabulary.cuisines,
+    "cooking_methods_allowed": vocabulary.cooking_methods,
+}
 
 
 class UserBase(BaseModel):
@@ -75,12 +84,21 @@ class UserGoalResponse(UserGoalBase):
 
 
 class UserPreferenceBase(BaseModel):
-    """Базовая схема UserPreference"""
-    dietary_restrictions: Optional[str] = None
-    allergies: Optional[str] = None
-    disliked_ingredients: Optional[str] = None
-    preferred_cuisines: Optional[str] = None
-    cooking_methods_allowed: Optional[str] = None
+    """Базовая схема UserPreference: списки кодов из db.vocabulary"""
+    dietary_restrictions: List[str] = Field(default_factory=list)  # ["vegan", "gluten_free"]
+    allergies: List[str] = Field(default_factory=list)  # ["nuts", "dairy"]
+    disliked_ingredients: List[str] = Field(default_factory=list)  # ["mushrooms"]
+    preferred_cuisines: List[str] = Field(default_factory=list)  # ["italian", "asian"]
+    cooking_methods_allowed: List[str] = Field(default_factory=list)  # ["boiling", "baking"]
+    
+    @field_validator(*_PREFERENCE_VOCABULARIES, mode="before")
+    @classmethod
+    def _canonical_codes(cls, value, info: ValidationInfo):
+        """Коды приводятся к каноническому виду и проверяются по словарю"""
+        if value is None:
+            return []
+        vocab = _PREFERENCE_VOCABULARIES[info.field_name]
+        return vocab.decode(vocab.encode(value))
 
 
 class UserPreferenceCreate(UserPreferenceBase):
@@ -1,21 +1,104 @@
 """
 Инициализация SQLAlchemy сессии
 """
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import declarative_base
 from sqlalchemy.pool import NullPool
+from typing import Iterable, Optional
 from backend.app.config import settings
+from backend.app.db.pool import InstrumentedQueuePool
+from backend.app.utils.metrics import ROW_BUCKETS, Family, counter, gauge, registry
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
-# Асинхронный движок (asyncpg драйвер)
-engine = create_async_engine(
-    settings.DATABASE_URL,
-    echo=settings.DEBUG,  # Логирование SQL если DEBUG=True
-    poolclass=NullPool,   # Для локального сервера (MVP)
-    future=True
+SQL_LATENCY = registry.histogram("db_query_duration_seconds", "Время выполнения SQL-запроса", ["statement"])
+SQL_ROWS = registry.histogram(
+    "db_query_rows", "Строк, затронутых запросом (если драйвер сообщает rowcount)", ["statement"],
+    buckets=ROW_BUCKETS
 )
+STATEMENT_KINDS = ("select", "insert", "update", "delete", "other")
+
+
+def build_engine(database_url: Optional[str] = None, pool_mode: Optional[str] = None) -> AsyncEngine:
+    """Создать движок по настройкам пула (DB_POOL_*)"""
+    url = make_url(database_url or settings.DATABASE_URL)
+    pool_mode = pool_mode or settings.DB_POOL_MODE
+    
+    options = {}
+    if pool_mode == "null":
+        options["poolclass"] = NullPool
+    else:
+        options.update(
+            poolclass=InstrumentedQueuePool,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            pool_pre_ping=settings.DB_POOL_PRE_PING,
+        )
+    
+    if url.drivername == "postgresql+asyncpg":
+        # Кэш prepared statements: asyncpg на соединении + SQLAlchemy поверх него
+        options["connect_args"] = {"statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE}
+        url = url.update_query_dict(
+            {"prepared_statement_cache_size": str(settings.DB_STATEMENT_CACHE_SIZE)}
+        )
+    
+    db_engine = create_async_engine(
+        url,
+        echo=settings.DEBUG,  # Логирование SQL если DEBUG=True
+        future=True,
+        **options
+    )
+    if url.get_backend_name() == "sqlite":
+        configure_sqlite(db_engine)
+    return db_engine
+
+
+def configure_sqlite(db_engine: AsyncEngine) -> None:
+    """WAL (чтение не ждёт запись) и busy_timeout на каждом соединении SQLite"""
+    @event.listens_for(db_engine.sync_engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA busy_timeout={int(settings.DB_SQLITE_BUSY_TIMEOUT_MS)}")
+        cursor.close()
+
+
+def instrument_engine(db_engine: AsyncEngine) -> None:
+    """Гистограммы длительности и rowcount SQL по типу запроса (события движка)"""
+    latency = {kind: SQL_LATENCY.labels(kind) for kind in STATEMENT_KINDS}
+    rows = {kind: SQL_ROWS.labels(kind) for kind in STATEMENT_KINDS}
+
+    @event.listens_for(db_engine.sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._metrics_started = time.perf_counter()
+
+    @event.listens_for(db_engine.sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._metrics_started
+        if context.isinsert:
+            kind = "insert"
+        elif context.isupdate:
+            kind = "update"
+        elif context.isdelete:
+            kind = "delete"
+        elif cursor.description is not None:
+            kind = "select"
+        else:
+            kind = "other"
+        latency[kind].observe(elapsed)
+        if cursor.rowcount >= 0:
+            rows[kind].observe(cursor.rowcount)
+
+
+# Асинхронный движок (asyncpg драйвер)
+engine = build_engine()
+instrument_engine(engine)
 
 # Асинхронная фабрика сессий
 async_session_maker = async_sessionmaker(
@@ -36,13 +119,48 @@ async def get_session() -> AsyncSession:
 
 
 async def init_db():
-    """Инициализация БД: создание всех таблиц"""
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    """
+    Проверка схемы одним запросом; миграции (db/migrations) — только если схема отстала
+    и DB_SCHEMA_MODE="migrate". В режиме "check" DDL при старте не выполняется.
+    """
+    from backend.app.db.migrations import LATEST_VERSION, check_schema_version, run_migrations
+    version = await check_schema_version(engine)
+    if version > LATEST_VERSION:
+        logger.warning(f"⚠️ Схема БД новее кода: версия {version}, код знает {LATEST_VERSION}")
+    elif version < LATEST_VERSION:
+        if settings.DB_SCHEMA_MODE != "migrate":
+            raise RuntimeError(
+                f"Схема БД версии {version}, нужна {LATEST_VERSION}: "
+                f"примените миграции (python -m backend.app.db.migrations)"
+            )
+        await run_migrations(engine)
     logger.info("✅ БД инициализирована")
 
 
+def get_pool_stats(db_engine: Optional[AsyncEngine] = None) -> dict:
+    """Телеметрия пула соединений (пусто для NullPool)"""
+    pool = (db_engine or engine).pool
+    if isinstance(pool, InstrumentedQueuePool):
+        return pool.snapshot()
+    return {}
+
+
+@registry.collector
+def _pool_metrics() -> Iterable[Family]:
+    # Ожидание checkout — гистограмма db_pool_checkout_wait_seconds (db/pool.py)
+    stats = get_pool_stats()
+    if not stats:
+        return
+    for key in ("size", "checked_out", "checked_in", "overflow"):
+        yield gauge(f"db_pool_{key}", f"Пул соединений БД: {key}", stats[key])
+    for key in ("checkouts", "overflow_events", "timeouts"):
+        yield counter(f"db_pool_{key}", f"Пул соединений БД: {key} с начала работы", stats[key])
+
+
 async def dispose_db():
     """Закрытие соединений при остановке приложения"""
+    stats = get_pool_stats()
+    if stats:
+        logger.info(f"📊 Статистика пула БД: {stats}")
     await engine.dispose()
     logger.info("✅ Соединения с БД закрыты")
\ No newline at end of file
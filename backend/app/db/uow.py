@@ -0,0 +1,105 @@
+"""
+Unit of Work: одна ленивая сессия БД и один commit на обновление Telegram
+"""
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional, TypeVar
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.app.db.session import async_session_maker
+from backend.app.repositories.base import BaseRepository
+from backend.app.repositories.goals_repo import GoalsRepository
+from backend.app.repositories.meals_repo import MealsRepository
+from backend.app.repositories.preferences_repo import PreferencesRepository
+from backend.app.repositories.reminders_repo import RemindersRepository
+from backend.app.repositories.users_repo import UsersRepository
+
+logger = logging.getLogger(__name__)
+
+RepositoryType = TypeVar("RepositoryType", bound=BaseRepository)
+
+
+class UnitOfWork:
+    """
+    Сессия создаётся при первом обращении к session/репозиториям, соединение
+    берётся из пула только при первом запросе. Репозитории работают с autocommit=False,
+    фиксирует транзакцию вызывающий (UnitOfWorkMiddleware) — один раз в конце.
+    """
+
+    def __init__(self, session_factory: Callable[[], AsyncSession] = async_session_maker):
+        self._session_factory = session_factory
+        self._session: Optional[AsyncSession] = None
+        self._repositories: Dict[type, BaseRepository] = {}
+        self._after_commit: List[Callable[[], Awaitable[None]]] = []
+
+    @property
+    def opened(self) -> bool:
+        return self._session is not None
+
+    @property
+    def session(self) -> AsyncSession:
+        if self._session is None:
+            self._session = self._session_factory()
+        return self._session
+
+    def repository(self, repository_cls: type[RepositoryType]) -> RepositoryType:
+        """Репозиторий, привязанный к сессии этой единицы работы"""
+        repository = self._repositories.get(repository_cls)
+        if repository is None:
+            repository = repository_cls(self.session, autocommit=False)
+            self._repositories[repository_cls] = repository
+        return repository
+
+    @property
+    def users(self) -> UsersRepository:
+        return self.repository(UsersRepository)
+
+    @property
+    def goals(self) -> GoalsRepository:
+        return self.repository(GoalsRepository)
+
+    @property
+    def meals(self) -> MealsRepository:
+        return self.repository(MealsRepository)
+
+    @property
+    def preferences(self) -> PreferencesRepository:
+        return self.repository(PreferencesRepository)
+
+    @property
+    def reminders(self) -> RemindersRepository:
+        return self.repository(RemindersRepository)
+
+    async def commit(self) -> None:
+        if self._session is not None:
+            await self._session.commit()
+
+    async def rollback(self) -> None:
+        if self._session is not None:
+            await self._session.rollback()
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+            self._repositories.clear()
+
+    def after_commit(self, callback: Callable[[], Awaitable[None]]) -> None:
+        """
+        Выполнить callback после commit и возврата соединения в пул (UnitOfWorkMiddleware):
+        внешние вызовы не держат транзакцию, соединение и блокировки строк. При rollback не вызывается.
+        """
+        self._after_commit.append(callback)
+
+    async def run_after_commit(self) -> None:
+        callbacks, self._after_commit = self._after_commit, []
+        for callback in callbacks:
+            try:
+                await callback()
+            except Exception as e:
+                logger.warning(f"⚠️ Ошибка в действии после commit: {e}", exc_info=True)
+
+    async def release(self) -> None:
+        """Зафиксировать и вернуть соединение в пул до конца обновления (перед долгим ожиданием)"""
+        await self.commit()
+        await self.close()
@@ -0,0 +1,137 @@
+"""
+Канонический словарь ограничений и предпочтений: код ↔ номер бита в маске (BigInteger).
+Номера битов — часть схемы БД: новые коды добавлять только в конец, существующие не переставлять.
+"""
+import json
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Что содержит блюдо. Этими битами размечается каталог RecSys (DishCatalog.restriction_masks),
+# на них же раскладываются аллергии, нелюбимые ингредиенты и диеты пользователя.
+INGREDIENTS: Tuple[str, ...] = (
+    "nuts", "peanuts", "dairy", "gluten", "eggs", "fish", "shellfish", "soy",
+    "sesame", "mustard", "celery", "sulphites", "meat", "pork", "poultry", "alcohol",
+    "honey", "gelatin", "sugar", "high_carb", "mushrooms", "onion", "garlic", "spicy",
+    "offal", "cilantro",
+)
+# Аллергены — подмножество ингредиентов (бит аллергии = бит ингредиента)
+ALLERGENS: Tuple[str, ...] = INGREDIENTS[:12]
+
+# Диета → какие ингредиенты она исключает
+DIETS: Dict[str, Tuple[str, ...]] = {
+    "vegetarian": ("meat", "pork", "poultry", "fish", "shellfish", "gelatin", "offal"),
+    "vegan": ("meat", "pork", "poultry", "fish", "shellfish", "gelatin", "offal", "dairy", "eggs", "honey"),
+    "pescatarian": ("meat", "pork", "poultry", "offal"),
+    "gluten_free": ("gluten",),
+    "lactose_free": ("dairy",),
+    "halal": ("pork", "alcohol"),
+    "kosher": ("pork", "shellfish"),
+    "keto": ("sugar", "high_carb"),
+    "low_carb": ("high_carb",),
+}
+
+CUISINES: Tuple[str, ...] = (
+    "russian", "italian", "asian", "georgian", "japanese", "chinese", "mexican", "french",
+    "indian", "mediterranean", "american", "middle_eastern", "thai", "korean",
+)
+COOKING_METHODS: Tuple[str, ...] = (
+    "boiling", "baking", "frying", "grilling", "steaming", "stewing", "raw", "sous_vide", "smoking",
+)
+
+# Синонимы из старых JSON-значений и свободного ввода
+ALIASES: Dict[str, str] = {
+    "tree_nuts": "nuts",
+    "milk": "dairy",
+    "lactose": "dairy",
+    "egg": "eggs",
+    "seafood": "shellfish",
+    "mushroom": "mushrooms",
+    "gluten_free_diet": "gluten_free",
+    "dairy_free": "lactose_free",
+    "vegetarianism": "vegetarian",
+    "veganism": "vegan",
+    "boil": "boiling",
+    "bake": "baking",
+    "fry": "frying",
+    "grill": "grilling",
+    "steam": "steaming",
+    "stew": "stewing",
+}
+
+
+def normalize_code(value: str) -> str:
+    """'Gluten-free' → 'gluten_free'"""
+    code = value.strip().lower().replace("-", "_").replace(" ", "_")
+    return ALIASES.get(code, code)
+
+
+class Vocabulary:
+    """Упорядоченный набор кодов, каждому соответствует бит маски"""
+
+    def __init__(self, codes: Sequence[str]):
+        assert len(codes) <= 63, "Маска хранится в знаковом BigInteger"
+        self.codes = tuple(codes)
+        self.bits = {code: 1 << i for i, code in enumerate(self.codes)}
+
+    def __contains__(self, code: str) -> bool:
+        return code in self.bits
+
+    def bit(self, code: str) -> int:
+        return self.bits[normalize_code(code)]
+
+    def encode(self, codes: Optional[Iterable[str]]) -> int:
+        """Список кодов → маска; неизвестный код — ValueError"""
+        mask = 0
+        for code in codes or ():
+            normalized = normalize_code(code)
+            if normalized not in self.bits:
+                raise ValueError(f"Неизвестное значение '{code}', допустимые: {', '.join(self.codes)}")
+            mask |= self.bits[normalized]
+        return mask
+
+    def decode(self, mask: Optional[int]) -> List[str]:
+        """Маска → список кодов в каноническом порядке"""
+        if not mask:
+            return []
+        return [code for code, bit in self.bits.items() if mask & bit]
+
+    def split_known(self, codes: Iterable[str]) -> Tuple[int, List[str]]:
+        """Маска из известных кодов + список неизвестных (для миграции старых данных)"""
+        mask, unknown = 0, []
+        for code in codes:
+            normalized = normalize_code(code)
+            if normalized in self.bits:
+                mask |= self.bits[normalized]
+            else:
+                unknown.append(code)
+        return mask, unknown
+
+
+ingredients = Vocabulary(INGREDIENTS)
+allergens = Vocabulary(ALLERGENS)
+diets = Vocabulary(tuple(DIETS))
+cuisines = Vocabulary(CUISINES)
+cooking_methods = Vocabulary(COOKING_METHODS)
+
+_DIET_EXCLUDES = {diets.bits[diet]: ingredients.encode(excluded) for diet, excluded in DIETS.items()}
+
+
+def exclude_mask(diet_mask: int = 0, allergy_mask: int = 0, disliked_mask: int = 0) -> int:
+    """Ингредиенты, которых не должно быть в блюде: аллергии ∪ нелюбимое ∪ исключённое диетами"""
+    mask = (allergy_mask or 0) | (disliked_mask or 0)
+    for diet_bit, excluded in _DIET_EXCLUDES.items():
+        if (diet_mask or 0) & diet_bit:
+            mask |= excluded
+    return mask
+
+
+def parse_json_list(raw: Optional[str]) -> List[str]:
+    """Старый формат колонок: JSON-массив строк или строка через запятую"""
+    if not raw:
+        return []
+    try:
+        value = json.loads(raw)
+    except ValueError:
+        value = raw.split(",")
+    if isinstance(value, str):
+        value = [value]
+    return [str(item) for item in value if str(item).strip()]
@@ -0,0 +1,238 @@
+"""
+Рассылка всем активным пользователям: keyset-страницы по users.id (короткая сессия на
+страницу), рендер пачками, ограниченный по конкурентности конвейер отправки и контрольные
+точки в broadcast_runs.
+Упавший запуск с тем же --name и текстом продолжается с последней контрольной точки
+(доставка at-least-once: недоотправленная пачка при повторе уходит целиком).
+
+Запуск (из корня репозитория):
+    python -m backend.app.jobs.broadcast --name news-2025-12 --text "Привет, {first_name}! ..."
+"""
+import argparse
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, List, Optional, Sequence, Tuple
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramForbiddenError
+
+from backend.app.bot.outbound import Lane, outbound_lane, setup_outbound
+from backend.app.config import settings
+from backend.app.db.models import User
+from backend.app.db.session import async_session_maker, dispose_db
+from backend.app.repositories.broadcasts_repo import BroadcastsRepository
+from backend.app.repositories.users_repo import UsersRepository
+
+logger = logging.getLogger(__name__)
+
+# (users.id, chat_id, текст) для каждого пользователя пачки
+Rendered = List[Tuple[int, int, str]]
+Renderer = Callable[[Sequence[User]], Awaitable[Rendered]]
+
+PROGRESS_INTERVAL_S = 5.0
+
+
+class _UserFields(dict):
+    """Поля пользователя для str.format_map; неизвестные/пустые поля — пустая строка"""
+
+    def __missing__(self, key: str) -> str:
+        return ""
+
+
+def template_renderer(template: str) -> Renderer:
+    """Рендер по шаблону с полями {first_name}, {username}"""
+    async def render(users: Sequence[User]) -> Rendered:
+        return [
+            (
+                user.id,
+                int(user.telegram_user_id),
+                template.format_map(_UserFields(first_name=user.first_name or "", username=user.username or ""))
+            )
+            for user in users
+        ]
+    return render
+
+
+class BroadcastStats:
+    """Прогресс рассылки: скорость и оценка оставшегося времени"""
+
+    def __init__(self, total: int, sent: int = 0, failed: int = 0, blocked: int = 0):
+        self.total = total
+        self.sent = sent
+        self.failed = failed
+        self.blocked = blocked
+        self.processed = 0  # В этом запуске
+        self.started = time.monotonic()
+
+    @property
+    def rate(self) -> float:
+        elapsed = time.monotonic() - self.started
+        return self.processed / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def eta_s(self) -> Optional[float]:
+        rate = self.rate
+        return (self.total - self.processed) / rate if rate else None
+
+    def __str__(self) -> str:
+        eta = f"{self.eta_s:.0f} с" if self.eta_s is not None else "—"
+        return (
+            f"{self.processed}/{self.total} ({self.rate:.1f}/с, ETA {eta}); "
+            f"отправлено {self.sent}, ошибок {self.failed}, заблокировали {self.blocked}"
+        )
+
+
+class _Watermark:
+    """
+    Пачки завершаются не по порядку (отправка конкурентная), а контрольная точка должна
+    означать «все id <= last_user_id обработаны». Двигаем её по завершённому префиксу пачек.
+    """
+
+    def __init__(self, start: int):
+        self.value = start
+        self._batches: "OrderedDict[int, list]" = OrderedDict()  # seq → [last_id, осталось]
+
+    def add(self, seq: int, last_id: int, size: int) -> None:
+        self._batches[seq] = [last_id, size]
+        self._advance()
+
+    def done(self, seq: int) -> bool:
+        """Отметить элемент пачки; True — контрольная точка сдвинулась"""
+        self._batches[seq][1] -= 1
+        return self._advance()
+
+    def _advance(self) -> bool:
+        moved = False
+        while self._batches:
+            last_id, left = next(iter(self._batches.values()))
+            if left:
+                break
+            self._batches.popitem(last=False)
+            self.value = last_id
+            moved = True
+        return moved
+
+
+async def broadcast(
+    bot: Bot,
+    name: str,
+    text: str,
+    renderer: Optional[Renderer] = None,
+    concurrency: int = 30,
+    batch_size: int = 500,
+    session_factory=async_session_maker
+) -> BroadcastStats:
+    """
+    Разослать text (или результат renderer) всем активным пользователям.
+    Запуск с именем существующей рассылки, но другим текстом отклоняется (ValueError):
+    иначе часть пользователей получила бы одно сообщение, а часть — другое.
+    """
+    async with session_factory() as session:
+        run = await BroadcastsRepository(session).start(name, text)
+        if run.text != text:
+            raise ValueError(f"Рассылка {name} уже запускалась с другим текстом — задайте новое --name")
+        total = await UsersRepository(session).count_active_users(after_id=run.last_user_id)
+    renderer = renderer or template_renderer(run.text)
+    stats = BroadcastStats(total, sent=run.sent, failed=run.failed, blocked=run.blocked)
+    if run.status == "done":
+        logger.info(f"✅ Рассылка {name} уже завершена: {stats}")
+        return stats
+    if run.last_user_id:
+        logger.info(f"🔄 Рассылка {name} продолжается после users.id={run.last_user_id}")
+
+    watermark = _Watermark(run.last_user_id)
+    queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+    blocked_ids: List[int] = []
+    checkpoint_lock = asyncio.Lock()
+
+    async def save_checkpoint(status: Optional[str] = None) -> None:
+        async with checkpoint_lock:
+            to_deactivate = blocked_ids[:]
+            blocked_ids.clear()
+            async with session_factory() as checkpoint_session:
+                if to_deactivate:
+                    await UsersRepository(checkpoint_session).deactivate(to_deactivate)
+                await BroadcastsRepository(checkpoint_session).checkpoint(
+                    run.id, watermark.value, stats.sent, stats.failed, stats.blocked, status=status
+                )
+
+    async def produce() -> None:
+        seq, after_id = 0, run.last_user_id
+        while True:
+            # Короткая сессия на страницу: соединение возвращается в пул до ожидания места в очереди
+            async with session_factory() as read_session:
+                batch = await UsersRepository(read_session).get_active_users(batch_size, after_id=after_id)
+            if not batch:
+                break
+            after_id = batch[-1].id
+            items = await renderer(batch)
+            watermark.add(seq, after_id, len(items))
+            for user_id, chat_id, message_text in items:
+                await queue.put((seq, user_id, chat_id, message_text))
+            seq += 1
+            if len(batch) < batch_size:
+                break
+        for _ in range(concurrency):
+            await queue.put(None)
+
+    async def send() -> None:
+        with outbound_lane(Lane.BULK):
+            while (item := await queue.get()) is not None:
+                seq, user_id, chat_id, message_text = item
+                try:
+                    await bot.send_message(chat_id, message_text)
+                    stats.sent += 1
+                except TelegramForbiddenError:
+                    # Пользователь заблокировал бота — больше не пишем ему
+                    stats.blocked += 1
+                    blocked_ids.append(user_id)
+                except Exception as e:
+                    stats.failed += 1
+                    logger.warning(f"⚠️ Рассылка {name}: не доставлено user {user_id}: {e}")
+                stats.processed += 1
+                if watermark.done(seq):
+                    await save_checkpoint()
+
+    async def report() -> None:
+        while True:
+            await asyncio.sleep(PROGRESS_INTERVAL_S)
+            logger.info(f"📊 Рассылка {name}: {stats}")
+
+    reporter = asyncio.create_task(report())
+    senders = [asyncio.create_task(send()) for _ in range(concurrency)]
+    try:
+        await produce()
+        await asyncio.gather(*senders)
+    finally:
+        reporter.cancel()
+        for task in senders:
+            task.cancel()
+    await save_checkpoint(status="done")
+    logger.info(f"✅ Рассылка {name} завершена: {stats}")
+    return stats
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Рассылка активным пользователям")
+    parser.add_argument("--name", required=True, help="Имя рассылки (по нему продолжается упавший запуск)")
+    parser.add_argument("--text", required=True, help="Шаблон: {first_name}, {username}")
+    parser.add_argument("--concurrency", type=int, default=30)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+    bot = Bot(token=settings.TELEGRAM_BOT_TOKEN)
+    setup_outbound(bot)
+    try:
+        await broadcast(bot, args.name, args.text, concurrency=args.concurrency, batch_size=args.batch_size)
+    except ValueError as e:
+        parser.exit(2, f"❌ {e}\n")
+    finally:
+        await bot.session.close()
+        await dispose_db()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
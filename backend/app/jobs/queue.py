@@ -0,0 +1,402 @@
+"""
+Очередь фоновых задач: хэндлер ставит типизированную задачу и сразу отвечает,
+тяжёлая работа идёт в воркерах (backend.app.jobs.worker).
+
+Брокеры: Memory (один процесс, тесты), SQLite (локально, переживает рестарт),
+Redis (прод, несколько процессов бота и воркеров). Модель у всех одна: задача
+ждёт в очереди до run_at; взятая задача получает аренду (run_at = срок аренды),
+и если воркер упал, по истечении аренды её возьмёт другой — это считается неудачной
+попыткой (задача, роняющая воркер, не крутится вечно). dedup_key не даёт поставить
+вторую такую же задачу, пока первая не завершилась.
+"""
+import asyncio
+import heapq
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from aiogram import Bot
+
+from backend.app.config import settings
+
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Job:
+    """Задача: kind — тип из JOB_TYPES, payload — JSON-совместимые аргументы"""
+    kind: str
+    payload: Dict[str, Any]
+    dedup_key: Optional[str] = None
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    attempts: int = 0  # Неудачных попыток (включая истёкшие аренды)
+    run_at: float = 0.0
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self), separators=(",", ":"), ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, raw: str) -> "Job":
+        return cls(**json.loads(raw))
+
+
+@dataclass(frozen=True)
+class JobType:
+    """
+    Тип задачи: load (в event loop воркера: данные из БД и т.п.) → compute (в процессе
+    пула: чистая функция уровня модуля, аргумент и результат сериализуются pickle) →
+    on_result (в event loop: например, сообщение пользователю). Сбой любого шага —
+    повтор через retry_backoff_s * 2^(попытка - 1), после max_attempts — on_failure.
+    """
+    name: str
+    compute: Callable[[Any], Any]
+    load: Optional[Callable[[Dict[str, Any]], Awaitable[Any]]] = None
+    on_result: Optional[Callable[[Bot, Job, Any], Awaitable[None]]] = None
+    on_failure: Optional[Callable[[Bot, Job, Exception], Awaitable[None]]] = None
+    max_attempts: int = 3
+    retry_backoff_s: float = 5.0
+    timeout_s: float = 60.0
+
+
+JOB_TYPES: Dict[str, JobType] = {}
+
+
+def register_job_type(job_type: JobType) -> JobType:
+    if job_type.name in JOB_TYPES:
+        raise ValueError(f"Тип задачи {job_type.name} уже зарегистрирован")
+    JOB_TYPES[job_type.name] = job_type
+    return job_type
+
+
+class JobBroker:
+    """Хранилище очереди; enqueue будит ожидающих воркеров этого процесса сразу, остальных — опрос"""
+
+    def __init__(self):
+        self._wakeup = asyncio.Event()
+
+    async def enqueue(self, job: Job) -> bool:
+        """Поставить задачу; False — задача с таким dedup_key уже в работе"""
+        added = await self._enqueue(job)
+        if added:
+            self._wakeup.set()
+        return added
+
+    async def wait(self, timeout: float) -> None:
+        """Дождаться новой задачи в этом процессе или таймаута"""
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+    async def _enqueue(self, job: Job) -> bool:
+        raise NotImplementedError
+
+    async def reserve(self, lease_s: float) -> Optional[Job]:
+        """Взять готовую задачу (run_at <= now) в аренду на lease_s; истёкшая аренда — +1 к attempts"""
+        raise NotImplementedError
+
+    async def ack(self, job: Job) -> None:
+        """Задача выполнена: удалить, освободить dedup_key"""
+        raise NotImplementedError
+
+    async def retry(self, job: Job, delay_s: float, error: str) -> None:
+        """Вернуть задачу в очередь через delay_s (job.attempts уже увеличен)"""
+        raise NotImplementedError
+
+    async def fail(self, job: Job, error: str) -> None:
+        """Попытки исчерпаны: убрать из очереди, освободить dedup_key"""
+        raise NotImplementedError
+
+    async def size(self) -> int:
+        """Задач в очереди (включая взятые в работу)"""
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+
+class MemoryJobBroker(JobBroker):
+    """Очередь в памяти процесса: для тестов и запуска в одном процессе без Redis"""
+
+    def __init__(self):
+        super().__init__()
+        self._jobs: Dict[str, Job] = {}
+        self._heap: List[Tuple[float, int, str]] = []  # (run_at, порядок, id); устаревшие записи пропускаются
+        self._seq = 0
+        self._dedup: Dict[str, str] = {}
+        self._leased: Set[str] = set()
+        self.failed: List[Tuple[Job, str]] = []
+
+    async def _enqueue(self, job: Job) -> bool:
+        if job.dedup_key is not None:
+            if job.dedup_key in self._dedup:
+                return False
+            self._dedup[job.dedup_key] = job.id
+        job.run_at = job.run_at or time.time()
+        self._jobs[job.id] = job
+        self._push(job)
+        return True
+
+    async def reserve(self, lease_s: float) -> Optional[Job]:
+        now = time.time()
+        while self._heap and self._heap[0][0] <= now:
+            run_at, _, job_id = heapq.heappop(self._heap)
+            job = self._jobs.get(job_id)
+            if job is None or job.run_at != run_at:
+                continue
+            if job.id in self._leased:
+                job.attempts += 1  # Аренда истекла: прошлый воркер не завершил задачу
+            self._leased.add(job.id)
+            job.run_at = now + lease_s
+            self._push(job)  # Аренда: не подтверждённая вовремя задача вернётся в выдачу
+            return job
+        return None
+
+    async def ack(self, job: Job) -> None:
+        self._remove(job)
+
+    async def retry(self, job: Job, delay_s: float, error: str) -> None:
+        if job.id in self._jobs:
+            self._leased.discard(job.id)
+            job.run_at = time.time() + delay_s
+            self._jobs[job.id] = job
+            self._push(job)
+
+    async def fail(self, job: Job, error: str) -> None:
+        self._remove(job)
+        self.failed.append((job, error))
+
+    async def size(self) -> int:
+        return len(self._jobs)
+
+    def _push(self, job: Job) -> None:
+        self._seq += 1
+        heapq.heappush(self._heap, (job.run_at, self._seq, job.id))
+
+    def _remove(self, job: Job) -> None:
+        self._jobs.pop(job.id, None)
+        self._leased.discard(job.id)
+        if job.dedup_key is not None and self._dedup.get(job.dedup_key) == job.id:
+            del self._dedup[job.dedup_key]
+
+
+class SQLiteJobBroker(JobBroker):
+    """Очередь в SQLite-файле: переживает рестарт, несколько процессов на одной машине"""
+
+    def __init__(self, path: str):
+        super().__init__()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, kind TEXT NOT NULL, payload TEXT NOT NULL, dedup_key TEXT, "
+            "attempts INTEGER NOT NULL DEFAULT 0, run_at REAL NOT NULL, "
+            "status TEXT NOT NULL DEFAULT 'queued', error TEXT)"
+        )
+        # dedup_key уникален среди незавершённых задач (упавшие остаются для разбора)
+        self._conn.execute(
+            "CREATE UNIQUE INDEX IF NOT EXISTS ux_jobs_dedup ON jobs (dedup_key) WHERE status != 'failed'"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_jobs_due ON jobs (status, run_at)")
+
+    async def _enqueue(self, job: Job) -> bool:
+        cursor = await self._run(
+            "INSERT OR IGNORE INTO jobs (id, kind, payload, dedup_key, attempts, run_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (job.id, job.kind, json.dumps(job.payload, ensure_ascii=False), job.dedup_key,
+             job.attempts, job.run_at or time.time())
+        )
+        return cursor.rowcount == 1
+
+    async def reserve(self, lease_s: float) -> Optional[Job]:
+        now = time.time()
+        # Одна инструкция: выбор и аренда атомарны и между процессами
+        row = await self._fetch(
+            "UPDATE jobs SET attempts = attempts + (status = 'running'), status = 'running', run_at = ? WHERE id = ("
+            "SELECT id FROM jobs WHERE status IN ('queued', 'running') AND run_at <= ? ORDER BY run_at LIMIT 1"
+            ") RETURNING id, kind, payload, dedup_key, attempts, run_at",
+            (now + lease_s, now)
+        )
+        if row is None:
+            return None
+        job_id, kind, payload, dedup_key, attempts, run_at = row
+        return Job(kind, json.loads(payload), dedup_key=dedup_key, id=job_id, attempts=attempts, run_at=run_at)
+
+    async def ack(self, job: Job) -> None:
+        await self._run("DELETE FROM jobs WHERE id = ?", (job.id,))
+
+    async def retry(self, job: Job, delay_s: float, error: str) -> None:
+        await self._run(
+            "UPDATE jobs SET status = 'queued', run_at = ?, attempts = ?, error = ? WHERE id = ?",
+            (time.time() + delay_s, job.attempts, error, job.id)
+        )
+
+    async def fail(self, job: Job, error: str) -> None:
+        await self._run(
+            "UPDATE jobs SET status = 'failed', attempts = ?, error = ? WHERE id = ?", (job.attempts, error, job.id)
+        )
+
+    async def size(self) -> int:
+        row = await self._fetch("SELECT COUNT(*) FROM jobs WHERE status != 'failed'", ())
+        return row[0]
+
+    async def close(self) -> None:
+        self._conn.close()
+
+    async def _run(self, sql: str, params: tuple) -> sqlite3.Cursor:
+        return await asyncio.to_thread(self._locked, lambda: self._conn.execute(sql, params))
+
+    async def _fetch(self, sql: str, params: tuple) -> Optional[tuple]:
+        return await asyncio.to_thread(self._locked, lambda: self._conn.execute(sql, params).fetchone())
+
+    def _locked(self, fn):
+        with self._lock:
+            return fn()
+
+
+class RedisJobBroker(JobBroker):
+    """
+    Очередь в Redis: задача — строка {prefix}job:{id} с JSON, очередь — sorted set
+    {prefix}queue (score = run_at или срок аренды), dedup — {prefix}dedup:{key} (SET NX),
+    взятые в аренду — set {prefix}leased. Выбор и аренда — один Lua-скрипт, так что задачу
+    берёт ровно один воркер, а повторная выдача из {prefix}leased увеличивает attempts.
+    """
+
+    RESERVE_SCRIPT = """
+    local ids = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, 1)
+    if #ids == 0 then return false end
+    redis.call('ZADD', KEYS[1], ARGV[2], ids[1])
+    local raw = redis.call('GET', ARGV[3] .. ids[1])
+    if redis.call('SADD', KEYS[2], ids[1]) == 0 and raw then
+        local job = cjson.decode(raw)
+        job['attempts'] = job['attempts'] + 1
+        raw = cjson.encode(job)
+        redis.call('SET', ARGV[3] .. ids[1], raw)
+    end
+    return raw
+    """
+    FAILED_KEEP = 1000  # Сколько упавших задач хранить в {prefix}failed
+
+    def __init__(self, redis: "Redis", prefix: str = "jobs:", dedup_ttl: int = 86400):
+        super().__init__()
+        self.redis = redis
+        self.prefix = prefix
+        self.dedup_ttl = dedup_ttl  # Страховка: ключ зависшей задачи не живёт вечно
+        self._reserve = redis.register_script(self.RESERVE_SCRIPT)
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs) -> "RedisJobBroker":
+        from redis.asyncio import Redis
+        return cls(Redis.from_url(url, decode_responses=True), **kwargs)
+
+    async def _enqueue(self, job: Job) -> bool:
+        if job.dedup_key is not None:
+            if not await self.redis.set(self._dedup_key(job.dedup_key), job.id, nx=True, ex=self.dedup_ttl):
+                return False
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.set(self._job_key(job.id), job.to_json())
+            pipe.zadd(self._queue_key, {job.id: job.run_at or time.time()})
+            await pipe.execute()
+        return True
+
+    async def reserve(self, lease_s: float) -> Optional[Job]:
+        now = time.time()
+        raw = await self._reserve(
+            keys=[self._queue_key, self._leased_key], args=[now, now + lease_s, self.prefix + "job:"]
+        )
+        return Job.from_json(raw) if raw else None
+
+    async def ack(self, job: Job) -> None:
+        async with self.redis.pipeline(transaction=True) as pipe:
+            self._remove(pipe, job)
+            await pipe.execute()
+
+    async def retry(self, job: Job, delay_s: float, error: str) -> None:
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.set(self._job_key(job.id), job.to_json())
+            pipe.zadd(self._queue_key, {job.id: time.time() + delay_s})
+            pipe.srem(self._leased_key, job.id)
+            await pipe.execute()
+
+    async def fail(self, job: Job, error: str) -> None:
+        async with self.redis.pipeline(transaction=True) as pipe:
+            self._remove(pipe, job)
+            pipe.lpush(self.prefix + "failed", json.dumps({"job": asdict(job), "error": error}, ensure_ascii=False))
+            pipe.ltrim(self.prefix + "failed", 0, self.FAILED_KEEP - 1)
+            await pipe.execute()
+
+    async def size(self) -> int:
+        return await self.redis.zcard(self._queue_key)
+
+    async def close(self) -> None:
+        await self.redis.aclose()
+
+    def _remove(self, pipe, job: Job) -> None:
+        pipe.zrem(self._queue_key, job.id)
+        pipe.srem(self._leased_key, job.id)
+        pipe.delete(self._job_key(job.id))
+        if job.dedup_key is not None:
+            pipe.delete(self._dedup_key(job.dedup_key))
+
+    @property
+    def _queue_key(self) -> str:
+        return self.prefix + "queue"
+
+    @property
+    def _leased_key(self) -> str:
+        return self.prefix + "leased"
+
+    def _job_key(self, job_id: str) -> str:
+        return f"{self.prefix}job:{job_id}"
+
+    def _dedup_key(self, key: str) -> str:
+        return f"{self.prefix}dedup:{key}"
+
+
+def create_job_broker() -> JobBroker:
+    """Создать брокер согласно settings.JOBS_BROKER"""
+    if settings.JOBS_BROKER == "redis":
+        logger.info("✅ Брокер задач: Redis")
+        return RedisJobBroker.from_url(settings.REDIS_URL)
+    if settings.JOBS_BROKER == "sqlite":
+        logger.info(f"✅ Брокер задач: SQLite ({settings.JOBS_SQLITE_PATH})")
+        return SQLiteJobBroker(settings.JOBS_SQLITE_PATH)
+    logger.info("✅ Брокер задач: Memory")
+    return MemoryJobBroker()
+
+
+_broker: Optional[JobBroker] = None
+
+
+def get_job_broker() -> JobBroker:
+    """Брокер задач процесса (создаётся при первом обращении)"""
+    global _broker
+    if _broker is None:
+        _broker = create_job_broker()
+    return _broker
+
+
+async def close_job_broker() -> None:
+    global _broker
+    if _broker is not None:
+        await _broker.close()
+        _broker = None
+
+
+async def enqueue_job(kind: str, payload: Dict[str, Any], dedup_key: Optional[str] = None,
+                      delay_s: float = 0.0) -> bool:
+    """Поставить задачу типа kind; False — такая же (dedup_key) уже в очереди или в работе"""
+    if kind not in JOB_TYPES:
+        raise ValueError(f"Неизвестный тип задачи: {kind}")
+    job = Job(kind, payload, dedup_key=dedup_key, run_at=time.time() + delay_s)
+    return await get_job_broker().enqueue(job)
@@ -0,0 +1,78 @@
+"""
+Пересчёт целевых КБЖУ после изменения формулы или коэффициентов
+
+Запуск (из корня репозитория):
+    python -m backend.app.jobs.retarget --batch-size 5000
+"""
+import argparse
+import asyncio
+import logging
+import time
+
+import numpy as np
+
+from backend.app.db.session import async_session_maker, dispose_db
+from backend.app.repositories.goals_repo import GoalsRepository
+from backend.app.services.nutrition_targets import FORMULA_VERSION, compute_targets_batch
+
+logger = logging.getLogger(__name__)
+
+
+async def retarget_all(batch_size: int = 5000, session_factory=async_session_maker) -> int:
+    """Потоково пересчитать цели с formula_version < FORMULA_VERSION; возвращает число обновлённых"""
+    updated = 0
+    last_id = 0
+    started = time.perf_counter()
+
+    async with session_factory() as session:
+        goals_repo = GoalsRepository(session)
+        while True:
+            rows = await goals_repo.get_stale_targets_page(FORMULA_VERSION, last_id, batch_size)
+            if not rows:
+                break
+            last_id = rows[-1].id
+
+            columns = list(zip(*rows))
+            (ids, goal_type, target_calories, manual, age, gender, height_cm, weight_kg, activity_level) = columns
+            manual_calories = np.where(
+                np.asarray(manual, dtype=bool), np.asarray(target_calories, dtype=np.float64), np.nan
+            )
+            targets = compute_targets_batch(
+                age, gender, height_cm, weight_kg, activity_level, goal_type, calories=manual_calories
+            )
+
+            await goals_repo.bulk_update([
+                {
+                    "id": goal_id,
+                    "target_calories": int(kcal),
+                    "target_protein_g": float(protein),
+                    "target_fat_g": float(fat),
+                    "target_carbs_g": float(carbs),
+                    "formula_version": FORMULA_VERSION,
+                }
+                for goal_id, kcal, protein, fat, carbs in zip(
+                    ids, targets.calories, targets.protein_g, targets.fat_g, targets.carbs_g
+                )
+            ])
+            updated += len(rows)
+            session.expunge_all()
+            logger.info(f"🔄 Пересчитано целей: {updated} ({updated / (time.perf_counter() - started):.0f}/с)")
+
+    logger.info(f"✅ Пересчёт целей завершён: {updated} (formula_version={FORMULA_VERSION})")
+    return updated
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Пересчёт целевых КБЖУ")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+    try:
+        await retarget_all(batch_size=args.batch_size)
+    finally:
+        await dispose_db()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,198 @@
+"""
+Исполнитель фоновых задач: N потребителей в event loop берут задачи у брокера,
+данные грузят асинхронно, а вычисления отдают в пул процессов — ни event loop бота,
+ни его хэндлеры тяжёлая работа не задерживает.
+
+По умолчанию исполнитель работает в процессе бота (JOBS_IN_PROCESS). Отдельные
+воркеры для Redis/SQLite-брокера (из корня репозитория):
+    python -m backend.app.jobs.worker --workers 4 --concurrency 8
+"""
+import argparse
+import asyncio
+import logging
+import time
+from typing import Iterable, List, Optional
+
+from aiogram import Bot
+
+from backend.app.bot.outbound import setup_outbound
+from backend.app.config import settings
+from backend.app.db.session import dispose_db
+from backend.app.jobs.queue import JOB_TYPES, Job, JobBroker, JobType, close_job_broker, get_job_broker
+from backend.app.services import session_analysis  # noqa: F401 — регистрирует свой тип задачи
+from backend.app.utils.metrics import Family, gauge, registry
+from backend.app.utils.processes import ProcessPool
+
+logger = logging.getLogger(__name__)
+
+JOB_DURATION = registry.histogram(
+    "job_duration_seconds", "Время выполнения фоновой задачи (загрузка + вычисление + результат)", ["kind"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+)
+JOB_RESULTS = registry.counter("jobs", "Завершённые попытки фоновых задач", ["kind", "result"])
+
+
+class JobRunner:
+    """
+    concurrency потребителей на workers процессов: пока одна задача считается в пуле,
+    другие грузят данные или отправляют результат.
+    """
+
+    def __init__(self, broker: JobBroker, bot: Optional[Bot], workers: int = 2, concurrency: int = 4,
+                 lease_s: float = 300.0, poll_interval: float = 1.0):
+        self.broker = broker
+        self.bot = bot
+        self.workers = workers
+        self.concurrency = concurrency
+        self.lease_s = lease_s
+        self.poll_interval = poll_interval
+        self.running = 0
+        self.queued = 0  # Последний замер размера очереди (для /metrics)
+        self._pool = ProcessPool("jobs", workers)
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self) -> None:
+        self._tasks = [asyncio.create_task(self._consume()) for _ in range(self.concurrency)]
+        logger.info(f"✅ Фоновые задачи: {self.concurrency} потребителей, {self.workers} процессов")
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._pool.shutdown()
+
+    async def join(self) -> None:
+        """Ждать потребителей (до stop или отмены)"""
+        await asyncio.gather(*self._tasks)
+
+    async def _consume(self) -> None:
+        while True:
+            try:
+                job = await self.broker.reserve(self.lease_s)
+                if job is None:
+                    self.queued = await self.broker.size()
+                    await self.broker.wait(self.poll_interval)
+                    continue
+                # Сбой записи исхода (ack / retry / fail) не должен убить потребителя:
+                # задача вернётся в выдачу по истечении аренды
+                await self.run(job)
+            except Exception as e:
+                logger.warning(f"⚠️ Брокер задач недоступен: {e}")
+                await asyncio.sleep(self.poll_interval)
+
+    async def run(self, job: Job) -> None:
+        """Выполнить задачу; исход (ack / retry / fail) записывается в брокер"""
+        job_type = JOB_TYPES.get(job.kind)
+        if job_type is None:
+            logger.error(f"❌ Неизвестный тип задачи {job.kind} ({job.id})")
+            await self.broker.fail(job, "unknown kind")
+            return
+
+        if job.attempts >= job_type.max_attempts:
+            # Все попытки ушли на истёкшие аренды: задача, скорее всего, роняет воркер
+            error = f"аренда истекла, попыток: {job.attempts}"
+            logger.error(f"❌ Задача {job.kind} ({job.id}): {error}")
+            await self._give_up(job, job_type, error, TimeoutError(error))
+            return
+
+        self.running += 1
+        started = time.perf_counter()
+        try:
+            data = await job_type.load(job.payload) if job_type.load else job.payload
+            # BrokenProcessPool (умер процесс пула) — обычный повтор задачи, пул уже пересоздан
+            result = await asyncio.wait_for(self._pool.run(job_type.compute, data), job_type.timeout_s)
+            if job_type.on_result:
+                await job_type.on_result(self.bot, job, result)
+        except Exception as e:
+            # Повтор с начала: результат может быть доставлен повторно (at-least-once)
+            job.attempts += 1
+            error = f"{type(e).__name__}: {e}"
+            if job.attempts < job_type.max_attempts:
+                delay = job_type.retry_backoff_s * 2 ** (job.attempts - 1)
+                logger.warning(f"⚠️ Задача {job.kind} ({job.id}) упала, повтор через {delay:.0f} с: {error}")
+                await self.broker.retry(job, delay, error)
+                JOB_RESULTS.labels(job.kind, "retry").inc()
+            else:
+                logger.error(f"❌ Задача {job.kind} ({job.id}) упала {job.attempts} раз: {error}")
+                await self._give_up(job, job_type, error, e)
+        else:
+            await self.broker.ack(job)
+            JOB_RESULTS.labels(job.kind, "ok").inc()
+        finally:
+            self.running -= 1
+            JOB_DURATION.labels(job.kind).observe(time.perf_counter() - started)
+
+    async def _give_up(self, job: Job, job_type: JobType, error: str, e: Exception) -> None:
+        """Попытки исчерпаны: fail в брокере и on_failure"""
+        await self.broker.fail(job, error)
+        JOB_RESULTS.labels(job.kind, "failed").inc()
+        if job_type.on_failure:
+            try:
+                await job_type.on_failure(self.bot, job, e)
+            except Exception as callback_error:
+                logger.warning(f"⚠️ on_failure задачи {job.kind}: {callback_error}")
+
+
+runner: Optional[JobRunner] = None
+
+
+@registry.collector
+def _job_metrics() -> Iterable[Family]:
+    if runner is None:
+        return
+    yield gauge("jobs_running", "Фоновых задач выполняется", runner.running)
+    yield gauge("jobs_queued", "Фоновых задач в очереди (последний замер)", runner.queued)
+
+
+def _create_runner(bot: Bot, workers: int, concurrency: int) -> JobRunner:
+    return JobRunner(
+        get_job_broker(), bot,
+        workers=workers,
+        concurrency=concurrency,
+        lease_s=settings.JOBS_LEASE_S,
+        poll_interval=settings.JOBS_POLL_INTERVAL_S
+    )
+
+
+async def start_jobs(bot: Bot) -> None:
+    """Запустить исполнитель задач в процессе бота (если JOBS_IN_PROCESS)"""
+    global runner
+    if not settings.JOBS_IN_PROCESS or runner is not None:
+        return
+    runner = _create_runner(bot, settings.JOBS_WORKERS, settings.JOBS_CONCURRENCY)
+    runner.start()
+
+
+async def stop_jobs() -> None:
+    global runner
+    if runner is not None:
+        await runner.stop()
+        runner = None
+    await close_job_broker()
+
+
+async def main() -> None:
+    global runner
+    parser = argparse.ArgumentParser(description="Воркер фоновых задач")
+    parser.add_argument("--workers", type=int, default=settings.JOBS_WORKERS, help="Процессов для вычислений")
+    parser.add_argument("--concurrency", type=int, default=settings.JOBS_CONCURRENCY, help="Задач одновременно")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=settings.LOG_LEVEL, format="%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+    if settings.JOBS_BROKER == "memory":
+        logger.warning("⚠️ JOBS_BROKER=memory: отдельный воркер не видит очередь бота, нужен redis или sqlite")
+    bot = Bot(token=settings.TELEGRAM_BOT_TOKEN)
+    setup_outbound(bot)
+    runner = _create_runner(bot, args.workers, args.concurrency)
+    runner.start()
+    try:
+        await runner.join()
+    finally:
+        await stop_jobs()
+        await bot.session.close()
+        await dispose_db()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
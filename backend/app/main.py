@@ -1,17 +1,32 @@
 """
 FastAPI приложение с интеграцией Telegram бота и БД
 """
+import time
+_import_started = time.perf_counter()  # Профиль холодного старта: отсчёт до тяжёлых импортов
+
 from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse
 import logging
 import asyncio
 from contextlib import asynccontextmanager
 from aiogram import Bot, Dispatcher
-from aiogram.fsm.storage.memory import MemoryStorage
 
 from backend.app.config import settings
-from backend.app.db.session import init_db, dispose_db, Base, engine
+from backend.app.db.session import init_db, dispose_db
+from backend.app.bot.outbound import setup_outbound
+from backend.app.bot.storage import create_fsm_storage
+from backend.app.bot.executor import UpdateExecutor, poll_updates, setup_executor, shutdown_executor
 from backend.app.bot.webhooks import handle_telegram_update
 from backend.app.bot.handlers import router  # Импортируем твой router!
+from backend.app.clients.cv_client import close_cv_client
+from backend.app.clients.nlp_client import close_nlp_client
+from backend.app.clients.nutritionix import close_nutritionix_client
+from backend.app.db.documents import close_document_store
+from backend.app.services.photos import close_photo_pipeline
+from backend.app.jobs.worker import start_jobs, stop_jobs
+from backend.app.services.reminders import start_reminders, stop_reminders
+from backend.app.utils.metrics import registry, start_loop_lag_monitor, stop_loop_lag_monitor
+from backend.app.utils.startup import profile as startup_profile
 
 # Настройка логирования
 logging.basicConfig(
@@ -19,67 +34,117 @@ logging.basicConfig(
     format="%(asctime)s [%(levelname)s] %(name)s: %(message)s"
 )
 logger = logging.getLogger(__name__)
+startup_profile.imported(since=_import_started)
 
 # Глобальные переменные для бота
 bot = None
 dp = None
 polling_task = None
+webhook_task = None
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Управление жизненным циклом приложения"""
-    global bot, dp, polling_task
+    global bot, dp, polling_task, webhook_task
     
     # === ЗАПУСК ===
     logger.info("🚀 Инициализация приложения...")
+    start_loop_lag_monitor()
     
-    # 1. Инициализация БД
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-    logger.info("✅ БД инициализирована")
+    # 1. Инициализация БД: один запрос версии схемы (миграции — только если отстала)
+    with startup_profile.phase("db"):
+        await init_db()
     
     # 2. Инициализация Telegram бота
-    bot = Bot(token=settings.TELEGRAM_BOT_TOKEN)
-    storage = MemoryStorage()  # FSM storage для состояний
-    dp = Dispatcher(storage=storage)
+    with startup_profile.phase("bot"):
+        bot = Bot(token=settings.TELEGRAM_BOT_TOKEN)
+        setup_outbound(bot)  # Все исходящие — через rate limit и приоритетные полосы
+        storage = create_fsm_storage()  # FSM storage для состояний (settings.FSM_STORAGE)
+        dp = Dispatcher(storage=storage)
+        
+        # 3. Регистрируем твой router с handlers
+        dp.include_router(router)
+        logger.info("✅ Handlers (router) регистрирован")
+    
+    # 4. Запускаем получение обновлений: webhook или polling (оба — через полосы чатов)
+    with startup_profile.phase("updates"):
+        update_executor = setup_executor(dp, bot)
+        if settings.BOT_MODE == "webhook":
+            if settings.WEBHOOK_URL:
+                # Регистрация webhook — запрос к Telegram; готовность пода его не ждёт
+                webhook_task = asyncio.create_task(register_webhook())
+            logger.info("🌐 Telegram webhook режим включён")
+        else:
+            polling_task = asyncio.create_task(start_polling(update_executor))
+            logger.info("🤖 Telegram polling запущен (async task)")
     
-    # 3. Регистрируем твой router с handlers
-    dp.include_router(router)
-    logger.info("✅ Handlers (router) регистрирован")
+    # 5. Планировщик напоминаний (секции делятся между воркерами через аренду в БД)
+    # 6. Фоновые задачи (AI-разбор): вычисления в пуле процессов
+    with startup_profile.phase("background"):
+        await start_reminders(bot)
+        await start_jobs(bot)
     
-    # 4. Запускаем polling в отдельной таске
-    polling_task = asyncio.create_task(start_polling())
-    logger.info("🤖 Telegram polling запущен (async task)")
+    logger.info(f"📊 Холодный старт: {startup_profile}")
     
     yield
     
     # === ОСТАНОВКА ===
     logger.info("🛑 Закрытие приложения...")
     
-    # 1. Останавливаем polling
+    # 1. Останавливаем polling, дорабатываем принятые обновления
+    if webhook_task and not webhook_task.done():
+        webhook_task.cancel()
     if polling_task and not polling_task.done():
         polling_task.cancel()
         try:
             await polling_task
         except asyncio.CancelledError:
             logger.info("✅ Polling task отменён")
+    await shutdown_executor()
     
-    # 2. Закрываем бота
+    # 2. Останавливаем напоминания и фоновые задачи, закрываем бота и FSM хранилище
+    await stop_reminders()
+    await stop_jobs()
     if bot:
         await bot.session.close()
         logger.info("✅ Telegram bot session закрыт")
+    if dp:
+        await dp.storage.close()
     
-    # 3. Закрываем БД
+    # 3. Закрываем внешние клиенты и БД
+    await close_nutritionix_client()
+    await close_cv_client()
+    await close_nlp_client()
+    await close_photo_pipeline()
+    await close_document_store()
     await dispose_db()
+    await stop_loop_lag_monitor()
     logger.info("✅ Приложение остановлено")
 
 
-async def start_polling():
-    """Запуск polling цикла для получения обновлений от Telegram"""
+async def register_webhook():
+    """Установить webhook в Telegram (BOT_MODE=webhook, WEBHOOK_URL задан)"""
+    try:
+        await bot.set_webhook(
+            settings.WEBHOOK_URL,
+            secret_token=settings.WEBHOOK_SECRET,
+            allowed_updates=dp.resolve_used_update_types()
+        )
+        logger.info(f"✅ Webhook установлен: {settings.WEBHOOK_URL}")
+    except Exception as e:
+        logger.error(f"❌ Не удалось установить webhook: {e}", exc_info=True)
+
+
+async def start_polling(update_executor: UpdateExecutor):
+    """Запуск polling цикла: getUpdates → исполнитель обновлений (порядок внутри чата)"""
     try:
         logger.info("📨 Polling цикл начался")
-        await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
+        await poll_updates(
+            update_executor,
+            allowed_updates=dp.resolve_used_update_types(),
+            polling_timeout=settings.POLLING_TIMEOUT
+        )
     except asyncio.CancelledError:
         logger.info("⏹️ Polling цикл остановлен")
     except Exception as e:
@@ -122,10 +187,15 @@ async def ready_check():
     }
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Метрики в текстовом формате Prometheus"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 @app.post("/telegram/webhook")
 async def telegram_webhook(request: Request):
-    """Приём обновлений от Telegram через webhook"""
-    # [Future] Для production: используем webhook вместо polling
+    """Приём обновлений от Telegram через webhook (BOT_MODE=webhook)"""
     return await handle_telegram_update(request)
 
 
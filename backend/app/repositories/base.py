@@ -1,27 +1,83 @@
 """
 Базовый репозиторий с общими CRUD операциями
 """
+from sqlalchemy import Row, delete, event, insert, update
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
 from sqlalchemy.future import select
-from typing import Generic, TypeVar, List, Optional
+from sqlalchemy.dialects import postgresql, sqlite
+from typing import Any, AsyncIterator, Callable, Generic, TypeVar, List, Optional, Sequence
 import logging
 
 logger = logging.getLogger(__name__)
 
 ModelType = TypeVar("ModelType")
 
+_AFTER_COMMIT_KEY = "repository_after_commit"
+
+
+def _run_after_commit(session: Session) -> None:
+    callbacks = session.info.get(_AFTER_COMMIT_KEY)
+    if not callbacks:
+        return
+    pending = list(callbacks)
+    callbacks.clear()
+    for callback in pending:
+        callback()
+
+
+def _drop_after_commit(session: Session) -> None:
+    callbacks = session.info.get(_AFTER_COMMIT_KEY)
+    if callbacks:
+        callbacks.clear()
+
 
 class BaseRepository(Generic[ModelType]):
     """Базовый класс для репозиториев"""
     
-    def __init__(self, session: AsyncSession, model: type[ModelType]):
+    def __init__(self, session: AsyncSession, model: type[ModelType], autocommit: bool = True):
         self.session = session
         self.model = model
+        # autocommit=False: транзакцией управляет вызывающий (UnitOfWork), методы только flush
+        self.autocommit = autocommit
+    
+    async def _commit(self) -> None:
+        """Зафиксировать изменения (или только flush внутри UnitOfWork)"""
+        if self.autocommit:
+            await self.session.commit()
+        else:
+            await self.session.flush()
+    
+    def _after_commit(self, callback: Callable[[], None]) -> None:
+        """Выполнить callback, когда изменения действительно зафиксированы (при rollback — отбросить)"""
+        if self.autocommit:
+            callback()
+            return
+        
+        session = self.session.sync_session
+        callbacks = session.info.get(_AFTER_COMMIT_KEY)
+        if callbacks is None:
+            # Одна пара слушателей на сессию: очередь живёт в session.info и очищается
+            # и при commit, и при rollback — ничего не копится на долгоживущей сессии
+            callbacks = session.info[_AFTER_COMMIT_KEY] = []
+            event.listen(session, "after_commit", _run_after_commit)
+            event.listen(session, "after_rollback", _drop_after_commit)
+        callbacks.append(callback)
+    
+    def _insert(self, model: Optional[type] = None):
+        """INSERT с поддержкой ON CONFLICT для текущего диалекта"""
+        model = model or self.model
+        dialect = self.session.bind.dialect.name
+        if dialect == "postgresql":
+            return postgresql.insert(model)
+        if dialect == "sqlite":
+            return sqlite.insert(model)
+        raise NotImplementedError(f"ON CONFLICT не поддерживается для диалекта {dialect}")
     
     async def create(self, obj: ModelType) -> ModelType:
         """Создать объект"""
         self.session.add(obj)
-        await self.session.commit()
+        await self._commit()
         await self.session.refresh(obj)
         logger.info(f"✅ Создан {self.model.__name__}: {obj.id}")
         return obj
@@ -33,13 +89,86 @@ class BaseRepository(Generic[ModelType]):
         )
         return result.scalar_one_or_none()
     
-    async def get_all(self, skip: int = 0, limit: int = 100) -> List[ModelType]:
-        """Получить все объекты с пагинацией"""
-        result = await self.session.execute(
-            select(self.model).offset(skip).limit(limit)
-        )
+    async def get_all(self, skip: int = 0, limit: int = 100, after_id: Optional[int] = None) -> List[ModelType]:
+        """Получить все объекты с пагинацией (after_id — keyset вместо OFFSET)"""
+        stmt = select(self.model).order_by(self.model.id).limit(limit)
+        if after_id is not None:
+            stmt = stmt.where(self.model.id > after_id)
+        else:
+            stmt = stmt.offset(skip)
+        result = await self.session.execute(stmt)
         return result.scalars().all()
     
+    async def iter_batches(self, *criteria: Any, batch_size: int = 1000) -> AsyncIterator[List[ModelType]]:
+        """
+        Все объекты пачками по возрастанию id.
+        Keyset-пагинация (id > последнего), страница читается потоком (server-side cursor),
+        после каждой пачки объекты выгружаются из сессии — память не растёт.
+        """
+        last_id = None
+        while True:
+            stmt = select(self.model).where(*criteria).order_by(self.model.id).limit(batch_size)
+            if last_id is not None:
+                stmt = stmt.where(self.model.id > last_id)
+            
+            result = await self.session.stream_scalars(stmt, execution_options={"yield_per": batch_size})
+            batch = [obj async for obj in result]
+            if not batch:
+                return
+            
+            last_id = batch[-1].id
+            yield batch
+            for obj in batch:
+                self.session.expunge(obj)
+            if len(batch) < batch_size:
+                return
+    
+    async def iter_all(self, *criteria: Any, batch_size: int = 1000) -> AsyncIterator[ModelType]:
+        """Все объекты по одному (см. iter_batches)"""
+        async for batch in self.iter_batches(*criteria, batch_size=batch_size):
+            for obj in batch:
+                yield obj
+    
+    async def bulk_create(self, rows: Sequence[dict]) -> int:
+        """Вставить много строк: executemany/multi-row INSERT и один commit"""
+        if not rows:
+            return 0
+        await self.session.execute(insert(self.model), list(rows))
+        await self._commit()
+        logger.info(f"✅ Создано {self.model.__name__}: {len(rows)}")
+        return len(rows)
+    
+    async def bulk_upsert(self, rows: Sequence[dict], index_elements: Sequence[str],
+                          update_fields: Optional[Sequence[str]] = None) -> int:
+        """INSERT ... ON CONFLICT (index_elements) DO UPDATE для многих строк, один commit"""
+        if not rows:
+            return 0
+        if update_fields is None:
+            update_fields = [key for key in rows[0] if key not in index_elements]
+        
+        stmt = self._insert()
+        if update_fields:
+            stmt = stmt.on_conflict_do_update(
+                index_elements=list(index_elements),
+                set_={field: stmt.excluded[field] for field in update_fields}
+            )
+        else:
+            stmt = stmt.on_conflict_do_nothing(index_elements=list(index_elements))
+        
+        await self.session.execute(stmt, list(rows))
+        await self._commit()
+        logger.info(f"✅ Upsert {self.model.__name__}: {len(rows)}")
+        return len(rows)
+    
+    async def bulk_update(self, rows: Sequence[dict]) -> int:
+        """UPDATE по первичному ключу для многих строк (каждая — dict с "id"), один commit"""
+        if not rows:
+            return 0
+        await self.session.execute(update(self.model), list(rows))
+        await self._commit()
+        logger.info(f"✅ Обновлено {self.model.__name__}: {len(rows)}")
+        return len(rows)
+    
     async def update(self, obj_id: int, update_data: dict) -> Optional[ModelType]:
         """Обновить объект"""
         obj = await self.get_by_id(obj_id)
@@ -50,18 +179,44 @@ class BaseRepository(Generic[ModelType]):
             if value is not None and hasattr(obj, key):
                 setattr(obj, key, value)
         
-        await self.session.commit()
+        await self._commit()
         await self.session.refresh(obj)
         logger.info(f"✅ Обновлён {self.model.__name__}: {obj.id}")
         return obj
     
+    async def patch(self, obj_id: int, update_data: dict,
+                    returning: Optional[Sequence[str]] = None) -> Optional[Row]:
+        """
+        Частичное обновление одним UPDATE ... WHERE id=... RETURNING, без загрузки объекта.
+        Пишутся только не-None поля; возвращается лёгкая строка (Row) вместо ORM-объекта.
+        Объект, уже загруженный в эту сессию, не обновляется.
+        """
+        table = self.model.__table__
+        columns = [table.c[name] for name in returning] if returning else list(table.c)
+        values = {
+            key: value for key, value in update_data.items()
+            if value is not None and key in table.c
+        }
+        
+        if values:
+            stmt = update(table).where(table.c.id == obj_id).values(**values).returning(*columns)
+        else:
+            stmt = select(*columns).where(table.c.id == obj_id)
+        
+        result = await self.session.execute(stmt)
+        row = result.one_or_none()
+        await self._commit()
+        if row is not None:
+            logger.info(f"✅ Обновлён {self.model.__name__}: {obj_id}")
+        return row
+    
     async def delete(self, obj_id: int) -> bool:
-        """Удалить объект"""
-        obj = await self.get_by_id(obj_id)
-        if not obj:
+        """Удалить объект одним DELETE без предварительной загрузки"""
+        table = self.model.__table__
+        result = await self.session.execute(delete(table).where(table.c.id == obj_id))
+        await self._commit()
+        if not result.rowcount:
             return False
         
-        await self.session.delete(obj)
-        await self.session.commit()
         logger.info(f"✅ Удалён {self.model.__name__}: {obj_id}")
         return True
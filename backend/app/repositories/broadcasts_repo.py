@@ -0,0 +1,40 @@
+"""
+Репозиторий рассылок (контрольные точки broadcast-джобы)
+"""
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from typing import Optional
+from backend.app.repositories.base import BaseRepository
+from backend.app.db.models import BroadcastRun
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class BroadcastsRepository(BaseRepository[BroadcastRun]):
+    """Репозиторий рассылок"""
+    
+    def __init__(self, session: AsyncSession, autocommit: bool = True):
+        super().__init__(session, BroadcastRun, autocommit=autocommit)
+    
+    async def get_by_name(self, name: str) -> Optional[BroadcastRun]:
+        result = await self.session.execute(select(BroadcastRun).where(BroadcastRun.name == name))
+        return result.scalar_one_or_none()
+    
+    async def start(self, name: str, text: str) -> BroadcastRun:
+        """Новая рассылка или незавершённая с тем же именем (продолжится с контрольной точки)"""
+        run = await self.get_by_name(name)
+        if run is None:
+            run = BroadcastRun(name=name, text=text, status="running")
+            self.session.add(run)
+            await self._commit()
+            logger.info(f"✅ Рассылка создана: {name}")
+        return run
+    
+    async def checkpoint(self, run_id: int, last_user_id: int, sent: int, failed: int, blocked: int,
+                         status: Optional[str] = None) -> None:
+        await self.patch(
+            run_id,
+            {"last_user_id": last_user_id, "sent": sent, "failed": failed, "blocked": blocked, "status": status},
+            returning=["id"]
+        )
@@ -0,0 +1,56 @@
+"""
+Репозиторий для работы с целями пользователей
+"""
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy import or_
+from typing import Optional
+from backend.app.repositories.base import BaseRepository
+from backend.app.db.models import User, UserGoal
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class GoalsRepository(BaseRepository[UserGoal]):
+    """Репозиторий целей"""
+    
+    def __init__(self, session: AsyncSession, autocommit: bool = True):
+        super().__init__(session, UserGoal, autocommit=autocommit)
+    
+    async def get_latest_for_user(self, user_id: int) -> Optional[UserGoal]:
+        """Актуальная (последняя) цель пользователя"""
+        result = await self.session.execute(
+            select(UserGoal).where(UserGoal.user_id == user_id).order_by(UserGoal.id.desc()).limit(1)
+        )
+        return result.scalar_one_or_none()
+    
+    async def get_stale_targets_page(self, formula_version: int, after_id: int, limit: int) -> list:
+        """
+        Страница целей, рассчитанных старой версией формулы, вместе с профилем пользователя.
+        Keyset по user_goals.id; возвращает лёгкие строки, не ORM-объекты.
+        """
+        result = await self.session.execute(
+            select(
+                UserGoal.id,
+                UserGoal.goal_type,
+                UserGoal.target_calories,
+                UserGoal.calories_manual,
+                User.age,
+                User.gender,
+                User.height_cm,
+                User.weight_kg,
+                User.activity_level,
+            )
+            .join(User, User.id == UserGoal.user_id)
+            .where(
+                UserGoal.id > after_id,
+                or_(UserGoal.formula_version.is_(None), UserGoal.formula_version < formula_version),
+                User.age.is_not(None),
+                User.height_cm.is_not(None),
+                User.weight_kg.is_not(None),
+            )
+            .order_by(UserGoal.id)
+            .limit(limit)
+        )
+        return result.all()
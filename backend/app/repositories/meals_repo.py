@@ -0,0 +1,155 @@
+"""
+Репозиторий приёмов пищи с инкрементальной дневной сводкой КБЖУ
+"""
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from datetime import date, datetime, timedelta
+from typing import Optional
+from backend.app.repositories.base import BaseRepository
+from backend.app.db.models import DailyNutritionTotal, Meal, MealEdit, UserGoal
+from backend.app.utils.localtime import local_date
+import logging
+
+logger = logging.getLogger(__name__)
+
+NUTRIENTS = ("calories", "protein_g", "fat_g", "carbs_g")
+
+
+def eaten_nutrients(meal: Meal) -> dict:
+    """Фактически съеденное КБЖУ с учётом % съеденного"""
+    share = meal.percent_eaten / 100.0
+    return {name: getattr(meal, name) * share for name in NUTRIENTS}
+
+
+class MealsRepository(BaseRepository[Meal]):
+    """
+    Репозиторий приёмов пищи.
+    Любая запись в meals сразу применяет дельту к daily_nutrition_totals в той же транзакции,
+    поэтому история и остаток на сегодня читают O(дней) строк, а не все приёмы пищи.
+    """
+
+    def __init__(self, session: AsyncSession, autocommit: bool = True):
+        super().__init__(session, Meal, autocommit=autocommit)
+
+    async def add_meal(self, user_id: int, name: str, calories: float, protein_g: float,
+                       fat_g: float, carbs_g: float, portion_g: Optional[float] = None,
+                       percent_eaten: float = 100.0, source: str = "text",
+                       session_id: Optional[int] = None, eaten_at: Optional[datetime] = None) -> Meal:
+        """Добавить приём пищи и учесть его в дневной сводке"""
+        eaten_at = eaten_at or datetime.utcnow()
+        meal = Meal(
+            user_id=user_id,
+            session_id=session_id,
+            name=name,
+            source=source,
+            meal_date=local_date(eaten_at),  # Сутки пользователя, а не UTC
+            portion_g=portion_g,
+            percent_eaten=percent_eaten,
+            calories=calories,
+            protein_g=protein_g,
+            fat_g=fat_g,
+            carbs_g=carbs_g,
+            eaten_at=eaten_at
+        )
+        self.session.add(meal)
+        await self.session.flush()
+
+        await self._apply_delta(user_id, meal.meal_date, eaten_nutrients(meal), meals_delta=1)
+        await self._commit()
+        logger.info(f"✅ Приём пищи добавлен: {meal.id} (user {user_id})")
+        return meal
+
+    async def edit_meal(self, meal_id: int, portion_g: Optional[float] = None,
+                        percent_eaten: Optional[float] = None) -> Optional[Meal]:
+        """Изменить порцию (КБЖУ масштабируется) и/или % съеденного, обновить сводку"""
+        meal = await self.get_by_id(meal_id)
+        if not meal:
+            return None
+
+        before = eaten_nutrients(meal)
+        edits = []
+
+        if portion_g is not None and portion_g != meal.portion_g:
+            if meal.portion_g:
+                scale = portion_g / meal.portion_g
+                for name in NUTRIENTS:
+                    setattr(meal, name, getattr(meal, name) * scale)
+            edits.append(MealEdit(meal_id=meal.id, user_id=meal.user_id, field="portion_g",
+                                  old_value=meal.portion_g, new_value=portion_g))
+            meal.portion_g = portion_g
+
+        if percent_eaten is not None and percent_eaten != meal.percent_eaten:
+            edits.append(MealEdit(meal_id=meal.id, user_id=meal.user_id, field="percent_eaten",
+                                  old_value=meal.percent_eaten, new_value=percent_eaten))
+            meal.percent_eaten = percent_eaten
+
+        if not edits:
+            return meal
+
+        after = eaten_nutrients(meal)
+        self.session.add_all(edits)
+        await self._apply_delta(
+            meal.user_id, meal.meal_date, {name: after[name] - before[name] for name in NUTRIENTS}
+        )
+        await self._commit()
+        logger.info(f"✅ Приём пищи изменён: {meal.id}")
+        return meal
+
+    async def delete(self, obj_id: int) -> bool:
+        """Удалить приём пищи и вычесть его из дневной сводки"""
+        meal = await self.get_by_id(obj_id)
+        if not meal:
+            return False
+
+        eaten = eaten_nutrients(meal)
+        await self._apply_delta(
+            meal.user_id, meal.meal_date, {name: -value for name, value in eaten.items()}, meals_delta=-1
+        )
+        await self.session.delete(meal)
+        await self._commit()
+        logger.info(f"✅ Удалён Meal: {obj_id}")
+        return True
+
+    async def get_daily_totals(self, user_id: int, days: int = 7) -> list[DailyNutritionTotal]:
+        """Сводки за последние `days` дней (новые первыми)"""
+        since = local_date() - timedelta(days=days - 1)
+        result = await self.session.execute(
+            select(DailyNutritionTotal)
+            .where(DailyNutritionTotal.user_id == user_id, DailyNutritionTotal.day >= since)
+            .order_by(DailyNutritionTotal.day.desc())
+        )
+        return result.scalars().all()
+
+    async def get_remaining_today(self, user_id: int) -> Optional[dict]:
+        """Сколько КБЖУ осталось на сегодня по актуальной цели (None — цели нет)"""
+        goal = (await self.session.execute(
+            select(UserGoal.target_calories, UserGoal.target_protein_g,
+                   UserGoal.target_fat_g, UserGoal.target_carbs_g)
+            .where(UserGoal.user_id == user_id)
+            .order_by(UserGoal.id.desc())
+            .limit(1)
+        )).one_or_none()
+        if goal is None:
+            return None
+
+        totals = (await self.session.execute(
+            select(*(getattr(DailyNutritionTotal, name) for name in NUTRIENTS))
+            .where(DailyNutritionTotal.user_id == user_id,
+                   DailyNutritionTotal.day == local_date())
+        )).one_or_none() or (0.0,) * len(NUTRIENTS)
+
+        return {name: target - eaten for name, target, eaten in zip(NUTRIENTS, goal, totals)}
+
+    async def _apply_delta(self, user_id: int, day: date, delta: dict, meals_delta: int = 0) -> None:
+        """Атомарно прибавить дельту к сводке дня (INSERT ... ON CONFLICT DO UPDATE SET x = x + ...)"""
+        stmt = self._insert(DailyNutritionTotal).values(
+            user_id=user_id, day=day, meals_count=meals_delta, updated_at=datetime.utcnow(), **delta
+        )
+        set_ = {
+            name: getattr(DailyNutritionTotal, name) + stmt.excluded[name]
+            for name in (*NUTRIENTS, "meals_count")
+        }
+        set_["updated_at"] = stmt.excluded.updated_at
+        await self.session.execute(
+            stmt.on_conflict_do_update(index_elements=["user_id", "day"], set_=set_)
+        )
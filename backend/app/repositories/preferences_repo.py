@@ -0,0 +1,53 @@
+"""
+Репозиторий предпочтений пользователей (маски ограничений из db.vocabulary)
+"""
+from sqlalchemy import literal, literal_column
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from typing import List, Optional
+from backend.app.repositories.base import BaseRepository
+from backend.app.db import vocabulary
+from backend.app.db.models import UserPreference
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class PreferencesRepository(BaseRepository[UserPreference]):
+    """Репозиторий предпочтений"""
+    
+    def __init__(self, session: AsyncSession, autocommit: bool = True):
+        super().__init__(session, UserPreference, autocommit=autocommit)
+    
+    async def get_for_user(self, user_id: int) -> Optional[UserPreference]:
+        result = await self.session.execute(
+            select(UserPreference).where(UserPreference.user_id == user_id).order_by(UserPreference.id.desc()).limit(1)
+        )
+        return result.scalar_one_or_none()
+    
+    async def get_exclude_mask(self, user_id: int) -> int:
+        """Маска ингредиентов, которых не должно быть в блюде (0 — ограничений нет)"""
+        result = await self.session.execute(
+            select(UserPreference.exclude_mask)
+            .where(UserPreference.user_id == user_id)
+            .order_by(UserPreference.id.desc())
+            .limit(1)
+        )
+        return result.scalar_one_or_none() or 0
+    
+    async def get_user_ids_avoiding(self, allergen: str, after_id: int = 0, limit: int = 1000) -> List[int]:
+        """
+        Пользователи, которым нельзя ингредиент-аллерген (с учётом диет), keyset по user_id.
+        Условие совпадает с предикатом частичного индекса ix_user_preferences_avoids_<код>:
+        бит и 0 вписываются в SQL константами — с параметрами (prepared statement, generic plan)
+        планировщик не может доказать, что индекс подходит.
+        """
+        bit = vocabulary.allergens.bit(allergen)
+        avoids = UserPreference.exclude_mask.op("&")(literal(bit, literal_execute=True)) != literal_column("0")
+        result = await self.session.execute(
+            select(UserPreference.user_id)
+            .where(avoids, UserPreference.user_id > after_id)
+            .order_by(UserPreference.user_id)
+            .limit(limit)
+        )
+        return list(result.scalars().all())
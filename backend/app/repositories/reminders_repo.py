@@ -0,0 +1,189 @@
+"""
+Репозиторий напоминаний: расписания и аренды секций планировщика
+"""
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import Row, and_, case, delete, func, or_, update
+from sqlalchemy.future import select
+from datetime import datetime
+from typing import Collection, Iterable, List, Optional, Sequence, Set, Tuple
+from backend.app.repositories.base import BaseRepository
+from backend.app.db.models import ReminderSchedule, SchedulerLease, SchedulerWorker
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class RemindersRepository(BaseRepository[ReminderSchedule]):
+    """Репозиторий расписаний напоминаний"""
+
+    def __init__(self, session: AsyncSession, autocommit: bool = True):
+        super().__init__(session, ReminderSchedule, autocommit=autocommit)
+
+    async def schedule(self, user_id: int, chat_id: int, kind: str, partition: int,
+                       next_run_ts: int, interval_s: int = 0, replace: bool = True) -> None:
+        """Создать расписание (user_id, kind); replace=False — существующее не трогать"""
+        stmt = self._insert().values(
+            user_id=user_id, chat_id=chat_id, kind=kind, partition=partition,
+            next_run_ts=next_run_ts, interval_s=interval_s, enabled=True,
+            created_at=datetime.utcnow(), updated_at=datetime.utcnow()
+        )
+        if replace:
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["user_id", "kind"],
+                set_={
+                    "chat_id": stmt.excluded.chat_id,
+                    "partition": stmt.excluded.partition,
+                    "next_run_ts": stmt.excluded.next_run_ts,
+                    "interval_s": stmt.excluded.interval_s,
+                    "enabled": True,
+                    "updated_at": stmt.excluded.updated_at,
+                }
+            )
+        else:
+            stmt = stmt.on_conflict_do_nothing(index_elements=["user_id", "kind"])
+        await self.session.execute(stmt)
+        await self._commit()
+
+    async def get_upcoming(self, partitions: Collection[int], after: Tuple[int, int], until_ts: int,
+                           limit: int) -> List[Row]:
+        """
+        (id, partition, next_run_ts) включённых расписаний секций partitions с ключом
+        (next_run_ts, id) > after и next_run_ts <= until_ts — по возрастанию времени (keyset).
+        """
+        after_ts, after_id = after
+        result = await self.session.execute(
+            select(ReminderSchedule.id, ReminderSchedule.partition, ReminderSchedule.next_run_ts)
+            .where(
+                ReminderSchedule.partition.in_(partitions),
+                ReminderSchedule.enabled.is_(True),
+                ReminderSchedule.next_run_ts <= until_ts,
+                or_(
+                    ReminderSchedule.next_run_ts > after_ts,
+                    and_(ReminderSchedule.next_run_ts == after_ts, ReminderSchedule.id > after_id)
+                )
+            )
+            .order_by(ReminderSchedule.next_run_ts, ReminderSchedule.id)
+            .limit(limit)
+        )
+        return result.all()
+
+    async def claim_due(self, schedule_ids: Sequence[int], now_ts: int, owner: str) -> List[Row]:
+        """
+        Забрать наступившие напоминания одним UPDATE ... RETURNING: повторяющиеся сдвигаются
+        на ближайший будущий период (пропущенные периоды не догоняем), разовые выключаются.
+        Проходят только строки секций, аренду которых owner держит сейчас, — поэтому
+        устаревший воркер после потери аренды ничего не отправит.
+        """
+        if not schedule_ids:
+            return []
+        schedule = ReminderSchedule
+        owned = select(SchedulerLease.partition).where(
+            SchedulerLease.owner == owner, SchedulerLease.expires_ts > now_ts
+        )
+        periods = (now_ts - schedule.next_run_ts) // schedule.interval_s + 1
+        result = await self.session.execute(
+            update(schedule)
+            .where(
+                schedule.id.in_(schedule_ids),
+                schedule.enabled.is_(True),
+                schedule.next_run_ts <= now_ts,
+                schedule.partition.in_(owned)
+            )
+            .values(
+                next_run_ts=case(
+                    (schedule.interval_s > 0, schedule.next_run_ts + schedule.interval_s * periods),
+                    else_=schedule.next_run_ts
+                ),
+                enabled=schedule.interval_s > 0,
+                updated_at=datetime.utcnow()
+            )
+            .returning(
+                schedule.id, schedule.user_id, schedule.chat_id, schedule.kind,
+                schedule.partition, schedule.next_run_ts, schedule.enabled
+            )
+            .execution_options(synchronize_session=False)
+        )
+        rows = result.all()
+        await self._commit()
+        return rows
+
+    async def disable_for_users(self, user_ids: Sequence[int]) -> None:
+        """Выключить все напоминания пользователей (например, заблокировавших бота)"""
+        if not user_ids:
+            return
+        await self.session.execute(
+            update(ReminderSchedule)
+            .where(ReminderSchedule.user_id.in_(user_ids))
+            .values(enabled=False, updated_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        await self._commit()
+
+    async def ensure_partitions(self, partitions: int) -> None:
+        """Строки аренды для секций 0..partitions-1 (существующие не меняются)"""
+        stmt = self._insert(SchedulerLease).on_conflict_do_nothing(index_elements=["partition"])
+        await self.session.execute(stmt, [{"partition": p, "expires_ts": 0} for p in range(partitions)])
+        await self._commit()
+
+    async def heartbeat(self, owner: str, now_ts: int, ttl_s: int) -> int:
+        """Отметить воркер живым; возвращает число живых воркеров (включая себя)"""
+        stmt = self._insert(SchedulerWorker).values(owner=owner, expires_ts=now_ts + ttl_s)
+        stmt = stmt.on_conflict_do_update(index_elements=["owner"], set_={"expires_ts": stmt.excluded.expires_ts})
+        await self.session.execute(stmt)
+        result = await self.session.execute(
+            select(func.count()).select_from(SchedulerWorker).where(SchedulerWorker.expires_ts > now_ts)
+        )
+        await self._commit()
+        return result.scalar_one()
+
+    async def renew_leases(self, owner: str, now_ts: int, ttl_s: int, max_owned: Optional[int] = None) -> Set[int]:
+        """
+        Продлить свои аренды (лишние сверх max_owned — отдать) и добрать свободных
+        до max_owned секций (None — все свободные); возвращает свои секции.
+        Условие на owner/expires_ts в самом UPDATE делает захват атомарным между воркерами.
+        """
+        lease = SchedulerLease
+        expires_ts = now_ts + ttl_s
+        result = await self.session.execute(
+            update(lease)
+            .where(lease.owner == owner, lease.expires_ts > now_ts)
+            .values(expires_ts=expires_ts)
+            .returning(lease.partition)
+            .execution_options(synchronize_session=False)
+        )
+        owned = set(result.scalars().all())
+
+        if max_owned is not None and len(owned) > max_owned:
+            extra = sorted(owned)[max_owned:]
+            await self._release(owner, extra)
+            owned.difference_update(extra)
+
+        claim = None if max_owned is None else max_owned - len(owned)
+        if claim is None or claim > 0:
+            free = select(lease.partition).where(lease.expires_ts <= now_ts).order_by(func.random())
+            if claim is not None:
+                free = free.limit(claim)
+            result = await self.session.execute(
+                update(lease)
+                .where(lease.partition.in_(free), lease.expires_ts <= now_ts)
+                .values(owner=owner, expires_ts=expires_ts)
+                .returning(lease.partition)
+                .execution_options(synchronize_session=False)
+            )
+            owned.update(result.scalars().all())
+        await self._commit()
+        return owned
+
+    async def release_leases(self, owner: str) -> None:
+        """Отдать свои аренды сразу (при остановке), не дожидаясь истечения"""
+        await self._release(owner)
+        await self.session.execute(delete(SchedulerWorker).where(SchedulerWorker.owner == owner))
+        await self._commit()
+
+    async def _release(self, owner: str, partitions: Optional[Iterable[int]] = None) -> None:
+        stmt = update(SchedulerLease).where(SchedulerLease.owner == owner)
+        if partitions is not None:
+            stmt = stmt.where(SchedulerLease.partition.in_(list(partitions)))
+        await self.session.execute(
+            stmt.values(owner=None, expires_ts=0).execution_options(synchronize_session=False)
+        )
@@ -2,20 +2,33 @@
 Репозиторий для работы с пользователями
 """
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import delete, func
 from sqlalchemy.future import select
-from typing import Optional
+from typing import AsyncIterator, Optional, Sequence
+from backend.app.config import settings
+from backend.app.db.session import async_session_maker
 from backend.app.repositories.base import BaseRepository
 from backend.app.db.models import User
+from backend.app.utils.cache import LRUCache, SingleFlight
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Кэш telegram_user_id → users.id на процесс (id пользователя не меняется)
+_user_id_cache = LRUCache(maxsize=settings.USER_CACHE_SIZE, ttl=settings.USER_CACHE_TTL)
+_user_id_flights = SingleFlight()
+
+
+def cached_user_id(telegram_user_id: str) -> Optional[int]:
+    """ID пользователя только из кэша процесса (None — не знаем без запроса к БД)"""
+    return _user_id_cache.get(telegram_user_id)
+
 
 class UsersRepository(BaseRepository[User]):
     """Репозиторий пользователей"""
     
-    def __init__(self, session: AsyncSession):
-        super().__init__(session, User)
+    def __init__(self, session: AsyncSession, autocommit: bool = True):
+        super().__init__(session, User, autocommit=autocommit)
     
     async def get_by_telegram_id(self, telegram_user_id: str) -> Optional[User]:
         """Получить пользователя по Telegram ID"""
@@ -27,23 +40,100 @@ class UsersRepository(BaseRepository[User]):
     async def get_or_create(self, telegram_user_id: str, username: Optional[str] = None, 
                            first_name: Optional[str] = None) -> User:
         """Получить пользователя или создать если не существует"""
-        user = await self.get_by_telegram_id(telegram_user_id)
-        
-        if user:
-            logger.info(f"✅ Пользователь найден: {user.id}")
-            return user
-        
-        # Создаём нового пользователя
-        new_user = User(
+        return await self.upsert(telegram_user_id, username=username, first_name=first_name)
+    
+    async def upsert(self, telegram_user_id: str, username: Optional[str] = None,
+                     first_name: Optional[str] = None) -> User:
+        """INSERT ... ON CONFLICT DO UPDATE ... RETURNING: один round trip, без гонки на unique"""
+        stmt = self._insert().values(
             telegram_user_id=telegram_user_id,
             username=username,
             first_name=first_name
         )
-        return await self.create(new_user)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[User.telegram_user_id],
+            # None в новом обновлении (нет username) не затирает сохранённое значение
+            set_={
+                "username": func.coalesce(stmt.excluded.username, User.username),
+                "first_name": func.coalesce(stmt.excluded.first_name, User.first_name),
+            }
+        ).returning(User)
+        
+        result = await self.session.scalars(stmt, execution_options={"populate_existing": True})
+        user = result.one()
+        await self._commit()
+        user_id = user.id
+        self._after_commit(lambda: _user_id_cache.set(telegram_user_id, user_id))
+        logger.info(f"✅ Пользователь получен: {user.id}")
+        return user
     
-    async def get_active_users(self, limit: int = 100) -> list[User]:
-        """Получить активных пользователей"""
+    async def get_or_create_id(self, telegram_user_id: str, username: Optional[str] = None,
+                               first_name: Optional[str] = None) -> int:
+        """
+        ID пользователя: из кэша без обращения к БД, иначе через upsert.
+        Результат upsert делят одновременные вызовы из других обновлений, поэтому он идёт
+        в своей короткой сессии с commit, а не в транзакции вызывающего (её могут откатить).
+        """
+        user_id = _user_id_cache.get(telegram_user_id)
+        if user_id is not None:
+            return user_id
+        
+        async def load() -> int:
+            async with async_session_maker() as session:
+                user = await UsersRepository(session).upsert(
+                    telegram_user_id, username=username, first_name=first_name
+                )
+                return user.id
+        
+        return await _user_id_flights.do(telegram_user_id, load)
+    
+    async def get_id_by_telegram_id(self, telegram_user_id: str) -> Optional[int]:
+        """ID пользователя по Telegram ID (через кэш)"""
+        user_id = _user_id_cache.get(telegram_user_id)
+        if user_id is not None:
+            return user_id
+        
         result = await self.session.execute(
-            select(User).where(User.is_active == True).limit(limit)
+            select(User.id).where(User.telegram_user_id == telegram_user_id)
         )
+        user_id = result.scalar_one_or_none()
+        if user_id is not None:
+            _user_id_cache.set(telegram_user_id, user_id)
+        return user_id
+    
+    async def delete(self, obj_id: int) -> bool:
+        """Удалить пользователя и вытеснить его из кэша"""
+        result = await self.session.execute(
+            delete(User.__table__).where(User.id == obj_id).returning(User.telegram_user_id)
+        )
+        telegram_user_id = result.scalar_one_or_none()
+        await self._commit()
+        if telegram_user_id is None:
+            return False
+        
+        _user_id_cache.pop(telegram_user_id)
+        logger.info(f"✅ Удалён User: {obj_id}")
+        return True
+    
+    async def get_active_users(self, limit: int = 100, after_id: Optional[int] = None) -> list[User]:
+        """Получить активных пользователей (after_id — keyset-пагинация)"""
+        stmt = select(User).where(User.is_active == True).order_by(User.id).limit(limit)
+        if after_id is not None:
+            stmt = stmt.where(User.id > after_id)
+        result = await self.session.execute(stmt)
         return result.scalars().all()
+    
+    def iter_active_users(self, batch_size: int = 1000, after_id: int = 0) -> AsyncIterator[list[User]]:
+        """Все активные пользователи пачками по возрастанию id (after_id — продолжить с места)"""
+        return self.iter_batches(User.is_active == True, User.id > after_id, batch_size=batch_size)
+    
+    async def count_active_users(self, after_id: int = 0) -> int:
+        """Число активных пользователей с id > after_id"""
+        result = await self.session.execute(
+            select(func.count()).select_from(User).where(User.is_active == True, User.id > after_id)
+        )
+        return result.scalar_one()
+    
+    async def deactivate(self, user_ids: Sequence[int]) -> int:
+        """Пометить неактивными (например, заблокировавших бота)"""
+        return await self.bulk_update([{"id": user_id, "is_active": False} for user_id in user_ids])
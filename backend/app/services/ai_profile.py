@@ -0,0 +1,263 @@
+"""
+Динамический AI-профиль: сигналы поведения, тона и вкусов, обновляемые онлайн.
+
+Каждый сигнал — состояние постоянного размера (EWMA, счётчики, кольцевые буферы, top-k),
+событие (приём пищи, сообщение, реакция на рекомендацию) обновляет его за O(1),
+а весь профиль — один небольшой документ в коллекции user_dynamic_profiles.
+"""
+import asyncio
+import logging
+import random
+import re
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+from backend.app.db.documents import REVISION, DocumentStore, get_document_store
+from backend.app.utils.localtime import local_time
+from backend.app.utils.online import Ewma, RingBuffer, SpaceSaving
+
+logger = logging.getLogger(__name__)
+
+COLLECTION = "user_dynamic_profiles"
+PROFILE_VERSION = 1
+
+DAILY_ALPHA = 0.1  # Дневные сигналы: ~ последние 2–3 недели
+EVENT_ALPHA = 0.05  # Сигналы на событие (приём пищи, сообщение)
+TONE_HISTORY = 32  # Последних оценок тона сообщений
+TASTE_CAPACITY = 32  # Счётчиков в top-k блюд
+TASTE_EVOLUTION_WEEKS = 12  # Недельных снимков вкусов
+MAX_SKIPPED_DAYS = 7  # Сколько пропущенных дней учитывать нулями при возвращении
+MAX_UPDATE_ATTEMPTS = 10  # Повторов чтение → изменение → запись при конфликте ревизий
+CONFLICT_BACKOFF = 0.01  # Базовая пауза перед повтором (с), растёт с номером попытки, со случайным разбросом
+
+BREAKFAST_HOURS = range(5, 11)
+EVENING_HOURS = (21, 22, 23, 0, 1, 2)
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+POSITIVE = {"спасибо", "отлично", "класс", "супер", "хорошо", "круто", "вкусно", "получилось", "рад", "рада"}
+NEGATIVE = {"плохо", "устал", "устала", "грустно", "надоело", "сорвался", "сорвалась", "тяжело", "стресс", "лень"}
+POSITIVE_EMOJI = ("😊", "😀", "😃", "👍", "🔥", "💪", "❤")
+NEGATIVE_EMOJI = ("😞", "😢", "😭", "😩", "😡", "👎")
+
+
+def estimate_tone(text: str) -> float:
+    """Грубая оценка тона сообщения по словарю и эмодзи: −1 (негатив) … 1 (позитив)"""
+    words = _WORD.findall(text.lower())
+    positive = sum(word in POSITIVE for word in words) + sum(text.count(e) for e in POSITIVE_EMOJI)
+    negative = sum(word in NEGATIVE for word in words) + sum(text.count(e) for e in NEGATIVE_EMOJI)
+    if positive == negative:
+        return 0.0
+    return (positive - negative) / (positive + negative)
+
+
+class DynamicProfile:
+    """Онлайн-состояние профиля одного пользователя"""
+
+    def __init__(self, user_id: int, document: Optional[Dict[str, Any]] = None):
+        self.user_id = user_id
+        document = document or {}
+        behavioral = document.get("behavioral_patterns", {})
+        emotional = document.get("emotional_patterns", {})
+        taste = document.get("taste_preferences", {})
+        recommendations = document.get("recommendations", {})
+
+        # Поведение: завтраки, вечерние перекусы, число приёмов в день, часы приёмов пищи
+        self.breakfast = Ewma.from_state(DAILY_ALPHA, behavioral.get("breakfast"))
+        self.meals_per_day = Ewma.from_state(DAILY_ALPHA, behavioral.get("meals_per_day"))
+        self.evening_snacks = Ewma.from_state(EVENT_ALPHA, behavioral.get("evening_snacks"))
+        self.meal_hours = behavioral.get("meal_hours") or [0] * 24
+        self.day = behavioral.get("day")  # Текущий локальный день (ordinal) и его счётчики
+        self.breakfast_today = behavioral.get("breakfast_today", False)
+        self.meals_today = behavioral.get("meals_today", 0)
+
+        # Эмоции: тон сообщений и их длина
+        self.tone = Ewma.from_state(EVENT_ALPHA, emotional.get("tone"))
+        self.tone_history = RingBuffer.from_state(TONE_HISTORY, emotional.get("message_tone_history"))
+        self.message_length = Ewma.from_state(EVENT_ALPHA, emotional.get("message_length"))
+
+        # Вкусы: частые блюда за всё время и за текущую неделю, доли макронутриентов
+        self.dishes = SpaceSaving.from_state(TASTE_CAPACITY, taste.get("dishes"))
+        self.week_dishes = SpaceSaving.from_state(TASTE_CAPACITY, taste.get("week_dishes"))
+        self.week = taste.get("week")
+        self.evolution = RingBuffer.from_state(TASTE_EVOLUTION_WEEKS, taste.get("evolution"))
+        self.protein_share = Ewma.from_state(EVENT_ALPHA, taste.get("protein_share"))
+        self.fat_share = Ewma.from_state(EVENT_ALPHA, taste.get("fat_share"))
+        self.carbs_share = Ewma.from_state(EVENT_ALPHA, taste.get("carbs_share"))
+
+        # Успех прошлых рекомендаций
+        self.shown = recommendations.get("shown", 0)
+        self.accepted = recommendations.get("accepted", 0)
+        self.acceptance = Ewma.from_state(EVENT_ALPHA, recommendations.get("acceptance"))
+
+        self.updated_at = document.get("updated_at")
+
+    def record_meal(self, name: str, calories: float, protein_g: float, fat_g: float, carbs_g: float,
+                    eaten_at: Optional[datetime] = None) -> None:
+        """Учесть приём пищи (время — UTC)"""
+        local = local_time(eaten_at)
+        self._roll_day(local.date().toordinal())
+        self._roll_week(local)
+
+        hour = local.hour
+        self.meal_hours[hour] += 1
+        self.meals_today += 1
+        if hour in BREAKFAST_HOURS:
+            self.breakfast_today = True
+        self.evening_snacks.update(1.0 if hour in EVENING_HOURS else 0.0)
+
+        dish = name.strip().lower()
+        self.dishes.add(dish)
+        self.week_dishes.add(dish)
+
+        macro_kcal = protein_g * 4 + fat_g * 9 + carbs_g * 4
+        if macro_kcal > 0:
+            self.protein_share.update(protein_g * 4 / macro_kcal)
+            self.fat_share.update(fat_g * 9 / macro_kcal)
+            self.carbs_share.update(carbs_g * 4 / macro_kcal)
+        self._touch()
+
+    def record_message(self, text: str) -> None:
+        """Учесть текстовое сообщение пользователя"""
+        tone = estimate_tone(text)
+        self.tone.update(tone)
+        self.tone_history.append(round(tone, 2))
+        self.message_length.update(len(text))
+        self._touch()
+
+    def record_recommendation(self, accepted: bool) -> None:
+        """Пользователь принял или отклонил рекомендацию"""
+        self.shown += 1
+        self.accepted += int(accepted)
+        self.acceptance.update(1.0 if accepted else 0.0)
+        self._touch()
+
+    @property
+    def breakfast_consistency(self) -> Optional[float]:
+        """Доля дней с завтраком (сглаженная, по завершённым дням)"""
+        return self.breakfast.get()
+
+    def _roll_day(self, day: int) -> None:
+        """Закрыть прошедшие дни: завтрак был/не был, сколько приёмов пищи"""
+        if self.day is None:
+            self.day = day
+            return
+        if day <= self.day:
+            return
+        self.breakfast.update(1.0 if self.breakfast_today else 0.0)
+        self.meals_per_day.update(self.meals_today)
+        # Дни без записей — пропущенные завтраки; после долгого перерыва учитываем не больше недели
+        for _ in range(min(day - self.day - 1, MAX_SKIPPED_DAYS)):
+            self.breakfast.update(0.0)
+            self.meals_per_day.update(0.0)
+        self.day = day
+        self.breakfast_today = False
+        self.meals_today = 0
+
+    def _roll_week(self, local: datetime) -> None:
+        """На границе недели — снимок top-3 блюд недели в evolution"""
+        year, week, _ = local.isocalendar()
+        week_key = f"{year}-W{week:02d}"
+        if self.week is None:
+            self.week = week_key
+        elif week_key > self.week:
+            if self.week_dishes.counts:
+                self.evolution.append([self.week, [dish for dish, _ in self.week_dishes.top(3)]])
+            self.week_dishes.clear()
+            self.week = week_key
+
+    def _touch(self) -> None:
+        self.updated_at = datetime.utcnow().isoformat(timespec="seconds")
+
+    def summary(self) -> Dict[str, Any]:
+        """Короткая выжимка для RecSys и NLP"""
+        return {
+            "breakfast_consistency": self.breakfast_consistency,
+            "meals_per_day": self.meals_per_day.get(),
+            "evening_snack_rate": self.evening_snacks.get(),
+            "tone": self.tone.get(),
+            "top_dishes": [dish for dish, _ in self.dishes.top(5)],
+            "acceptance_rate": self.acceptance.get(),
+        }
+
+    def to_document(self) -> Dict[str, Any]:
+        return {
+            "v": PROFILE_VERSION,
+            "user_id": self.user_id,
+            "behavioral_patterns": {
+                "breakfast_consistency": self.breakfast_consistency,
+                "breakfast": self.breakfast.to_state(),
+                "meals_per_day": self.meals_per_day.to_state(),
+                "evening_snacks": self.evening_snacks.to_state(),
+                "meal_hours": self.meal_hours,
+                "day": self.day,
+                "breakfast_today": self.breakfast_today,
+                "meals_today": self.meals_today,
+            },
+            "emotional_patterns": {
+                "tone": self.tone.to_state(),
+                "message_tone_history": self.tone_history.to_state(),
+                "message_length": self.message_length.to_state(),
+            },
+            "taste_preferences": {
+                "dishes": self.dishes.to_state(),
+                "week_dishes": self.week_dishes.to_state(),
+                "week": self.week,
+                "evolution": self.evolution.to_state(),
+                "protein_share": self.protein_share.to_state(),
+                "fat_share": self.fat_share.to_state(),
+                "carbs_share": self.carbs_share.to_state(),
+            },
+            "recommendations": {
+                "shown": self.shown,
+                "accepted": self.accepted,
+                "acceptance": self.acceptance.to_state(),
+            },
+            "updated_at": self.updated_at,
+        }
+
+
+class ProfileConflict(Exception):
+    """Профиль менялся параллельно чаще, чем MAX_UPDATE_ATTEMPTS раз подряд"""
+
+
+class ProfileService:
+    """
+    Чтение и обновление профилей: одно чтение + одна условная запись документа на событие.
+    Запись проходит, только если ревизия документа не изменилась с чтения (compare-and-swap),
+    иначе событие применяется заново к свежему документу — параллельные обновления из
+    нескольких воркеров не теряют друг друга.
+    """
+
+    def __init__(self, store: DocumentStore):
+        self.store = store
+
+    async def get(self, user_id: int) -> DynamicProfile:
+        return DynamicProfile(user_id, await self.store.get(COLLECTION, user_id))
+
+    async def update(self, user_id: int, apply: Callable[[DynamicProfile], None]) -> DynamicProfile:
+        """Применить событие к профилю: чтение → apply → запись, если документ не менялся"""
+        for attempt in range(MAX_UPDATE_ATTEMPTS):
+            if attempt:
+                # Разводим конкурентов во времени, иначе они снова прочитают одну ревизию
+                await asyncio.sleep(random.uniform(0, CONFLICT_BACKOFF * attempt))
+            document = await self.store.get(COLLECTION, user_id)
+            revision = document.get(REVISION, 0) if document is not None else None
+            profile = DynamicProfile(user_id, document)
+            apply(profile)
+            if await self.store.put_if_unchanged(COLLECTION, user_id, profile.to_document(), revision):
+                return profile
+        raise ProfileConflict(f"профиль {user_id} меняется параллельно, событие не записано")
+
+    async def record_meal(self, user_id: int, name: str, nutrients: Dict[str, float],
+                          eaten_at: Optional[datetime] = None) -> None:
+        await self.update(user_id, lambda profile: profile.record_meal(
+            name, nutrients["calories"], nutrients["protein_g"], nutrients["fat_g"], nutrients["carbs_g"],
+            eaten_at=eaten_at
+        ))
+
+    async def record_message(self, user_id: int, text: str) -> None:
+        await self.update(user_id, lambda profile: profile.record_message(text))
+
+
+def get_profile_service() -> ProfileService:
+    return ProfileService(get_document_store())
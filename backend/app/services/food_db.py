@@ -0,0 +1,193 @@
+"""
+Локальная база состава продуктов: колоночные массивы в memory-mapped файлах
+и триграммный индекс для нечёткого поиска по названию (RU/EN).
+
+Формат — каталог с .npy файлами, открываемыми через mmap: страницы файла делятся
+между всеми воркерами через page cache ОС, каждый процесс не держит свою копию.
+
+Сборка из CSV (name,kcal,protein,fat,carbs на 100 г):
+    python -m backend.app.services.food_db build foods.csv data/food_db
+"""
+import csv
+import re
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from backend.app.config import settings
+
+_NON_WORD = re.compile(r"[^0-9a-zа-я]+")
+
+
+def normalize(text: str) -> str:
+    """Нижний регистр, ё → е, всё кроме букв и цифр → пробел"""
+    return _NON_WORD.sub(" ", text.lower().replace("ё", "е")).strip()
+
+
+def trigrams(text: str) -> set:
+    """Триграммы как в pg_trgm: каждое слово дополняется двумя пробелами слева и одним справа"""
+    result = set()
+    for word in normalize(text).split():
+        padded = f"  {word} "
+        for i in range(len(padded) - 2):
+            a, b, c = padded[i:i + 3]
+            # Три символа Unicode (≤ 21 бит каждый) без коллизий укладываются в uint64
+            result.add((ord(a) << 42) | (ord(b) << 21) | ord(c))
+    return result
+
+
+@dataclass(frozen=True)
+class FoodMatch:
+    """Найденный продукт и его КБЖУ на 100 г"""
+    index: int
+    name: str
+    score: float
+    kcal: float
+    protein_g: float
+    fat_g: float
+    carbs_g: float
+
+    def for_portion(self, grams: float) -> dict:
+        """КБЖУ на порцию"""
+        factor = grams / 100.0
+        return {
+            "calories": self.kcal * factor,
+            "protein_g": self.protein_g * factor,
+            "fat_g": self.fat_g * factor,
+            "carbs_g": self.carbs_g * factor,
+        }
+
+
+class FoodStore:
+    """Read-only база продуктов поверх memory-mapped массивов"""
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        load = lambda name: np.load(self.directory / f"{name}.npy", mmap_mode="r")
+        self.nutrients = load("nutrients")  # float32 (N, 4): kcal, белки, жиры, углеводы на 100 г
+        self.name_offsets = load("name_offsets")  # int64 (N + 1)
+        self.name_trigrams = load("name_trigrams")  # uint16 (N): число триграмм в названии
+        self.tri_keys = load("tri_keys")  # uint64 (K), отсортированы
+        self.tri_offsets = load("tri_offsets")  # int64 (K + 1)
+        self.tri_postings = load("tri_postings")  # uint32: id продуктов по триграммам
+        names_path = self.directory / "names.bin"
+        # Пустой файл mmap не открыть (пустой каталог или только пустые названия)
+        if names_path.stat().st_size:
+            self.names = np.memmap(names_path, dtype=np.uint8, mode="r")
+        else:
+            self.names = np.zeros(0, dtype=np.uint8)
+
+    def __len__(self) -> int:
+        return len(self.nutrients)
+
+    def name(self, index: int) -> str:
+        start, end = self.name_offsets[index], self.name_offsets[index + 1]
+        return bytes(self.names[start:end]).decode("utf-8")
+
+    def search(self, query: str, k: int = 5, min_score: float = 0.0) -> List[FoodMatch]:
+        """Top-k продуктов по триграммному сходству (Jaccard) с запросом"""
+        query_trigrams = trigrams(query)
+        if not query_trigrams or not len(self):
+            return []
+
+        keys = np.fromiter(query_trigrams, dtype=np.uint64, count=len(query_trigrams))
+        positions = np.searchsorted(self.tri_keys, keys)
+        in_range = positions < len(self.tri_keys)
+        positions, keys = positions[in_range], keys[in_range]
+        positions = positions[self.tri_keys[positions] == keys]
+        if not len(positions):
+            return []
+
+        postings = np.concatenate([
+            self.tri_postings[self.tri_offsets[p]:self.tri_offsets[p + 1]] for p in positions
+        ])
+        counts = np.bincount(postings, minlength=len(self))
+        candidates = np.flatnonzero(counts)
+        shared = counts[candidates]
+        scores = shared / (len(query_trigrams) + self.name_trigrams[candidates] - shared)
+
+        if len(candidates) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(len(candidates))
+        top = top[np.argsort(-scores[top], kind="stable")]
+
+        matches = []
+        for i in top:
+            score = float(scores[i])
+            if score < min_score:
+                break
+            index = int(candidates[i])
+            kcal, protein, fat, carbs = (float(v) for v in self.nutrients[index])
+            matches.append(FoodMatch(index, self.name(index), score, kcal, protein, fat, carbs))
+        return matches
+
+    @classmethod
+    def build(cls, records: Iterable[Tuple[str, float, float, float, float]], directory: Path) -> "FoodStore":
+        """Собрать базу из записей (название, ккал, белки, жиры, углеводы на 100 г)"""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+
+        names_blob = bytearray()
+        offsets = [0]
+        nutrients = []
+        name_trigrams = []
+        postings_by_trigram: dict = {}
+        for doc_id, (name, *values) in enumerate(records):
+            names_blob += name.encode("utf-8")
+            offsets.append(len(names_blob))
+            nutrients.append(values)
+            doc_trigrams = trigrams(name)
+            name_trigrams.append(len(doc_trigrams))
+            for trigram in doc_trigrams:
+                postings_by_trigram.setdefault(trigram, []).append(doc_id)
+
+        tri_keys = np.array(sorted(postings_by_trigram), dtype=np.uint64)
+        tri_lengths = [len(postings_by_trigram[key]) for key in tri_keys.tolist()]
+        tri_offsets = np.zeros(len(tri_keys) + 1, dtype=np.int64)
+        np.cumsum(tri_lengths, out=tri_offsets[1:])
+        tri_postings = np.fromiter(
+            (doc_id for key in tri_keys.tolist() for doc_id in postings_by_trigram[key]),
+            dtype=np.uint32, count=int(tri_offsets[-1])
+        )
+
+        np.save(directory / "nutrients.npy", np.asarray(nutrients, dtype=np.float32).reshape(-1, 4))
+        np.save(directory / "name_offsets.npy", np.asarray(offsets, dtype=np.int64))
+        np.save(directory / "name_trigrams.npy", np.asarray(name_trigrams, dtype=np.uint16))
+        np.save(directory / "tri_keys.npy", tri_keys)
+        np.save(directory / "tri_offsets.npy", tri_offsets)
+        np.save(directory / "tri_postings.npy", tri_postings)
+        (directory / "names.bin").write_bytes(bytes(names_blob))
+        return cls(directory)
+
+    @classmethod
+    def build_from_csv(cls, csv_path: Path, directory: Path) -> "FoodStore":
+        """CSV с колонками name,kcal,protein,fat,carbs"""
+        with open(csv_path, encoding="utf-8", newline="") as f:
+            records = [
+                (row["name"], float(row["kcal"]), float(row["protein"]), float(row["fat"]), float(row["carbs"]))
+                for row in csv.DictReader(f)
+            ]
+        return cls.build(records, directory)
+
+
+_store: Optional[FoodStore] = None
+
+
+def get_food_store() -> Optional[FoodStore]:
+    """База продуктов из settings.FOOD_DB_PATH (открывается один раз на процесс)"""
+    global _store
+    if _store is None and settings.FOOD_DB_PATH and Path(settings.FOOD_DB_PATH).is_dir():
+        _store = FoodStore(Path(settings.FOOD_DB_PATH))
+    return _store
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4 or sys.argv[1] != "build":
+        print("Использование: python -m backend.app.services.food_db build <foods.csv> <каталог>")
+        sys.exit(1)
+    store = FoodStore.build_from_csv(Path(sys.argv[2]), Path(sys.argv[3]))
+    print(f"✅ База продуктов собрана: {len(store)} записей → {sys.argv[3]}")
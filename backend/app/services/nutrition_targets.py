@@ -0,0 +1,120 @@
+"""
+Расчёт целевых КБЖУ: BMR (Mifflin–St Jeor) → TDEE → цель → макронутриенты.
+Одна формула для одного пользователя и для массивов пользователей (NumPy).
+"""
+from dataclasses import dataclass
+from typing import NamedTuple, Optional, Sequence
+
+import numpy as np
+
+# Увеличивать при любом изменении формулы или коэффициентов — batch-job пересчитает цели
+FORMULA_VERSION = 1
+
+# Поправка Mifflin–St Jeor по полу, ккал
+SEX_OFFSET = {"M": 5.0, "F": -161.0}
+SEX_OFFSET_DEFAULT = -78.0  # 'Other' / не указан — среднее
+
+ACTIVITY_FACTOR = {
+    "sedentary": 1.2,
+    "light": 1.375,
+    "moderate": 1.55,
+    "active": 1.725,
+    "very_active": 1.9,
+}
+ACTIVITY_FACTOR_DEFAULT = 1.2
+
+# Множитель калорийности и белок (г на кг веса) по цели
+GOAL_CALORIE_FACTOR = {"lose": 0.8, "maintain": 1.0, "gain": 1.1}
+GOAL_PROTEIN_G_PER_KG = {"lose": 2.0, "maintain": 1.6, "gain": 1.8}
+
+FAT_SHARE = 0.25  # Доля калорий из жиров
+MAX_PROTEIN_SHARE = 0.4  # Белок не больше 40% калорий
+MIN_CALORIES = 1000
+
+KCAL_PER_G_PROTEIN = 4.0
+KCAL_PER_G_FAT = 9.0
+KCAL_PER_G_CARBS = 4.0
+
+
+@dataclass(frozen=True)
+class NutritionTargets:
+    """Целевые показатели на день"""
+    calories: int
+    protein_g: float
+    fat_g: float
+    carbs_g: float
+
+
+class TargetsBatch(NamedTuple):
+    """Целевые показатели для массива пользователей"""
+    calories: np.ndarray
+    protein_g: np.ndarray
+    fat_g: np.ndarray
+    carbs_g: np.ndarray
+
+
+def _lookup(values: Sequence[Optional[str]], table: dict, default: float) -> np.ndarray:
+    return np.fromiter((table.get(v, default) for v in values), dtype=np.float64, count=len(values))
+
+
+def compute_targets_batch(
+    age: Sequence[float],
+    gender: Sequence[Optional[str]],
+    height_cm: Sequence[float],
+    weight_kg: Sequence[float],
+    activity_level: Sequence[Optional[str]],
+    goal_type: Sequence[Optional[str]],
+    calories: Optional[Sequence[float]] = None,
+) -> TargetsBatch:
+    """
+    Векторный расчёт для N пользователей.
+    calories — заданная вручную калорийность (NaN — рассчитать по TDEE).
+    """
+    age = np.asarray(age, dtype=np.float64)
+    height_cm = np.asarray(height_cm, dtype=np.float64)
+    weight_kg = np.asarray(weight_kg, dtype=np.float64)
+
+    bmr = 10.0 * weight_kg + 6.25 * height_cm - 5.0 * age + _lookup(gender, SEX_OFFSET, SEX_OFFSET_DEFAULT)
+    tdee = bmr * _lookup(activity_level, ACTIVITY_FACTOR, ACTIVITY_FACTOR_DEFAULT)
+    kcal = np.maximum(tdee * _lookup(goal_type, GOAL_CALORIE_FACTOR, 1.0), MIN_CALORIES)
+
+    if calories is not None:
+        manual = np.asarray(calories, dtype=np.float64)
+        kcal = np.where(np.isnan(manual), kcal, manual)
+    kcal = np.rint(kcal)
+
+    protein = np.minimum(
+        weight_kg * _lookup(goal_type, GOAL_PROTEIN_G_PER_KG, GOAL_PROTEIN_G_PER_KG["maintain"]),
+        kcal * MAX_PROTEIN_SHARE / KCAL_PER_G_PROTEIN,
+    )
+    fat = kcal * FAT_SHARE / KCAL_PER_G_FAT
+    carbs = np.maximum(kcal - protein * KCAL_PER_G_PROTEIN - fat * KCAL_PER_G_FAT, 0.0) / KCAL_PER_G_CARBS
+
+    return TargetsBatch(
+        calories=kcal.astype(np.int64),
+        protein_g=np.round(protein, 1),
+        fat_g=np.round(fat, 1),
+        carbs_g=np.round(carbs, 1),
+    )
+
+
+def compute_targets(
+    age: float,
+    gender: Optional[str],
+    height_cm: float,
+    weight_kg: float,
+    activity_level: Optional[str],
+    goal_type: Optional[str],
+    calories: Optional[int] = None,
+) -> NutritionTargets:
+    """Расчёт для одного пользователя (та же формула, что и в batch)"""
+    batch = compute_targets_batch(
+        [age], [gender], [height_cm], [weight_kg], [activity_level], [goal_type],
+        calories=[np.nan if calories is None else calories],
+    )
+    return NutritionTargets(
+        calories=int(batch.calories[0]),
+        protein_g=float(batch.protein_g[0]),
+        fat_g=float(batch.fat_g[0]),
+        carbs_g=float(batch.carbs_g[0]),
+    )
@@ -0,0 +1,306 @@
+"""
+Фото блюда → CV → Nutritionix → черновик приёма пищи.
+
+- Из размеров фото Telegram берётся наименьший, покрывающий вход CV-модели, и скачивается
+  потоком с ограничением размера (в памяти не бывает больше PHOTO_MAX_BYTES).
+- Декодирование, поворот по EXIF, уменьшение и перекодирование в JPEG, а также перцептивный
+  хэш (dHash, 64 бита) выполняются в пуле процессов — event loop не блокируется.
+- Результаты распознавания кэшируются по хэшу: пересланное или повторно отправленное фото
+  (в т.ч. пережатое) находится по расстоянию Хэмминга и в CV не уходит. Тот же файл Telegram
+  (file_unique_id) узнаётся ещё до скачивания.
+"""
+import io
+import logging
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from aiogram import Bot
+from aiogram.types import PhotoSize
+
+from backend.app.clients.cv_client import DishHypothesis, get_cv_client
+from backend.app.clients.nutritionix import NutritionixError, get_nutritionix_client
+from backend.app.config import settings
+from backend.app.services.food_db import get_food_store
+from backend.app.utils.cache import DiskCache, LRUCache, SingleFlight
+from backend.app.utils.metrics import Family, counters, gauge, registry
+from backend.app.utils.processes import ProcessPool
+
+logger = logging.getLogger(__name__)
+
+HASH_BITS = 64
+PHOTO_PORTION_G = 250.0  # Порция по умолчанию, если КБЖУ берутся из локальной базы (на 100 г)
+
+
+class PhotoTooLarge(Exception):
+    """Фото больше PHOTO_MAX_BYTES"""
+
+
+@dataclass
+class PhotoDraft:
+    """Черновик приёма пищи по фото"""
+    name: str
+    confidence: float
+    portion_g: Optional[float]
+    calories: float
+    protein_g: float
+    fat_g: float
+    carbs_g: float
+    alternatives: List[str] = field(default_factory=list)
+    cached: bool = False
+
+    def nutrients(self) -> Dict[str, float]:
+        return {"calories": self.calories, "protein_g": self.protein_g, "fat_g": self.fat_g, "carbs_g": self.carbs_g}
+
+
+# --- Работа в процессах пула (только чистые функции от bytes) ---
+
+def _dhash(image, size: int = 8) -> int:
+    """Difference hash: знаки разностей соседних пикселей уменьшенного серого изображения"""
+    from PIL import Image
+
+    pixels = list(image.convert("L").resize((size + 1, size), Image.Resampling.LANCZOS).getdata())
+    value = 0
+    for row in range(size):
+        offset = row * (size + 1)
+        for col in range(size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def preprocess_image(data: bytes, target_size: int, quality: int = 90) -> Tuple[bytes, int]:
+    """Декодировать, повернуть по EXIF, уменьшить до короткой стороны target_size, перекодировать в JPEG; + dHash"""
+    from PIL import Image, ImageOps
+
+    image = Image.open(io.BytesIO(data))
+    # JPEG декодируется сразу в уменьшенном масштабе (1/2, 1/4, 1/8) — в разы быстрее
+    image.draft("RGB", (target_size, target_size))
+    image = ImageOps.exif_transpose(image).convert("RGB")
+    scale = target_size / min(image.size)
+    if scale < 1:
+        size = (max(target_size, round(image.width * scale)), max(target_size, round(image.height * scale)))
+        image = image.resize(size, Image.Resampling.LANCZOS, reducing_gap=2.0)
+    output = io.BytesIO()
+    image.save(output, format="JPEG", quality=quality, optimize=True)
+    return output.getvalue(), _dhash(image)
+
+
+# --- Кэш распознаваний по перцептивному хэшу ---
+
+class PhotoHashCache:
+    """
+    LRU «хэш → результат» с поиском ближайшего по Хэммингу (<= max_distance).
+    Хэш делится на max_distance + 1 полос: у хэшей на расстоянии <= max_distance хотя бы
+    одна полоса совпадает (принцип Дирихле), поэтому кандидаты ищутся по индексу полос,
+    а не перебором всего кэша. Точные совпадения дополнительно хранятся на диске.
+    """
+
+    def __init__(self, maxsize: int, max_distance: int, disk: Optional[DiskCache] = None):
+        self.maxsize = maxsize
+        self.max_distance = max_distance
+        self.disk = disk
+        bands = max_distance + 1
+        self._band_bits = -(-HASH_BITS // bands)
+        self._bands = bands
+        self._items: "OrderedDict[int, dict]" = OrderedDict()
+        self._index: Dict[Tuple[int, int], Set[int]] = {}
+
+    def _band_keys(self, value: int) -> List[Tuple[int, int]]:
+        mask = (1 << self._band_bits) - 1
+        return [(band, (value >> (band * self._band_bits)) & mask) for band in range(self._bands)]
+
+    async def get(self, value: int) -> Optional[dict]:
+        best, best_distance = None, self.max_distance + 1
+        for key in self._band_keys(value):
+            for candidate in self._index.get(key, ()):
+                distance = bin(candidate ^ value).count("1")
+                if distance < best_distance:
+                    best, best_distance = candidate, distance
+        if best is not None:
+            self._items.move_to_end(best)
+            return self._items[best]
+        if self.disk:
+            cached = await self.disk.get(f"{value:016x}")
+            if cached is not None:
+                self._add(value, cached)
+            return cached
+        return None
+
+    async def set(self, value: int, result: dict) -> None:
+        self._add(value, result)
+        if self.disk:
+            await self.disk.set(f"{value:016x}", result)
+
+    def _add(self, value: int, result: dict) -> None:
+        if value in self._items:
+            self._items.move_to_end(value)
+            self._items[value] = result
+            return
+        self._items[value] = result
+        for key in self._band_keys(value):
+            self._index.setdefault(key, set()).add(value)
+        if len(self._items) > self.maxsize:
+            evicted, _ = self._items.popitem(last=False)
+            for key in self._band_keys(evicted):
+                bucket = self._index.get(key)
+                if bucket is not None:
+                    bucket.discard(evicted)
+                    if not bucket:
+                        del self._index[key]
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def close(self) -> None:
+        if self.disk:
+            self.disk.close()
+
+
+# --- Конвейер ---
+
+def choose_photo_size(sizes: Sequence[PhotoSize], target_size: int) -> PhotoSize:
+    """Наименьший размер, чья короткая сторона не меньше target_size (иначе самый большой)"""
+    ordered = sorted(sizes, key=lambda size: size.width * size.height)
+    for size in ordered:
+        if min(size.width, size.height) >= target_size:
+            return size
+    return ordered[-1]
+
+
+class PhotoPipeline:
+    def __init__(self, pool: ProcessPool, cache: PhotoHashCache,
+                 target_size: int = 512, max_bytes: int = 10 * 1024 * 1024):
+        self.pool = pool
+        self.cache = cache
+        self.target_size = target_size
+        self.max_bytes = max_bytes
+        # file_unique_id → dHash: тот же файл Telegram (пересылка) не скачивается повторно
+        self._file_hashes = LRUCache(maxsize=cache.maxsize)
+        # Одинаковые фото, пришедшие одновременно (альбом, двойная отправка), — один вызов CV
+        self._inflight = SingleFlight()
+        self.stats = {"photos": 0, "file_hits": 0, "hash_hits": 0, "cv_calls": 0}
+
+    async def recognize(self, bot: Bot, sizes: Sequence[PhotoSize]) -> Optional[PhotoDraft]:
+        """Черновик по фото; None — блюдо не распознано"""
+        self.stats["photos"] += 1
+        photo = choose_photo_size(sizes, self.target_size)
+
+        known_hash = self._file_hashes.get(photo.file_unique_id)
+        if known_hash is not None:
+            cached = await self.cache.get(known_hash)
+            if cached is not None:
+                self.stats["file_hits"] += 1
+                return PhotoDraft(**{**cached, "cached": True})
+
+        data = await self.download(bot, photo)
+        image, image_hash = await self.pool.run(preprocess_image, data, self.target_size)
+        self._file_hashes.set(photo.file_unique_id, image_hash)
+
+        cached = await self.cache.get(image_hash)
+        if cached is not None:
+            self.stats["hash_hits"] += 1
+            return PhotoDraft(**{**cached, "cached": True})
+
+        return await self._inflight.do(image_hash, lambda: self._recognize_new(image_hash, image))
+
+    async def _recognize_new(self, image_hash: int, image: bytes) -> Optional[PhotoDraft]:
+        self.stats["cv_calls"] += 1
+        hypotheses = await get_cv_client().recognize(image)
+        draft = await self._draft(hypotheses)
+        if draft is not None:
+            await self.cache.set(image_hash, asdict(draft))
+        return draft
+
+    async def download(self, bot: Bot, photo: PhotoSize) -> bytes:
+        """Скачать файл потоком; больше max_bytes — PhotoTooLarge (не дочитывая)"""
+        if photo.file_size and photo.file_size > self.max_bytes:
+            raise PhotoTooLarge(photo.file_size)
+        file = await bot.get_file(photo.file_id)
+        if bot.session.api.is_local:
+            return (await bot.download_file(file.file_path)).read()
+
+        buffer = bytearray()
+        stream = bot.session.stream_content(
+            url=bot.session.api.file_url(bot.token, file.file_path), chunk_size=65536, raise_for_status=True
+        )
+        async for chunk in stream:
+            buffer += chunk
+            if len(buffer) > self.max_bytes:
+                await stream.aclose()
+                raise PhotoTooLarge(len(buffer))
+        return bytes(buffer)
+
+    async def _draft(self, hypotheses: List[DishHypothesis]) -> Optional[PhotoDraft]:
+        """Лучшая гипотеза CV → КБЖУ (Nutritionix, иначе локальная база)"""
+        if not hypotheses:
+            return None
+        best = max(hypotheses, key=lambda h: h.confidence)
+        alternatives = [h.label for h in sorted(hypotheses, key=lambda h: -h.confidence)[1:4]]
+
+        nutritionix = get_nutritionix_client()
+        if nutritionix is not None:
+            try:
+                foods = await nutritionix.natural_nutrients(best.label)
+            except NutritionixError as e:
+                logger.warning(f"⚠️ {e}; КБЖУ по фото берём из локальной базы")
+                foods = []
+            if foods:
+                weights = [food.serving_weight_g for food in foods]
+                return PhotoDraft(
+                    name=best.label,
+                    confidence=best.confidence,
+                    portion_g=sum(weights) if all(weights) else None,
+                    calories=sum(food.calories for food in foods),
+                    protein_g=sum(food.protein_g for food in foods),
+                    fat_g=sum(food.fat_g for food in foods),
+                    carbs_g=sum(food.carbs_g for food in foods),
+                    alternatives=alternatives
+                )
+
+        food_store = get_food_store()
+        found = food_store.search(best.label, k=1) if food_store is not None else []
+        if not found:
+            return None
+        portion = found[0].for_portion(PHOTO_PORTION_G)
+        return PhotoDraft(
+            name=found[0].name, confidence=best.confidence, portion_g=PHOTO_PORTION_G,
+            alternatives=alternatives, **portion
+        )
+
+    def close(self) -> None:
+        self.pool.shutdown()
+        self.cache.close()
+
+
+_pipeline: Optional[PhotoPipeline] = None
+
+
+def get_photo_pipeline() -> PhotoPipeline:
+    """Конвейер фото из настроек PHOTO_* (один на процесс; пул процессов создаётся лениво)"""
+    global _pipeline
+    if _pipeline is None:
+        disk = None
+        if settings.PHOTO_CACHE_PATH:
+            disk = DiskCache(settings.PHOTO_CACHE_PATH, ttl=settings.PHOTO_CACHE_TTL, max_entries=settings.PHOTO_CACHE_SIZE)
+        _pipeline = PhotoPipeline(
+            ProcessPool("photos", settings.PHOTO_WORKERS),
+            PhotoHashCache(settings.PHOTO_CACHE_SIZE, settings.PHOTO_DEDUP_DISTANCE, disk=disk),
+            target_size=settings.PHOTO_TARGET_SIZE,
+            max_bytes=settings.PHOTO_MAX_BYTES
+        )
+    return _pipeline
+
+
+@registry.collector
+def _photo_metrics() -> Iterable[Family]:
+    if _pipeline is None:
+        return
+    yield counters("photo_pipeline_events", "Фото с начала работы: всего, из кэша, отправлено в CV", _pipeline.stats, "kind")
+    yield gauge("photo_cache_entries", "Распознаваний в кэше в памяти", len(_pipeline.cache))
+
+
+async def close_photo_pipeline() -> None:
+    global _pipeline
+    if _pipeline is not None:
+        _pipeline.close()
+        _pipeline = None
@@ -0,0 +1,172 @@
+"""
+RecSys: фильтр по ограничениям → скоринг блюд по КБЖУ → top-k.
+Каталог хранится колоночными NumPy-массивами, скоринг — одно матричное умножение
+на весь каталог (и сразу на пачку пользователей для предрасчёта подсказок).
+
+Сборка из CSV (name,kcal,protein,fat,carbs[,ingredients] на порцию; ingredients — коды
+db.vocabulary.ingredients через пробел):
+    python -m backend.app.services.recsys build dishes.csv data/dishes
+"""
+import csv
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from backend.app.config import settings
+from backend.app.db import vocabulary
+
+# Порядок колонок nutrients: ккал, белки, жиры, углеводы
+NUTRIENT_WEIGHTS = np.array([1.0, 1.5, 0.75, 0.75], dtype=np.float32)  # Белок важнее всего
+MIN_SCALE = np.array([100.0, 5.0, 5.0, 10.0], dtype=np.float32)  # Нижняя граница нормировки
+USERS_PER_CHUNK = 64  # Пользователей за проход в rank_batch: (64 × N) float32 в памяти
+
+
+@dataclass(frozen=True)
+class DishScore:
+    """Блюдо в выдаче и его КБЖУ на порцию"""
+    index: int
+    name: str
+    score: float
+    kcal: float
+    protein_g: float
+    fat_g: float
+    carbs_g: float
+
+
+def meal_targets(remaining: np.ndarray, meals_left: np.ndarray) -> np.ndarray:
+    """Цель на один приём пищи: остаток на день, поделённый на оставшиеся приёмы"""
+    return np.maximum(remaining, 0.0) / np.maximum(meals_left, 1.0)[:, None]
+
+
+class DishCatalog:
+    """
+    Каталог блюд.
+    nutrients — float32 (N, 4) на порцию, restriction_masks — uint64 (N,):
+    биты db.vocabulary.ingredients, которые блюдо содержит. Исключение — по
+    UserPreference.exclude_mask (аллергии, нелюбимое, диеты).
+    """
+
+    def __init__(self, names: Sequence[str], nutrients: np.ndarray, restriction_masks: np.ndarray):
+        self.names = list(names)
+        self.nutrients = np.ascontiguousarray(nutrients, dtype=np.float32).reshape(-1, 4)
+        self.restriction_masks = np.ascontiguousarray(restriction_masks, dtype=np.uint64)
+        # ||n - t||² = n² − 2·n·t + t²: слагаемое n² не зависит от пользователя
+        self._squared = self.nutrients ** 2
+
+    def __len__(self) -> int:
+        return len(self.nutrients)
+
+    def rank(self, remaining: Sequence[float], daily_targets: Sequence[float], exclude_mask: int = 0,
+             k: int = 5, meals_left: float = 1.0) -> List[DishScore]:
+        """Top-k блюд для одного пользователя"""
+        indices, scores = self.rank_batch(
+            [remaining], [daily_targets], [exclude_mask], k=k, meals_left=[meals_left]
+        )
+        return [
+            self._dish(int(index), float(score))
+            for index, score in zip(indices[0], scores[0])
+            if np.isfinite(score)
+        ]
+
+    def rank_batch(self, remaining: Sequence[Sequence[float]], daily_targets: Sequence[Sequence[float]],
+                   exclude_masks: Sequence[int], k: int = 5,
+                   meals_left: Optional[Sequence[float]] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Top-k для U пользователей сразу.
+        remaining / daily_targets — (U, 4) в порядке ккал, Б, Ж, У.
+        Возвращает индексы блюд (U, k) и их score (U, k), лучшие первыми;
+        -inf — подходящих блюд меньше k.
+        """
+        remaining = np.asarray(remaining, dtype=np.float32).reshape(-1, 4)
+        users = len(remaining)
+        k = min(k, len(self))
+        if k == 0:
+            return np.empty((users, 0), dtype=np.int64), np.empty((users, 0), dtype=np.float32)
+        if meals_left is None:
+            meals_left = np.ones(users, dtype=np.float32)
+        targets = meal_targets(remaining, np.asarray(meals_left, dtype=np.float32))
+        # Ошибка по каждому нутриенту в долях дневной нормы, чтобы ккал и граммы были сопоставимы
+        scale = np.maximum(np.asarray(daily_targets, dtype=np.float32).reshape(-1, 4), MIN_SCALE)
+        weights = NUTRIENT_WEIGHTS / scale ** 2  # (U, 4)
+        exclude_masks = np.asarray(exclude_masks, dtype=np.uint64)
+
+        indices = np.empty((users, k), dtype=np.int64)
+        scores = np.empty((users, k), dtype=np.float32)
+        for start in range(0, users, USERS_PER_CHUNK):
+            chunk = slice(start, start + USERS_PER_CHUNK)
+            w, t = weights[chunk], targets[chunk]
+            # −Σ w·(n − t)² для всех пар (пользователь, блюдо) двумя матричными умножениями
+            chunk_scores = 2.0 * (w * t) @ self.nutrients.T - w @ self._squared.T
+            chunk_scores -= (w * t * t).sum(axis=1, keepdims=True)
+            blocked = (self.restriction_masks[None, :] & exclude_masks[chunk, None]) != 0
+            chunk_scores[blocked] = -np.inf
+
+            top = np.argpartition(-chunk_scores, k - 1, axis=1)[:, :k]
+            top_scores = np.take_along_axis(chunk_scores, top, axis=1)
+            order = np.argsort(-top_scores, axis=1, kind="stable")
+            indices[chunk] = np.take_along_axis(top, order, axis=1)
+            scores[chunk] = np.take_along_axis(top_scores, order, axis=1)
+        return indices, scores
+
+    def _dish(self, index: int, score: float) -> DishScore:
+        kcal, protein, fat, carbs = (float(v) for v in self.nutrients[index])
+        return DishScore(index, self.names[index], score, kcal, protein, fat, carbs)
+
+    def save(self, directory: Path) -> None:
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        np.save(directory / "nutrients.npy", self.nutrients)
+        np.save(directory / "restriction_masks.npy", self.restriction_masks)
+        (directory / "names.txt").write_text("\n".join(self.names), encoding="utf-8")
+
+    @classmethod
+    def load(cls, directory: Path) -> "DishCatalog":
+        directory = Path(directory)
+        return cls(
+            (directory / "names.txt").read_text(encoding="utf-8").split("\n"),
+            np.load(directory / "nutrients.npy"),
+            np.load(directory / "restriction_masks.npy"),
+        )
+
+    @classmethod
+    def from_records(cls, records: Iterable[Tuple[str, float, float, float, float, int]]) -> "DishCatalog":
+        """Записи (название, ккал, белки, жиры, углеводы, маска ограничений)"""
+        names, nutrients, masks = [], [], []
+        for name, kcal, protein, fat, carbs, mask in records:
+            names.append(name)
+            nutrients.append((kcal, protein, fat, carbs))
+            masks.append(mask)
+        return cls(names, np.asarray(nutrients, dtype=np.float32), np.asarray(masks, dtype=np.uint64))
+
+    @classmethod
+    def from_csv(cls, csv_path: Path) -> "DishCatalog":
+        """CSV с колонками name,kcal,protein,fat,carbs и необязательной ingredients"""
+        with open(csv_path, encoding="utf-8", newline="") as f:
+            return cls.from_records(
+                (row["name"], float(row["kcal"]), float(row["protein"]), float(row["fat"]),
+                 float(row["carbs"]), vocabulary.ingredients.encode((row.get("ingredients") or "").split()))
+                for row in csv.DictReader(f)
+            )
+
+
+_catalog: Optional[DishCatalog] = None
+
+
+def get_dish_catalog() -> Optional[DishCatalog]:
+    """Каталог блюд из settings.DISH_CATALOG_PATH (загружается один раз на процесс)"""
+    global _catalog
+    if _catalog is None and settings.DISH_CATALOG_PATH and Path(settings.DISH_CATALOG_PATH).is_dir():
+        _catalog = DishCatalog.load(Path(settings.DISH_CATALOG_PATH))
+    return _catalog
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4 or sys.argv[1] != "build":
+        print("Использование: python -m backend.app.services.recsys build <dishes.csv> <каталог>")
+        sys.exit(1)
+    catalog = DishCatalog.from_csv(Path(sys.argv[2]))
+    catalog.save(Path(sys.argv[3]))
+    print(f"✅ Каталог блюд собран: {len(catalog)} записей → {sys.argv[3]}")
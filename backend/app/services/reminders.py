@@ -0,0 +1,291 @@
+"""
+Планировщик напоминаний (завтрак, взвешивание) на миллионы расписаний.
+
+- Расписания лежат в reminder_schedules, поэтому перезапуск ничего не теряет: пропущенные
+  за время простоя напоминания отправляются один раз при старте, дальше — по расписанию.
+- Пользователи разбиты на секции (user_id % REMINDER_PARTITIONS); воркеры делят их поровну
+  (heartbeat в scheduler_workers), арендуют в scheduler_leases и продлевают аренду. Упавший
+  воркер перестаёт продлевать — его секции забирают другие. Отправка проходит только по секциям под действующей арендой (claim_due),
+  так что два воркера одно напоминание не отправят.
+- В памяти — куча (next_run_ts, id) только на горизонт REMINDER_HORIZON_S вперёд:
+  вставка и извлечение O(log n), память ограничена REMINDER_MAX_QUEUED.
+- Наступившие напоминания забираются пачкой одним UPDATE ... RETURNING (время сдвигается
+  на следующий период до отправки: at-most-once) и уходят по полосе NOTIFICATION.
+"""
+import asyncio
+import heapq
+import logging
+import math
+import os
+import socket
+import time
+import uuid
+from datetime import timedelta
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramForbiddenError
+from sqlalchemy import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.app.bot.outbound import Lane, outbound_lane
+from backend.app.config import settings
+from backend.app.db.session import async_session_maker
+from backend.app.repositories.reminders_repo import RemindersRepository
+from backend.app.services.ai_profile import DynamicProfile, get_profile_service
+from backend.app.utils.localtime import EPOCH, local_date_of_ts, tz_offset
+
+logger = logging.getLogger(__name__)
+
+DAY_S = 86400
+WEEK_S = 7 * DAY_S
+SPREAD_S = 1800  # Напоминания одного времени размазываются на полчаса по user_id
+
+REMINDER_TEXTS = {
+    "breakfast": "🍳 Доброе утро! Не забудь позавтракать и записать завтрак — так проще держать ритм дня.",
+    "weigh_in": "⚖️ Время еженедельного взвешивания: взвесься утром натощак и запиши вес.",
+}
+
+# kind → (час, минута по локальному времени, день недели или None — ежедневно, период)
+DEFAULT_REMINDERS = {
+    "breakfast": (8, 30, None, DAY_S),
+    "weigh_in": (8, 0, 0, WEEK_S),
+}
+
+
+def partition_of(user_id: int) -> int:
+    return user_id % settings.REMINDER_PARTITIONS
+
+
+def next_occurrence(now_ts: int, hour: int, minute: int, weekday: Optional[int] = None,
+                    offset_s: int = 0) -> int:
+    """Ближайшее после now_ts локальное время hour:minute (+offset_s) в UNIX-секундах"""
+    tz = tz_offset()
+    local = EPOCH + timedelta(seconds=now_ts) + tz
+    target = local.replace(hour=hour, minute=minute, second=0, microsecond=0) + timedelta(seconds=offset_s)
+    if weekday is not None:
+        target += timedelta(days=(weekday - target.weekday()) % 7)
+    if target <= local:
+        target += timedelta(days=7 if weekday is not None else 1)
+    return int((target - tz - EPOCH).total_seconds())
+
+
+async def schedule_default_reminders(repo: RemindersRepository, user_id: int, chat_id: int,
+                                     now_ts: Optional[int] = None) -> None:
+    """Напоминания по умолчанию новому пользователю (уже настроенные не меняются)"""
+    now_ts = now_ts or int(time.time())
+    offset_s = user_id * 7919 % SPREAD_S
+    for kind, (hour, minute, weekday, interval_s) in DEFAULT_REMINDERS.items():
+        next_run_ts = next_occurrence(now_ts, hour, minute, weekday, offset_s)
+        # Владелец секции подхватит расписание при загрузке окна (или при перечитке, если
+        # оно попало в уже загруженное окно — тогда с опозданием до REMINDER_RESYNC_S)
+        await repo.schedule(
+            user_id, chat_id, kind, partition_of(user_id), next_run_ts, interval_s, replace=False
+        )
+
+
+def wants_breakfast_nudge(profile: DynamicProfile, now_ts: int) -> bool:
+    """Напоминать о завтраке тем, кто ещё не завтракал сегодня и завтракает нерегулярно"""
+    today = local_date_of_ts(now_ts).toordinal()
+    if profile.day == today and profile.breakfast_today:
+        return False
+    consistency = profile.breakfast_consistency
+    return consistency is None or consistency < settings.REMINDER_BREAKFAST_SKIP
+
+
+class ReminderStats:
+    def __init__(self):
+        self.sent = 0
+        self.skipped = 0
+        self.failed = 0
+        self.blocked = 0
+
+    def as_dict(self) -> dict:
+        return {"sent": self.sent, "skipped": self.skipped, "failed": self.failed, "blocked": self.blocked}
+
+
+class ReminderScheduler:
+    """Один на процесс: аренда секций, куча ближайших напоминаний и пакетная отправка"""
+
+    def __init__(self, bot: Bot, session_factory: Callable[[], AsyncSession] = async_session_maker,
+                 owner: Optional[str] = None):
+        self.bot = bot
+        self.session_factory = session_factory
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.partitions: Set[int] = set()
+        self.stats = ReminderStats()
+        self._heap: List[Tuple[int, int, int]] = []  # (next_run_ts, id, partition)
+        self._queued: Set[int] = set()
+        # Всё с ключом (next_run_ts, id) <= курсора уже в куче (или отправлено)
+        self._cursor: Tuple[int, int] = (0, 0)
+        self._resync_at = 0.0
+        self._wakeup = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self) -> None:
+        # Секции, аренда и первая загрузка расписаний — в фоне: готовность процесса их не ждёт
+        self._tasks = [asyncio.create_task(self._maintain_loop()), asyncio.create_task(self._fire_loop())]
+        logger.info(f"✅ Планировщик напоминаний {self.owner} запущен")
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        try:
+            async with self.session_factory() as session:
+                await RemindersRepository(session).release_leases(self.owner)
+        except Exception as e:
+            # Остановку не срываем: аренды истекут сами через REMINDER_LEASE_TTL_S
+            logger.warning(f"⚠️ Планировщик напоминаний {self.owner}: аренды не отданы: {e}")
+        self.partitions.clear()
+        logger.info(f"✅ Планировщик напоминаний {self.owner} остановлен: {self.stats.as_dict()}")
+
+    # --- Аренда и загрузка кучи ---
+
+    async def _maintain_loop(self) -> None:
+        partitions_ready = False
+        while True:
+            try:
+                if not partitions_ready:
+                    async with self.session_factory() as session:
+                        await RemindersRepository(session).ensure_partitions(settings.REMINDER_PARTITIONS)
+                    partitions_ready = True
+                await self._maintain()
+            except Exception as e:
+                logger.error(f"❌ Планировщик напоминаний: ошибка обслуживания: {e}", exc_info=True)
+            await asyncio.sleep(settings.REMINDER_LEASE_TTL_S / 3)
+
+    async def _maintain(self) -> None:
+        now_ts = int(time.time())
+        async with self.session_factory() as session:
+            repo = RemindersRepository(session)
+            # Поровну между живыми воркерами: новый воркер получает секции, которые отдают соседи
+            workers = await repo.heartbeat(self.owner, now_ts, settings.REMINDER_LEASE_TTL_S)
+            partitions = await repo.renew_leases(
+                self.owner, now_ts, settings.REMINDER_LEASE_TTL_S,
+                max_owned=math.ceil(settings.REMINDER_PARTITIONS / workers)
+            )
+            if partitions != self.partitions:
+                gained, lost = partitions - self.partitions, self.partitions - partitions
+                logger.info(f"🔄 Напоминания: секции +{len(gained)} −{len(lost)}, всего {len(partitions)}")
+                self.partitions = partitions
+                if lost:
+                    self._heap = [entry for entry in self._heap if entry[2] in partitions]
+                    heapq.heapify(self._heap)
+                    self._queued = {entry[1] for entry in self._heap}
+                if gained:
+                    self._cursor = (0, 0)
+            if time.monotonic() >= self._resync_at:
+                self._cursor = (0, 0)
+                self._resync_at = time.monotonic() + settings.REMINDER_RESYNC_S
+            await self._refill(repo, now_ts)
+
+    async def _refill(self, repo: RemindersRepository, now_ts: int) -> None:
+        """Догрузить в кучу расписания своих секций до now + горизонт (keyset от курсора)"""
+        if not self.partitions:
+            return
+        until_ts = now_ts + settings.REMINDER_HORIZON_S
+        added = 0
+        while (room := settings.REMINDER_MAX_QUEUED - len(self._heap)) > 0:
+            rows = await repo.get_upcoming(self.partitions, self._cursor, until_ts, min(room, 10_000))
+            for schedule_id, partition, next_run_ts in rows:
+                if schedule_id not in self._queued:
+                    heapq.heappush(self._heap, (next_run_ts, schedule_id, partition))
+                    self._queued.add(schedule_id)
+                    added += 1
+            if rows:
+                self._cursor = (rows[-1].next_run_ts, rows[-1].id)
+            if len(rows) < min(room, 10_000):
+                # Окно прочитано целиком: курсор — до конца горизонта
+                self._cursor = max(self._cursor, (until_ts, 0))
+                break
+        if added:
+            self._wakeup.set()
+
+    # --- Отправка ---
+
+    async def _fire_loop(self) -> None:
+        while True:
+            self._wakeup.clear()
+            delay = self._heap[0][0] - time.time() if self._heap else settings.REMINDER_LEASE_TTL_S
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            now_ts = int(time.time())
+            due: List[int] = []
+            while self._heap and self._heap[0][0] <= now_ts and len(due) < settings.REMINDER_BATCH_SIZE:
+                _, schedule_id, _ = heapq.heappop(self._heap)
+                self._queued.discard(schedule_id)
+                due.append(schedule_id)
+            try:
+                await self._dispatch(due, now_ts)
+            except Exception as e:
+                logger.error(f"❌ Напоминания: пачка из {len(due)} не обработана: {e}", exc_info=True)
+
+    async def _dispatch(self, schedule_ids: List[int], now_ts: int) -> None:
+        async with self.session_factory() as session:
+            rows = await RemindersRepository(session).claim_due(schedule_ids, now_ts, self.owner)
+        # Повторяющееся напоминание с периодом меньше горизонта возвращается в кучу сразу
+        for row in rows:
+            if row.enabled and (row.next_run_ts, row.id) <= self._cursor and row.id not in self._queued:
+                heapq.heappush(self._heap, (row.next_run_ts, row.id, row.partition))
+                self._queued.add(row.id)
+
+        rows = await self._filter(rows, now_ts)
+        blocked: List[int] = []
+
+        async def send(row: Row) -> None:
+            try:
+                await self.bot.send_message(row.chat_id, REMINDER_TEXTS[row.kind])
+                self.stats.sent += 1
+            except TelegramForbiddenError:
+                self.stats.blocked += 1
+                blocked.append(row.user_id)
+            except Exception as e:
+                self.stats.failed += 1
+                logger.warning(f"⚠️ Напоминание {row.kind} не доставлено user {row.user_id}: {e}")
+
+        with outbound_lane(Lane.NOTIFICATION):
+            await asyncio.gather(*(send(row) for row in rows))
+        if blocked:
+            async with self.session_factory() as session:
+                await RemindersRepository(session).disable_for_users(blocked)
+
+    async def _filter(self, rows: List[Row], now_ts: int) -> List[Row]:
+        """Завтрак — только тем, кому он нужен по AI-профилю (breakfast_consistency)"""
+        breakfast = [row for row in rows if row.kind == "breakfast"]
+        if not breakfast:
+            return rows
+        service = get_profile_service()
+        profiles = await asyncio.gather(*(service.get(row.user_id) for row in breakfast), return_exceptions=True)
+        skip: Dict[int, bool] = {}
+        for row, profile in zip(breakfast, profiles):
+            # Профиль недоступен — лучше напомнить, чем промолчать
+            skip[row.id] = not isinstance(profile, BaseException) and not wants_breakfast_nudge(profile, now_ts)
+        self.stats.skipped += sum(skip.values())
+        return [row for row in rows if not skip.get(row.id, False)]
+
+
+scheduler: Optional[ReminderScheduler] = None
+
+
+async def start_reminders(bot: Bot) -> Optional[ReminderScheduler]:
+    """Запустить планировщик напоминаний процесса (settings.REMINDERS_ENABLED)"""
+    global scheduler
+    if not settings.REMINDERS_ENABLED:
+        return None
+    scheduler = ReminderScheduler(bot)
+    await scheduler.start()
+    return scheduler
+
+
+async def stop_reminders() -> None:
+    global scheduler
+    if scheduler is not None:
+        await scheduler.stop()
+        scheduler = None
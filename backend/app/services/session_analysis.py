@@ -0,0 +1,164 @@
+"""
+Сценарий 4: завершение сессии → AI-анализ питания.
+
+Хэндлер только ставит задачу session_analysis; данные (цель, дневные сводки,
+AI-профиль) грузит воркер, разбор считается в пуле процессов (analyze_session —
+чистая функция от словаря), готовый текст уходит пользователю сообщением.
+"""
+import logging
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from aiogram import Bot
+from aiogram.exceptions import TelegramForbiddenError
+
+from backend.app.bot.outbound import Lane, outbound_lane
+from backend.app.db.session import async_session_maker
+from backend.app.jobs.queue import Job, JobType, enqueue_job, register_job_type
+from backend.app.repositories.goals_repo import GoalsRepository
+from backend.app.repositories.meals_repo import NUTRIENTS, MealsRepository
+from backend.app.services.ai_profile import get_profile_service
+from backend.app.utils.localtime import local_date
+
+logger = logging.getLogger(__name__)
+
+SESSION_ANALYSIS = "session_analysis"
+HISTORY_DAYS = 28
+ON_TARGET = 0.1  # День «в цели», если калории в пределах ±10% от нормы
+MIN_TREND_DAYS = 5  # Меньше записанных дней — тренд не оцениваем
+
+
+async def load_session(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Цель, сводки за HISTORY_DAYS дней и выжимка AI-профиля (только примитивы — уходят в процесс)"""
+    user_id = payload["user_id"]
+    async with async_session_maker() as session:
+        goal = await GoalsRepository(session).get_latest_for_user(user_id)
+        history = await MealsRepository(session).get_daily_totals(user_id, days=HISTORY_DAYS)
+        targets = None
+        if goal is not None:
+            targets = [goal.target_calories, goal.target_protein_g, goal.target_fat_g, goal.target_carbs_g]
+        days = [
+            {"day": day.day.toordinal(), "meals": day.meals_count, **{name: getattr(day, name) for name in NUTRIENTS}}
+            for day in history
+        ]
+    try:
+        profile = (await get_profile_service().get(user_id)).summary()
+    except Exception as e:
+        logger.warning(f"⚠️ AI-профиль для разбора недоступен: {e}")
+        profile = {}
+    return {"today": local_date().toordinal(), "targets": targets, "days": days, "profile": profile}
+
+
+def analyze_session(data: Dict[str, Any]) -> str:
+    """Текст разбора: сегодня против цели, попадание в норму, тренд, будни/выходные, привычки"""
+    targets = data["targets"]
+    if not targets or not data["days"]:
+        return "📋 Пока мало данных для разбора. Записывай приёмы пищи — и я подведу итоги!"
+
+    target = np.asarray(targets, dtype=np.float64)
+    days = sorted(data["days"], key=lambda row: row["day"])
+    ordinals = np.asarray([row["day"] for row in days])
+    eaten = np.asarray([[row[name] for name in NUTRIENTS] for row in days], dtype=np.float64)
+    calories = eaten[:, 0]
+    lines: List[str] = ["🏁 Итоги дня"]
+
+    today = eaten[ordinals == data["today"]]
+    if len(today):
+        share = today[0] / np.maximum(target, 1.0)
+        lines.append(
+            f"• Сегодня: {today[0][0]:.0f} из {target[0]:.0f} ккал ({share[0]:.0%}); "
+            f"Б {share[1]:.0%} / Ж {share[2]:.0%} / У {share[3]:.0%} от нормы"
+        )
+        lines.extend(_macro_hints(share))
+    else:
+        lines.append("• Сегодня записей нет")
+
+    deviation = np.abs(calories / max(target[0], 1.0) - 1.0)
+    on_target = int(np.count_nonzero(deviation <= ON_TARGET))
+    lines.append(
+        f"• За {HISTORY_DAYS} дн.: записей {len(days)} дн., в норме (±{ON_TARGET:.0%}) — {on_target}; "
+        f"в среднем {calories.mean():.0f} ккал, белка {eaten[:, 1].mean() / max(target[1], 1.0):.0%} от нормы"
+    )
+
+    trend = _calories_trend(ordinals, calories)
+    if trend is not None:
+        direction = "растут" if trend > 0 else "снижаются"
+        lines.append(f"• Калории {direction} на ~{abs(trend) * 7:.0f} ккал в неделю")
+
+    weekend = np.asarray([date.fromordinal(int(day)).weekday() >= 5 for day in ordinals])
+    if weekend.any() and (~weekend).any():
+        difference = calories[weekend].mean() - calories[~weekend].mean()
+        if abs(difference) > ON_TARGET * target[0]:
+            more_or_less = "больше" if difference > 0 else "меньше"
+            lines.append(f"• В выходные ешь на {abs(difference):.0f} ккал {more_or_less}, чем в будни")
+
+    lines.extend(_habit_hints(data.get("profile") or {}))
+    return "\n".join(lines)
+
+
+def _calories_trend(ordinals: np.ndarray, calories: np.ndarray) -> Optional[float]:
+    """Наклон линейной регрессии калорий по дням, ккал/день (None — мало точек или нет тренда)"""
+    if len(ordinals) < MIN_TREND_DAYS:
+        return None
+    x = ordinals - ordinals.mean()
+    slope = float(np.dot(x, calories - calories.mean()) / max(np.dot(x, x), 1e-9))
+    residual = calories - calories.mean() - slope * x
+    # Тренд заметен, если за период он больше разброса вокруг прямой
+    if abs(slope) * (ordinals.max() - ordinals.min()) < residual.std():
+        return None
+    return slope
+
+
+def _macro_hints(share: np.ndarray) -> List[str]:
+    hints = []
+    if share[1] < 0.7:
+        hints.append("💡 Белка маловато — добавь творог, яйца или птицу")
+    if share[2] > 1.2:
+        hints.append("💡 Жиров больше нормы — присмотрись к соусам и перекусам")
+    if share[3] > 1.2:
+        hints.append("💡 Углеводов больше нормы — сладкое лучше заменить фруктами")
+    return hints
+
+
+def _habit_hints(profile: Dict[str, Any]) -> List[str]:
+    hints = []
+    breakfast = profile.get("breakfast_consistency")
+    if breakfast is not None and breakfast < 0.5:
+        hints.append("🍳 Завтракаешь реже, чем через день — завтрак помогает не переедать вечером")
+    evening = profile.get("evening_snack_rate")
+    if evening is not None and evening > 0.3:
+        hints.append("🌙 Часто перекусываешь поздно вечером — попробуй поужинать плотнее")
+    return hints
+
+
+async def send_analysis(bot: Bot, job: Job, text: str) -> None:
+    with outbound_lane(Lane.NOTIFICATION):
+        try:
+            await bot.send_message(job.payload["chat_id"], text)
+        except TelegramForbiddenError:
+            logger.info(f"🔄 Разбор не доставлен: user {job.payload['user_id']} заблокировал бота")
+
+
+async def send_failure(bot: Bot, job: Job, error: Exception) -> None:
+    with outbound_lane(Lane.NOTIFICATION):
+        await bot.send_message(job.payload["chat_id"], "⚠️ Не получилось подготовить разбор. Попробуй позже!")
+
+
+register_job_type(JobType(
+    SESSION_ANALYSIS,
+    compute=analyze_session,
+    load=load_session,
+    on_result=send_analysis,
+    on_failure=send_failure,
+    timeout_s=30.0
+))
+
+
+async def request_session_analysis(user_id: int, chat_id: int) -> bool:
+    """Поставить разбор дня; False — разбор уже готовится"""
+    return await enqueue_job(
+        SESSION_ANALYSIS,
+        {"user_id": user_id, "chat_id": chat_id},
+        dedup_key=f"{SESSION_ANALYSIS}:{user_id}:{local_date().isoformat()}"
+    )
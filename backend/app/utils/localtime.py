@@ -0,0 +1,29 @@
+"""
+Локальное время пользователей: одна граница суток для сводок КБЖУ, разбора дня, AI-профиля
+и напоминаний. Время в БД хранится в UTC (naive), пояс — settings.PROFILE_TZ_OFFSET_H.
+"""
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+from backend.app.config import settings
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def tz_offset() -> timedelta:
+    return timedelta(hours=settings.PROFILE_TZ_OFFSET_H)
+
+
+def local_time(moment: Optional[datetime] = None) -> datetime:
+    """Момент UTC → локальное время (None — сейчас)"""
+    return (moment or datetime.utcnow()) + tz_offset()
+
+
+def local_date(moment: Optional[datetime] = None) -> date:
+    """Локальный день момента UTC (None — сегодня)"""
+    return local_time(moment).date()
+
+
+def local_date_of_ts(ts: float) -> date:
+    """Локальный день UNIX-времени"""
+    return local_date(EPOCH + timedelta(seconds=ts))
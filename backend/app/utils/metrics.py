@@ -0,0 +1,231 @@
+"""
+Метрики в текстовом формате Prometheus без внешних зависимостей.
+
+Счётчики и гистограммы обновляются из event loop: в одном потоке блокировки не нужны,
+а запись — это инкремент элемента заранее созданного списка (без аллокаций на вызов,
+если дочерняя серия с метками получена заранее через labels()). Текст собирается
+только при запросе /metrics. Значения «на момент запроса» (пул БД, очереди) отдают
+коллекторы — функции, вызываемые при рендере.
+"""
+import asyncio
+import math
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# (суффикс имени, метки, значение); (имя, тип, описание, [сэмплы])
+Sample = Tuple[str, Dict[str, str], float]
+Family = Tuple[str, str, str, List[Sample]]
+
+# Латентность, секунды: 1 мс … 10 с
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.2, 0.5, 1.0, 2.5, 5.0, 10.0)
+ROW_BUCKETS = (0, 1, 5, 10, 50, 100, 500, 1000, 10_000)
+
+
+class CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+
+class HistogramChild:
+    """Гистограмма с фиксированными границами: counts[i] — наблюдения в (bounds[i-1], bounds[i]]"""
+
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # Последний — +Inf
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        if not self.labelnames:
+            self._default = self.labels()
+
+    def labels(self, *values: str):
+        """Серия с метками (создаётся при первом обращении и дальше переиспользуется)"""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name}: ожидались метки {self.labelnames}, получено {values}")
+            child = self._children[values] = self._new_child()
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _label_dict(self, values: Tuple[str, ...]) -> Dict[str, str]:
+        return dict(zip(self.labelnames, values))
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self) -> CounterChild:
+        return CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default.inc(amount)
+
+    def collect(self) -> Iterable[Family]:
+        samples = [("", self._label_dict(values), child.value) for values, child in self._children.items()]
+        yield self.name + "_total", self.kind, self.description, samples
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, description, labelnames)
+
+    def _new_child(self) -> HistogramChild:
+        return HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._default.observe(value)
+
+    def collect(self) -> Iterable[Family]:
+        samples: List[Sample] = []
+        for values, child in self._children.items():
+            labels = self._label_dict(values)
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), child.counts):
+                cumulative += count
+                samples.append(("_bucket", {**labels, "le": _format_value(bound)}, cumulative))
+            samples.append(("_sum", labels, child.sum))
+            samples.append(("_count", labels, cumulative))
+        yield self.name, self.kind, self.description, samples
+
+
+class Registry:
+    """Набор метрик и коллекторов процесса"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], Iterable[Family]]] = []
+
+    def counter(self, name: str, description: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, description, labelnames))
+
+    def histogram(self, name: str, description: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, description, labelnames, buckets))
+
+    def collector(self, fn: Callable[[], Iterable[Family]]) -> Callable[[], Iterable[Family]]:
+        """Функция, возвращающая семейства метрик на момент запроса (можно как декоратор)"""
+        self._collectors.append(fn)
+        return fn
+
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Метрика {metric.name} уже зарегистрирована")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """Текстовый формат Prometheus (exposition format 0.0.4)"""
+        lines: List[str] = []
+        families = [family for metric in self._metrics.values() for family in metric.collect()]
+        for collect in self._collectors:
+            families.extend(collect())
+        for name, kind, description, samples in families:
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {kind}")
+            for suffix, labels, value in samples:
+                lines.append(f"{name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def gauges(name: str, description: str, values: Dict[str, float], label: str) -> Family:
+    """Семейство gauge для коллектора: {значение метки: значение}"""
+    return name, "gauge", description, [("", {label: key}, value) for key, value in values.items()]
+
+
+def gauge(name: str, description: str, value: float) -> Family:
+    return name, "gauge", description, [("", {}, value)]
+
+
+def counters(name: str, description: str, values: Dict[str, float], label: str) -> Family:
+    """Семейство counter для коллектора: монотонные суммы, которые ведёт сам компонент"""
+    return name + "_total", "counter", description, [("", {label: key}, value) for key, value in values.items()]
+
+
+def counter(name: str, description: str, value: float) -> Family:
+    return name + "_total", "counter", description, [("", {}, value)]
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+registry = Registry()
+
+LOOP_LAG = registry.histogram(
+    "event_loop_lag_seconds", "Опоздание пробуждения event loop относительно расписания",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+_loop_lag_last = 0.0
+
+
+@registry.collector
+def _loop_lag_gauge() -> Iterable[Family]:
+    yield gauge("event_loop_lag_last_seconds", "Последний замер опоздания event loop", _loop_lag_last)
+
+
+async def monitor_loop_lag(interval: float = 0.5) -> None:
+    """Фоновая задача: насколько позже запланированного просыпается sleep(interval)"""
+    global _loop_lag_last
+    while True:
+        expected = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+        _loop_lag_last = max(0.0, time.perf_counter() - expected)
+        LOOP_LAG.observe(_loop_lag_last)
+
+
+_lag_task: Optional[asyncio.Task] = None
+
+
+def start_loop_lag_monitor(interval: float = 0.5) -> None:
+    global _lag_task
+    if _lag_task is None:
+        _lag_task = asyncio.create_task(monitor_loop_lag(interval))
+
+
+async def stop_loop_lag_monitor() -> None:
+    global _lag_task
+    if _lag_task is not None:
+        _lag_task.cancel()
+        await asyncio.gather(_lag_task, return_exceptions=True)
+        _lag_task = None
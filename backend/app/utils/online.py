@@ -0,0 +1,117 @@
+"""
+Онлайн-статистики постоянного размера: EWMA, кольцевой буфер, top-k (Space-Saving).
+Каждая обновляется за O(1) и сериализуется в компактный список для хранения в документе.
+"""
+from typing import Dict, Generic, Hashable, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class Ewma:
+    """Экспоненциальное скользящее среднее; первые значения усредняются честно (bias correction)"""
+
+    __slots__ = ("alpha", "value", "count")
+
+    def __init__(self, alpha: float, value: float = 0.0, count: int = 0):
+        self.alpha = alpha
+        self.value = value
+        self.count = count
+
+    def update(self, x: float) -> float:
+        self.count += 1
+        # Пока наблюдений мало, шаг 1/n: среднее не тянется к начальному нулю
+        step = max(self.alpha, 1.0 / self.count)
+        self.value += step * (x - self.value)
+        return self.value
+
+    def get(self) -> Optional[float]:
+        return self.value if self.count else None
+
+    def to_state(self) -> list:
+        return [round(self.value, 6), self.count]
+
+    @classmethod
+    def from_state(cls, alpha: float, state: Optional[list]) -> "Ewma":
+        return cls(alpha, *state) if state else cls(alpha)
+
+
+class RingBuffer(Generic[T]):
+    """Последние size значений"""
+
+    __slots__ = ("size", "items", "head")
+
+    def __init__(self, size: int, items: Optional[List[T]] = None, head: int = 0):
+        self.size = size
+        self.items: List[T] = list(items or [])[:size]
+        self.head = head % size if self.items else 0
+
+    def append(self, item: T) -> None:
+        if len(self.items) < self.size:
+            self.items.append(item)
+        else:
+            self.items[self.head] = item
+            self.head = (self.head + 1) % self.size
+
+    def values(self) -> List[T]:
+        """От старых к новым"""
+        return self.items[self.head:] + self.items[:self.head]
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def to_state(self) -> list:
+        return self.values()
+
+    @classmethod
+    def from_state(cls, size: int, state: Optional[list]) -> "RingBuffer":
+        # Состояние хранится от старых к новым, поэтому после загрузки head = 0
+        return cls(size, (state or [])[-size:])
+
+
+class SpaceSaving:
+    """
+    Приближённый top-k частых элементов (Metwally et al.) на capacity счётчиках.
+    Для элементов с частотой выше N / capacity оценка count гарантированно не ниже истинной.
+    """
+
+    __slots__ = ("capacity", "counts", "errors")
+
+    def __init__(self, capacity: int, counts: Optional[Dict[Hashable, float]] = None,
+                 errors: Optional[Dict[Hashable, float]] = None):
+        self.capacity = capacity
+        self.counts: Dict[Hashable, float] = dict(counts or {})
+        self.errors: Dict[Hashable, float] = dict(errors or {})
+
+    def add(self, item: Hashable, weight: float = 1.0) -> None:
+        if item in self.counts:
+            self.counts[item] += weight
+            return
+        if len(self.counts) < self.capacity:
+            self.counts[item] = weight
+            self.errors[item] = 0.0
+            return
+        # Вытесняем минимальный счётчик; capacity фиксирована, поэтому поиск минимума — O(1)
+        victim = min(self.counts, key=self.counts.__getitem__)
+        floor = self.counts.pop(victim)
+        self.errors.pop(victim, None)
+        self.counts[item] = floor + weight
+        self.errors[item] = floor
+
+    def top(self, k: int) -> List[Tuple[Hashable, float]]:
+        return sorted(self.counts.items(), key=lambda pair: pair[1], reverse=True)[:k]
+
+    def clear(self) -> None:
+        self.counts.clear()
+        self.errors.clear()
+
+    def to_state(self) -> list:
+        return [[item, round(count, 3), round(self.errors[item], 3)] for item, count in self.counts.items()]
+
+    @classmethod
+    def from_state(cls, capacity: int, state: Optional[list]) -> "SpaceSaving":
+        sketch = cls(capacity)
+        for item, count, error in state or []:
+            sketch.counts[item] = count
+            sketch.errors[item] = error
+        return sketch
+
@@ -0,0 +1,53 @@
+"""
+Пул процессов для вычислений из event loop, переживающий гибель процесса-воркера
+"""
+import asyncio
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+
+from backend.app.utils.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+POOL_RESTARTS = registry.counter("process_pool_restarts", "Пересозданий пула процессов после BrokenProcessPool", ["pool"])
+
+
+class ProcessPool:
+    """
+    ProcessPoolExecutor, создаваемый при первом вызове. Если процесс пула умер (OOM killer,
+    segfault в нативной библиотеке), исполнитель навсегда становится broken — такой пул
+    закрывается и следующий вызов получает новый. Сам вызов, заставший поломку, падает
+    с BrokenProcessPool: повторять его — решение вызывающего.
+    """
+
+    def __init__(self, name: str, max_workers: int):
+        self.name = name
+        self.max_workers = max_workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """fn(*args) в процессе пула"""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        executor = self._executor
+        try:
+            return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+        except BrokenProcessPool:
+            self._replace(executor)
+            raise
+
+    def _replace(self, broken: ProcessPoolExecutor) -> None:
+        # Поломку застают все вызовы в полёте — пересоздаём один раз
+        if self._executor is not broken:
+            return
+        logger.warning(f"⚠️ Пул процессов {self.name} сломан (процесс завершился), создаём новый")
+        broken.shutdown(wait=False, cancel_futures=True)
+        self._executor = None
+        POOL_RESTARTS.labels(self.name).inc()
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
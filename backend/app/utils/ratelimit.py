@@ -0,0 +1,109 @@
+"""
+Ограничение частоты: асинхронный token bucket
+"""
+import asyncio
+import heapq
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """rate токенов в секунду, запас до capacity; acquire() ждёт, пока токен появится"""
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens: float = 1.0) -> float:
+        """Взять токены без ожидания; возвращает 0 при успехе, иначе сколько секунд ждать"""
+        self._refill()
+        if self._tokens >= tokens:
+            self._tokens -= tokens
+            return 0.0
+        return (tokens - self._tokens) / self.rate
+
+    async def acquire(self, tokens: float = 1.0) -> None:
+        """Дождаться и взять токены (ожидающие обслуживаются по очереди)"""
+        async with self._lock:
+            while True:
+                delay = self.try_acquire(tokens)
+                if not delay:
+                    return
+                await asyncio.sleep(delay)
+
+
+class PriorityTokenBucket(TokenBucket):
+    """
+    Token bucket с приоритетами: токен достаётся ожидающему с наименьшим priority,
+    при равенстве — пришедшему раньше. pause() временно не выдаёт токены низким приоритетам.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        super().__init__(rate, capacity)
+        self._waiters: list = []  # heap (priority, seq, tokens, future)
+        self._seq = 0
+        self._changed = asyncio.Event()
+        self._pump_task: Optional[asyncio.Task] = None
+        self._paused_until = 0.0
+        self._pause_from_priority = 0
+
+    def waiting(self, priority: Optional[int] = None) -> int:
+        """Сколько ожидающих (всего или с данным приоритетом)"""
+        return sum(
+            1 for p, _, _, future in self._waiters
+            if not future.done() and (priority is None or p == priority)
+        )
+
+    def pause(self, seconds: float, from_priority: int = 0) -> None:
+        """Не выдавать токены приоритетам >= from_priority ближайшие seconds секунд"""
+        now = time.monotonic()
+        if now >= self._paused_until:
+            self._pause_from_priority = from_priority
+        else:
+            self._pause_from_priority = min(self._pause_from_priority, from_priority)
+        self._paused_until = max(self._paused_until, now + seconds)
+        self._changed.set()
+
+    async def acquire(self, tokens: float = 1.0, priority: int = 0) -> None:
+        # Быстрый путь: очереди нет и токен есть
+        if not self._waiters and not self._paused(priority) and not self.try_acquire(tokens):
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._seq += 1
+        heapq.heappush(self._waiters, (priority, self._seq, tokens, future))
+        self._changed.set()
+        if self._pump_task is None or self._pump_task.done():
+            self._pump_task = asyncio.create_task(self._pump())
+        await future
+
+    def _paused(self, priority: int) -> bool:
+        return priority >= self._pause_from_priority and time.monotonic() < self._paused_until
+
+    async def _pump(self) -> None:
+        while self._waiters:
+            priority, _, tokens, future = self._waiters[0]
+            if future.done():  # Ожидающий отменён
+                heapq.heappop(self._waiters)
+                continue
+            if self._paused(priority):
+                delay = self._paused_until - time.monotonic()
+            else:
+                delay = self.try_acquire(tokens)
+            if not delay:
+                heapq.heappop(self._waiters)
+                future.set_result(None)
+                continue
+            # Ждём токен, но просыпаемся раньше, если пришёл более приоритетный ожидающий или пауза
+            self._changed.clear()
+            try:
+                await asyncio.wait_for(self._changed.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,43 @@
+"""
+Профиль холодного старта: время импорта приложения и фаз lifespan.
+Итог пишется в лог одной строкой и отдаётся в /metrics (startup_phase_seconds).
+"""
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator
+
+from backend.app.utils.metrics import Family, gauges, registry
+
+
+class StartupProfile:
+    def __init__(self):
+        self.phases: Dict[str, float] = {}  # Порядок вставки = порядок фаз
+
+    def imported(self, since: float) -> None:
+        """Отметить конец импорта приложения (since — perf_counter() до первых тяжёлых импортов)"""
+        self.phases["import"] = time.perf_counter() - since
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = time.perf_counter() - started
+
+    @property
+    def total(self) -> float:
+        return sum(self.phases.values())
+
+    def __str__(self) -> str:
+        parts = ", ".join(f"{name} {seconds * 1000:.0f} мс" for name, seconds in self.phases.items())
+        return f"{parts} — всего {self.total * 1000:.0f} мс"
+
+
+profile = StartupProfile()
+
+
+@registry.collector
+def _startup_metrics() -> Iterable[Family]:
+    if profile.phases:
+        yield gauges("startup_phase_seconds", "Длительность фаз холодного старта", profile.phases, "phase")
@@ -0,0 +1,58 @@
+"""
+Бенчмарк CV-клиента на локальной заглушке: по одному фото за вызов vs micro-batching
+
+Запуск (из корня репозитория):
+    python -m backend.benchmarks.bench_cv_client --requests 2000 --concurrency 200
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from backend.app.clients.cv_client import CVClient
+from backend.app.clients.grpc_base import ChannelPool
+from backend.app.clients.stubs.cv_server import start_server
+
+
+async def run(label: str, client: CVClient, requests: int, concurrency: int) -> None:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one() -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            await client.recognize(os.urandom(2048))
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    p = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000
+    print(f"{label:<22} {requests / elapsed:8.1f} фото/с  p50={p(0.5):7.2f} ms  p95={p(0.95):7.2f} ms  p99={p(0.99):7.2f} ms")
+    await client.close()
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--window-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    server = await start_server(0)
+    target = f"127.0.0.1:{server.bound_port}"
+    try:
+        await run("unary", CVClient(ChannelPool(target), deadline=30), args.requests, args.concurrency)
+        await run(
+            f"batched ({args.window_ms} ms)",
+            CVClient(ChannelPool(target), deadline=30, batch_window=args.window_ms / 1000, max_batch_size=32),
+            args.requests, args.concurrency
+        )
+    finally:
+        await server.stop(None)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
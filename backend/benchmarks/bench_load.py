@@ -0,0 +1,307 @@
+"""
+Нагрузочный тест бота в одном процессе: синтетические обновления через настоящий router
+
+Каждый виртуальный пользователь проходит регистрацию (UserRegistration) и затем случайные
+действия из меню (история, запись еды, профиль, свободный текст) — последовательно, как
+в одном чате Telegram; пользователи работают одновременно. Telegram заменён фейковой
+сессией (с задержкой --tg-latency-ms), БД — временный SQLite в режиме WAL (или --database-url).
+
+Отчёт: пропускная способность и p50/p95/p99 на обновление — всего, по хэндлерам и по
+FSM-состоянию до обработки. С --baseline результаты сравниваются с сохранённой базовой
+линией (p95 хуже на --tolerance или ошибки в прогоне → код выхода 1).
+
+Запуск (из корня репозитория):
+    python -m backend.benchmarks.bench_load --users 100 --actions 20
+    python -m backend.benchmarks.bench_load --users 100 --save-baseline backend/benchmarks/bench_load_baseline.json
+    python -m backend.benchmarks.bench_load --users 100 --baseline backend/benchmarks/bench_load_baseline.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List
+
+H1_P95_MS = 200.0  # Гипотеза H1 (architecture.md): p95 < 200 мс при 100 одновременных пользователях
+MIN_SAMPLES = 20  # Меньше замеров — сравнение с базовой линией не показательно
+LABEL_WIDTH = 52
+SECTIONS = (("handlers", "хэндлер"), ("states", "состояние"))
+
+FOODS = [
+    ("гречка", 343, 13.3, 3.4, 72.6),
+    ("рис отварной", 130, 2.7, 0.3, 28.2),
+    ("куриная грудка", 165, 31.0, 3.6, 0.0),
+    ("овсянка", 352, 12.3, 6.1, 59.5),
+    ("творог 5%", 121, 17.2, 5.0, 1.8),
+    ("яблоко", 47, 0.4, 0.4, 9.8),
+    ("омлет", 184, 9.6, 15.4, 1.9),
+    ("борщ", 49, 1.1, 2.2, 6.7),
+]
+
+GENDERS = ["👨 Мужской", "👩 Женский"]
+ACTIVITIES = ["🛋️ Сидячий", "🚶 Лёгкая активность", "🏃 Умеренная активность", "💪 Высокая активность"]
+GOALS = ["📉 Похудеть", "⚖️ Поддерживать вес", "📈 Набрать вес"]
+
+
+def registration(rng: random.Random) -> List[str]:
+    weight = rng.randint(50, 110)
+    return [
+        "/start",
+        str(rng.randint(18, 70)),
+        rng.choice(GENDERS),
+        str(rng.randint(155, 195)),
+        str(weight),
+        rng.choice(ACTIVITIES),
+        rng.choice(GOALS),
+        str(weight + rng.randint(-10, 10)),
+        str(rng.randint(15, 30) * 100),
+    ]
+
+
+def log_meal(rng: random.Random) -> List[str]:
+    return ["📷 Добавить приём пищи", f"{rng.choice(FOODS)[0]} {rng.randint(5, 40) * 10}"]
+
+
+# Действие из меню → (вес, сообщения)
+ACTIONS: Dict[str, tuple] = {
+    "history": (3, lambda rng: ["📊 История питания"]),
+    "meal": (4, log_meal),
+    "profile": (1, lambda rng: ["⚙️ Мой профиль"]),
+    "free_text": (2, lambda rng: [rng.choice(["спасибо 👍", "что съесть на ужин?", "устал сегодня"])]),
+    "recommendations": (1, lambda rng: ["💡 Рекомендации"]),
+}
+
+
+def percentiles(samples: List[float]) -> Dict[str, Any]:
+    values = sorted(samples)
+    p = lambda q: round(values[min(len(values) - 1, int(q * len(values)))] * 1000, 2)
+    return {"count": len(values), "p50_ms": p(0.5), "p95_ms": p(0.95), "p99_ms": p(0.99)}
+
+
+class Recorder:
+    """Задержки обновлений с разбивкой по хэндлеру и FSM-состоянию"""
+
+    def __init__(self):
+        self.total: List[float] = []
+        self.handlers: Dict[str, List[float]] = defaultdict(list)
+        self.states: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    def outer(self) -> Callable:
+        """Middleware dp.update: время всего обновления (FSM storage, хэндлер, commit)"""
+        async def middleware(handler: Callable[..., Awaitable[Any]], event: Any, data: Dict[str, Any]) -> Any:
+            probe = data["load_probe"] = {"handler": "unhandled"}
+            state = data.get("raw_state") or "none"
+            started = time.perf_counter()
+            try:
+                return await handler(event, data)
+            except Exception as e:
+                message = str(e).splitlines()[0][:80] if str(e) else ""
+                self.errors[f"{type(e).__name__}: {message}"] += 1
+                probe["handler"] += ":error"
+                raise
+            finally:
+                elapsed = time.perf_counter() - started
+                self.total.append(elapsed)
+                self.handlers[probe["handler"]].append(elapsed)
+                self.states[state].append(elapsed)
+        return middleware
+
+    @staticmethod
+    async def inner(handler: Callable[..., Awaitable[Any]], event: Any, data: Dict[str, Any]) -> Any:
+        """Middleware router.message: какой хэндлер выбран (данные уходят в outer через probe)"""
+        probe = data.get("load_probe")
+        if probe is not None:
+            probe["handler"] = data["handler"].callback.__name__
+        return await handler(event, data)
+
+    def report(self, elapsed_s: float) -> Dict[str, Any]:
+        return {
+            "total": {**percentiles(self.total), "throughput_per_s": round(len(self.total) / elapsed_s, 1)},
+            "handlers": {name: percentiles(values) for name, values in sorted(self.handlers.items())},
+            "states": {name: percentiles(values) for name, values in sorted(self.states.items())},
+            "errors": dict(self.errors),
+        }
+
+
+def print_report(result: Dict[str, Any]) -> None:
+    total = result["total"]
+    print(f"\nОбновлений: {total['count']}, {total['throughput_per_s']}/с, ошибок: {sum(result['errors'].values())}")
+    for error, count in result["errors"].items():
+        print(f"  {count} × {error}")
+    print(f"{'':<{LABEL_WIDTH}} {'n':>7} {'p50, ms':>9} {'p95, ms':>9} {'p99, ms':>9}")
+    print(f"{'всего':<{LABEL_WIDTH}} {total['count']:>7} {total['p50_ms']:>9} {total['p95_ms']:>9} {total['p99_ms']:>9}")
+    for section, title in SECTIONS:
+        for name, row in result[section].items():
+            label = f"{title}: {name}"[:LABEL_WIDTH]
+            print(f"{label:<{LABEL_WIDTH}} {row['count']:>7} {row['p50_ms']:>9} {row['p95_ms']:>9} {row['p99_ms']:>9}")
+    verdict = "✅" if total["p95_ms"] < H1_P95_MS else "❌"
+    print(f"\n{verdict} H1: p95 {total['p95_ms']} ms (цель < {H1_P95_MS:.0f} ms)")
+
+
+def compare(result: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> int:
+    """Сравнить p95 с базовой линией; возвращает число регрессий (ошибки прогона — тоже регрессия)"""
+    regressions = 0
+    print(f"\nСравнение с базовой линией ({baseline.get('created_at', '?')}), допуск +{tolerance:.0%} к p95:")
+    errors = sum(result["errors"].values())
+    if errors:
+        print(f"❌ Ошибок в прогоне: {errors} (в базовой линии {sum(baseline.get('errors', {}).values())})")
+        regressions += 1
+    rows = [("всего", result["total"], baseline["total"])]
+    for section, title in SECTIONS:
+        for name, row in result[section].items():
+            if name in baseline.get(section, {}):
+                rows.append((f"{title}: {name}", row, baseline[section][name]))
+    for label, current, base in rows:
+        if current["count"] < MIN_SAMPLES or base["count"] < MIN_SAMPLES or not base["p95_ms"]:
+            continue
+        change = current["p95_ms"] / base["p95_ms"] - 1
+        regressed = change > tolerance
+        regressions += regressed
+        mark = "❌" if regressed else "  "
+        print(f"{mark} {label[:LABEL_WIDTH]:<{LABEL_WIDTH}} {base['p95_ms']:>9} → {current['p95_ms']:>9} ms ({change:+.0%})")
+    return regressions
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    # Импорты после настройки окружения: settings читаются при импорте backend.app.config
+    from aiogram import Bot, Dispatcher
+    from aiogram.client.session.base import BaseSession
+    from aiogram.fsm.storage.memory import MemoryStorage
+    from aiogram.methods import EditMessageText, SendMessage
+    from aiogram.types import Chat, Message, Update
+
+    from backend.app.bot.handlers import router
+    from backend.app.config import settings
+    from backend.app.db.documents import close_document_store
+    from backend.app.db.session import dispose_db, init_db
+    from backend.app.services.food_db import FoodStore
+
+    class FakeSession(BaseSession):
+        """Telegram Bot API без сети: ответ через tg_latency, Message для send/edit"""
+
+        def __init__(self, latency_s: float):
+            super().__init__()
+            self.latency_s = latency_s
+            self.message_id = 0
+
+        async def make_request(self, bot, method, timeout=None):
+            if self.latency_s:
+                await asyncio.sleep(self.latency_s)
+            if isinstance(method, (SendMessage, EditMessageText)):
+                self.message_id += 1
+                chat = Chat(id=method.chat_id or 0, type="private")
+                return Message(message_id=self.message_id, date=datetime.now(), chat=chat, text=method.text).as_(bot)
+            return True
+
+        async def stream_content(self, *args, **kwargs):
+            yield b""
+
+        async def close(self) -> None:
+            pass
+
+    food_dir = Path(args.workdir) / "food_db"
+    FoodStore.build(FOODS, food_dir)
+    settings.FOOD_DB_PATH = str(food_dir)
+    await init_db()
+
+    bot = Bot(token=settings.TELEGRAM_BOT_TOKEN, session=FakeSession(args.tg_latency_ms / 1000))
+    dp = Dispatcher(storage=MemoryStorage())
+    recorder = Recorder()
+    dp.update.outer_middleware(recorder.outer())
+    router.message.middleware(Recorder.inner)
+    dp.include_router(router)
+
+    actions = {name: spec for name, spec in ACTIONS.items() if name != "recommendations" or args.recommendations}
+    names, weights = list(actions), [actions[name][0] for name in actions]
+    update_ids = iter(range(1, sys.maxsize))
+
+    async def feed(user_id: int, text: str) -> None:
+        update = Update.model_validate({
+            "update_id": next(update_ids),
+            "message": {
+                "message_id": next(update_ids),
+                "date": int(time.time()),
+                "chat": {"id": user_id, "type": "private"},
+                "from": {"id": user_id, "is_bot": False, "first_name": f"Load{user_id}"},
+                "text": text,
+            },
+        })
+        try:
+            await dp.feed_update(bot, update)
+        except Exception:
+            pass  # Уже учтено в Recorder
+
+    async def virtual_user(user_id: int) -> None:
+        rng = random.Random(args.seed * 1_000_003 + user_id)
+        script = registration(rng)
+        for _ in range(args.actions):
+            script += actions[rng.choices(names, weights)[0]][1](rng)
+        for text in script:
+            await feed(user_id, text)
+            if args.think_ms:
+                await asyncio.sleep(rng.expovariate(1000 / args.think_ms))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(virtual_user(10_000_000 + i) for i in range(args.users)))
+    elapsed = time.perf_counter() - started
+
+    await close_document_store()
+    await dispose_db()
+    return recorder.report(elapsed)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=100, help="Одновременных виртуальных пользователей")
+    parser.add_argument("--actions", type=int, default=20, help="Действий из меню на пользователя после регистрации")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="Средняя пауза пользователя между сообщениями")
+    parser.add_argument("--tg-latency-ms", type=float, default=0.0, help="Задержка ответа фейкового Telegram")
+    parser.add_argument("--recommendations", action="store_true", help="Включить «💡 Рекомендации» (нужен NLP Module)")
+    parser.add_argument("--database-url", help="По умолчанию — временный SQLite")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", type=Path, help="Сравнить с базовой линией (JSON)")
+    parser.add_argument("--save-baseline", type=Path, help="Сохранить результат как базовую линию")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Допустимый рост p95 относительно базовой линии")
+    args = parser.parse_args()
+
+    args.workdir = tempfile.mkdtemp(prefix="bench_load_")
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite+aiosqlite:///{args.workdir}/bench.db"
+    os.environ.setdefault("TELEGRAM_BOT_TOKEN", "123456:ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghi")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    # SQLite пишет по одному; busy handler не FIFO, и под 100 писателями 5 с ожидания не хватает
+    os.environ.setdefault("DB_SQLITE_BUSY_TIMEOUT_MS", "30000")
+    os.environ["PROFILE_STORE"] = "sqlite"
+    os.environ["PROFILE_SQLITE_PATH"] = f"{args.workdir}/profiles.sqlite3"
+    try:
+        result = asyncio.run(run(args))
+    finally:
+        shutil.rmtree(args.workdir, ignore_errors=True)
+
+    print_report(result)
+    regressions = 0
+    if args.baseline:
+        regressions = compare(result, json.loads(args.baseline.read_text()), args.tolerance)
+    if args.save_baseline and result["errors"]:
+        print("\n❌ Прогон с ошибками не сохраняется как базовая линия")
+        sys.exit(1)
+    if args.save_baseline:
+        result["created_at"] = datetime.now().isoformat(timespec="seconds")
+        result["params"] = {"users": args.users, "actions": args.actions, "think_ms": args.think_ms,
+                            "tg_latency_ms": args.tg_latency_ms, "seed": args.seed}
+        args.save_baseline.write_text(json.dumps(result, ensure_ascii=False, indent=2))
+        print(f"\n💾 Базовая линия сохранена: {args.save_baseline}")
+    if regressions:
+        print(f"\n❌ Регрессий p95: {regressions}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Бенчмарк накладных расходов метрик: примитивы, MetricsMiddleware и события SQL
+
+Каждый слой сравнивается с собой же без метрик: обновление через Dispatcher (пустой хэндлер)
+без и с MetricsMiddleware; SQL-запрос на движке без и с instrument_engine (SQLite в памяти,
+одно соединение). Раунды чередуются, берётся минимум по раундам — он меньше всего зашумлён.
+
+Запуск (из корня репозитория):
+    python -m backend.benchmarks.bench_metrics --n 5000 --rounds 10
+"""
+import argparse
+import asyncio
+import time
+
+from aiogram import Bot, Dispatcher, Router
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.types import Message, Update
+from sqlalchemy import text
+
+from backend.app.bot.middlewares import MetricsMiddleware
+from backend.app.db.session import build_engine, instrument_engine
+from backend.app.utils.metrics import Registry
+
+TOKEN = "123456:ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghi"
+
+
+def bench_primitives(n: int) -> None:
+    registry = Registry()
+    histogram = registry.histogram("bench_seconds", "bench", ["handler"]).labels("h")
+    counter = registry.counter("bench", "bench", ["handler"]).labels("h")
+    for label, op in (("histogram.observe", lambda: histogram.observe(0.0123)), ("counter.inc", counter.inc)):
+        started = time.perf_counter()
+        for _ in range(n):
+            op()
+        print(f"{label:<22} {(time.perf_counter() - started) / n * 1e9:8.1f} ns/op")
+
+
+def make_dispatcher(with_metrics: bool) -> Dispatcher:
+    router = Router()
+    if with_metrics:
+        router.message.middleware(MetricsMiddleware())
+
+    @router.message()
+    async def handler(message: Message) -> None:
+        pass
+
+    dp = Dispatcher(storage=MemoryStorage())
+    dp.include_router(router)
+    return dp
+
+
+async def feed_updates(dp: Dispatcher, bot: Bot, updates: list) -> float:
+    started = time.perf_counter()
+    for update in updates:
+        await dp.feed_update(bot, update)
+    return (time.perf_counter() - started) / len(updates)
+
+
+async def run_queries(engine, n: int) -> float:
+    async with engine.connect() as conn:
+        started = time.perf_counter()
+        for _ in range(n):
+            await conn.execute(text("SELECT 1"))
+        return (time.perf_counter() - started) / n
+
+
+def report(label: str, plain: list, metered: list) -> None:
+    base, with_metrics = min(plain), min(metered)
+    print(
+        f"{label:<22} без метрик {base * 1e6:7.1f} µs, с метриками {with_metrics * 1e6:7.1f} µs "
+        f"(+{(with_metrics - base) * 1e6:.1f} µs, {with_metrics / base - 1:+.1%})"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--n", type=int, default=5000, help="Обновлений / запросов в раунде")
+    parser.add_argument("--rounds", type=int, default=10)
+    args = parser.parse_args()
+
+    bench_primitives(1_000_000)
+
+    bot = Bot(token=TOKEN)
+    plain_dp, metered_dp = make_dispatcher(with_metrics=False), make_dispatcher(with_metrics=True)
+    updates = [
+        Update.model_validate({
+            "update_id": i,
+            "message": {
+                "message_id": i, "date": 0, "text": "hi",
+                "chat": {"id": 1000 + i % 100, "type": "private"},
+                "from": {"id": 1000 + i % 100, "is_bot": False, "first_name": "Bench"},
+            },
+        })
+        for i in range(args.n)
+    ]
+    plain_engine = build_engine("sqlite+aiosqlite:///:memory:")
+    metered_engine = build_engine("sqlite+aiosqlite:///:memory:")
+    instrument_engine(metered_engine)
+
+    results = {name: [] for name in ("dp", "dp+metrics", "sql", "sql+metrics")}
+    for _ in range(args.rounds):
+        results["dp"].append(await feed_updates(plain_dp, bot, updates))
+        results["dp+metrics"].append(await feed_updates(metered_dp, bot, updates))
+        results["sql"].append(await run_queries(plain_engine, args.n))
+        results["sql+metrics"].append(await run_queries(metered_engine, args.n))
+
+    report("обновление (Dispatcher)", results["dp"], results["dp+metrics"])
+    report("SQL-запрос", results["sql"], results["sql+metrics"])
+
+    await bot.session.close()
+    await plain_engine.dispose()
+    await metered_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
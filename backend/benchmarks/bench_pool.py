@@ -0,0 +1,70 @@
+"""
+Бенчмарк: NullPool vs пул соединений под всплеском одновременных /start
+
+Запуск (из корня репозитория):
+    python -m backend.benchmarks.bench_pool --concurrency 100 --rounds 5
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from backend.app.db import models  # noqa: F401  регистрирует таблицы в Base.metadata
+from backend.app.db.session import Base, build_engine, get_pool_stats
+from backend.app.repositories.users_repo import UsersRepository
+
+
+async def start_command(session_maker, telegram_id: str) -> float:
+    """Та же работа с БД, что делает cmd_start"""
+    started = time.perf_counter()
+    async with session_maker() as session:
+        await UsersRepository(session).get_or_create(
+            telegram_user_id=telegram_id,
+            username=f"user{telegram_id}",
+            first_name="Bench"
+        )
+    return time.perf_counter() - started
+
+
+async def run_mode(url: str, pool_mode: str, concurrency: int, rounds: int) -> None:
+    engine = build_engine(url, pool_mode=pool_mode)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(rounds):
+        # Первый раунд — новые пользователи, следующие — повторный /start
+        ids = [f"bench-{pool_mode}-{i}" for i in range(concurrency)]
+        latencies += await asyncio.gather(*(start_command(session_maker, tid) for tid in ids))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    p = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000
+    print(
+        f"{pool_mode:>5}: {len(latencies) / elapsed:8.1f} req/s  "
+        f"p50={p(0.50):7.2f} ms  p95={p(0.95):7.2f} ms  p99={p(0.99):7.2f} ms  "
+        f"mean={statistics.mean(latencies) * 1000:7.2f} ms"
+    )
+    stats = get_pool_stats(engine)
+    if stats:
+        print(f"       pool: {stats}")
+    await engine.dispose()
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", default=None, help="DATABASE_URL (по умолчанию из настроек)")
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    for mode in ("null", "queue"):
+        await run_mode(args.url, mode, args.concurrency, args.rounds)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,47 @@
+"""
+Бенчмарк ранжирования RecSys на синтетическом каталоге: по одному пользователю и пачкой
+
+Запуск (из корня репозитория):
+    python -m backend.benchmarks.bench_recsys --dishes 100000 --users 1000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from backend.app.services.recsys import DishCatalog
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--dishes", type=int, default=100_000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    nutrients = rng.uniform([50, 0, 0, 0], [900, 60, 50, 120], size=(args.dishes, 4))
+    masks = rng.integers(0, 1 << 16, size=args.dishes, dtype=np.uint64) & rng.integers(0, 1 << 16, size=args.dishes, dtype=np.uint64)
+    catalog = DishCatalog([f"dish {i}" for i in range(args.dishes)], nutrients, masks)
+
+    daily = rng.uniform([1500, 80, 50, 150], [3000, 180, 100, 350], size=(args.users, 4))
+    remaining = daily * rng.uniform(0.1, 1.0, size=(args.users, 1))
+    exclude = rng.integers(0, 1 << 16, size=args.users, dtype=np.uint64) & 0b1010_0000_0001
+
+    latencies = []
+    for u in range(args.users):
+        started = time.perf_counter()
+        catalog.rank(remaining[u], daily[u], int(exclude[u]), k=args.k, meals_left=2)
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    p = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000
+    print(f"rank (по одному)   p50={p(0.5):6.2f} ms  p95={p(0.95):6.2f} ms  p99={p(0.99):6.2f} ms")
+
+    started = time.perf_counter()
+    catalog.rank_batch(remaining, daily, exclude, k=args.k, meals_left=np.full(args.users, 2.0))
+    elapsed = time.perf_counter() - started
+    print(f"rank_batch ({args.users})  {elapsed * 1000:8.1f} ms всего  {elapsed * 1000 / args.users:6.2f} ms/пользователь")
+
+
+if __name__ == "__main__":
+    main()
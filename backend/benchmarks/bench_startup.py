@@ -0,0 +1,111 @@
+"""
+Бенчмарк холодного старта: время импорта приложения по пакетам и фазы lifespan
+
+Импорт: `python -X importtime -c "import backend.app.main"` в чистом процессе, собственное
+время модулей суммируется по пакетам (backend.app.* — по подмодулям). Старт: lifespan
+в отдельном процессе (BOT_MODE=webhook без WEBHOOK_URL — без сетевых запросов) на временной
+SQLite-БД; первый запуск применяет миграции, следующие — только проверяют версию схемы.
+Для каждого замера берётся минимум по запускам.
+
+Запуск (из корня репозитория):
+    python -m backend.benchmarks.bench_startup --runs 5 --top 15
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+LIFESPAN_SCRIPT = """
+import asyncio, json
+from backend.app.main import app, lifespan
+from backend.app.utils.startup import profile
+
+async def main():
+    async with lifespan(app):
+        pass
+
+asyncio.run(main())
+print(json.dumps(profile.phases))
+"""
+
+
+def bench_env(directory: Path) -> Dict[str, str]:
+    return {
+        **os.environ,
+        "DATABASE_URL": f"sqlite+aiosqlite:///{directory / 'bench.db'}",
+        "TELEGRAM_BOT_TOKEN": "123456:ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghi",
+        "BOT_MODE": "webhook",
+        "WEBHOOK_URL": "",
+        "PROFILE_SQLITE_PATH": str(directory / "profiles.sqlite3"),
+        "LOG_LEVEL": "WARNING",
+    }
+
+
+def package_of(module: str) -> str:
+    parts = module.split(".")
+    return ".".join(parts[:3]) if parts[0] == "backend" else parts[0]
+
+
+def profile_imports(env: Dict[str, str]) -> Tuple[float, Dict[str, float]]:
+    """(полное время импорта, собственное время по пакетам), секунды"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import backend.app.main"],
+        env=env, capture_output=True, text=True, check=True
+    )
+    packages: Dict[str, float] = defaultdict(float)
+    total = 0.0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:"):].split("|")
+        packages[package_of(module.strip())] += int(self_us) / 1e6
+        if module.strip() == "backend.app.main":
+            total = int(cumulative_us) / 1e6
+    return total, packages
+
+
+def run_lifespan(env: Dict[str, str]) -> Dict[str, float]:
+    result = subprocess.run(
+        [sys.executable, "-c", LIFESPAN_SCRIPT], env=env, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def report_phases(label: str, runs: List[Dict[str, float]]) -> None:
+    phases = {name: min(run[name] for run in runs) for name in runs[0]}
+    parts = ", ".join(f"{name} {seconds * 1000:.0f}" for name, seconds in phases.items())
+    print(f"{label:<34} {sum(phases.values()) * 1000:7.0f} мс  ({parts})")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="Сколько пакетов показать")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        env = bench_env(Path(directory))
+        run_lifespan(env)  # Прогрев .pyc
+
+        imports = [profile_imports(env) for _ in range(args.runs)]
+        total = min(run[0] for run in imports)
+        packages = {name: min(run[1].get(name, 0.0) for run in imports) for name in imports[0][1]}
+        print(f"Импорт backend.app.main: {total * 1000:.0f} мс; собственное время по пакетам:")
+        for name, seconds in sorted(packages.items(), key=lambda item: -item[1])[:args.top]:
+            print(f"  {name:<40} {seconds * 1000:7.1f} мс")
+
+        Path(directory, "bench.db").unlink()
+        first = [run_lifespan(env)]
+        warm = [run_lifespan(env) for _ in range(args.runs)]
+        print()
+        report_phases("Первый старт (миграции):", first)
+        report_phases("Старт на готовой схеме:", warm)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Микробенчмарк: ORM update/delete (загрузка + изменение + refresh) vs UPDATE/DELETE ... RETURNING
+
+Запуск (из корня репозитория):
+    python -m backend.benchmarks.bench_update_paths --rows 500
+"""
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import select
+
+from backend.app.db.models import User
+from backend.app.db.session import Base, engine, async_session_maker, dispose_db
+from backend.app.repositories.users_repo import UsersRepository
+
+PROFILE = {"age": 30, "gender": "M", "height_cm": 180.0, "weight_kg": 75.5, "activity_level": "moderate"}
+
+
+async def orm_delete(session, obj_id: int) -> None:
+    """Прежний путь delete: SELECT + DELETE"""
+    user = (await session.execute(select(User).where(User.id == obj_id))).scalar_one_or_none()
+    await session.delete(user)
+    await session.commit()
+
+
+async def timed(label: str, ids: list[int], op) -> None:
+    started = time.perf_counter()
+    for obj_id in ids:
+        # Новая сессия на каждую операцию — как в хэндлере
+        async with async_session_maker() as session:
+            await op(UsersRepository(session), obj_id)
+    elapsed = time.perf_counter() - started
+    print(f"{label:<28} {elapsed / len(ids) * 1e6:9.1f} µs/op  ({len(ids)} ops)")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=500)
+    args = parser.parse_args()
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with async_session_maker() as session:
+        repo = UsersRepository(session)
+        prefix = f"bench-upd-{time.time_ns()}"
+        await repo.bulk_create([{"telegram_user_id": f"{prefix}-{i}"} for i in range(args.rows * 2)])
+        ids = (await session.execute(
+            select(User.id).where(User.telegram_user_id.like(f"{prefix}-%")).order_by(User.id)
+        )).scalars().all()
+
+    half = ids[:args.rows], ids[args.rows:]
+    await timed("update (ORM + refresh)", half[0], lambda repo, i: repo.update(i, PROFILE))
+    await timed("patch (UPDATE RETURNING)", half[0], lambda repo, i: repo.patch(i, PROFILE))
+    await timed("delete (SELECT + DELETE)", half[0], lambda repo, i: orm_delete(repo.session, i))
+    await timed("delete (DELETE RETURNING)", half[1], lambda repo, i: repo.delete(i))
+    await dispose_db()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
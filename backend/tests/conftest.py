@@ -0,0 +1,23 @@
+"""
+Общие настройки тестов: окружение задаётся до импорта backend.app (settings читаются при импорте),
+асинхронные тесты идут через плагин anyio на asyncio.
+
+Запуск (из корня репозитория):
+    python -m pytest -q backend/tests
+"""
+import os
+import tempfile
+
+import pytest
+
+_workdir = tempfile.mkdtemp(prefix="nutrition_bot_tests_")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_workdir}/test.db"
+os.environ["TELEGRAM_BOT_TOKEN"] = "123456:ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghi"
+os.environ["PROFILE_STORE"] = "sqlite"
+os.environ["PROFILE_SQLITE_PATH"] = f"{_workdir}/profiles.sqlite3"
+os.environ["LOG_LEVEL"] = "WARNING"
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
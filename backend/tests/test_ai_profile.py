@@ -0,0 +1,100 @@
+"""
+AI-профиль: условная запись документа (compare-and-swap) и обновление после commit
+"""
+import asyncio
+
+import pytest
+
+from backend.app.bot.middlewares import UnitOfWorkMiddleware
+from backend.app.db.documents import REVISION, SQLiteDocumentStore
+from backend.app.services.ai_profile import COLLECTION, ProfileService
+
+MEAL = {"calories": 300.0, "protein_g": 20.0, "fat_g": 10.0, "carbs_g": 30.0}
+
+
+@pytest.fixture
+async def stores(tmp_path):
+    # Два хранилища на одном файле — как два воркера uvicorn
+    path = str(tmp_path / "profiles.sqlite3")
+    stores = [SQLiteDocumentStore(path), SQLiteDocumentStore(path)]
+    yield stores
+    for store in stores:
+        await store.close()
+
+
+@pytest.mark.anyio
+async def test_put_if_unchanged(stores):
+    store = stores[0]
+    assert await store.put_if_unchanged("c", 1, {"x": 1}, revision=None)
+    assert not await store.put_if_unchanged("c", 1, {"x": 2}, revision=None)
+    assert await store.get("c", 1) == {"x": 1, REVISION: 1}
+
+    assert await store.put_if_unchanged("c", 1, {"x": 3}, revision=1)
+    assert not await store.put_if_unchanged("c", 1, {"x": 4}, revision=1)
+    assert await store.get("c", 1) == {"x": 3, REVISION: 2}
+
+    # Документ, записанный до появления ревизий, считается ревизией 0
+    await store.put("c", 2, {"x": 1})
+    assert await store.put_if_unchanged("c", 2, {"x": 5}, revision=0)
+    assert (await store.get("c", 2))[REVISION] == 1
+
+
+@pytest.mark.anyio
+async def test_concurrent_updates_are_not_lost(stores):
+    services = [ProfileService(store) for store in stores]
+    await asyncio.gather(*(
+        services[i % 2].record_meal(7, "гречка", MEAL) for i in range(20)
+    ), *(
+        services[i % 2].record_message(7, "спасибо, отлично") for i in range(10)
+    ))
+
+    profile = await services[0].get(7)
+    assert sum(profile.meal_hours) == 20
+    assert profile.message_length.count == 10
+    assert (await stores[0].get(COLLECTION, 7))[REVISION] == 30
+
+
+class FakeUnitOfWork:
+    def __init__(self):
+        self.log = []
+        self.callbacks = []
+
+    def after_commit(self, callback):
+        self.callbacks.append(callback)
+
+    async def commit(self):
+        self.log.append("commit")
+
+    async def rollback(self):
+        self.log.append("rollback")
+
+    async def close(self):
+        self.log.append("close")
+
+    async def run_after_commit(self):
+        for callback in self.callbacks:
+            await callback()
+
+
+@pytest.mark.anyio
+async def test_after_commit_runs_after_connection_is_released(monkeypatch):
+    uow = FakeUnitOfWork()
+    monkeypatch.setattr("backend.app.bot.middlewares.UnitOfWork", lambda: uow)
+
+    async def handler(event, data):
+        async def update_profile():
+            uow.log.append("profile")
+        data["uow"].after_commit(update_profile)
+        return "ok"
+
+    assert await UnitOfWorkMiddleware()(handler, None, {}) == "ok"
+    assert uow.log == ["commit", "close", "profile"]
+
+    async def failing(event, data):
+        data["uow"].after_commit(lambda: uow.log.append("never"))
+        raise ValueError("boom")
+
+    uow.log, uow.callbacks = [], []
+    with pytest.raises(ValueError):
+        await UnitOfWorkMiddleware()(failing, None, {})
+    assert uow.log == ["rollback", "close"]
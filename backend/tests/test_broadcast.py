@@ -0,0 +1,139 @@
+"""
+Рассылка: продолжение упавшего запуска с контрольной точки, короткие сессии чтения
+"""
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+from aiogram.exceptions import TelegramForbiddenError
+from aiogram.methods import SendMessage
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from backend.app.db.migrations import run_migrations
+from backend.app.db.models import User
+from backend.app.db.session import build_engine
+from backend.app.jobs.broadcast import broadcast
+from backend.app.repositories.broadcasts_repo import BroadcastsRepository
+
+USERS = 10
+BLOCKED_CHAT = 1002
+
+
+class FakeBot:
+    """send_message без сети; после stall_after отправок зависает (как упавший процесс)"""
+
+    def __init__(self, stall_after=None):
+        self.sent = []
+        self.stall_after = stall_after
+        self.stalled = asyncio.Event()
+        self.resume = asyncio.Event()
+
+    async def send_message(self, chat_id, text):
+        if self.stall_after is not None and len(self.sent) >= self.stall_after:
+            self.stalled.set()
+            await self.resume.wait()
+        if chat_id == BLOCKED_CHAT:
+            raise TelegramForbiddenError(SendMessage(chat_id=chat_id, text=text), "bot was blocked by the user")
+        self.sent.append(chat_id)
+
+
+class Sessions:
+    """Фабрика сессий, считающая открытые сессии"""
+
+    def __init__(self, engine):
+        self.maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        self.open = 0
+
+    @asynccontextmanager
+    async def __call__(self):
+        self.open += 1
+        try:
+            async with self.maker() as session:
+                yield session
+        finally:
+            self.open -= 1
+
+
+@pytest.fixture
+async def sessions(tmp_path):
+    engine = build_engine(f"sqlite+aiosqlite:///{tmp_path / 'broadcast.db'}", pool_mode="null")
+    await run_migrations(engine)
+    sessions = Sessions(engine)
+    async with sessions() as session:
+        session.add_all(
+            User(telegram_user_id=str(1000 + i), first_name=f"user{i}", is_active=True) for i in range(1, USERS + 1)
+        )
+        await session.commit()
+    yield sessions
+    await engine.dispose()
+
+
+async def get_run(sessions, name):
+    async with sessions() as session:
+        return await BroadcastsRepository(session).get_by_name(name)
+
+
+@pytest.mark.anyio
+async def test_resume_after_crash(sessions):
+    bot = FakeBot(stall_after=6)
+    run = asyncio.create_task(
+        broadcast(bot, "news", "Привет, {first_name}!", concurrency=2, batch_size=3, session_factory=sessions)
+    )
+    await asyncio.wait_for(bot.stalled.wait(), 5)
+    await asyncio.sleep(0.2)  # Контрольная точка после второй пачки успевает записаться
+    run.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await run
+
+    checkpoint = await get_run(sessions, "news")
+    assert checkpoint.status == "running"
+    assert checkpoint.last_user_id == 6
+    assert checkpoint.blocked == 1
+    delivered_before = set(bot.sent)
+
+    bot = FakeBot()
+    stats = await broadcast(bot, "news", "Привет, {first_name}!", concurrency=2, batch_size=3, session_factory=sessions)
+    # Продолжение только после контрольной точки; заблокировавший бота больше не получает сообщений
+    assert sorted(bot.sent) == [1000 + i for i in range(7, USERS + 1)]
+    assert delivered_before | set(bot.sent) == {1000 + i for i in range(1, USERS + 1)} - {BLOCKED_CHAT}
+    assert stats.blocked == 1
+    assert (await get_run(sessions, "news")).status == "done"
+
+    async with sessions() as session:
+        blocked = await session.get(User, 2)
+        assert blocked.is_active is False
+
+    # Завершённая рассылка повторно не отправляется
+    bot = FakeBot()
+    await broadcast(bot, "news", "Привет, {first_name}!", session_factory=sessions)
+    assert bot.sent == []
+
+
+@pytest.mark.anyio
+async def test_resume_with_different_text_is_refused(sessions):
+    bot = FakeBot(stall_after=3)
+    run = asyncio.create_task(broadcast(bot, "news", "Старый текст", concurrency=1, batch_size=3, session_factory=sessions))
+    await asyncio.wait_for(bot.stalled.wait(), 5)
+    run.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await run
+
+    bot = FakeBot()
+    with pytest.raises(ValueError, match="другим текстом"):
+        await broadcast(bot, "news", "Новый текст", session_factory=sessions)
+    assert bot.sent == []
+    assert (await get_run(sessions, "news")).text == "Старый текст"
+
+
+@pytest.mark.anyio
+async def test_read_session_closed_while_queue_is_full(sessions):
+    bot = FakeBot(stall_after=0)
+    run = asyncio.create_task(broadcast(bot, "promo", "Акция", concurrency=1, batch_size=3, session_factory=sessions))
+    await asyncio.wait_for(bot.stalled.wait(), 5)
+    await asyncio.sleep(0.2)  # Продюсер заполнил очередь и ждёт места
+    assert sessions.open == 0
+    bot.resume.set()
+
+    stats = await asyncio.wait_for(run, 5)
+    assert len(bot.sent) == USERS - 1
+    assert stats.blocked == 1
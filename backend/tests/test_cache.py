@@ -0,0 +1,106 @@
+"""
+LRU-кэш с TTL и схлопывание одновременных запросов (SingleFlight)
+"""
+import asyncio
+
+import pytest
+
+from backend.app.utils import cache
+from backend.app.utils.cache import LRUCache, SingleFlight
+
+
+def test_lru_evicts_least_recently_used():
+    lru = LRUCache(maxsize=2)
+    lru.set("a", 1)
+    lru.set("b", 2)
+    assert lru.get("a") == 1  # "a" стал свежее "b"
+    lru.set("c", 3)
+
+    assert "b" not in lru
+    assert lru.get("a") == 1 and lru.get("c") == 3
+    assert len(lru) == 2
+
+    lru.pop("a")
+    lru.pop("missing")
+    assert lru.get("a", "default") == "default"
+
+
+def test_lru_ttl_expires_entries(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    lru = LRUCache(maxsize=10, ttl=5)
+    lru.set("a", 1)
+
+    now[0] = 104.9
+    assert lru.get("a") == 1
+    now[0] = 105.1
+    assert lru.get("a") is None
+    assert len(lru) == 0
+
+
+@pytest.mark.anyio
+async def test_single_flight_runs_once_for_concurrent_calls():
+    flights = SingleFlight()
+    calls = 0
+    release = asyncio.Event()
+
+    async def load():
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return "value"
+
+    tasks = [asyncio.create_task(flights.do("k", load)) for _ in range(5)]
+    await asyncio.sleep(0)
+    assert len(flights) == 1
+    release.set()
+
+    assert await asyncio.gather(*tasks) == ["value"] * 5
+    assert calls == 1
+    assert len(flights) == 0
+
+
+@pytest.mark.anyio
+async def test_single_flight_shares_exception_then_retries():
+    flights = SingleFlight()
+    calls = 0
+
+    async def load():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0)
+        if calls == 1:
+            raise ValueError("boom")
+        return calls
+
+    results = await asyncio.gather(flights.do("k", load), flights.do("k", load), return_exceptions=True)
+    assert [type(result) for result in results] == [ValueError, ValueError]
+    # Ошибка не кэшируется: следующий вызов выполняется заново
+    assert await flights.do("k", load) == 2
+
+
+@pytest.mark.anyio
+async def test_single_flight_leader_cancel_does_not_fail_waiters():
+    flights = SingleFlight()
+    calls = 0
+    release = asyncio.Event()
+
+    async def load():
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return "value"
+
+    leader = asyncio.create_task(flights.do("k", load))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(flights.do("k", load))
+    await asyncio.sleep(0)
+
+    leader.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+    release.set()
+
+    assert await waiter == "value"
+    assert calls == 1
+    assert len(flights) == 0
@@ -0,0 +1,159 @@
+"""
+CV-клиент на локальной заглушке: micro-batching, circuit breaker, hedged-вызовы
+"""
+import asyncio
+
+import grpc
+import pytest
+
+from backend.app.clients import grpc_base
+from backend.app.clients.cv_client import CVClient
+from backend.app.clients.grpc_base import ChannelPool, CircuitBreaker, CircuitOpenError, hedged
+from backend.app.clients.stubs import cv_server
+
+
+def rpc_error(code=grpc.StatusCode.UNAVAILABLE) -> grpc.aio.AioRpcError:
+    return grpc.aio.AioRpcError(code, grpc.aio.Metadata(), grpc.aio.Metadata(), details="stub")
+
+
+class RecordingCVService(cv_server.StubCVService):
+    """Заглушка CV, запоминающая размеры пачек"""
+
+    def __init__(self):
+        super().__init__(pass_latency=0.001, per_image_latency=0)
+        self.batches = []
+
+    async def recognize_batch(self, request, context):
+        self.batches.append(len(request.items))
+        return await super().recognize_batch(request, context)
+
+
+@pytest.fixture
+async def cv_stub():
+    service = RecordingCVService()
+    server = await cv_server.start_server(0, service)
+    client = CVClient(ChannelPool(f"127.0.0.1:{server.bound_port}", size=2), batch_window=0.05, max_batch_size=4)
+    yield service, client
+    await client.close()
+    await server.stop(None)
+
+
+@pytest.mark.anyio
+async def test_cv_coalesces_concurrent_photos_into_batches(cv_stub):
+    service, client = cv_stub
+    images = [f"photo-{i}".encode() for i in range(6)]
+
+    results = await asyncio.gather(*(client.recognize(image) for image in images))
+
+    # max_batch_size=4 сбрасывает пачку сразу, остаток уходит по окну
+    assert service.batches == [4, 2]
+    for image, hypotheses in zip(images, results):
+        assert [h.label for h in hypotheses] == [h.label for h in cv_server.fake_hypotheses(image)]
+
+
+@pytest.mark.anyio
+async def test_cv_window_batches_single_photo(cv_stub):
+    service, client = cv_stub
+    assert len(await client.recognize(b"one")) == 3
+    assert service.batches == [1]
+
+
+@pytest.mark.anyio
+async def test_breaker_opens_then_half_open_probe(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(grpc_base.time, "monotonic", lambda: now[0])
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10)
+
+    async def fail():
+        raise rpc_error()
+
+    async def not_found():
+        raise rpc_error(grpc.StatusCode.NOT_FOUND)
+
+    # Ошибка конкретного запроса не считается отказом сервиса
+    for _ in range(3):
+        with pytest.raises(grpc.aio.AioRpcError):
+            await breaker.call(not_found)
+    assert breaker.state == "closed"
+
+    for _ in range(2):
+        with pytest.raises(grpc.aio.AioRpcError):
+            await breaker.call(fail)
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        await breaker.call(fail)
+
+    # После reset_timeout — один пробный вызов; неудача снова открывает цепь
+    now[0] += 10
+    assert breaker.state == "half-open"
+    with pytest.raises(grpc.aio.AioRpcError):
+        await breaker.call(fail)
+    assert breaker.state == "open"
+
+    now[0] += 10
+    release = asyncio.Event()
+
+    async def probe():
+        await release.wait()
+        return "ok"
+
+    probe_task = asyncio.create_task(breaker.call(probe))
+    await asyncio.sleep(0)
+    with pytest.raises(CircuitOpenError):
+        await breaker.call(probe)
+    release.set()
+    assert await probe_task == "ok"
+    assert breaker.state == "closed"
+
+
+@pytest.mark.anyio
+async def test_cv_breaker_opens_on_unreachable_service():
+    client = CVClient(ChannelPool("127.0.0.1:1", size=1), deadline=1, breaker=CircuitBreaker(2, 60))
+    try:
+        for _ in range(2):
+            with pytest.raises(grpc.aio.AioRpcError):
+                await client.recognize(b"photo")
+        with pytest.raises(CircuitOpenError):
+            await client.recognize(b"photo")
+    finally:
+        await client.close()
+
+
+@pytest.mark.anyio
+async def test_hedged_cancels_slow_attempt():
+    started, cancelled = [], []
+
+    async def call():
+        attempt = len(started)
+        started.append(attempt)
+        try:
+            await asyncio.sleep(10 if attempt == 0 else 0.01)
+        except asyncio.CancelledError:
+            cancelled.append(attempt)
+            raise
+        return attempt
+
+    assert await hedged(call, hedge_delay=0.02) == 1
+    await asyncio.sleep(0)
+    assert started == [0, 1]
+    assert cancelled == [0]
+
+
+@pytest.mark.anyio
+async def test_hedged_retries_network_error_but_not_request_error():
+    calls = []
+
+    async def flaky():
+        calls.append(1)
+        if len(calls) == 1:
+            raise rpc_error()
+        return "ok"
+
+    assert await hedged(flaky, hedge_delay=5) == "ok"
+    assert len(calls) == 2
+
+    async def bad_request():
+        raise rpc_error(grpc.StatusCode.INVALID_ARGUMENT)
+
+    with pytest.raises(grpc.aio.AioRpcError):
+        await hedged(bad_request, hedge_delay=5)
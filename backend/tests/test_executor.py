@@ -0,0 +1,111 @@
+"""
+Исполнитель обновлений: порядок внутри чата, общий лимит обработки, ограничения очереди
+"""
+import asyncio
+from collections import defaultdict
+
+import pytest
+from aiogram.types import Update
+
+from backend.app.bot.executor import UPDATE_RESULTS, UpdateExecutor
+
+
+def make_update(update_id: int, chat_id: int, text: str = "привет") -> Update:
+    return Update.model_validate({
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 0,
+            "chat": {"id": chat_id, "type": "private"},
+            "from": {"id": chat_id, "is_bot": False, "first_name": "Test"},
+            "text": text,
+        },
+    })
+
+
+class FakeDispatcher:
+    """feed_update без хэндлеров: журнал обработки и счётчики одновременности"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.release = asyncio.Event()
+        self.release.set()
+        self.processed = defaultdict(list)
+        self.active = 0
+        self.max_active = 0
+        self.active_chats = set()
+        self.overlaps = 0
+
+    async def feed_update(self, bot, update):
+        chat_id = update.message.chat.id
+        if chat_id in self.active_chats:
+            self.overlaps += 1
+        self.active_chats.add(chat_id)
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await self.release.wait()
+            await asyncio.sleep(self.delay)
+            self.processed[chat_id].append(update.update_id)
+        finally:
+            self.active -= 1
+            self.active_chats.discard(chat_id)
+
+
+@pytest.mark.anyio
+async def test_updates_of_one_chat_are_processed_in_order():
+    dp = FakeDispatcher(delay=0.001)
+    executor = UpdateExecutor(dp, bot=None, max_in_flight=4)
+    executor.start()
+    for update_id in range(60):
+        assert executor.submit(make_update(update_id, chat_id=update_id % 3))
+    await executor.stop()  # Дожидается обработки очереди
+
+    assert dp.overlaps == 0
+    for chat_id in range(3):
+        assert dp.processed[chat_id] == list(range(chat_id, 60, 3))
+    assert dp.max_active == 3  # Чатов меньше, чем воркеров: параллельность — по числу полос
+
+
+@pytest.mark.anyio
+async def test_max_in_flight_caps_concurrent_processing():
+    dp = FakeDispatcher()
+    dp.release.clear()
+    executor = UpdateExecutor(dp, bot=None, max_in_flight=3)
+    executor.start()
+    try:
+        for chat_id in range(10):
+            executor.submit(make_update(chat_id, chat_id))
+        await asyncio.sleep(0.05)
+        assert executor.in_flight == 3
+        assert executor.queued == 7
+
+    finally:
+        dp.release.set()
+        await executor.stop()
+    assert dp.max_active == 3
+    assert sum(len(ids) for ids in dp.processed.values()) == 10
+
+
+@pytest.mark.anyio
+async def test_submit_rejects_when_queue_is_full():
+    executor = UpdateExecutor(FakeDispatcher(), bot=None, max_queued=2)
+    rejected = UPDATE_RESULTS.labels("rejected").value
+    assert executor.submit(make_update(1, 1))
+    assert executor.submit(make_update(2, 2))
+    assert not executor.submit(make_update(3, 3))
+    assert executor.queued == 2
+    assert UPDATE_RESULTS.labels("rejected").value == rejected + 1
+
+
+@pytest.mark.anyio
+async def test_lane_overflow_is_dropped():
+    executor = UpdateExecutor(FakeDispatcher(), bot=None, max_per_chat=2)
+    dropped = UPDATE_RESULTS.labels("dropped").value
+    for update_id in range(4):
+        assert executor.submit(make_update(update_id, chat_id=7))
+    assert executor.submit(make_update(10, chat_id=8))  # Другой чат не страдает
+
+    assert [update.update_id for update, _ in executor.lanes[7]] == [0, 1]
+    assert executor.queued == 3
+    assert UPDATE_RESULTS.labels("dropped").value == dropped + 2
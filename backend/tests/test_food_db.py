@@ -0,0 +1,65 @@
+"""
+База продуктов: триграммный поиск top-k и пустой каталог
+"""
+import pytest
+
+from backend.app.services.food_db import FoodStore, normalize, trigrams
+
+FOODS = [
+    ("Гречка отварная", 110, 4.2, 1.1, 21.3),
+    ("Гречневая каша на молоке", 140, 5.0, 3.5, 22.0),
+    ("Рис отварной", 130, 2.7, 0.3, 28.2),
+    ("Куриная грудка", 165, 31.0, 3.6, 0.0),
+    ("Ёжики мясные", 190, 12.0, 11.0, 10.0),
+    ("Buckwheat", 343, 13.3, 3.4, 71.5),
+]
+
+
+@pytest.fixture
+def store(tmp_path):
+    return FoodStore.build(FOODS, tmp_path / "food_db")
+
+
+def test_normalize_and_trigrams():
+    assert normalize("  Ёжики, мясные!") == "ежики мясные"
+    assert len(trigrams("рис")) == 4  # "  р", " ри", "рис", "ис "
+    assert trigrams("Рис!") == trigrams("рис")
+
+
+def test_top_k_by_trigram_similarity(store):
+    assert len(store) == len(FOODS)
+    matches = store.search("гречка", k=2)
+    assert len(matches) == 2
+    assert matches[0].name == "Гречка отварная"
+    assert matches[0].score > matches[1].score > 0
+    assert matches[0].for_portion(200)["calories"] == pytest.approx(220)
+    # argpartition по k даёт тот же префикс, что и полная сортировка
+    for query in ("гречка", "гречневая каша", "курица грудка"):
+        ranked = store.search(query, k=len(FOODS))
+        assert [match.score for match in ranked] == sorted((match.score for match in ranked), reverse=True)
+        assert store.search(query, k=2) == ranked[:2]
+    assert store.search("гречневая каша", k=1)[0].name == "Гречневая каша на молоке"
+
+    assert [match.name for match in store.search("ежики", k=1)] == ["Ёжики мясные"]
+    assert store.search("buckwheat")[0].kcal == pytest.approx(343)
+    assert [match.name for match in store.search("отварн", k=10)] == ["Рис отварной", "Гречка отварная"]
+
+
+def test_min_score_and_no_match(store):
+    assert store.search("рис отварной", k=5, min_score=0.99)[0].name == "Рис отварной"
+    assert all(match.score >= 0.5 for match in store.search("рис отварной", k=5, min_score=0.5))
+    assert store.search("пицца") == []
+    assert store.search("!!!") == []
+
+
+def test_reopen_from_disk(store, tmp_path):
+    reopened = FoodStore(tmp_path / "food_db")
+    assert reopened.name(3) == "Куриная грудка"
+    assert reopened.search("курица грудка", k=1)[0].name == "Куриная грудка"
+
+
+def test_empty_catalog(tmp_path):
+    store = FoodStore.build([], tmp_path / "empty")
+    assert len(store) == 0
+    assert store.search("гречка") == []
+    assert len(FoodStore(tmp_path / "empty")) == 0
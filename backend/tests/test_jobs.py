@@ -0,0 +1,198 @@
+"""
+Очередь фоновых задач: dedup, аренда, повтор и отказ у брокеров; исполнитель задач
+"""
+import asyncio
+import os
+
+import pytest
+
+from backend.app.jobs.queue import Job, JobType, MemoryJobBroker, SQLiteJobBroker, register_job_type
+from backend.app.jobs.worker import JobRunner
+
+LEASE_S = 0.05
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+async def broker(request, tmp_path):
+    broker = MemoryJobBroker() if request.param == "memory" else SQLiteJobBroker(str(tmp_path / "jobs.sqlite3"))
+    yield broker
+    await broker.close()
+
+
+@pytest.mark.anyio
+async def test_dedup_until_finished(broker):
+    assert await broker.enqueue(Job("k", {"n": 1}, dedup_key="user:1"))
+    assert not await broker.enqueue(Job("k", {"n": 2}, dedup_key="user:1"))
+    assert await broker.enqueue(Job("k", {"n": 3}, dedup_key="user:2"))
+    assert await broker.size() == 2
+
+    job = await broker.reserve(60)
+    assert job.payload == {"n": 1}
+    assert not await broker.enqueue(Job("k", {"n": 4}, dedup_key="user:1"))  # В работе — тоже дубль
+    await broker.ack(job)
+    assert await broker.enqueue(Job("k", {"n": 5}, dedup_key="user:1"))
+
+
+@pytest.mark.anyio
+async def test_expired_lease_is_reclaimed_as_attempt(broker):
+    await broker.enqueue(Job("k", {}))
+    job = await broker.reserve(LEASE_S)
+    assert job.attempts == 0
+    assert await broker.reserve(LEASE_S) is None  # Аренда ещё действует
+
+    await asyncio.sleep(LEASE_S * 2)
+    reclaimed = await broker.reserve(LEASE_S)
+    assert reclaimed.id == job.id
+    assert reclaimed.attempts == 1
+
+    await asyncio.sleep(LEASE_S * 2)
+    assert (await broker.reserve(60)).attempts == 2
+
+
+@pytest.mark.anyio
+async def test_retry_and_fail(broker):
+    await broker.enqueue(Job("k", {}, dedup_key="d"))
+    job = await broker.reserve(60)
+    job.attempts += 1
+    await broker.retry(job, LEASE_S, "boom")
+    assert await broker.reserve(60) is None  # Ждёт задержку повтора
+
+    await asyncio.sleep(LEASE_S * 2)
+    job = await broker.reserve(60)
+    assert job.attempts == 1  # Повтор после retry — не истёкшая аренда
+
+    job.attempts += 1
+    await broker.fail(job, "boom")
+    assert await broker.size() == 0
+    assert await broker.reserve(60) is None
+    assert await broker.enqueue(Job("k", {}, dedup_key="d"))
+
+
+def double(x: int) -> int:
+    return x * 2
+
+
+def explode(x: int) -> int:
+    raise ValueError(f"bad {x}")
+
+
+def die(x: int) -> int:
+    os._exit(1)
+
+
+RESULTS = []
+FAILURES = []
+
+
+async def on_result(bot, job, result):
+    RESULTS.append(result)
+
+
+async def on_failure(bot, job, error):
+    FAILURES.append((job.kind, type(error).__name__))
+
+
+for _name, _compute in (("test_double", double), ("test_explode", explode), ("test_die", die)):
+    register_job_type(JobType(
+        _name, _compute, on_result=on_result, on_failure=on_failure, max_attempts=2, retry_backoff_s=0.0
+    ))
+
+
+@pytest.fixture
+async def runner():
+    RESULTS.clear()
+    FAILURES.clear()
+    runner = JobRunner(MemoryJobBroker(), None, workers=1, concurrency=1, lease_s=LEASE_S)
+    yield runner
+    await runner.stop()
+
+
+async def run_next(runner: JobRunner) -> Job:
+    job = await runner.broker.reserve(runner.lease_s)
+    await runner.run(job)
+    return job
+
+
+@pytest.mark.anyio
+async def test_runner_ack_retry_fail(runner):
+    await runner.broker.enqueue(Job("test_double", 21))
+    await run_next(runner)
+    assert RESULTS == [42]
+    assert await runner.broker.size() == 0
+
+    await runner.broker.enqueue(Job("test_explode", 1))
+    assert (await run_next(runner)).attempts == 1
+    assert await runner.broker.size() == 1 and FAILURES == []
+    await run_next(runner)
+    assert await runner.broker.size() == 0
+    assert FAILURES == [("test_explode", "ValueError")]
+
+
+@pytest.mark.anyio
+async def test_runner_survives_dead_process(runner):
+    await runner.broker.enqueue(Job("test_die", 0))
+    assert (await run_next(runner)).attempts == 1  # BrokenProcessPool — обычный повтор
+
+    await runner.broker.enqueue(Job("test_double", 5))
+    while await runner.broker.size():
+        await run_next(runner)
+    assert RESULTS == [10]
+    assert FAILURES == [("test_die", "BrokenProcessPool")]
+
+
+@pytest.mark.anyio
+async def test_runner_fails_job_after_expired_leases(runner):
+    await runner.broker.enqueue(Job("test_double", 1))
+    for _ in range(2):  # Воркер «падает»: аренда истекает без ack
+        assert await runner.broker.reserve(LEASE_S)
+        await asyncio.sleep(LEASE_S * 2)
+
+    job = await run_next(runner)
+    assert job.attempts == 2
+    assert RESULTS == []
+    assert FAILURES == [("test_double", "TimeoutError")]
+    assert await runner.broker.size() == 0
+
+
+class FlakyBroker(MemoryJobBroker):
+    """Первый retry и первый ack падают, как при обрыве соединения с Redis"""
+
+    def __init__(self):
+        super().__init__()
+        self.outages = {"retry": 1, "ack": 1}
+
+    def _outage(self, method: str) -> None:
+        if self.outages[method]:
+            self.outages[method] -= 1
+            raise ConnectionError("redis down")
+
+    async def retry(self, job, delay_s, error):
+        self._outage("retry")
+        await super().retry(job, delay_s, error)
+
+    async def ack(self, job):
+        self._outage("ack")
+        await super().ack(job)
+
+
+@pytest.mark.anyio
+async def test_consumer_survives_broker_errors():
+    RESULTS.clear()
+    FAILURES.clear()
+    runner = JobRunner(FlakyBroker(), None, workers=1, concurrency=1, lease_s=LEASE_S, poll_interval=0.01)
+    await runner.broker.enqueue(Job("test_explode", 1))
+    await runner.broker.enqueue(Job("test_double", 2))
+    await runner.broker.enqueue(Job("test_double", 3))
+    runner.start()
+    try:
+        for _ in range(500):
+            if await runner.broker.size() == 0:
+                break
+            await asyncio.sleep(0.01)
+        assert all(not task.done() for task in runner._tasks)
+        # Неподтверждённые из-за сбоя задачи выданы повторно по истечении аренды
+        assert sorted(set(RESULTS)) == [4, 6]
+        assert [kind for kind, _ in FAILURES] == ["test_explode"]
+        assert await runner.broker.size() == 0
+    finally:
+        await runner.stop()
@@ -0,0 +1,80 @@
+"""
+Приёмы пищи: инкрементальная дневная сводка КБЖУ при добавлении, правке и удалении
+"""
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from backend.app.config import settings
+from backend.app.db.migrations import run_migrations
+from backend.app.db.models import DailyNutritionTotal, UserGoal
+from backend.app.db.session import build_engine
+from backend.app.repositories.meals_repo import MealsRepository
+
+USER_ID = 1
+KBJU = {"calories": 200.0, "protein_g": 10.0, "fat_g": 5.0, "carbs_g": 30.0}
+
+
+@pytest.fixture
+async def session(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "PROFILE_TZ_OFFSET_H", 3)
+    engine = build_engine(f"sqlite+aiosqlite:///{tmp_path / 'meals.db'}", pool_mode="null")
+    await run_migrations(engine)
+    async with async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)() as session:
+        yield session
+    await engine.dispose()
+
+
+async def totals(session) -> dict:
+    rows = (await session.execute(
+        select(DailyNutritionTotal).order_by(DailyNutritionTotal.day).execution_options(populate_existing=True)
+    )).scalars()
+    return {
+        row.day: (row.meals_count, *(round(getattr(row, name), 6) for name in KBJU))
+        for row in rows
+    }
+
+
+@pytest.mark.anyio
+async def test_daily_totals_follow_add_edit_delete(session):
+    repo = MealsRepository(session)
+    # 22:30 UTC — уже 01:30 следующего дня по МСК: приём пищи относится к локальным суткам
+    late = await repo.add_meal(USER_ID, "кефир", portion_g=200, eaten_at=datetime(2026, 10, 17, 22, 30), **KBJU)
+    evening = await repo.add_meal(USER_ID, "ужин", portion_g=300, eaten_at=datetime(2026, 10, 17, 20, 0), **KBJU)
+    lunch = await repo.add_meal(USER_ID, "обед", portion_g=100, eaten_at=datetime(2026, 10, 18, 10, 0), **KBJU)
+
+    assert late.meal_date == date(2026, 10, 18)
+    assert evening.meal_date == date(2026, 10, 17)
+    assert await totals(session) == {
+        date(2026, 10, 17): (1, 200.0, 10.0, 5.0, 30.0),
+        date(2026, 10, 18): (2, 400.0, 20.0, 10.0, 60.0),
+    }
+
+    # Порция ×2 и съедено половина: в сводке тот же обед
+    await repo.edit_meal(lunch.id, portion_g=200, percent_eaten=50)
+    assert (await totals(session))[date(2026, 10, 18)] == (2, 400.0, 20.0, 10.0, 60.0)
+    await repo.edit_meal(lunch.id, percent_eaten=25)
+    assert (await totals(session))[date(2026, 10, 18)] == (2, 300.0, 15.0, 7.5, 45.0)
+
+    assert await repo.delete(late.id)
+    assert (await totals(session))[date(2026, 10, 18)] == (1, 100.0, 5.0, 2.5, 15.0)
+    assert await repo.delete(evening.id)
+    assert (await totals(session))[date(2026, 10, 17)] == (0, 0.0, 0.0, 0.0, 0.0)
+    assert not await repo.delete(evening.id)
+
+
+@pytest.mark.anyio
+async def test_remaining_today_uses_local_day(session):
+    session.add(UserGoal(
+        user_id=USER_ID, goal_type="maintain", target_weight_kg=70, target_calories=2000,
+        target_protein_g=100, target_fat_g=70, target_carbs_g=250
+    ))
+    await session.commit()
+    repo = MealsRepository(session)
+    await repo.add_meal(USER_ID, "завтрак", **KBJU)  # Сейчас
+    await repo.add_meal(USER_ID, "вчера", eaten_at=datetime(2000, 1, 1), **KBJU)
+
+    remaining = await repo.get_remaining_today(USER_ID)
+    assert remaining == pytest.approx({"calories": 1800.0, "protein_g": 90.0, "fat_g": 65.0, "carbs_g": 220.0})
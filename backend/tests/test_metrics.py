@@ -0,0 +1,43 @@
+"""
+Метрики Prometheus: типы семейств коллекторов и пул соединений БД
+"""
+import pytest
+from sqlalchemy import text
+
+from backend.app.db.session import async_session_maker, engine, get_pool_stats
+from backend.app.utils.metrics import Registry, counter, counters, gauge, registry
+
+
+def test_collector_families_render_with_types():
+    local = Registry()
+
+    @local.collector
+    def collect():
+        yield counter("jobs_done", "Готово", 3)
+        yield counters("jobs", "По итогу", {"ok": 2, "failed": 1}, "result")
+        yield gauge("jobs_queued", "В очереди", 5)
+
+    lines = local.render().splitlines()
+    assert "# TYPE jobs_done_total counter" in lines
+    assert "jobs_done_total 3" in lines
+    assert 'jobs_total{result="failed"} 1' in lines
+    assert "# TYPE jobs_queued gauge" in lines
+
+
+@pytest.mark.anyio
+async def test_pool_exports_totals_as_counters_and_wait_as_histogram():
+    try:
+        async with async_session_maker() as session:
+            await session.execute(text("SELECT 1"))
+    finally:
+        await engine.dispose()  # Иначе поток aiosqlite не даёт процессу завершиться
+    checkouts = get_pool_stats()["checkouts"]
+    assert checkouts >= 1
+
+    lines = registry.render().splitlines()
+    assert "# TYPE db_pool_checkouts_total counter" in lines
+    assert f"db_pool_checkouts_total {checkouts}" in lines
+    assert "# TYPE db_pool_timeouts_total counter" in lines
+    assert "# TYPE db_pool_checked_out gauge" in lines
+    assert "# TYPE db_pool_checkout_wait_seconds histogram" in lines
+    assert not any(line.startswith("db_pool_wait_") for line in lines)
@@ -0,0 +1,128 @@
+"""
+Миграции схемы: база со схемой до появления миграций (baseline) и пустая база
+"""
+from datetime import datetime
+
+import pytest
+from sqlalchemy import inspect, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from backend.app.db import vocabulary
+from backend.app.db.migrations import LATEST_VERSION, get_schema_version, m0002_preference_masks, run_migrations
+from backend.app.db.models import UserGoal
+from backend.app.db.session import Base, build_engine
+from backend.app.repositories.goals_repo import GoalsRepository
+
+# Схема, которую создавал create_all до миграций (SQLite)
+BASELINE_DDL = (
+    """CREATE TABLE users (
+        id INTEGER NOT NULL, telegram_user_id VARCHAR(255) NOT NULL, username VARCHAR(255),
+        first_name VARCHAR(255), last_name VARCHAR(255), phone VARCHAR(20), age INTEGER,
+        gender VARCHAR(10), height_cm FLOAT, weight_kg FLOAT, activity_level VARCHAR(50),
+        is_active BOOLEAN, is_premium BOOLEAN, created_at DATETIME NOT NULL, updated_at DATETIME NOT NULL,
+        PRIMARY KEY (id))""",
+    "CREATE INDEX ix_users_id ON users (id)",
+    "CREATE UNIQUE INDEX ix_users_telegram_user_id ON users (telegram_user_id)",
+    """CREATE TABLE user_goals (
+        id INTEGER NOT NULL, user_id INTEGER NOT NULL, goal_type VARCHAR(50) NOT NULL,
+        target_weight_kg FLOAT NOT NULL, weekly_goal_kg FLOAT, target_calories INTEGER NOT NULL,
+        target_protein_g FLOAT NOT NULL, target_fat_g FLOAT NOT NULL, target_carbs_g FLOAT NOT NULL,
+        created_at DATETIME NOT NULL, updated_at DATETIME NOT NULL, PRIMARY KEY (id))""",
+    "CREATE INDEX ix_user_goals_id ON user_goals (id)",
+    "CREATE INDEX ix_user_goals_user_id ON user_goals (user_id)",
+    """CREATE TABLE user_preferences (
+        id INTEGER NOT NULL, user_id INTEGER NOT NULL, dietary_restrictions TEXT, allergies TEXT,
+        disliked_ingredients TEXT, preferred_cuisines TEXT, cooking_methods_allowed TEXT,
+        created_at DATETIME NOT NULL, updated_at DATETIME NOT NULL, PRIMARY KEY (id))""",
+    "CREATE INDEX ix_user_preferences_id ON user_preferences (id)",
+    "CREATE INDEX ix_user_preferences_user_id ON user_preferences (user_id)",
+)
+
+
+@pytest.fixture
+async def engine(tmp_path):
+    engine = build_engine(f"sqlite+aiosqlite:///{tmp_path / 'migrations.db'}", pool_mode="null")
+    yield engine
+    await engine.dispose()
+
+
+async def _columns(engine, table: str) -> set:
+    async with engine.connect() as conn:
+        return await conn.run_sync(lambda sync: {column["name"] for column in inspect(sync).get_columns(table)})
+
+
+async def assert_schema_matches_models(engine) -> None:
+    """Каждая таблица, колонка и индекс моделей есть в базе, собранной миграциями"""
+    def missing(sync) -> list:
+        inspector = inspect(sync)
+        problems = []
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                problems.append(table.name)
+                continue
+            columns = {column["name"] for column in inspector.get_columns(table.name)}
+            problems += [f"{table.name}.{column.name}" for column in table.columns if column.name not in columns]
+            indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+            problems += [index.name for index in table.indexes if index.name not in indexes]
+        return problems
+
+    async with engine.connect() as conn:
+        assert await conn.run_sync(missing) == []
+
+
+@pytest.mark.anyio
+async def test_baseline_schema_gets_goal_columns(engine):
+    now = datetime.utcnow()
+    async with engine.begin() as conn:
+        for ddl in BASELINE_DDL:
+            await conn.execute(text(ddl))
+        await conn.execute(
+            text("INSERT INTO users (id, telegram_user_id, age, gender, height_cm, weight_kg, activity_level, "
+                 "created_at, updated_at) VALUES (1, '100', 30, 'M', 180, 80, 'moderate', :now, :now)"),
+            {"now": now}
+        )
+        await conn.execute(
+            text("INSERT INTO user_goals (id, user_id, goal_type, target_weight_kg, target_calories, "
+                 "target_protein_g, target_fat_g, target_carbs_g, created_at, updated_at) "
+                 "VALUES (1, 1, 'lose', 75, 2000, 120, 60, 220, :now, :now)"),
+            {"now": now}
+        )
+
+    assert await run_migrations(engine) == LATEST_VERSION
+    assert await get_schema_version(engine) == LATEST_VERSION
+    assert {"calories_manual", "formula_version"} <= await _columns(engine, "user_goals")
+    await assert_schema_matches_models(engine)
+
+    session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with session_maker() as session:
+        goals = GoalsRepository(session)
+        old_goal = await goals.get_latest_for_user(1)
+        # Калорийность до движка целей вводил пользователь; формула ещё не применялась
+        assert old_goal.calories_manual is True
+        assert old_goal.formula_version is None
+        assert [row.id for row in await goals.get_stale_targets_page(1, after_id=0, limit=10)] == [1]
+
+        # Как process_calories при завершении регистрации
+        await goals.create(UserGoal(
+            user_id=1, goal_type="lose", target_weight_kg=75, target_calories=2100, target_protein_g=130,
+            target_fat_g=65, target_carbs_g=230, calories_manual=True, formula_version=1
+        ))
+        latest = await goals.get_latest_for_user(1)
+        assert (latest.target_calories, latest.formula_version) == (2100, 1)
+
+
+@pytest.mark.anyio
+async def test_empty_database_and_rerun(engine):
+    assert await run_migrations(engine) == LATEST_VERSION
+    await assert_schema_matches_models(engine)
+
+    # Повторный запуск ничего не применяет
+    assert await run_migrations(engine) == LATEST_VERSION
+    async with engine.connect() as conn:
+        applied = (await conn.execute(text("SELECT count(*) FROM schema_version"))).scalar()
+    assert applied == LATEST_VERSION
+
+
+def test_frozen_allergen_indexes_match_vocabulary():
+    # Новый аллерген в словаре — новый шаг миграции с его индексом, а не правка 0002
+    assert m0002_preference_masks.ALLERGENS == vocabulary.ALLERGENS
@@ -0,0 +1,113 @@
+"""
+NLP-клиент на локальной заглушке: потоковый совет в постепенно редактируемое сообщение
+"""
+import asyncio
+
+import grpc
+import pytest
+
+from backend.app.bot.streaming import stream_to_message
+from backend.app.clients.grpc_base import ChannelPool
+from backend.app.clients.nlp_client import NLPClient
+from backend.app.clients.protos import nlp_pb2
+from backend.app.clients.stubs import nlp_server
+
+
+class BrokenNLPService(nlp_server.StubNLPService):
+    """Поток обрывается ошибкой сервера после нескольких фрагментов"""
+
+    async def stream_advice(self, request, context):
+        for word in ("Добери", "белок"):
+            yield nlp_pb2.AdviceChunk(text=word + " ")
+        await context.abort(grpc.StatusCode.INTERNAL, "model crashed")
+
+
+class SlowNLPService(nlp_server.StubNLPService):
+    """Бесконечный поток; замечает отмену RPC клиентом"""
+
+    def __init__(self):
+        super().__init__(token_delay=0.01)
+        self.cancelled = asyncio.Event()
+
+    async def stream_advice(self, request, context):
+        try:
+            while True:
+                await asyncio.sleep(self.token_delay)
+                yield nlp_pb2.AdviceChunk(text="слово ")
+        except asyncio.CancelledError:
+            self.cancelled.set()
+            raise
+
+
+class FakeSentMessage:
+    def __init__(self, text):
+        self.text = text
+        self.edits = []
+
+    async def edit_text(self, text):
+        self.edits.append(text)
+        self.text = text
+
+
+class FakeMessage:
+    def __init__(self):
+        self.sent = None
+
+    async def answer(self, text):
+        self.sent = FakeSentMessage(text)
+        return self.sent
+
+
+async def nlp_stub(service):
+    server = await nlp_server.start_server(0, service)
+    return server, NLPClient(ChannelPool(f"127.0.0.1:{server.bound_port}", size=1), deadline=5)
+
+
+@pytest.mark.anyio
+async def test_nlp_stream_edits_message_progressively():
+    server, client = await nlp_stub(nlp_server.StubNLPService(token_delay=0.001))
+    request = nlp_pb2.AdviceRequest(remaining_today=nlp_pb2.DayTotals(calories=800, protein_g=40))
+    try:
+        message = FakeMessage()
+        text = await stream_to_message(message, "💭 ...", client.stream_advice(request), min_interval=0)
+    finally:
+        await client.close()
+        await server.stop(None)
+
+    expected = nlp_server.compose_advice(request)
+    assert text.strip() == expected
+    edits = message.sent.edits
+    assert len(edits) > 2
+    assert all(edit.endswith(" ▌") for edit in edits[:-1])
+    assert edits[-1].strip() == expected
+
+
+@pytest.mark.anyio
+async def test_nlp_broken_stream_keeps_partial_text():
+    server, client = await nlp_stub(BrokenNLPService())
+    try:
+        message = FakeMessage()
+        text = await stream_to_message(
+            message, "💭 ...", client.stream_advice(nlp_pb2.AdviceRequest()), min_interval=0, error_text="⚠️ Прервано"
+        )
+    finally:
+        await client.close()
+        await server.stop(None)
+
+    assert text == "Добери белок "
+    assert message.sent.text == "Добери белок \n\n⚠️ Прервано"
+
+
+@pytest.mark.anyio
+async def test_nlp_consumer_break_cancels_rpc():
+    service = SlowNLPService()
+    server, client = await nlp_stub(service)
+    try:
+        stream = client.stream_advice(nlp_pb2.AdviceRequest())
+        async for _ in stream:
+            break
+        await stream.aclose()
+        await asyncio.wait_for(service.cancelled.wait(), 5)
+    finally:
+        await client.close()
+        await server.stop(None)
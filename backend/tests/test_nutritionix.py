@@ -0,0 +1,85 @@
+"""
+Клиент Nutritionix: кэш в памяти и на диске, схлопывание одинаковых запросов
+(HTTP подменяется транспортом httpx.MockTransport)
+"""
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from backend.app.clients.nutritionix import NutritionixClient, NutritionixError, normalize_query
+from backend.app.utils.cache import DiskCache
+
+BUCKWHEAT = {
+    "food_name": "buckwheat", "serving_weight_grams": 200, "nf_calories": 686,
+    "nf_protein": 26.6, "nf_total_fat": 6.8, "nf_total_carbohydrate": 145.2,
+}
+
+
+class FakeApi:
+    """Nutritionix в памяти: считает вызовы, ответ задаётся статусом и списком продуктов"""
+
+    def __init__(self, status: int = 200, foods: tuple = (BUCKWHEAT,), delay: float = 0.0):
+        self.status = status
+        self.foods = list(foods)
+        self.delay = delay
+        self.queries = []
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.queries.append(json.loads(request.content)["query"])
+        await asyncio.sleep(self.delay)
+        return httpx.Response(self.status, json={"foods": self.foods})
+
+    def client(self, disk_cache: DiskCache = None) -> NutritionixClient:
+        http = httpx.AsyncClient(base_url="https://nutritionix.test", transport=httpx.MockTransport(self))
+        return NutritionixClient("app", "key", disk_cache=disk_cache, rate_limit=1000, http_client=http)
+
+
+def test_normalize_query():
+    assert normalize_query("  200 г   Гречки\n") == "200 г гречки"
+
+
+@pytest.mark.anyio
+async def test_concurrent_queries_share_one_call():
+    api = FakeApi(delay=0.05)
+    client = api.client()
+    results = await asyncio.gather(*(client.natural_nutrients(query) for query in ["Гречка 200 г", "гречка  200 г"] * 5))
+    assert api.queries == ["гречка 200 г"]
+    assert all(result == results[0] for result in results)
+    assert results[0][0].calories == 686
+
+    await client.natural_nutrients("ГРЕЧКА 200 г")
+    assert client.stats == {"memory_hits": 1, "disk_hits": 0, "api_calls": 1}
+    await client.close()
+
+
+@pytest.mark.anyio
+async def test_disk_cache_survives_restart(tmp_path):
+    path = str(tmp_path / "nutritionix.sqlite3")
+    api = FakeApi()
+    client = api.client(DiskCache(path, ttl=3600, max_entries=100))
+    first = await client.natural_nutrients("гречка 200 г")
+    await client.close()
+
+    client = api.client(DiskCache(path, ttl=3600, max_entries=100))
+    assert await client.natural_nutrients("гречка 200 г") == first
+    assert len(api.queries) == 1
+    assert client.stats["disk_hits"] == 1
+    await client.close()
+
+
+@pytest.mark.anyio
+async def test_not_found_is_cached_errors_are_not():
+    api = FakeApi(status=404)
+    client = api.client()
+    assert await client.natural_nutrients("абракадабра") == []
+    assert await client.natural_nutrients("абракадабра") == []
+    assert len(api.queries) == 1
+
+    api.status = 500
+    for _ in range(2):
+        with pytest.raises(NutritionixError):
+            await client.natural_nutrients("гречка")
+    assert len(api.queries) == 3
+    await client.close()
@@ -0,0 +1,108 @@
+"""
+Планировщик исходящих: порядок полос, повтор после 429, метрики
+"""
+import asyncio
+
+import pytest
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import GetMe, SendMessage
+
+from backend.app.bot import outbound
+from backend.app.bot.outbound import Lane, OutboundScheduler, outbound_lane
+from backend.app.utils.metrics import registry
+
+
+class FakeTelegram:
+    """make_request: записывает порядок отправок, первые retry_after вызовов отвечает 429"""
+
+    def __init__(self, retry_after: int = 0):
+        self.sent = []
+        self.retry_after = retry_after
+
+    async def __call__(self, bot, method):
+        if self.retry_after:
+            retry_after, self.retry_after = self.retry_after, 0
+            raise TelegramRetryAfter(method, "Too Many Requests", retry_after)
+        self.sent.append(method.text if isinstance(method, SendMessage) else type(method).__name__)
+        return "ok"
+
+
+async def send(scheduler, telegram, lane: Lane, chat_id: int, text: str):
+    with outbound_lane(lane):
+        return await scheduler(telegram, None, SendMessage(chat_id=chat_id, text=text))
+
+
+@pytest.mark.anyio
+async def test_lanes_by_priority_then_fifo():
+    scheduler = OutboundScheduler(global_rate=50.0)
+    scheduler.global_bucket._tokens = 0  # Общий лимит исчерпан: все встают в очередь
+    telegram = FakeTelegram()
+
+    sends = [
+        (Lane.BULK, "bulk-1"), (Lane.NOTIFICATION, "notify-1"), (Lane.BULK, "bulk-2"),
+        (Lane.INTERACTIVE, "reply-1"), (Lane.NOTIFICATION, "notify-2"), (Lane.INTERACTIVE, "reply-2"),
+    ]
+    tasks = []
+    for chat_id, (lane, text) in enumerate(sends, start=1):
+        tasks.append(asyncio.create_task(send(scheduler, telegram, lane, chat_id, text)))
+        await asyncio.sleep(0)  # Фиксируем порядок постановки
+    assert scheduler.stats.waiting == {Lane.INTERACTIVE: 2, Lane.NOTIFICATION: 2, Lane.BULK: 2}
+
+    await asyncio.gather(*tasks)
+    assert telegram.sent == ["reply-1", "reply-2", "notify-1", "notify-2", "bulk-1", "bulk-2"]
+    assert scheduler.stats.sent == 6
+
+
+@pytest.mark.anyio
+async def test_per_chat_order_and_unlimited_methods():
+    scheduler = OutboundScheduler(chat_rate=100.0, chat_burst=1.0)
+    telegram = FakeTelegram()
+
+    await asyncio.gather(*(send(scheduler, telegram, Lane.INTERACTIVE, 42, f"m{i}") for i in range(5)))
+    assert telegram.sent == [f"m{i}" for i in range(5)]
+
+    # Методы без chat_id лимиты не тратят
+    assert await scheduler(telegram, None, GetMe()) == "ok"
+    assert scheduler.stats.sent == 5
+
+
+@pytest.mark.anyio
+async def test_retry_after_pauses_background_lanes_only():
+    scheduler = OutboundScheduler(global_rate=50.0)
+    telegram = FakeTelegram(retry_after=1)
+
+    assert await send(scheduler, telegram, Lane.BULK, 1, "bulk-1") == "ok"
+    assert scheduler.stats.retry_after_events == 1
+    assert telegram.sent == ["bulk-1"]
+
+    telegram.retry_after = 1
+    bulk = asyncio.create_task(send(scheduler, telegram, Lane.BULK, 2, "bulk-2"))
+    await asyncio.sleep(0.05)
+    # Рассылка на паузе после 429, ответ пользователю проходит сразу
+    await send(scheduler, telegram, Lane.INTERACTIVE, 3, "reply")
+    assert telegram.sent == ["bulk-1", "reply"]
+    await bulk
+    assert telegram.sent == ["bulk-1", "reply", "bulk-2"]
+
+
+@pytest.mark.anyio
+async def test_retry_after_gives_up_after_max_retries():
+    scheduler = OutboundScheduler(max_retries=0)
+    with pytest.raises(TelegramRetryAfter):
+        await send(scheduler, FakeTelegram(retry_after=1), Lane.INTERACTIVE, 1, "x")
+    assert scheduler.stats.failed == 1
+
+
+@pytest.mark.anyio
+async def test_metrics_export_totals_as_counters(monkeypatch):
+    scheduler = OutboundScheduler()
+    monkeypatch.setattr(outbound, "scheduler", scheduler)
+    await send(scheduler, FakeTelegram(), Lane.NOTIFICATION, 1, "x")
+
+    text = registry.render()
+    assert "# TYPE outbound_messages_total counter" in text
+    assert 'outbound_messages_total{result="sent"} 1' in text
+    assert "# TYPE outbound_retry_after_events_total counter" in text
+    assert "# TYPE outbound_latency_seconds histogram" in text
+    assert 'outbound_latency_seconds_count{lane="notification"}' in text
+    assert "outbound_latency_seconds{quantile" not in text
@@ -0,0 +1,29 @@
+"""
+Пул процессов: восстановление после гибели процесса-воркера
+"""
+import os
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from backend.app.utils.processes import ProcessPool
+
+
+def square(x: int) -> int:
+    return x * x
+
+
+def die(code: int) -> None:
+    os._exit(code)
+
+
+@pytest.mark.anyio
+async def test_pool_is_rebuilt_after_worker_dies():
+    pool = ProcessPool("test", 1)
+    try:
+        assert await pool.run(square, 3) == 9
+        with pytest.raises(BrokenProcessPool):
+            await pool.run(die, 1)
+        assert await pool.run(square, 4) == 16
+    finally:
+        pool.shutdown()
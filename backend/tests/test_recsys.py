@@ -0,0 +1,105 @@
+"""
+RecSys: top-k через argpartition совпадает с полной сортировкой, ограничения исключают блюда
+"""
+import numpy as np
+import pytest
+
+from backend.app.db import vocabulary
+from backend.app.services import recsys
+from backend.app.services.recsys import NUTRIENT_WEIGHTS, MIN_SCALE, DishCatalog, meal_targets
+
+DAILY = [2000.0, 100.0, 70.0, 250.0]
+NUTS = vocabulary.ingredients.encode(["nuts"])
+MUSHROOMS = vocabulary.ingredients.encode(["mushrooms"])
+CILANTRO = vocabulary.ingredients.encode(["cilantro"])
+
+RECORDS = [
+    ("овсянка с орехами", 350, 12, 14, 45, NUTS),
+    ("куриная грудка с рисом", 520, 45, 10, 60, 0),
+    ("жульен", 420, 18, 28, 20, MUSHROOMS | vocabulary.ingredients.encode(["dairy"])),
+    ("гречка", 300, 11, 3, 60, 0),
+    ("салат с кинзой", 150, 4, 10, 12, CILANTRO),
+    ("творог", 220, 30, 5, 10, vocabulary.ingredients.encode(["dairy"])),
+    ("стейк", 650, 55, 45, 0, vocabulary.ingredients.encode(["meat"])),
+    ("паста с грибами", 600, 20, 18, 90, MUSHROOMS | vocabulary.ingredients.encode(["gluten"])),
+]
+
+
+@pytest.fixture
+def catalog():
+    return DishCatalog.from_records(RECORDS)
+
+
+def brute_force_scores(catalog, remaining, daily, meals_left=1.0):
+    """Тот же score напрямую: −Σ w·(n − t)² по каждому блюду"""
+    target = meal_targets(np.asarray([remaining], dtype=np.float32), np.asarray([meals_left], dtype=np.float32))[0]
+    weights = NUTRIENT_WEIGHTS / np.maximum(np.asarray(daily, dtype=np.float32), MIN_SCALE) ** 2
+    return -(weights * (catalog.nutrients - target) ** 2).sum(axis=1)
+
+
+@pytest.mark.parametrize("remaining, meals_left", [
+    ([600, 50, 20, 70], 1),
+    ([1500, 90, 50, 200], 3),
+    ([200, 30, 5, 10], 1),
+    ([-100, 0, 0, 0], 2),
+])
+def test_rank_matches_full_sort(catalog, remaining, meals_left):
+    expected = brute_force_scores(catalog, remaining, DAILY, meals_left)
+    order = np.argsort(-expected, kind="stable")
+
+    for k in (1, 3, len(catalog)):
+        dishes = catalog.rank(remaining, DAILY, k=k, meals_left=meals_left)
+        assert [dish.index for dish in dishes] == list(order[:k])
+        np.testing.assert_allclose([dish.score for dish in dishes], expected[order[:k]], rtol=1e-4, atol=1e-4)
+
+
+def test_rank_batch_chunks_agree_with_single_user(catalog, monkeypatch):
+    monkeypatch.setattr(recsys, "USERS_PER_CHUNK", 2)
+    rng = np.random.default_rng(7)
+    remaining = rng.uniform([0, 0, 0, 0], [2000, 120, 80, 250], size=(5, 4))
+    masks = [0, NUTS, MUSHROOMS, NUTS | CILANTRO, 0]
+
+    indices, scores = catalog.rank_batch(remaining, [DAILY] * 5, masks, k=3)
+
+    assert indices.shape == scores.shape == (5, 3)
+    for user in range(5):
+        single = catalog.rank(remaining[user], DAILY, exclude_mask=masks[user], k=3)
+        assert list(indices[user]) == [dish.index for dish in single]
+        assert np.all(np.diff(scores[user]) <= 0)
+
+
+def test_excluded_dishes_never_returned(catalog):
+    exclude = vocabulary.exclude_mask(
+        allergy_mask=vocabulary.allergens.encode(["nuts"]),
+        disliked_mask=vocabulary.ingredients.encode(["mushrooms", "cilantro"]),
+    )
+    # Цель ровно под исключённое блюдо: без фильтра оно было бы первым
+    for remaining in ([350, 12, 14, 45], [420, 18, 28, 20], [150, 4, 10, 12]):
+        names = [dish.name for dish in catalog.rank(remaining, DAILY, exclude_mask=exclude, k=len(catalog))]
+        assert names
+        assert not {"овсянка с орехами", "жульен", "салат с кинзой", "паста с грибами"} & set(names)
+        assert len(names) == len(catalog) - 4
+
+    assert catalog.rank([350, 12, 14, 45], DAILY, k=1)[0].name == "овсянка с орехами"
+
+
+def test_vegetarian_diet_excludes_meat_and_short_result(catalog):
+    vegetarian = vocabulary.exclude_mask(diet_mask=vocabulary.diets.encode(["vegetarian"]))
+    names = [dish.name for dish in catalog.rank([650, 55, 45, 0], DAILY, exclude_mask=vegetarian, k=3)]
+    assert "стейк" not in names
+    assert len(names) == 3
+
+    everything = NUTS | MUSHROOMS | CILANTRO | vocabulary.ingredients.encode(["dairy", "meat", "gluten"])
+    # Подходящих блюд меньше k: -inf в выдачу не попадает
+    assert [dish.name for dish in catalog.rank([500, 30, 10, 60], DAILY, exclude_mask=everything, k=5)] == [
+        "куриная грудка с рисом", "гречка"
+    ]
+
+
+def test_save_load_round_trip(catalog, tmp_path):
+    catalog.save(tmp_path / "dishes")
+    loaded = DishCatalog.load(tmp_path / "dishes")
+    assert loaded.names == catalog.names
+    np.testing.assert_array_equal(loaded.restriction_masks, catalog.restriction_masks)
+    remaining = [600, 50, 20, 70]
+    assert [dish.index for dish in loaded.rank(remaining, DAILY)] == [dish.index for dish in catalog.rank(remaining, DAILY)]
@@ -0,0 +1,157 @@
+"""
+Планировщик напоминаний: аренда секций и claim_due на SQLite, загрузка кучи по горизонту
+"""
+import asyncio
+import time
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from backend.app.config import settings
+from backend.app.db.migrations import run_migrations
+from backend.app.db.session import build_engine
+from backend.app.repositories.reminders_repo import RemindersRepository
+from backend.app.services.reminders import REMINDER_TEXTS, ReminderScheduler
+
+PARTITIONS = 4
+TTL_S = 10
+NOW = 1_800_000_000
+
+
+@pytest.fixture
+async def sessions(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "REMINDER_PARTITIONS", PARTITIONS)
+    engine = build_engine(f"sqlite+aiosqlite:///{tmp_path / 'reminders.db'}", pool_mode="null")
+    await run_migrations(engine)
+    sessions = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with sessions() as session:
+        await RemindersRepository(session).ensure_partitions(PARTITIONS)
+    yield sessions
+    await engine.dispose()
+
+
+async def repo_call(sessions, method, *args, **kwargs):
+    async with sessions() as session:
+        return await getattr(RemindersRepository(session), method)(*args, **kwargs)
+
+
+async def schedule(sessions, user_id, next_run_ts, interval_s=0, kind="weigh_in"):
+    await repo_call(sessions, "schedule", user_id, 100 + user_id, kind, user_id % PARTITIONS, next_run_ts, interval_s)
+
+
+@pytest.mark.anyio
+async def test_claim_due_hands_reminder_to_exactly_one_claimer(sessions):
+    assert await repo_call(sessions, "renew_leases", "a", NOW, TTL_S) == set(range(PARTITIONS))
+    assert await repo_call(sessions, "renew_leases", "b", NOW, TTL_S) == set()
+    for user_id in range(1, 9):
+        await schedule(sessions, user_id, NOW - 5, interval_s=3600 if user_id % 2 else 0)
+    ids = list(range(1, 9))
+
+    # Не владелец секций не забирает ничего
+    assert await repo_call(sessions, "claim_due", ids, NOW, "b") == []
+
+    # Параллельные claim одного владельца (два процесса после рестарта) делят строки без повторов
+    first, second = await asyncio.gather(
+        repo_call(sessions, "claim_due", ids, NOW, "a"), repo_call(sessions, "claim_due", ids, NOW, "a")
+    )
+    claimed = [row.id for row in first + second]
+    assert sorted(claimed) == ids
+
+    by_user = {row.user_id: row for row in first + second}
+    assert by_user[1].enabled and by_user[1].next_run_ts == NOW - 5 + 3600  # Сдвинут на период
+    assert not by_user[2].enabled  # Разовое выключено
+    assert await repo_call(sessions, "claim_due", ids, NOW, "a") == []
+
+
+@pytest.mark.anyio
+async def test_expired_lease_is_reclaimed(sessions):
+    await repo_call(sessions, "renew_leases", "a", NOW, TTL_S)
+    await schedule(sessions, 1, NOW + TTL_S)
+
+    assert await repo_call(sessions, "renew_leases", "b", NOW + TTL_S - 1, TTL_S) == set()
+    later = NOW + TTL_S + 1
+    assert await repo_call(sessions, "renew_leases", "b", later, TTL_S) == set(range(PARTITIONS))
+    # Старый владелец после потери аренды ничего не отправит
+    assert await repo_call(sessions, "claim_due", [1], later, "a") == []
+    assert [row.id for row in await repo_call(sessions, "claim_due", [1], later, "b")] == [1]
+
+
+@pytest.mark.anyio
+async def test_heartbeat_renewal_keeps_lease(sessions):
+    assert await repo_call(sessions, "heartbeat", "a", NOW, TTL_S) == 1
+    await repo_call(sessions, "renew_leases", "a", NOW, TTL_S)
+    for tick in range(1, 4):
+        now = NOW + tick * (TTL_S - 2)
+        await repo_call(sessions, "heartbeat", "a", now, TTL_S)
+        assert await repo_call(sessions, "renew_leases", "a", now, TTL_S) == set(range(PARTITIONS))
+        assert await repo_call(sessions, "renew_leases", "b", now + 1, TTL_S) == set()
+
+    # Второй живой воркер: первый отдаёт лишние секции сверх половины
+    await repo_call(sessions, "heartbeat", "a", NOW + 30, TTL_S)
+    assert await repo_call(sessions, "heartbeat", "b", NOW + 30, TTL_S) == 2
+    kept = await repo_call(sessions, "renew_leases", "a", NOW + 30, TTL_S, max_owned=PARTITIONS // 2)
+    taken = await repo_call(sessions, "renew_leases", "b", NOW + 30, TTL_S, max_owned=PARTITIONS // 2)
+    assert len(kept) == len(taken) == PARTITIONS // 2
+    assert kept | taken == set(range(PARTITIONS))
+
+    await repo_call(sessions, "release_leases", "a")
+    assert await repo_call(sessions, "renew_leases", "c", NOW + 31, TTL_S, max_owned=PARTITIONS) == kept
+
+
+class FakeBot:
+    def __init__(self):
+        self.sent = []
+
+    async def send_message(self, chat_id, text):
+        self.sent.append((chat_id, text))
+
+
+async def wait_sent(bot, count, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while len(bot.sent) < count and time.monotonic() < deadline:
+        await asyncio.sleep(0.02)
+
+
+@pytest.mark.anyio
+async def test_scheduler_loads_horizon_and_fires_due(sessions, monkeypatch):
+    monkeypatch.setattr(settings, "REMINDER_HORIZON_S", 60)
+    now = int(time.time())
+    await schedule(sessions, 1, now - 10)  # Пропущенное за время простоя
+    await schedule(sessions, 2, now + 3600)  # За горизонтом
+
+    bot = FakeBot()
+    scheduler = ReminderScheduler(bot, session_factory=sessions, owner="test")
+    await scheduler._maintain()
+    assert scheduler.partitions == set(range(PARTITIONS))
+    assert [entry[1] for entry in scheduler._heap] == [1]
+
+    fire = asyncio.create_task(scheduler._fire_loop())
+    try:
+        await wait_sent(bot, 1)
+        assert bot.sent == [(101, REMINDER_TEXTS["weigh_in"])]
+
+        # Расписание, появившееся в уже прочитанном окне, подхватывает перечитка
+        await schedule(sessions, 3, int(time.time()) + 1)
+        scheduler._resync_at = 0
+        await scheduler._maintain()
+        assert [entry[1] for entry in scheduler._heap] == [3]
+        await wait_sent(bot, 2)
+        assert bot.sent[1][0] == 103
+    finally:
+        fire.cancel()
+        await asyncio.gather(fire, return_exceptions=True)
+    assert scheduler.stats.sent == 2
+
+    await scheduler.stop()
+    assert await repo_call(sessions, "renew_leases", "other", now, TTL_S) == set(range(PARTITIONS))
+
+
+@pytest.mark.anyio
+async def test_stop_survives_database_errors():
+    def broken_sessions():
+        raise ConnectionError("db down")
+
+    scheduler = ReminderScheduler(FakeBot(), session_factory=broken_sessions, owner="test")
+    scheduler.partitions = {1}
+    await scheduler.stop()
+    assert scheduler.partitions == set()
@@ -0,0 +1,123 @@
+"""
+BaseRepository: пачечные операции, потоковое чтение, patch и действия после commit
+"""
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from backend.app.db.migrations import run_migrations
+from backend.app.db.models import User
+from backend.app.db.session import build_engine
+from backend.app.repositories.users_repo import UsersRepository, _user_id_cache, cached_user_id
+
+
+@pytest.fixture
+async def sessions(tmp_path):
+    engine = build_engine(f"sqlite+aiosqlite:///{tmp_path / 'repo.db'}", pool_mode="null")
+    await run_migrations(engine)
+    _user_id_cache.clear()
+    yield async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    _user_id_cache.clear()
+    await engine.dispose()
+
+
+async def usernames(sessions) -> dict:
+    async with sessions() as session:
+        rows = await session.execute(select(User.telegram_user_id, User.username).order_by(User.id))
+        return dict(rows.all())
+
+
+@pytest.mark.anyio
+async def test_bulk_create_upsert_update(sessions):
+    async with sessions() as session:
+        repo = UsersRepository(session)
+        assert await repo.bulk_create([]) == 0
+        assert await repo.bulk_create([
+            {"telegram_user_id": "1", "username": "a"},
+            {"telegram_user_id": "2", "username": "b"},
+        ]) == 2
+
+        assert await repo.bulk_upsert([
+            {"telegram_user_id": "2", "username": "b2"},
+            {"telegram_user_id": "3", "username": "c"},
+        ], index_elements=["telegram_user_id"]) == 2
+        # Без полей для обновления — ON CONFLICT DO NOTHING
+        await repo.bulk_upsert([{"telegram_user_id": "1"}], index_elements=["telegram_user_id"])
+
+        ids = dict((await session.execute(select(User.telegram_user_id, User.id))).all())
+        assert await repo.bulk_update([
+            {"id": ids["1"], "username": "a2"},
+            {"id": ids["3"], "username": "c2"},
+        ]) == 2
+
+    assert await usernames(sessions) == {"1": "a2", "2": "b2", "3": "c2"}
+
+
+@pytest.mark.anyio
+async def test_iter_batches_and_iter_all(sessions):
+    async with sessions() as session:
+        repo = UsersRepository(session)
+        await repo.bulk_create([{"telegram_user_id": str(i), "is_active": i % 3 != 0} for i in range(1, 11)])
+
+        batches = [[user.telegram_user_id for user in batch] async for batch in repo.iter_batches(batch_size=4)]
+        assert batches == [["1", "2", "3", "4"], ["5", "6", "7", "8"], ["9", "10"]]
+        # Выданные пачки выгружены из сессии
+        assert not list(session.identity_map.values())
+
+        active = [user.telegram_user_id async for user in repo.iter_all(User.is_active.is_(True), batch_size=3)]
+        assert active == ["1", "2", "4", "5", "7", "8", "10"]
+
+        assert [batch async for batch in repo.iter_batches(User.id < 0)] == []
+
+
+@pytest.mark.anyio
+async def test_patch_returns_row_without_loading_object(sessions):
+    async with sessions() as session:
+        repo = UsersRepository(session)
+        user = await repo.create(User(telegram_user_id="1", username="a", first_name="Anna"))
+
+        row = await repo.patch(user.id, {"username": "b", "first_name": None, "unknown": 1},
+                               returning=["id", "username", "first_name"])
+        assert tuple(row) == (user.id, "b", "Anna")
+
+        # Пустое обновление — только чтение
+        row = await repo.patch(user.id, {"username": None}, returning=["username"])
+        assert row.username == "b"
+        assert await repo.patch(user.id + 100, {"username": "x"}) is None
+
+    assert await usernames(sessions) == {"1": "b"}
+
+
+@pytest.mark.anyio
+async def test_after_commit_callbacks_dropped_on_rollback(sessions):
+    async with sessions() as session:
+        repo = UsersRepository(session, autocommit=False)
+        await repo.upsert("1", username="a")
+        await session.rollback()
+        assert cached_user_id("1") is None
+
+        # Откаченный callback не срабатывает на следующем commit той же сессии
+        await repo.upsert("2", username="b")
+        await session.commit()
+        assert cached_user_id("1") is None
+        assert cached_user_id("2") is not None
+
+        # Слушатели не копятся: одна пара на сессию
+        sync_session = session.sync_session
+        assert len(sync_session.dispatch.after_commit) == 1
+        assert len(sync_session.dispatch.after_rollback) == 1
+
+    assert await usernames(sessions) == {"2": "b"}
+
+
+@pytest.mark.anyio
+async def test_upsert_keeps_known_names_when_update_has_none(sessions):
+    async with sessions() as session:
+        repo = UsersRepository(session)
+        first = await repo.upsert("1", username="anna", first_name="Anna")
+        again = await repo.upsert("1")
+        assert again.id == first.id
+        assert (again.username, again.first_name) == ("anna", "Anna")
+
+        renamed = await repo.upsert("1", username="anna_k")
+        assert (renamed.username, renamed.first_name) == ("anna_k", "Anna")
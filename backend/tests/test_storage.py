@@ -0,0 +1,149 @@
+"""
+FSM хранилища: запись/чтение состояния и данных, TTL брошенной регистрации
+"""
+import time
+
+import pytest
+from aiogram.fsm.state import State, StatesGroup
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from backend.app.bot.storage import PipelinedRedisStorage, SQLiteStorage, decode_data, encode_data
+
+KEY = StorageKey(bot_id=1, chat_id=42, user_id=42)
+OTHER_KEY = StorageKey(bot_id=1, chat_id=43, user_id=43)
+
+
+class Registration(StatesGroup):
+    waiting_for_height = State()
+
+
+def fake_redis_storage() -> PipelinedRedisStorage:
+    """Redis-хранилище поверх fakeredis (без него тест пропускается)"""
+    fakeredis = pytest.importorskip("fakeredis")
+    return PipelinedRedisStorage(fakeredis.FakeAsyncRedis(decode_responses=True), state_ttl=60)
+
+
+@pytest.fixture
+async def redis_storage():
+    storage = fake_redis_storage()
+    yield storage
+    await storage.close()
+
+
+@pytest.fixture(params=["memory", "sqlite", "redis"])
+async def storage(request, tmp_path):
+    if request.param == "memory":
+        storage = MemoryStorage()
+    elif request.param == "sqlite":
+        storage = SQLiteStorage(str(tmp_path / "fsm.sqlite3"), state_ttl=60)
+    else:
+        storage = fake_redis_storage()
+    yield storage
+    await storage.close()
+
+
+def test_field_aliases_round_trip():
+    data = {"age": 30, "height_cm": 180.5, "goal_type": "lose", "custom": [1, "два"]}
+    raw = encode_data(data)
+    assert '"h":180.5' in raw
+    assert decode_data(raw) == data
+    assert decode_data(None) == {}
+
+
+@pytest.mark.anyio
+async def test_state_and_data_round_trip(storage):
+    await storage.set_state(KEY, Registration.waiting_for_height)
+    await storage.set_data(KEY, {"age": 30, "gender": "M"})
+    assert await storage.update_data(KEY, {"height_cm": 180}) == {"age": 30, "gender": "M", "height_cm": 180}
+
+    assert await storage.get_state(KEY) == Registration.waiting_for_height.state
+    assert await storage.get_data(KEY) == {"age": 30, "gender": "M", "height_cm": 180}
+    assert await storage.get_state(OTHER_KEY) is None
+    assert await storage.get_data(OTHER_KEY) == {}
+
+    await storage.set_state(KEY, None)
+    assert await storage.get_state(KEY) is None
+
+
+@pytest.mark.anyio
+async def test_sqlite_survives_reopen(tmp_path):
+    path = str(tmp_path / "fsm.sqlite3")
+    storage = SQLiteStorage(path, state_ttl=60)
+    await storage.set_state(KEY, Registration.waiting_for_height)
+    await storage.update_data(KEY, {"age": 30})
+    await storage.close()
+
+    storage = SQLiteStorage(path, state_ttl=60)
+    assert await storage.get_state(KEY) == Registration.waiting_for_height.state
+    assert await storage.get_data(KEY) == {"age": 30}
+    await storage.close()
+
+
+@pytest.mark.anyio
+async def test_sqlite_ttl(tmp_path, monkeypatch):
+    storage = SQLiteStorage(str(tmp_path / "fsm.sqlite3"), state_ttl=60)
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now)
+    await storage.set_state(KEY, Registration.waiting_for_height)
+    await storage.update_data(KEY, {"age": 30})
+
+    # Любая запись продлевает TTL
+    monkeypatch.setattr(time, "time", lambda: now + 50)
+    await storage.update_data(KEY, {"gender": "F"})
+    monkeypatch.setattr(time, "time", lambda: now + 100)
+    assert await storage.get_data(KEY) == {"age": 30, "gender": "F"}
+
+    # Брошенная регистрация истекает, слияние данных начинается с чистого листа
+    monkeypatch.setattr(time, "time", lambda: now + 200)
+    assert await storage.get_state(KEY) is None
+    assert await storage.get_data(KEY) == {}
+    assert await storage.update_data(KEY, {"age": 31}) == {"age": 31}
+    await storage.close()
+
+
+@pytest.mark.anyio
+async def test_sqlite_expired_row_does_not_revive_other_column(tmp_path, monkeypatch):
+    storage = SQLiteStorage(str(tmp_path / "fsm.sqlite3"), state_ttl=60)
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now)
+    await storage.set_state(KEY, Registration.waiting_for_height)
+    await storage.set_data(KEY, {"age": 30})
+
+    # Новое состояние поверх истёкшей строки не возвращает старые данные
+    monkeypatch.setattr(time, "time", lambda: now + 100)
+    await storage.set_state(KEY, Registration.waiting_for_height)
+    assert await storage.get_data(KEY) == {}
+
+    # И наоборот: новые данные не возвращают истёкшее состояние
+    monkeypatch.setattr(time, "time", lambda: now + 200)
+    await storage.set_data(KEY, {"age": 31})
+    assert await storage.get_state(KEY) is None
+    assert await storage.get_data(KEY) == {"age": 31}
+
+    monkeypatch.setattr(time, "time", lambda: now + 300)
+    await storage.set_state(KEY, Registration.waiting_for_height)
+    monkeypatch.setattr(time, "time", lambda: now + 400)
+    assert await storage.update_data(KEY, {"gender": "F"}) == {"gender": "F"}
+    assert await storage.get_state(KEY) is None
+    await storage.close()
+
+
+@pytest.mark.anyio
+async def test_redis_keys_compact_and_expire(redis_storage):
+    redis = redis_storage.redis
+    await redis_storage.set_state(KEY, Registration.waiting_for_height)
+    await redis_storage.update_data(KEY, {"height_cm": 180, "goal_type": "lose"})
+
+    state_key = redis_storage.key_builder.build(KEY, "state")
+    data_key = redis_storage.key_builder.build(KEY, "data")
+    assert await redis.hgetall(data_key) == {"h": "180", "t": '"lose"'}
+    assert 0 < await redis.ttl(state_key) <= 60
+    assert 0 < await redis.ttl(data_key) <= 60
+
+    # set_data заменяет hash целиком, пустые данные удаляют ключ
+    await redis_storage.set_data(KEY, {"age": 30})
+    assert await redis_storage.get_data(KEY) == {"age": 30}
+    await redis_storage.set_data(KEY, {})
+    assert not await redis.exists(data_key)
+    assert await redis_storage.update_data(KEY, {}) == {}
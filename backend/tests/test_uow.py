@@ -0,0 +1,86 @@
+"""
+UnitOfWorkMiddleware: один commit после хэндлера, rollback и без after_commit при ошибке
+"""
+from functools import partial
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from backend.app.bot import middlewares
+from backend.app.db.migrations import run_migrations
+from backend.app.db.models import User
+from backend.app.db.session import build_engine
+from backend.app.db.uow import UnitOfWork
+from backend.app.repositories.users_repo import _user_id_cache, cached_user_id
+
+
+@pytest.fixture
+async def sessions(tmp_path, monkeypatch):
+    engine = build_engine(f"sqlite+aiosqlite:///{tmp_path / 'uow.db'}", pool_mode="null")
+    await run_migrations(engine)
+    factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    monkeypatch.setattr(middlewares, "UnitOfWork", partial(UnitOfWork, factory))
+    _user_id_cache.clear()
+    yield factory
+    _user_id_cache.clear()
+    await engine.dispose()
+
+
+async def count_users(sessions) -> int:
+    async with sessions() as session:
+        return await session.scalar(select(func.count()).select_from(User))
+
+
+@pytest.mark.anyio
+async def test_handler_error_rolls_back_and_skips_callbacks(sessions):
+    called = []
+
+    async def handler(event, data):
+        uow = data["uow"]
+        await uow.users.upsert("100", username="alice")
+        await uow.users.upsert("200", username="bob")
+        uow.after_commit(partial(called.append, "sent"))
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError, match="boom"):
+        await middlewares.UnitOfWorkMiddleware()(handler, object(), {})
+
+    assert await count_users(sessions) == 0
+    assert called == []
+    assert cached_user_id("100") is None
+
+
+@pytest.mark.anyio
+async def test_handler_success_commits_once_then_runs_callbacks(sessions):
+    seen = {}
+
+    async def callback():
+        seen["opened"] = uow.opened
+        seen["users"] = await count_users(sessions)
+
+    async def handler(event, data):
+        nonlocal uow
+        uow = data["uow"]
+        await uow.users.upsert("100", username="alice")
+        uow.after_commit(callback)
+        # До commit строка не видна другим сессиям
+        seen["before_commit"] = await count_users(sessions)
+        return "ok"
+
+    uow = None
+    assert await middlewares.UnitOfWorkMiddleware()(handler, object(), {}) == "ok"
+
+    assert seen == {"before_commit": 0, "opened": False, "users": 1}
+    assert cached_user_id("100") is not None
+
+
+@pytest.mark.anyio
+async def test_handler_without_db_does_not_open_session(sessions):
+    data = {}
+
+    async def handler(event, data):
+        return "ok"
+
+    assert await middlewares.UnitOfWorkMiddleware()(handler, object(), data) == "ok"
+    assert data["uow"].opened is False
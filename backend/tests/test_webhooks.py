@@ -0,0 +1,70 @@
+"""
+Webhook Telegram: secret token, некорректное тело, обратное давление очереди
+"""
+import httpx
+import pytest
+from aiogram import Bot
+from fastapi import FastAPI
+
+from backend.app.bot import executor
+from backend.app.bot.executor import UpdateExecutor
+from backend.app.bot.webhooks import SECRET_HEADER, handle_telegram_update
+from backend.app.config import settings
+
+SECRET = "s3cret"
+UPDATE = {
+    "update_id": 1,
+    "message": {
+        "message_id": 1, "date": 0, "chat": {"id": 5, "type": "private"},
+        "from": {"id": 5, "is_bot": False, "first_name": "Test"}, "text": "/start",
+    },
+}
+
+
+@pytest.fixture
+async def client(monkeypatch):
+    monkeypatch.setattr(settings, "BOT_MODE", "webhook")
+    monkeypatch.setattr(settings, "WEBHOOK_SECRET", SECRET)
+    bot = Bot(token=settings.TELEGRAM_BOT_TOKEN)
+    # Воркеры не запущены: обновления остаются в очереди
+    update_executor = UpdateExecutor(dp=None, bot=bot, max_queued=1)
+    monkeypatch.setattr(executor, "update_executor", update_executor)
+
+    app = FastAPI()
+    app.post("/telegram/webhook")(handle_telegram_update)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        client.update_executor = update_executor
+        yield client
+    await bot.session.close()
+
+
+async def post(client, body, secret=SECRET, **kwargs):
+    headers = {SECRET_HEADER: secret} if secret is not None else {}
+    return await client.post("/telegram/webhook", headers=headers, **{"json": body, **kwargs})
+
+
+@pytest.mark.anyio
+async def test_wrong_or_missing_secret_is_rejected(client):
+    assert (await post(client, UPDATE, secret="wrong")).status_code == 403
+    assert (await post(client, UPDATE, secret=None)).status_code == 403
+    assert client.update_executor.queued == 0
+
+
+@pytest.mark.anyio
+async def test_malformed_body_is_400(client):
+    response = await post(client, None, content=b"{not json")
+    assert response.status_code == 400
+    assert (await post(client, {"message": "no update_id"})).status_code == 400
+    assert client.update_executor.queued == 0
+
+
+@pytest.mark.anyio
+async def test_good_update_is_queued_then_backpressure(client):
+    response = await post(client, UPDATE)
+    assert response.status_code == 200
+    assert response.json() == {"ok": True}
+    assert client.update_executor.queued == 1
+
+    response = await post(client, {**UPDATE, "update_id": 2})
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"